@@ -0,0 +1,4 @@
+"""PDF処理アダプターパッケージです。
+
+Poppler (pdf2image) を用いたPDFページの画像化の実装を提供します。
+"""
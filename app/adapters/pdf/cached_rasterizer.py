@@ -0,0 +1,168 @@
+"""ページ画像のキャッシュを参照するPdfRasterizerGatewayのラッパーモジュール。
+
+``CachedPdfRasterizer`` は画像化の前にページごとにキャッシュを参照し、キャッシュされているページは
+出力先ディレクトリにコピーするのみとします。キャッシュされていないページのみを連続する範囲ごとに
+元の実装で画像化し、画像化したページをキャッシュに登録します。
+キャッシュのキーの解像度と色は、元の実装の ``plan_pages()`` が決めたページごとの方針によります。
+"""
+
+import logging
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from app.adapters.pdf.page_cache import PageCacheKey, PageImageCache, file_sha256
+from app.adapters.pdf.pdf2image_rasterizer import Pdf2ImageRasterizer, page_filename
+from app.adapters.pdf.raster_policy import PagePlan
+from app.core.pdf.gateways import PdfRasterizerGateway, RenderedPage
+
+logger = logging.getLogger(__name__)
+
+
+def missing_ranges(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """昇順のページ番号を連続する範囲にまとめます。
+
+    Args:
+        page_numbers: 昇順のページ番号
+
+    Returns:
+        List[Tuple[int, int]]: (最初のページ, 最後のページ) のリスト
+    """
+    ranges: List[Tuple[int, int]] = []
+    for page_number in page_numbers:
+        if ranges and ranges[-1][1] == page_number - 1:
+            ranges[-1] = (ranges[-1][0], page_number)
+        else:
+            ranges.append((page_number, page_number))
+    return ranges
+
+
+class CachedPdfRasterizer(PdfRasterizerGateway):
+    """ページ画像のキャッシュを参照してから画像化するPdfRasterizerGatewayのラッパー。"""
+
+    def __init__(self, rasterizer: Pdf2ImageRasterizer, cache: PageImageCache):
+        """初期化
+
+        Args:
+            rasterizer: キャッシュされていないページの画像化に用いる実装
+            cache: ページ画像のキャッシュ
+        """
+        self.rasterizer = rasterizer
+        self.cache = cache
+
+    def get_page_count(self, pdf_path: str) -> int:
+        """PDFのページ数を返す。
+
+        Args:
+            pdf_path: PDFファイルのパス
+
+        Returns:
+            ページ数
+
+        Raises:
+            PdfRasterizeError: PDFを読み込めない場合
+        """
+        return self.rasterizer.get_page_count(pdf_path)
+
+    def render_pages(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+    ) -> Iterator[RenderedPage]:
+        """キャッシュされているページはコピーし、それ以外のページを画像化して、書き出したページを順に返す。
+
+        Args:
+            pdf_path: PDFファイルのパス
+            output_dir: 画像の出力先ディレクトリ（存在しない場合は作成）
+            first_page: 画像化する最初のページ（1始まり）。省略時は先頭ページ
+            last_page: 画像化する最後のページ。省略時は最終ページ
+
+        Returns:
+            ページ番号の昇順に、書き出したページを逐次返すイテレータ
+
+        Raises:
+            PdfRasterizeError: PDFの読み込み・画像化に失敗した場合
+        """
+        first_page = first_page or 1
+        if last_page is None:
+            last_page = self.get_page_count(pdf_path)
+        os.makedirs(output_dir, exist_ok=True)
+        pdf_sha256 = file_sha256(pdf_path)
+        plans = {plan.page_number: plan for plan in self.rasterizer.plan_pages(pdf_path, first_page, last_page)}
+
+        cached = {}
+        for page_number in range(first_page, last_page + 1):
+            path = self.cache.get(self._key(pdf_sha256, plans[page_number]))
+            if path is not None:
+                cached[page_number] = path
+        missing = [n for n in range(first_page, last_page + 1) if n not in cached]
+        logger.debug(f"PDF {pdf_path}: キャッシュ済み {len(cached)}ページ, 画像化 {len(missing)}ページ")
+
+        next_page = first_page
+        for start, end in missing_ranges(missing):
+            yield from self._copy_cached(pdf_path, pdf_sha256, plans, cached, output_dir, next_page, start - 1)
+            yield from self._render(pdf_path, pdf_sha256, output_dir, [plans[n] for n in range(start, end + 1)])
+            next_page = end + 1
+        yield from self._copy_cached(pdf_path, pdf_sha256, plans, cached, output_dir, next_page, last_page)
+
+    def _key(self, pdf_sha256: str, plan: PagePlan) -> PageCacheKey:
+        return PageCacheKey(
+            pdf_sha256=pdf_sha256,
+            page_number=plan.page_number,
+            dpi=plan.dpi,
+            fmt=self.rasterizer.fmt,
+            color_mode=plan.color_mode,
+        )
+
+    def _render(
+        self,
+        pdf_path: str,
+        pdf_sha256: str,
+        output_dir: str,
+        plans: Sequence[PagePlan],
+    ) -> Iterator[RenderedPage]:
+        """指定したページを方針に従って画像化し、キャッシュに登録します。
+
+        返されたページの並び順ではなくページ番号で方針を対応付け、返されなかったページはキャッシュに登録しません。
+        """
+        plans_by_page = {plan.page_number: plan for plan in plans}
+        for page in self.rasterizer.render_planned(pdf_path, output_dir, plans):
+            plan = plans_by_page.get(page.page_number)
+            if plan is not None:
+                self.cache.put(self._key(pdf_sha256, plan), page.path)
+            yield page
+
+    def _copy_cached(
+        self,
+        pdf_path: str,
+        pdf_sha256: str,
+        plans: Dict[int, PagePlan],
+        cached: Dict[int, str],
+        output_dir: str,
+        first_page: int,
+        last_page: int,
+    ) -> Iterator[RenderedPage]:
+        """キャッシュされているページを出力先ディレクトリにコピーします。
+
+        ハードリンクにすると後続の処理がページ画像をその場で書き換えた場合にキャッシュも書き換わるため、コピーとします。
+        参照してからコピーするまでの間に他のプロセスがキャッシュから削除した場合は、そのページを画像化します。
+        """
+        for page_number in range(first_page, last_page + 1):
+            path = os.path.join(output_dir, page_filename(page_number, self.rasterizer.fmt))
+            if os.path.exists(path):
+                os.remove(path)
+            try:
+                shutil.copyfile(cached[page_number], path)
+            except FileNotFoundError:
+                yield from self._render(pdf_path, pdf_sha256, output_dir, [plans[page_number]])
+                continue
+            with Image.open(path) as image:
+                width, height = image.size
+            plan = plans[page_number]
+            yield RenderedPage(
+                page_number=page_number, path=path, width=width, height=height,
+                dpi=plan.dpi, grayscale=plan.grayscale)
@@ -0,0 +1,67 @@
+"""PDF画像化ゲートウェイのファクトリー
+
+設定に基づいて適切なPdfRasterizerGatewayの実装を提供します。
+"""
+import logging
+from typing import Optional
+
+from django.conf import settings
+
+from app.adapters.pdf.cached_rasterizer import CachedPdfRasterizer
+from app.adapters.pdf.page_cache import PageImageCache
+from app.adapters.pdf.pdf2image_rasterizer import Pdf2ImageRasterizer
+from app.core.pdf.gateways import PdfRasterizerGateway
+
+logger = logging.getLogger(__name__)
+
+
+class PdfRasterizerFactory:
+    """PdfRasterizerGatewayのファクトリークラス
+
+    シングルトンパターンでPdfRasterizerGatewayインスタンスを提供します。
+    """
+
+    # シングルトンインスタンスを保持するためのクラス変数
+    _instance: Optional[PdfRasterizerGateway] = None
+
+    @classmethod
+    def create_rasterizer(cls) -> PdfRasterizerGateway:
+        """PdfRasterizerGatewayのインスタンスを作成する
+
+        ``PDF_PAGE_CACHE_ENABLED`` が有効な場合は、ページ画像のキャッシュを参照する実装を返します。
+
+        Returns:
+            PdfRasterizerGateway: PDF画像化ゲートウェイのインスタンス
+        """
+        rasterizer = Pdf2ImageRasterizer()
+        if not getattr(settings, 'PDF_PAGE_CACHE_ENABLED', False):
+            return rasterizer
+
+        cache = PageImageCache(
+            settings.PDF_PAGE_CACHE_DIR,
+            max_bytes=settings.PDF_PAGE_CACHE_MAX_MB * 1024 * 1024,
+        )
+        logger.debug(f"ページ画像のキャッシュを使用します: {settings.PDF_PAGE_CACHE_DIR}")
+        return CachedPdfRasterizer(rasterizer, cache)
+
+    @classmethod
+    def get_rasterizer(cls) -> PdfRasterizerGateway:
+        """PdfRasterizerGatewayのシングルトンインスタンスを取得する
+
+        Returns:
+            PdfRasterizerGateway: PDF画像化ゲートウェイのシングルトンインスタンス
+        """
+        if cls._instance is None:
+            cls._instance = cls.create_rasterizer()
+        return cls._instance
+
+    @classmethod
+    def reset_rasterizer(cls) -> None:
+        """PdfRasterizerGatewayのシングルトンインスタンスをリセットする
+
+        テストなどで初期化が必要な場合に使用します。
+
+        Returns:
+            None
+        """
+        cls._instance = None
@@ -0,0 +1,181 @@
+"""画像化の前にPDFのページの内容を安価に調べるモジュール。
+
+ページを画像化せずに、Popplerの以下のコマンドの出力のみからページごとの指標を求めます。
+
+- ``pdfinfo -f -l``: ページの大きさ
+- ``pdftotext -f -l``: テキストレイヤーの文字数（ページは改ページ文字で区切られる）
+- ``pdfimages -list -f -l``: ページに配置された画像の大きさ・解像度・色空間
+
+いずれも文書全体で1回ずつの実行で、ページの描画を行わないため、画像化と比べて十分に短時間で完了します。
+"""
+
+import os
+import platform
+import re
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.pdf.gateways import PdfRasterizeError
+
+# 1インチあたりのポイント数
+POINTS_PER_INCH = 72.0
+
+# pdfinfo の "Page    1 size: 595.276 x 841.89 pts (A4)" の行
+PAGE_SIZE_PATTERN = re.compile(r'^Page\s+(\d+)\s+size:\s+([\d.]+)\s+x\s+([\d.]+)\s+pts')
+
+# pdfimages -list の色空間のうち、グレースケールとみなすもの
+GRAY_COLOR_SPACES = ('gray',)
+
+
+@dataclass(frozen=True)
+class PageMetrics:
+    """画像化の前に調べた1ページの指標。
+
+    Attributes:
+        page_number: ページ番号（1始まり）
+        width_pt: ページの幅（ポイント）
+        height_pt: ページの高さ（ポイント）
+        text_chars: テキストレイヤーの空白以外の文字数
+        image_count: ページに配置された画像の数（マスクを除く）
+        image_coverage: ページの面積に対する画像の面積の割合（0〜1）
+        has_color_images: グレースケール以外の色空間の画像を含むかどうか
+    """
+    page_number: int
+    width_pt: float
+    height_pt: float
+    text_chars: int = 0
+    image_count: int = 0
+    image_coverage: float = 0.0
+    has_color_images: bool = False
+
+
+def analyze_pages(
+    pdf_path: str,
+    first_page: int,
+    last_page: int,
+    poppler_path: Optional[str] = None,
+    timeout: Optional[int] = None,
+) -> Dict[int, PageMetrics]:
+    """指定した範囲のページの指標を求めます。
+
+    Args:
+        pdf_path: PDFファイルのパス
+        first_page: 最初のページ（1始まり）
+        last_page: 最後のページ
+        poppler_path: Popplerの実行ファイルのディレクトリ。Noneの場合はPATHから検索
+        timeout: 各コマンドのタイムアウト（秒）。Noneの場合は無制限
+
+    Returns:
+        Dict[int, PageMetrics]: ページ番号をキーとしたページの指標
+
+    Raises:
+        PdfRasterizeError: Popplerのコマンドを実行できない、または出力を解析できない場合
+    """
+    page_range = ['-f', str(first_page), '-l', str(last_page)]
+    sizes = parse_page_sizes(_run('pdfinfo', page_range + [pdf_path], poppler_path, timeout))
+    missing = [n for n in range(first_page, last_page + 1) if n not in sizes]
+    if missing:
+        raise PdfRasterizeError(f"PDF {pdf_path} の {missing[0]} ページの大きさを取得できません")
+
+    text = _run('pdftotext', page_range + ['-enc', 'UTF-8', pdf_path, '-'], poppler_path, timeout)
+    text_chars = parse_text_chars(text, first_page)
+    images = parse_image_list(_run('pdfimages', ['-list'] + page_range + [pdf_path], poppler_path, timeout))
+
+    metrics = {}
+    for page_number in range(first_page, last_page + 1):
+        width_pt, height_pt = sizes[page_number]
+        page_area = (width_pt / POINTS_PER_INCH) * (height_pt / POINTS_PER_INCH)
+        page_images = images.get(page_number, [])
+        image_area = sum(area for area, _ in page_images)
+        metrics[page_number] = PageMetrics(
+            page_number=page_number,
+            width_pt=width_pt,
+            height_pt=height_pt,
+            text_chars=text_chars.get(page_number, 0),
+            image_count=len(page_images),
+            image_coverage=min(1.0, image_area / page_area) if page_area else 0.0,
+            has_color_images=any(is_color for _, is_color in page_images),
+        )
+    return metrics
+
+
+def parse_page_sizes(output: str) -> Dict[int, Tuple[float, float]]:
+    """``pdfinfo -f -l`` の出力からページの大きさを取り出します。
+
+    Args:
+        output: pdfinfoの標準出力
+
+    Returns:
+        Dict[int, Tuple[float, float]]: ページ番号をキーとした (幅, 高さ)（ポイント）
+    """
+    sizes = {}
+    for line in output.splitlines():
+        match = PAGE_SIZE_PATTERN.match(line)
+        if match:
+            sizes[int(match.group(1))] = (float(match.group(2)), float(match.group(3)))
+    return sizes
+
+
+def parse_text_chars(output: str, first_page: int) -> Dict[int, int]:
+    """``pdftotext`` の出力からページごとの空白以外の文字数を数えます。
+
+    Args:
+        output: pdftotextの標準出力（ページの末尾に改ページ文字が付く）
+        first_page: 出力の最初のページ番号
+
+    Returns:
+        Dict[int, int]: ページ番号をキーとした文字数
+    """
+    pages = output.split('\f')
+    if pages and not pages[-1].strip():
+        # 最後のページの改ページ文字の後の空文字列
+        pages = pages[:-1]
+    return {
+        page_number: sum(1 for c in page if not c.isspace())
+        for page_number, page in enumerate(pages, start=first_page)
+    }
+
+
+def parse_image_list(output: str) -> Dict[int, List[Tuple[float, bool]]]:
+    """``pdfimages -list`` の出力からページごとの画像の面積と色を取り出します。
+
+    出力の列は ``page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio`` です。
+    マスク (``mask``・``smask``・``stencil``) は画像の一部であるため数えません。
+
+    Args:
+        output: pdfimagesの標準出力
+
+    Returns:
+        Dict[int, List[Tuple[float, bool]]]: ページ番号をキーとした (面積（平方インチ）, カラーかどうか) のリスト
+    """
+    images: Dict[int, List[Tuple[float, bool]]] = {}
+    for line in output.splitlines():
+        columns = line.split()
+        if len(columns) < 14 or not columns[0].isdigit() or columns[2] != 'image':
+            continue
+        try:
+            width, height = int(columns[3]), int(columns[4])
+            x_ppi, y_ppi = float(columns[12]), float(columns[13])
+        except ValueError:
+            continue
+        area = (width / x_ppi) * (height / y_ppi) if x_ppi and y_ppi else 0.0
+        images.setdefault(int(columns[0]), []).append((area, columns[5] not in GRAY_COLOR_SPACES))
+    return images
+
+
+def _run(command: str, args: List[str], poppler_path: Optional[str] = None, timeout: Optional[int] = None) -> str:
+    """Popplerのコマンドを実行し、標準出力を返します。"""
+    if platform.system() == 'Windows':
+        command += '.exe'
+    if poppler_path is not None:
+        command = os.path.join(poppler_path, command)
+    try:
+        result = subprocess.run(
+            [command] + args, capture_output=True, timeout=timeout, check=False)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise PdfRasterizeError(f"{command} を実行できません: {e}") from e
+    if result.returncode != 0:
+        stderr = result.stderr.decode('utf-8', 'ignore').strip()
+        raise PdfRasterizeError(f"{command} が終了コード {result.returncode} で失敗しました: {stderr}")
+    return result.stdout.decode('utf-8', 'ignore')
@@ -0,0 +1,179 @@
+"""画像化したページをPDFの内容で引けるディスクキャッシュのモジュール。
+
+同じPDFの再アップロードや、後続の処理の失敗による再実行でページを画像化し直さないよう、
+(PDFのSHA-256, ページ番号, 解像度, 画像形式, 色) をキーにページ画像をローカルディスクに保存します。
+合計サイズが ``PDF_PAGE_CACHE_MAX_MB`` を超えた場合は、最後に参照された日時 (mtime) が古い画像から削除します。
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 上限を超えた場合に、合計サイズをこの割合まで減らす
+EVICTION_LOW_WATERMARK = 0.9
+# 登録中の一時ファイルの拡張子
+TEMP_SUFFIX = '.tmp'
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """ファイルの内容のSHA-256を返します。
+
+    Args:
+        path: ファイルのパス
+        chunk_size: 1回に読み込むバイト数
+
+    Returns:
+        str: 16進数のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class PageCacheKey:
+    """ページ画像のキャッシュのキー。
+
+    Attributes:
+        pdf_sha256: PDFの内容のSHA-256
+        page_number: ページ番号（1始まり）
+        dpi: 解像度
+        fmt: 画像形式 ('jpg' または 'png')
+        color_mode: 色 ('color' または 'gray')
+    """
+    pdf_sha256: str
+    page_number: int
+    dpi: int
+    fmt: str
+    color_mode: str
+
+    @property
+    def relative_path(self) -> str:
+        """キャッシュディレクトリからの相対パスを返します。"""
+        return os.path.join(
+            self.pdf_sha256[:2], self.pdf_sha256,
+            f"page-{self.page_number:04d}-{self.dpi}dpi-{self.color_mode}.{self.fmt}")
+
+
+class PageImageCache:
+    """ページ画像をローカルディスクに保存するLRUキャッシュ。
+
+    複数のプロセスから同じディレクトリを共有できるよう、登録は一時ファイルからの名前の変更で行い、
+    参照日時はファイルのmtimeに記録します。
+    登録・参照するページ画像はコピーとし、呼び出し元のファイルとキャッシュのファイルが同じ実体を共有しないようにします
+    （呼び出し元がページ画像をその場で書き換えてもキャッシュが壊れないようにするため）。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """初期化
+
+        Args:
+            directory: キャッシュディレクトリ
+            max_bytes: キャッシュの合計サイズの上限（バイト）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def path_for(self, key: PageCacheKey) -> str:
+        """キーに対応するキャッシュファイルのパスを返します。
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            str: キャッシュファイルのパス
+        """
+        return os.path.join(self.directory, key.relative_path)
+
+    def get(self, key: PageCacheKey) -> Optional[str]:
+        """キャッシュされたページ画像のパスを返し、参照日時を更新します。
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            Optional[str]: キャッシュファイルのパス。キャッシュされていない場合はNone
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: PageCacheKey, source_path: str) -> str:
+        """ページ画像をキャッシュに登録し、上限を超えた場合は古い画像を削除します。
+
+        Args:
+            key: キャッシュのキー
+            source_path: 登録するページ画像のパス
+
+        Returns:
+            str: キャッシュファイルのパス
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}{TEMP_SUFFIX}"
+        shutil.copyfile(source_path, temp_path)
+        try:
+            # 同じキーの画像を置き換える場合は、置き換えた画像のサイズを合計から差し引く
+            replaced_size = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced_size = 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size in self._scan())
+            else:
+                self._size += os.path.getsize(path) - replaced_size
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """キャッシュファイルの (mtime, パス, サイズ) を返します。
+
+        他のプロセスが登録中の一時ファイルは、削除すると登録が失敗するため含めません。
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(TEMP_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _evict(self) -> None:
+        """参照日時が古い画像から削除し、合計サイズを上限の ``EVICTION_LOW_WATERMARK`` 倍まで減らします。"""
+        entries = sorted(self._scan())
+        size = sum(entry_size for _, _, entry_size in entries)
+        target = self.max_bytes * EVICTION_LOW_WATERMARK
+        removed = 0
+        for _, path, entry_size in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+            removed += 1
+        self._size = size
+        logger.info(f"ページ画像のキャッシュから{removed}件を削除しました (合計 {size / 1024 / 1024:.1f}MB)")
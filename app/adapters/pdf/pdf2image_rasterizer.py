@@ -0,0 +1,406 @@
+"""pdf2image (Poppler) を用いたPdfRasterizerGatewayの実装モジュール。
+
+``convert_from_path()`` で文書全体を一度に変換すると、全ページのPIL画像がメモリ上に展開されるため、
+数百ページの書籍では数GBのメモリを消費します。このモジュールでは ``first_page``/``last_page`` で
+``PDF_RASTER_WINDOW_SIZE`` ページずつ変換し、各ページを書き出して画像を解放してから次の範囲を変換します。
+範囲ごとの変換はそれぞれ別のpdftoppmプロセスで実行されるため、複数の範囲をスレッドから同時に変換して
+CPUコアを並列に使用します。同時に変換する範囲の数は文書ごとに ``PDF_RASTER_MAX_WORKERS_PER_DOCUMENT`` で制限します。
+
+``PDF_RASTER_PATHS_ONLY`` が有効な場合（既定）は、pdftoppmに出力先ディレクトリへ直接書き出させ
+(``output_folder``・``paths_only=True``)、ファイル名を ``page-0001.jpg`` 形式に変更するのみとします。
+PIL画像へのデコードと再エンコードを行わないため、1ページあたりのCPU時間とメモリ使用量を削減できます。
+
+``PDF_RASTER_ADAPTIVE`` が有効な場合は、画像化の前にページの内容を調べ (``page_analysis``)、
+ページごとの解像度とグレースケールかどうかを ``PDF_RASTER_POLICY`` の方針で決めます (``raster_policy``)。
+方針が同じ連続したページを1つの範囲として変換します。
+"""
+
+import logging
+import os
+import re
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pdf2image.exceptions import (
+    PDFInfoNotInstalledError,
+    PDFPageCountError,
+    PDFPopplerTimeoutError,
+    PDFSyntaxError,
+    PopplerNotInstalledError,
+)
+
+from app.adapters.pdf.page_analysis import analyze_pages
+from app.adapters.pdf.raster_policy import PagePlan, RasterPolicy, get_raster_policy
+from app.core.pdf.gateways import PdfRasterizeError, PdfRasterizerGateway, PdfToolNotInstalledError, RenderedPage
+
+logger = logging.getLogger(__name__)
+
+# pdf2imageが送出するPopplerの実行・PDFの解析に関するエラー
+POPPLER_ERRORS = (
+    PDFInfoNotInstalledError,
+    PDFPageCountError,
+    PDFPopplerTimeoutError,
+    PDFSyntaxError,
+    PopplerNotInstalledError,
+)
+# Popplerがインストールされていない（サーバーの構成の問題である）ことを示すエラー
+POPPLER_INSTALLATION_ERRORS = (PDFInfoNotInstalledError, PopplerNotInstalledError)
+
+# pdftoppmが書き出すファイル名（「接頭辞-ページ番号.拡張子」）のページ番号
+PDFTOPPM_PAGE_NUMBER = re.compile(r'-(\d+)\.[^.]+$')
+
+
+def page_filename(page_number: int, fmt: str) -> str:
+    """ページ画像のファイル名を返します。
+
+    Args:
+        page_number: ページ番号（1始まり）
+        fmt: 画像形式 ('jpg' または 'png')
+
+    Returns:
+        str: ``page-0001.jpg`` 形式のファイル名
+    """
+    return f"page-{page_number:04d}.{fmt}"
+
+
+def _check_page_count(pdf_path: str, first_page: int, last_page: int, count: int) -> None:
+    """変換されたページ数が範囲のページ数と一致することを確認します。
+
+    pdf2imageはpdftoppmの終了コードを確認しないため、pdftoppmが異常終了した場合などはページが欠けた結果が返ります。
+
+    Raises:
+        PdfRasterizeError: ページ数が一致しない場合
+    """
+    expected = last_page - first_page + 1
+    if count != expected:
+        raise PdfRasterizeError(
+            f"PDF {pdf_path} の {first_page}〜{last_page} ページの画像化結果のページ数 ({count}) が"
+            f"範囲のページ数 ({expected}) と一致しません")
+
+
+def plan_windows(plans: Sequence[PagePlan], window_size: int) -> List[Tuple[int, int, int, bool]]:
+    """ページごとの方針を、方針が同じ連続したページの範囲にまとめます。
+
+    Args:
+        plans: ページ番号の昇順に並んだページごとの方針
+        window_size: 1つの範囲の最大ページ数
+
+    Returns:
+        List[Tuple[int, int, int, bool]]: (最初のページ, 最後のページ, 解像度, グレースケールかどうか) のリスト
+    """
+    windows: List[Tuple[int, int, int, bool]] = []
+    for plan in plans:
+        if windows:
+            start, end, dpi, grayscale = windows[-1]
+            if (end == plan.page_number - 1 and (dpi, grayscale) == (plan.dpi, plan.grayscale)
+                    and end - start + 1 < window_size):
+                windows[-1] = (start, plan.page_number, dpi, grayscale)
+                continue
+        windows.append((plan.page_number, plan.page_number, plan.dpi, plan.grayscale))
+    return windows
+
+
+class Pdf2ImageRasterizer(PdfRasterizerGateway):
+    """pdf2image (Poppler) を用いてPDFのページを画像化するクラス。"""
+
+    def __init__(
+        self,
+        dpi: Optional[int] = None,
+        fmt: Optional[str] = None,
+        window_size: Optional[int] = None,
+        poppler_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_workers_per_document: Optional[int] = None,
+        paths_only: Optional[bool] = None,
+        adaptive: Optional[bool] = None,
+        policy: Optional[RasterPolicy] = None,
+        pdfinfo_timeout: Optional[int] = None,
+        analysis_timeout: Optional[int] = None,
+        render_timeout: Optional[int] = None,
+    ):
+        """初期化
+
+        Args:
+            dpi: 解像度。省略時は ``PDF_RASTER_DPI``
+            fmt: 画像形式 ('jpg' または 'png')。省略時は ``PDF_RASTER_FORMAT``
+            window_size: 1回に変換するページ数。省略時は ``PDF_RASTER_WINDOW_SIZE``
+            poppler_path: Popplerの実行ファイルのディレクトリ。省略時は ``POPPLER_PATH``（未設定ならPATHから検索）
+            workers: 同時に変換する範囲の数。省略時は ``PDF_RASTER_WORKERS``（0の場合はCPUコア数）
+            max_workers_per_document: 1文書で同時に変換する範囲の数の上限。
+                省略時は ``PDF_RASTER_MAX_WORKERS_PER_DOCUMENT``
+            paths_only: pdftoppmに画像ファイルを直接書き出させるかどうか。省略時は ``PDF_RASTER_PATHS_ONLY``
+            adaptive: ページごとに解像度と色を決めるかどうか。省略時は ``PDF_RASTER_ADAPTIVE``
+            policy: ページごとの解像度と色を決める方針。省略時は ``PDF_RASTER_POLICY`` を適用した方針
+            pdfinfo_timeout: ページ数を取得するpdfinfoのタイムアウト（秒）。省略時は ``PDF_PDFINFO_TIMEOUT``
+            analysis_timeout: ページの内容を調べるコマンドごとのタイムアウト（秒）。省略時は ``PDF_ANALYSIS_TIMEOUT``
+            render_timeout: 1つの範囲を画像化するpdftoppmのタイムアウト（秒）。省略時は ``PDF_RASTER_TIMEOUT``
+
+        Raises:
+            ValueError: 画像形式・1回に変換するページ数・画像化の方針が無効な場合
+        """
+        self.dpi = dpi or getattr(settings, 'PDF_RASTER_DPI', 200)
+        self.fmt = (fmt or getattr(settings, 'PDF_RASTER_FORMAT', 'jpg')).lower()
+        self.window_size = window_size or getattr(settings, 'PDF_RASTER_WINDOW_SIZE', 10)
+        self.poppler_path = poppler_path or getattr(settings, 'POPPLER_PATH', None)
+        self.workers = workers if workers is not None else getattr(settings, 'PDF_RASTER_WORKERS', 0)
+        self.max_workers_per_document = (
+            max_workers_per_document or getattr(settings, 'PDF_RASTER_MAX_WORKERS_PER_DOCUMENT', 8))
+        self.paths_only = paths_only if paths_only is not None else getattr(settings, 'PDF_RASTER_PATHS_ONLY', True)
+        self.adaptive = adaptive if adaptive is not None else getattr(settings, 'PDF_RASTER_ADAPTIVE', False)
+        self.policy = policy or get_raster_policy()
+        self.pdfinfo_timeout = pdfinfo_timeout or getattr(settings, 'PDF_PDFINFO_TIMEOUT', None)
+        self.analysis_timeout = analysis_timeout or getattr(settings, 'PDF_ANALYSIS_TIMEOUT', None)
+        self.render_timeout = render_timeout or getattr(settings, 'PDF_RASTER_TIMEOUT', None)
+        if self.fmt not in ('jpg', 'png'):
+            raise ValueError(f"画像形式が無効です: {self.fmt!r}")
+        if self.window_size < 1:
+            raise ValueError(f"1回に変換するページ数は1以上である必要があります: {self.window_size}")
+
+    def get_page_count(self, pdf_path: str) -> int:
+        """PDFのページ数をpdfinfoで取得する。
+
+        pdfinfoが ``pdfinfo_timeout`` 秒以内に終了しない場合は、PDFを読み込めないものとして扱います。
+
+        Args:
+            pdf_path: PDFファイルのパス
+
+        Returns:
+            ページ数
+
+        Raises:
+            PdfToolNotInstalledError: pdfinfoがインストールされていない場合
+            PdfRasterizeError: PDFを読み込めない場合
+        """
+        try:
+            info = pdfinfo_from_path(pdf_path, poppler_path=self.poppler_path, timeout=self.pdfinfo_timeout)
+        except POPPLER_INSTALLATION_ERRORS as e:
+            raise PdfToolNotInstalledError(f"Popplerがインストールされていません: {e}") from e
+        except POPPLER_ERRORS as e:
+            raise PdfRasterizeError(f"PDF {pdf_path} の情報を取得できません: {e}") from e
+        return int(info['Pages'])
+
+    def render_pages(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+    ) -> Iterator[RenderedPage]:
+        """PDFのページを ``window_size`` ページずつ画像化して書き出し、書き出したページを順に返す。
+
+        ``plan_pages()`` でページごとの方針を決めてから ``render_planned()`` で画像化します。
+
+        Args:
+            pdf_path: PDFファイルのパス
+            output_dir: 画像の出力先ディレクトリ（存在しない場合は作成）
+            first_page: 画像化する最初のページ（1始まり）。省略時は先頭ページ
+            last_page: 画像化する最後のページ。省略時は最終ページ
+
+        Returns:
+            ページ番号の昇順に、書き出したページを逐次返すイテレータ
+
+        Raises:
+            PdfRasterizeError: PDFの読み込み・画像化に失敗した場合
+        """
+        first_page = first_page or 1
+        if last_page is None:
+            last_page = self.get_page_count(pdf_path)
+        yield from self.render_planned(pdf_path, output_dir, self.plan_pages(pdf_path, first_page, last_page))
+
+    def plan_pages(self, pdf_path: str, first_page: int, last_page: int) -> List[PagePlan]:
+        """指定した範囲のページごとの画像化の方針を決めます。
+
+        ``adaptive`` が無効な場合は、すべてのページを ``dpi`` のカラーで画像化する方針とします。
+        ページの内容を調べられなかった場合（``analysis_timeout`` 秒以内に終わらない場合を含む）も、
+        画像化自体は行えるため同じ方針とします。
+
+        Args:
+            pdf_path: PDFファイルのパス
+            first_page: 最初のページ（1始まり）
+            last_page: 最後のページ
+
+        Returns:
+            List[PagePlan]: ページ番号の昇順のページごとの方針
+        """
+        pages = range(first_page, last_page + 1)
+        if not self.adaptive:
+            return [PagePlan(page_number=n, dpi=self.dpi) for n in pages]
+        try:
+            metrics = analyze_pages(
+                pdf_path, first_page, last_page, poppler_path=self.poppler_path, timeout=self.analysis_timeout)
+        except PdfRasterizeError as e:
+            logger.warning(f"PDF {pdf_path} のページの内容を調べられないため、既定の解像度で画像化します: {e}")
+            return [PagePlan(page_number=n, dpi=self.dpi) for n in pages]
+
+        plans = [self.policy.decide(metrics[n], self.dpi) for n in pages]
+        for plan in plans:
+            logger.debug(
+                f"PDF {pdf_path} の {plan.page_number} ページ: {plan.dpi}dpi {plan.color_mode} ({plan.reason})")
+        reasons = dict(Counter(plan.reason for plan in plans))
+        logger.info(f"PDF {pdf_path} の {first_page}〜{last_page} ページの画像化の方針: {reasons}")
+        return plans
+
+    def render_planned(self, pdf_path: str, output_dir: str, plans: Sequence[PagePlan]) -> Iterator[RenderedPage]:
+        """ページごとの方針に従ってページを画像化して書き出し、書き出したページを順に返す。
+
+        方針が同じ連続したページを最大 ``window_size`` ページずつの範囲にまとめて変換します。
+        複数の範囲を ``worker_count()`` 個のスレッドで同時に変換し、ページ番号の順に返します。
+        変換済みで未取得の範囲は同時に変換する範囲の数までに制限するため、メモリ上に展開される画像は
+        最大で ``window_size`` × 同時に変換する範囲の数のページです。
+        呼び出し元が途中で反復をやめた場合、未着手の範囲は変換しません。
+
+        Args:
+            pdf_path: PDFファイルのパス
+            output_dir: 画像の出力先ディレクトリ（存在しない場合は作成）
+            plans: ページ番号の昇順に並んだ、画像化するページの方針
+
+        Returns:
+            ページ番号の昇順に、書き出したページを逐次返すイテレータ
+
+        Raises:
+            PdfRasterizeError: PDFの読み込み・画像化に失敗した場合
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        windows = plan_windows(plans, self.window_size)
+        workers = self.worker_count(len(windows))
+        if workers <= 1:
+            for window in windows:
+                yield from self._render_window(pdf_path, output_dir, *window)
+            return
+
+        pending = deque(windows)
+        running: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-raster') as executor:
+            try:
+                while pending or running:
+                    while pending and len(running) < workers:
+                        running.append(executor.submit(self._render_window, pdf_path, output_dir, *pending.popleft()))
+                    yield from running.popleft().result()
+            finally:
+                # 途中で反復をやめた場合やエラーの場合は、未着手の範囲を変換しない
+                for future in running:
+                    future.cancel()
+
+    def worker_count(self, windows: int) -> int:
+        """1文書で同時に変換する範囲の数を返します。
+
+        Args:
+            windows: 変換する範囲の数
+
+        Returns:
+            int: ``workers``（0の場合はCPUコア数）を、1文書あたりの上限と範囲の数で制限した値
+        """
+        workers = self.workers or os.cpu_count() or 1
+        return max(1, min(workers, self.max_workers_per_document, windows))
+
+    def _render_window(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        first_page: int,
+        last_page: int,
+        dpi: int,
+        grayscale: bool,
+    ) -> List[RenderedPage]:
+        """指定した範囲のページを指定した解像度・色で画像化して書き出します。"""
+        logger.debug(f"PDF {pdf_path} の {first_page}〜{last_page} ページを画像化します ({dpi}dpi)")
+        if self.paths_only:
+            return self._render_window_to_files(pdf_path, output_dir, first_page, last_page, dpi, grayscale)
+
+        images = self._convert(pdf_path, first_page, last_page, dpi, grayscale)
+        try:
+            _check_page_count(pdf_path, first_page, last_page, len(images))
+            pages = []
+            for page_number, image in enumerate(images, start=first_page):
+                path = os.path.join(output_dir, page_filename(page_number, self.fmt))
+                image.save(path)
+                pages.append(RenderedPage(
+                    page_number=page_number, path=path, width=image.width, height=image.height,
+                    dpi=dpi, grayscale=grayscale))
+            return pages
+        finally:
+            for image in images:
+                image.close()
+
+    def _render_window_to_files(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        first_page: int,
+        last_page: int,
+        dpi: int,
+        grayscale: bool,
+    ) -> List[RenderedPage]:
+        """pdftoppmに出力先ディレクトリへ直接書き出させ、ファイル名をページ番号の形式に変更します。
+
+        pdftoppmのファイル名の桁数は文書のページ数によって変わるため、範囲ごとに一意な接頭辞で書き出してから
+        ``page_filename()`` の名前に変更します。ページ番号は並び順ではなくファイル名の ``-NN`` から取得します。
+        画像の幅・高さはファイルのヘッダーのみを読み込んで取得します。
+        """
+        prefix = f".render-{first_page:04d}-{uuid.uuid4().hex[:8]}"
+        paths = self._convert(
+            pdf_path, first_page, last_page, dpi, grayscale, output_folder=output_dir, output_file=prefix, paths_only=True)
+        try:
+            _check_page_count(pdf_path, first_page, last_page, len(paths))
+            rendered = self._rendered_page_numbers(pdf_path, paths)
+            if set(rendered) != set(range(first_page, last_page + 1)):
+                raise PdfRasterizeError(
+                    f"PDF {pdf_path} の {first_page}〜{last_page} ページの画像化結果のページ番号が一致しません: "
+                    f"{sorted(rendered)}")
+            pages = []
+            for page_number, rendered_path in sorted(rendered.items()):
+                path = os.path.join(output_dir, page_filename(page_number, self.fmt))
+                os.replace(rendered_path, path)
+                with Image.open(path) as image:
+                    width, height = image.size
+                pages.append(RenderedPage(
+                    page_number=page_number, path=path, width=width, height=height, dpi=dpi, grayscale=grayscale))
+            return pages
+        finally:
+            # 名前の変更に失敗した場合も一時的なファイル名の画像を残さない
+            for rendered_path in paths:
+                if os.path.exists(rendered_path):
+                    os.remove(rendered_path)
+
+    @staticmethod
+    def _rendered_page_numbers(pdf_path: str, paths: Sequence[str]) -> Dict[int, str]:
+        """pdftoppmが書き出したファイルのパスを、ファイル名のページ番号ごとに返します。
+
+        Raises:
+            PdfRasterizeError: ファイル名からページ番号を取得できない場合
+        """
+        rendered = {}
+        for rendered_path in paths:
+            match = PDFTOPPM_PAGE_NUMBER.search(os.path.basename(rendered_path))
+            if match is None:
+                raise PdfRasterizeError(f"PDF {pdf_path} の画像のファイル名からページ番号を取得できません: {rendered_path}")
+            rendered[int(match.group(1))] = rendered_path
+        return rendered
+
+    def _convert(self, pdf_path: str, first_page: int, last_page: int, dpi: int, grayscale: bool, **kwargs) -> List:
+        """指定した範囲のページをPIL画像（``paths_only=True`` の場合は書き出したファイルのパス）に変換します。
+
+        pdftoppmが ``render_timeout`` 秒以内に終了しない場合は、範囲の画像化に失敗したものとして扱います。
+        """
+        try:
+            return convert_from_path(
+                pdf_path,
+                dpi=dpi,
+                grayscale=grayscale,
+                fmt='jpeg' if self.fmt == 'jpg' else self.fmt,
+                first_page=first_page,
+                last_page=last_page,
+                poppler_path=self.poppler_path,
+                timeout=self.render_timeout,
+                **kwargs,
+            )
+        except POPPLER_INSTALLATION_ERRORS as e:
+            raise PdfToolNotInstalledError(f"Popplerがインストールされていません: {e}") from e
+        except POPPLER_ERRORS as e:
+            raise PdfRasterizeError(f"PDF {pdf_path} の {first_page}〜{last_page} ページを画像化できません: {e}") from e
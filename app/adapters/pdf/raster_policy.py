@@ -0,0 +1,118 @@
+"""ページごとの画像化の解像度と色を決める方針のモジュール。
+
+``page_analysis.analyze_pages()`` で求めたページの指標から、ページごとに解像度とグレースケールかどうかを決めます。
+文字のみのページは低い解像度のグレースケールで画像化すると、画像化が速く、抽出モデルに送る画像も小さくなります。
+方針の既定値は ``RasterPolicy`` の各フィールドの既定値で、``PDF_RASTER_POLICY`` で上書きできます。
+"""
+
+from dataclasses import dataclass, fields, replace
+from typing import Optional
+
+from django.conf import settings
+
+from app.adapters.pdf.page_analysis import PageMetrics
+
+# 画像化の色
+COLOR_MODE_COLOR = 'color'
+COLOR_MODE_GRAY = 'gray'
+
+# 画像化の方針を決めた理由
+REASON_DEFAULT = 'default'  # ページを調べていない（適応的な画像化が無効、または調べられなかった）
+REASON_TEXT = 'text'  # テキストレイヤーが十分にあり、画像がほとんどないページ
+REASON_IMAGE = 'image'  # 画像（スキャンした紙面・写真・図）を含むページ
+REASON_VECTOR = 'vector'  # テキストも画像も少ないページ（ベクター形式の図・白紙など）
+
+
+@dataclass(frozen=True)
+class PagePlan:
+    """1ページの画像化の方針。
+
+    Attributes:
+        page_number: ページ番号（1始まり）
+        dpi: 解像度
+        grayscale: グレースケールで画像化するかどうか
+        reason: 方針を決めた理由 ('default', 'text', 'image', 'vector')
+    """
+    page_number: int
+    dpi: int
+    grayscale: bool = False
+    reason: str = REASON_DEFAULT
+
+    @property
+    def color_mode(self) -> str:
+        """画像化の色 ('color' または 'gray') を返します。"""
+        return COLOR_MODE_GRAY if self.grayscale else COLOR_MODE_COLOR
+
+
+@dataclass(frozen=True)
+class RasterPolicy:
+    """ページの指標から画像化の方針を決める設定。
+
+    Attributes:
+        text_dpi: 文字のみのページの解像度
+        text_grayscale: 文字のみのページをグレースケールで画像化するかどうか
+        image_dpi: 画像・図を含むページの解像度。Noneの場合は ``PDF_RASTER_DPI``
+        min_text_chars: 文字のみのページとみなすテキストレイヤーの最小文字数
+        max_text_image_coverage: 文字のみのページとみなす画像の面積の割合の上限（0〜1）
+        gray_image_grayscale: グレースケールの画像のみを含むページをグレースケールで画像化するかどうか
+    """
+    text_dpi: int = 150
+    text_grayscale: bool = True
+    image_dpi: Optional[int] = None
+    min_text_chars: int = 200
+    max_text_image_coverage: float = 0.05
+    gray_image_grayscale: bool = True
+
+    def decide(self, metrics: PageMetrics, default_dpi: int) -> PagePlan:
+        """ページの指標から画像化の方針を決めます。
+
+        ページの色はページに配置された画像の色空間からのみ判定します。文字やベクター形式の図の色は
+        調べないため、色付きの図がある可能性のある、テキストも画像も少ないページはカラーで画像化します。
+
+        Args:
+            metrics: ページの指標
+            default_dpi: ``image_dpi`` が未設定の場合の解像度
+
+        Returns:
+            PagePlan: ページの画像化の方針
+        """
+        page_number = metrics.page_number
+        if metrics.text_chars >= self.min_text_chars and metrics.image_coverage <= self.max_text_image_coverage:
+            return PagePlan(
+                page_number=page_number,
+                dpi=self.text_dpi,
+                grayscale=self.text_grayscale and not metrics.has_color_images,
+                reason=REASON_TEXT,
+            )
+        dpi = self.image_dpi or default_dpi
+        if metrics.image_count:
+            return PagePlan(
+                page_number=page_number,
+                dpi=dpi,
+                grayscale=self.gray_image_grayscale and not metrics.has_color_images,
+                reason=REASON_IMAGE,
+            )
+        return PagePlan(page_number=page_number, dpi=dpi, grayscale=False, reason=REASON_VECTOR)
+
+
+def get_raster_policy() -> RasterPolicy:
+    """``PDF_RASTER_POLICY`` の上書き設定を適用した画像化の方針を返します。
+
+    Returns:
+        RasterPolicy: 画像化の方針
+
+    Raises:
+        ValueError: 未知の設定項目が指定されている場合、または値が無効な場合
+    """
+    overrides = dict(getattr(settings, 'PDF_RASTER_POLICY', {}))
+    unknown = set(overrides) - {f.name for f in fields(RasterPolicy)}
+    if unknown:
+        raise ValueError(f"PDF_RASTER_POLICY に未知の設定項目があります: {sorted(unknown)}")
+    policy = replace(RasterPolicy(), **overrides)
+    if policy.text_dpi < 1 or (policy.image_dpi is not None and policy.image_dpi < 1):
+        raise ValueError(f"PDF_RASTER_POLICY の解像度は1以上である必要があります: {overrides}")
+    if not 0 <= policy.max_text_image_coverage <= 1:
+        raise ValueError(
+            f"PDF_RASTER_POLICY の max_text_image_coverage は0以上1以下である必要があります: "
+            f"{policy.max_text_image_coverage}")
+    return policy
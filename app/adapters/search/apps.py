@@ -2,6 +2,7 @@
 
 import logging
 from django.apps import AppConfig
+from django.conf import settings
 
 
 logger = logging.getLogger(__name__)
@@ -16,12 +17,36 @@ class SearchConfig(AppConfig):
     name = 'app.adapters.search'
 
     def ready(self):
-        """アプリケーション起動時に必要なQdrantコレクションを初期化"""
+        """アプリケーション起動時にQdrantコレクションの検証状態を確認し、必要に応じてウォームアップを開始"""
         # AppConfigのready()はDjango起動時に呼び出される
-        # この処理はウェブサーバーの各プロセス起動時に実行されるため注意
+        self._ensure_schema()
+        if getattr(settings, 'QDRANT_WARMUP_ON_STARTUP', False):
+            # 起動を遅らせないよう、ウォームアップはバックグラウンドのスレッドで行う
+            from app.adapters.search.warmup import start_warmup_thread
+            start_warmup_thread()
+
+    def _ensure_schema(self):
+        """スキーマが未検証の場合にQdrantコレクションを作成・検証"""
+        # この処理はウェブサーバーの各プロセス起動時に実行されるため、
+        # 通常はスキーマ検証済みマーカーの確認のみを行いQdrantへは問い合わせない
         try:
             from app.adapters.search.qdrant_manager import ensure_collections_exist
+            from app.adapters.search.schema_marker import (
+                is_schema_verified,
+                write_schema_marker,
+            )
+
+            if is_schema_verified():
+                logger.debug("Qdrantスキーマは検証済みのため、コレクションの初期化をスキップします。")
+                return
+
+            if not getattr(settings, 'QDRANT_BOOTSTRAP_ON_STARTUP', True):
+                logger.warning(
+                    "Qdrantスキーマが未検証です。デプロイ時に `manage.py qdrant_bootstrap` を実行してください。")
+                return
+
             ensure_collections_exist()
+            write_schema_marker()
         except Exception as e:
             # 接続エラーなどがあっても、アプリケーション起動は継続するが
             # 明示的に警告ログを出力して問題を通知する
@@ -0,0 +1,194 @@
+"""非同期 Qdrant クライアントの接続プールを管理するモジュール。
+
+ASGI 環境の非同期ビューから Qdrant を利用する際にイベントループをブロックしないよう、
+``AsyncQdrantClient`` を上限付きのプールで管理します。
+プール内の各クライアントはそれぞれ独立した gRPC チャネルを持ち、
+呼び出しごとにラウンドロビンで払い出されます。
+"""
+
+import asyncio
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from qdrant_client import AsyncQdrantClient
+
+from app.adapters.search.instrumentation import instrument_client
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncQdrantClientManager:
+    """非同期Qdrantクライアントマネージャクラス。
+
+    ``QdrantClientManager`` と同様に初回利用時に接続し、接続テストに成功したクライアントのみを
+    プールに追加します。プールは ``QDRANT_ASYNC_POOL_SIZE`` 個まで必要に応じて拡張されます。
+    """
+
+    # プール内のクライアント（それぞれが独立したgRPCチャネルを保持する）
+    _pool: List[AsyncQdrantClient] = []
+    # 次に払い出すクライアントのインデックス
+    _next_index: int = 0
+    # プールが紐づくイベントループ（gRPCの非同期チャネルは生成したループに束縛される）
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    # プール拡張時の排他制御用ロック
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def _get_pool_size(cls) -> int:
+        """設定からプールサイズの上限を取得します。
+
+        Returns:
+            int: プールサイズ（最低1）
+        """
+        return max(1, int(getattr(settings, 'QDRANT_ASYNC_POOL_SIZE', 1)))
+
+    @classmethod
+    def _bind_to_running_loop(cls) -> Tuple[asyncio.Lock, List[AsyncQdrantClient]]:
+        """プールを現在実行中のイベントループに紐づけます。
+
+        別のイベントループで生成されたチャネルは再利用できないため、
+        ループが変わった場合はプールを破棄して作り直します。
+        破棄したクライアントは、元のループが別のスレッドで実行中であればそのループでクローズし、
+        それ以外の場合は呼び出し元が現在のループでクローズします。
+
+        Returns:
+            Tuple[asyncio.Lock, List[AsyncQdrantClient]]: プール拡張用のロックと、現在のループでクローズするクライアント
+        """
+        loop = asyncio.get_running_loop()
+        discarded: List[AsyncQdrantClient] = []
+        lock = cls._lock
+        if cls._loop is not loop or lock is None:
+            old_loop, old_pool = cls._loop, cls._pool
+            if old_pool:
+                logger.debug("イベントループが変更されたため、非同期Qdrantクライアントプールを再生成します。")
+                if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+                    asyncio.run_coroutine_threadsafe(cls._close_clients(old_pool), old_loop)
+                else:
+                    discarded = old_pool
+            cls._pool = []
+            cls._next_index = 0
+            cls._loop = loop
+            lock = asyncio.Lock()
+            cls._lock = lock
+        return lock, discarded
+
+    @classmethod
+    async def _close_clients(cls, clients: List[AsyncQdrantClient]) -> None:
+        """クライアントを閉じます。クローズに失敗した場合は警告を記録して続行します。
+
+        Args:
+            clients: 閉じるクライアント
+        """
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"非同期Qdrantクライアントのクローズに失敗しました: {e}")
+
+    @classmethod
+    async def _connect(cls) -> AsyncQdrantClient:
+        """新しい非同期クライアントを生成し、接続テストを行います。
+
+        Returns:
+            AsyncQdrantClient: 接続テストに成功したクライアント
+
+        Raises:
+            ConnectionError: Qdrantサーバーに接続できない場合
+        """
+        client = AsyncQdrantClient(
+            host=settings.QDRANT_HOST,
+            grpc_port=settings.QDRANT_PORT,
+            prefer_grpc=True,
+            timeout=settings.QDRANT_TIMEOUT
+        )
+        try:
+            # 接続テスト
+            await client.get_collections()
+        except Exception as e:
+            logger.error(f"Qdrantサーバーへの非同期接続に失敗しました: {e}", exc_info=True)
+            try:
+                await client.close()
+            except Exception:
+                pass
+            raise ConnectionError(f"Qdrantサーバーに接続できません: {str(e)}") from e
+
+        logger.debug(f"Qdrantサーバーに非同期接続しました: {settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
+        return instrument_client(client, node='primary')
+
+    @classmethod
+    async def get_client(cls) -> AsyncQdrantClient:
+        """プールから非同期Qdrantクライアントを取得します。
+
+        プールが上限に達するまでは呼び出しごとに新しいチャネルを確立し、
+        上限に達した後は既存のクライアントをラウンドロビンで返します。
+
+        Returns:
+            AsyncQdrantClient: 設定済みの非同期Qdrantクライアント
+
+        Raises:
+            ConnectionError: Qdrantサーバーに接続できない場合
+        """
+        lock, discarded = cls._bind_to_running_loop()
+        if discarded:
+            await cls._close_clients(discarded)
+
+        if len(cls._pool) < cls._get_pool_size():
+            async with lock:
+                # ロック待ちの間に他のコルーチンがプールを満たしている可能性がある
+                if len(cls._pool) < cls._get_pool_size():
+                    client = await cls._connect()
+                    cls._pool.append(client)
+                    logger.debug(f"非同期Qdrantクライアントをプールに追加しました (現在 {len(cls._pool)} 件)")
+                    return client
+
+        client = cls._pool[cls._next_index % len(cls._pool)]
+        cls._next_index += 1
+        return client
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """プール内の全クライアントを閉じ、プールを空にします。
+
+        ASGIサーバーのシャットダウン時やテストの後始末に使用します。
+        """
+        pool, cls._pool = cls._pool, []
+        cls._next_index = 0
+        await cls._close_clients(pool)
+
+    @classmethod
+    def after_fork_in_child(cls) -> None:
+        """fork直後の子プロセスで呼び出され、引き継いだプールを破棄します。
+
+        親プロセスのgRPCチャネルは子プロセスで利用できないため、クローズせずに参照のみを破棄し、
+        子プロセスでの初回利用時に改めて接続します。
+        """
+        cls._pool = []
+        cls._next_index = 0
+        cls._loop = None
+        cls._lock = None
+
+    @classmethod
+    def pool_size(cls) -> int:
+        """現在プールに保持しているクライアント数を返します。
+
+        Returns:
+            int: プール内のクライアント数
+        """
+        return len(cls._pool)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=AsyncQdrantClientManager.after_fork_in_child)
+
+
+async def get_async_qdrant_client() -> AsyncQdrantClient:
+    """非同期 Qdrant クライアントのインスタンスを取得します。
+
+    クライアントマネージャを通じてプール内のインスタンスを返します。
+
+    Returns:
+        AsyncQdrantClient: 設定済みの非同期Qdrantクライアントインスタンス
+    """
+    return await AsyncQdrantClientManager.get_client()
@@ -0,0 +1,381 @@
+"""Qdrantコレクションのポイントを一括で読み出し・書き出しするモジュール。
+
+ペイロードの値（既定では ``user_id``）のファセットからコレクションを重複の無いパーティションに分割し、
+パーティションごとに独立したscrollカーソルで並列に読み出します。
+
+スナップショットは以下のファイルで構成されるディレクトリです。
+
+- ``manifest.json``: コレクションの構成、ポイント数、シャードの一覧
+- ``part-PPPP-CCCCC.npy``: シャードの密ベクトル行列
+- ``part-PPPP-CCCCC.jsonl``: 行列の各行に対応するポイントID・ペイロード・疎ベクトル
+"""
+
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    MatchAny,
+    PointStruct,
+    Record,
+    SparseVector,
+)
+
+from app.adapters.search.collection_aliases import resolve_collection
+from app.adapters.search.collection_config import (
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+    CollectionConfig,
+)
+from app.adapters.search.payload_schema import PAYLOAD_USER_ID
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+# パーティション分割に用いるファセットの最大取得件数。
+# 残余パーティションのフィルタは取得したすべての値を除外条件に含み、scrollのたびに送信されるため上限を抑える
+FACET_LIMIT = 1000
+# シャードのnpyファイルのヘッダーの長さ（バイト）
+NPY_HEADER_SIZE = 128
+
+
+def build_partitions(
+    client: QdrantClient,
+    collection_name: str,
+    partitions: int,
+    partition_key: str = PAYLOAD_USER_ID,
+) -> List[Optional[Filter]]:
+    """コレクションを重複の無いパーティションに分割するフィルタを生成します。
+
+    ``partition_key`` のファセットで得た値を、ポイント数が均等になるよう ``partitions`` 個に振り分けます。
+    ファセットはポイント数の多い順に最大 ``FACET_LIMIT`` 件の値を取得し、
+    それ以外の値やキーを持たないポイントは、最後の残余パーティションに含まれます。
+
+    Args:
+        client: Qdrantクライアント
+        collection_name: コレクション名
+        partitions: 値を振り分けるパーティション数
+        partition_key: パーティション分割に用いるペイロードのキー（インデックス作成済みであること）
+
+    Returns:
+        List[Optional[Filter]]: パーティションごとのフィルタ。分割できない場合は ``[None]``
+    """
+    try:
+        hits = client.facet(collection_name, key=partition_key, limit=FACET_LIMIT, exact=False).hits
+    except Exception as e:
+        logger.warning(f"コレクション {collection_name} を {partition_key} で分割できないため、単一のカーソルで読み出します: {e}")
+        return [None]
+    if not hits:
+        return [None]
+
+    buckets: List[List[Any]] = [[] for _ in range(min(max(partitions, 1), len(hits)))]
+    loads = [0] * len(buckets)
+    for hit in sorted(hits, key=lambda h: h.count, reverse=True):
+        i = loads.index(min(loads))
+        buckets[i].append(hit.value)
+        loads[i] += hit.count
+
+    filters: List[Optional[Filter]] = [
+        Filter(must=[FieldCondition(key=partition_key, match=MatchAny(any=bucket))]) for bucket in buckets
+    ]
+    filters.append(Filter(must_not=[
+        FieldCondition(key=partition_key, match=MatchAny(any=[hit.value for hit in hits]))]))
+    return filters
+
+
+def scroll_partition(
+    client: QdrantClient,
+    collection_name: str,
+    partition_filter: Optional[Filter],
+    batch_size: int,
+    with_vectors: Any = True,
+) -> Iterator[List[Record]]:
+    """パーティション内のポイントをバッチ単位で読み出します。
+
+    Args:
+        client: Qdrantクライアント
+        collection_name: コレクション名
+        partition_filter: パーティションのフィルタ
+        batch_size: 1回のscrollで読み出すポイント数
+        with_vectors: ベクトルを読み出すかどうか
+
+    Yields:
+        List[Record]: ポイントのバッチ
+    """
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name,
+            scroll_filter=partition_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=with_vectors,
+        )
+        if records:
+            yield records
+        if offset is None:
+            return
+
+
+def split_vector(vector: Any) -> Tuple[Optional[List[float]], Optional[SparseVector]]:
+    """ポイントのベクトルを密ベクトルと疎ベクトルに分けます。
+
+    Args:
+        vector: 名前なしベクトル、または名前付きベクトルの辞書
+
+    Returns:
+        Tuple[Optional[List[float]], Optional[SparseVector]]: 密ベクトルと疎ベクトル
+    """
+    if isinstance(vector, dict):
+        return vector.get(DENSE_VECTOR_NAME), vector.get(SPARSE_VECTOR_NAME)
+    return vector, None
+
+
+def build_point(
+    config: CollectionConfig,
+    point_id: Any,
+    dense: Any,
+    sparse: Optional[SparseVector],
+    payload: Optional[Dict[str, Any]],
+) -> PointStruct:
+    """コレクションの構成に合わせて登録するポイントを生成します。
+
+    密ベクトルは登録先の次元数の切り詰め・データ型に合わせて変換します。
+
+    Args:
+        config: 登録先のコレクション構成
+        point_id: ポイントID
+        dense: 密ベクトル
+        sparse: 疎ベクトル（ハイブリッド構成のコレクションでのみ使用）
+        payload: ペイロード
+
+    Returns:
+        PointStruct: 登録するポイント
+    """
+    dense = config.prepare_vector(dense.tolist() if isinstance(dense, np.ndarray) else dense)
+    if config.hybrid:
+        vector: Any = {DENSE_VECTOR_NAME: dense}
+        if sparse is not None:
+            vector[SPARSE_VECTOR_NAME] = sparse
+    else:
+        vector = dense
+    return PointStruct(id=point_id, vector=vector, payload=payload or {})
+
+
+def _npy_header(dtype: np.dtype, shape: Tuple[int, int]) -> bytes:
+    """固定長 (``NPY_HEADER_SIZE``) のnpy形式のヘッダーを生成します。"""
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+    magic = np.lib.format.magic(1, 0)
+    header_len = NPY_HEADER_SIZE - len(magic) - 2
+    return magic + struct.pack('<H', header_len) + (header.ljust(header_len - 1) + '\n').encode('latin1')
+
+
+class _ShardWriter:
+    """1パーティションのポイントをシャードのファイルに逐次書き出し、件数の上限で次のシャードに切り替えます。
+
+    密ベクトルは行列全体をメモリに保持せず、1件ずつnpyファイルに追記し、シャードを閉じる際にヘッダーの行数を確定します。
+    """
+
+    def __init__(self, directory: str, partition: int, shard_size: int, dtype: str):
+        self.directory = directory
+        self.partition = partition
+        self.shard_size = shard_size
+        self.dtype = np.dtype(dtype)
+        self.shards: List[Dict[str, Any]] = []
+        self._name: Optional[str] = None
+        self._rows = None
+        self._vectors = None
+        self._count = 0
+        self._dim = 0
+
+    def write(self, record: Record) -> None:
+        """ポイントを現在のシャードに書き出します。
+
+        Raises:
+            ValueError: ポイントに密ベクトルが無い場合、または密ベクトルの次元数がシャード内で異なる場合
+        """
+        dense, sparse = split_vector(record.vector)
+        if dense is None:
+            raise ValueError(f"ポイント {record.id} に密ベクトルが無いため書き出せません")
+        dense = np.asarray(dense, dtype=self.dtype)
+        if self._name is None:
+            self._open(dense.shape[0])
+        elif dense.shape[0] != self._dim:
+            raise ValueError(f"ポイント {record.id} の密ベクトルの次元数 ({dense.shape[0]}) がシャード内で異なります")
+        row: Dict[str, Any] = {'id': record.id, 'payload': record.payload or {}}
+        if sparse is not None:
+            row['sparse'] = {'indices': list(sparse.indices), 'values': list(sparse.values)}
+        self._rows.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self._vectors.write(dense.tobytes())
+        self._count += 1
+        if self._count >= self.shard_size:
+            self.close()
+
+    def close(self) -> None:
+        """現在のシャードを閉じ、npyファイルのヘッダーに行数を書き込みます。"""
+        if self._name is None:
+            return
+        self._rows.close()
+        self._vectors.seek(0)
+        self._vectors.write(_npy_header(self.dtype, (self._count, self._dim)))
+        self._vectors.close()
+        self.shards.append({'name': self._name, 'points': self._count})
+        self._name, self._rows, self._vectors = None, None, None
+
+    def _open(self, dim: int) -> None:
+        # シャードを切り替えるまでファイルを開いたままにするため、close() で閉じる
+        # pylint: disable=consider-using-with
+        self._name = f'part-{self.partition:04d}-{len(self.shards):05d}'
+        self._count, self._dim = 0, dim
+        self._rows = open(os.path.join(self.directory, f'{self._name}.jsonl'), 'w', encoding='utf-8')
+        self._vectors = open(os.path.join(self.directory, f'{self._name}.npy'), 'wb')
+        # 行数が確定するまでの仮のヘッダー
+        self._vectors.write(_npy_header(self.dtype, (0, dim)))
+
+
+def _export_partition(
+    client: QdrantClient,
+    source: str,
+    directory: str,
+    partition: int,
+    partition_filter: Optional[Filter],
+    batch_size: int,
+    shard_size: int,
+    dtype: str,
+) -> List[Dict[str, Any]]:
+    writer = _ShardWriter(directory, partition, shard_size, dtype)
+    try:
+        for records in scroll_partition(client, source, partition_filter, batch_size):
+            for record in records:
+                writer.write(record)
+    finally:
+        writer.close()
+    return writer.shards
+
+
+def export_collection(
+    client: QdrantClient,
+    collection_name: str,
+    directory: str,
+    workers: int = 4,
+    batch_size: int = 1000,
+    shard_size: int = 100000,
+    dtype: str = 'float32',
+    partition_key: str = PAYLOAD_USER_ID,
+) -> Dict[str, Any]:
+    """コレクションのポイントをスナップショットとしてディレクトリに書き出します。
+
+    ``manifest.json`` は全シャードの書き出し後に作成されるため、マニフェストが存在すれば書き出しは完了しています。
+
+    Args:
+        client: Qdrantクライアント
+        collection_name: コレクションの論理名
+        directory: 書き出し先のディレクトリ
+        workers: 並列に読み出すカーソル数
+        batch_size: 1回のscrollで読み出すポイント数
+        shard_size: 1シャードあたりの最大ポイント数
+        dtype: 密ベクトルの保存形式 ('float32' または 'float16')
+        partition_key: パーティション分割に用いるペイロードのキー
+
+    Returns:
+        Dict[str, Any]: 書き出したスナップショットのマニフェスト
+
+    Raises:
+        ValueError: コレクションが存在しない場合、書き出し先が空でない場合、または密ベクトルが無いポイントがある場合
+    """
+    source = resolve_collection(client, collection_name)
+    if source is None:
+        raise ValueError(f"コレクション {collection_name} が存在しません")
+    os.makedirs(directory, exist_ok=True)
+    if os.listdir(directory):
+        raise ValueError(f"書き出し先のディレクトリが空ではありません: {directory}")
+
+    partitions = build_partitions(client, source, workers, partition_key)
+    logger.info(f"コレクション {collection_name} ({source}) を {len(partitions)} パーティションで書き出します: {directory}")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qdrant-export') as executor:
+        futures = [
+            executor.submit(_export_partition, client, source, directory, i, f, batch_size, shard_size, dtype)
+            for i, f in enumerate(partitions)
+        ]
+        shards = [shard for future in futures for shard in future.result()]
+
+    vectors = client.get_collection(source).config.params.vectors
+    dense_params = vectors.get(DENSE_VECTOR_NAME) if isinstance(vectors, dict) else vectors
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'collection': collection_name,
+        'source': source,
+        'vector_size': dense_params.size if dense_params is not None else None,
+        'dtype': dtype,
+        'point_count': sum(shard['points'] for shard in shards),
+        'shards': shards,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    logger.info(f"コレクション {collection_name} を書き出しました: {manifest['point_count']}件, {len(shards)}シャード")
+    return manifest
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """スナップショットのマニフェストを読み込みます。
+
+    Args:
+        directory: スナップショットのディレクトリ
+
+    Returns:
+        Dict[str, Any]: マニフェスト
+
+    Raises:
+        ValueError: マニフェストが存在しない、または形式が対応していない場合
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise ValueError(f"スナップショットのマニフェストがありません（書き出しが完了していない可能性があります）: {path}")
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"対応していないスナップショット形式です: {manifest.get('format_version')}")
+    return manifest
+
+
+def iter_shard_points(
+    directory: str,
+    shard_name: str,
+    config: CollectionConfig,
+    batch_size: int,
+) -> Iterator[List[PointStruct]]:
+    """シャードのポイントを登録先のコレクション構成に合わせてバッチ単位で読み出します。
+
+    Args:
+        directory: スナップショットのディレクトリ
+        shard_name: シャード名
+        config: 登録先のコレクション構成
+        batch_size: 1バッチあたりのポイント数
+
+    Yields:
+        List[PointStruct]: 登録するポイントのバッチ
+    """
+    vectors = np.load(os.path.join(directory, f'{shard_name}.npy'), mmap_mode='r')
+    batch: List[PointStruct] = []
+    with open(os.path.join(directory, f'{shard_name}.jsonl'), encoding='utf-8') as f:
+        for row_index, line in enumerate(f):
+            row = json.loads(line)
+            sparse = SparseVector(**row['sparse']) if 'sparse' in row else None
+            dense = np.asarray(vectors[row_index], dtype=np.float32)
+            batch.append(build_point(config, row['id'], dense, sparse, row['payload']))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
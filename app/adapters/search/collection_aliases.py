@@ -0,0 +1,114 @@
+"""Qdrantコレクションのエイリアスとバージョン管理を行うモジュール。
+
+アプリケーションは設定ファイルのコレクション名（論理名、例: ``documents``）でQdrantにアクセスし、
+実体はバージョン付きの物理コレクション（例: ``documents_v3``）とします。
+論理名は物理コレクションを指すエイリアスとして作成するため、再インデックス時は新しい物理コレクションを
+構築した後にエイリアスを切り替えるだけで、検索を止めずに移行できます。
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def versioned_collection_name(logical_name: str, version: int) -> str:
+    """論理名とバージョンから物理コレクション名を生成します。
+
+    Args:
+        logical_name: コレクションの論理名
+        version: バージョン番号
+
+    Returns:
+        str: 物理コレクション名
+    """
+    return f"{logical_name}_v{version}"
+
+
+def list_collection_versions(collection_names: Iterable[str], logical_name: str) -> List[int]:
+    """既存の物理コレクションのバージョン番号を昇順で返します。
+
+    Args:
+        collection_names: 既存のコレクション名
+        logical_name: コレクションの論理名
+
+    Returns:
+        List[int]: バージョン番号のリスト
+    """
+    pattern = re.compile(rf'^{re.escape(logical_name)}_v(\d+)$')
+    return sorted(int(m.group(1)) for m in map(pattern.match, collection_names) if m)
+
+
+def next_collection_version(collection_names: Iterable[str], logical_name: str) -> int:
+    """次に作成する物理コレクションのバージョン番号を返します。
+
+    Args:
+        collection_names: 既存のコレクション名
+        logical_name: コレクションの論理名
+
+    Returns:
+        int: 次のバージョン番号
+    """
+    versions = list_collection_versions(collection_names, logical_name)
+    return versions[-1] + 1 if versions else 1
+
+
+def get_collection_aliases(client: QdrantClient) -> Dict[str, str]:
+    """エイリアス名と参照先の物理コレクション名の辞書を返します。
+
+    Args:
+        client: Qdrantクライアント
+
+    Returns:
+        Dict[str, str]: エイリアス名から物理コレクション名への辞書
+    """
+    return {alias.alias_name: alias.collection_name for alias in client.get_aliases().aliases}
+
+
+def resolve_collection(client: QdrantClient, logical_name: str) -> Optional[str]:
+    """論理名が指している物理コレクション名を返します。
+
+    エイリアスが無く、論理名と同じ名前のコレクションが存在する場合（エイリアス導入前に作成されたコレクション）は、
+    そのコレクション名を返します。
+
+    Args:
+        client: Qdrantクライアント
+        logical_name: コレクションの論理名
+
+    Returns:
+        Optional[str]: 物理コレクション名。存在しない場合はNone
+    """
+    aliases = get_collection_aliases(client)
+    if logical_name in aliases:
+        return aliases[logical_name]
+    existing = {c.name for c in client.get_collections().collections}
+    return logical_name if logical_name in existing else None
+
+
+def point_alias(client: QdrantClient, alias_name: str, collection_name: str, replace: bool = False) -> None:
+    """エイリアスを物理コレクションに向けます。
+
+    既存のエイリアスの削除と作成は1回のリクエストで実行され、Qdrant側でアトミックに切り替わります。
+
+    Args:
+        client: Qdrantクライアント
+        alias_name: エイリアス名（コレクションの論理名）
+        collection_name: 参照先の物理コレクション名
+        replace: 既存のエイリアスを置き換えるかどうか
+    """
+    operations = []
+    if replace:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)))
+    operations.append(CreateAliasOperation(
+        create_alias=CreateAlias(collection_name=collection_name, alias_name=alias_name)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"エイリアス {alias_name} を {collection_name} に切り替えました")
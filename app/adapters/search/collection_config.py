@@ -0,0 +1,239 @@
+"""Qdrantコレクションの構成設定を組み立てるモジュール。
+
+Django設定ファイルの ``QDRANT_*`` 設定値と、コレクションごとの上書き設定
+``QDRANT_COLLECTION_OVERRIDES`` から、各コレクションに適用する構成を生成します。
+コールド層のコレクション（例: ``documents_cold``）は、元のコレクションの構成をディスク保存・量子化に
+切り替えた構成になります。
+"""
+
+import math
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.conf import settings
+
+# 利用可能な量子化モード
+QUANTIZATION_NONE = 'none'
+QUANTIZATION_SCALAR = 'scalar'
+QUANTIZATION_BINARY = 'binary'
+QUANTIZATION_MODES = (QUANTIZATION_NONE, QUANTIZATION_SCALAR, QUANTIZATION_BINARY)
+
+# 利用可能な密ベクトルのデータ型
+DATATYPE_FLOAT32 = 'float32'
+DATATYPE_FLOAT16 = 'float16'
+DATATYPE_UINT8 = 'uint8'
+DATATYPES = (DATATYPE_FLOAT32, DATATYPE_FLOAT16, DATATYPE_UINT8)
+
+# ハイブリッド検索を有効にしたコレクションで使用する名前付きベクトルの名前
+DENSE_VECTOR_NAME = 'dense'
+SPARSE_VECTOR_NAME = 'sparse'
+
+
+@dataclass(frozen=True)
+class CollectionConfig:
+    """1つのQdrantコレクションに適用する構成設定。
+
+    Attributes:
+        name: コレクション名
+        vector_size: 埋め込みモデルが出力するベクトルの次元数
+        hnsw_m: HNSWグラフの各ノードの最大エッジ数
+        hnsw_ef_construct: インデックス構築時の探索幅
+        hnsw_full_scan_threshold: HNSWを使わず全件走査に切り替えるしきい値(KB)
+        vectors_on_disk: ベクトルをmemmapでディスク上に保持するかどうか
+        on_disk_payload: ペイロードをディスク上に保持するかどうか
+        indexing_threshold: HNSWインデックスを構築するセグメントサイズのしきい値(KB)
+        memmap_threshold: セグメントをmemmapに切り替えるしきい値(KB)。Noneの場合はサーバー既定値
+        quantization: 量子化モード ('none', 'scalar'(int8), 'binary')
+        quantization_always_ram: 量子化済みベクトルを常にメモリ上に保持するかどうか
+        hybrid: 名前付きの密ベクトル (``dense``) と疎ベクトル (``sparse``) を持つハイブリッド構成にするかどうか
+        datatype: 密ベクトルの保存形式 ('float32', 'float16', 'uint8')
+        truncate_dim: 先頭から何次元を保存するか（Matryoshka表現の切り詰め）。Noneの場合は切り詰めない
+    """
+    name: str
+    vector_size: int
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_full_scan_threshold: int = 10000
+    vectors_on_disk: bool = False
+    on_disk_payload: bool = False
+    indexing_threshold: int = 20000
+    memmap_threshold: Optional[int] = None
+    quantization: str = QUANTIZATION_NONE
+    quantization_always_ram: bool = True
+    hybrid: bool = False
+    datatype: str = DATATYPE_FLOAT32
+    truncate_dim: Optional[int] = None
+
+    @property
+    def stored_vector_size(self) -> int:
+        """コレクションに保存する密ベクトルの次元数を返します。
+
+        Returns:
+            int: 切り詰め後の次元数
+        """
+        return self.truncate_dim or self.vector_size
+
+    def prepare_vector(self, vector: Sequence[float]) -> List[float]:
+        """登録・検索に用いる密ベクトルを、コレクションの次元数とデータ型に合わせて変換します。
+
+        ``truncate_dim`` が設定されている場合は先頭の次元のみを残し、コサイン類似度の計算精度を保つため
+        再正規化します。uint8のコレクションでは、埋め込みモデル側で量子化済みの値をそのまま使用します。
+
+        Args:
+            vector: 埋め込みモデルが出力した密ベクトル
+
+        Returns:
+            List[float]: コレクションに登録・問い合わせするベクトル
+
+        Raises:
+            ValueError: uint8のコレクションに0〜255の整数以外の値が渡された場合
+        """
+        values = list(vector)
+        truncated = self.truncate_dim is not None and len(values) > self.truncate_dim
+        if truncated:
+            values = values[:self.truncate_dim]
+        if self.datatype == DATATYPE_UINT8:
+            if any(not 0 <= v <= 255 or v != int(v) for v in values):
+                raise ValueError(
+                    f"コレクション {self.name} はuint8形式のため、0〜255の整数に量子化されたベクトルが必要です。"
+                    "浮動小数点の埋め込みを使用する場合は datatype='float16' を指定してください。")
+            return values
+        if truncated:
+            norm = math.sqrt(sum(v * v for v in values))
+            if norm:
+                values = [v / norm for v in values]
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        """構成設定を辞書に変換します。
+
+        Returns:
+            Dict[str, Any]: 構成設定の辞書表現
+        """
+        return asdict(self)
+
+
+def _get_overrides(collection_name: str) -> Dict[str, Any]:
+    """指定コレクションの上書き設定を取得します。
+
+    Args:
+        collection_name: コレクション名
+
+    Returns:
+        Dict[str, Any]: 上書きするフィールドと値の辞書
+
+    Raises:
+        ValueError: 未知の設定項目が指定されている場合
+    """
+    overrides = dict(getattr(settings, 'QDRANT_COLLECTION_OVERRIDES', {}).get(collection_name, {}))
+    known = {f.name for f in fields(CollectionConfig)} - {'name'}
+    unknown = set(overrides) - known
+    if unknown:
+        raise ValueError(f"QDRANT_COLLECTION_OVERRIDES[{collection_name!r}] に未知の設定項目があります: {sorted(unknown)}")
+    return overrides
+
+
+def get_cold_tier_collections() -> List[str]:
+    """コールド層を持つコレクション（論理名）を返します。
+
+    Returns:
+        List[str]: ``QDRANT_COLD_TIER_COLLECTIONS``。未設定の場合は文書用のコレクション。
+        コールド層が無効な場合は空のリスト
+    """
+    if not getattr(settings, 'QDRANT_COLD_TIER_ENABLED', False):
+        return []
+    collections = getattr(settings, 'QDRANT_COLD_TIER_COLLECTIONS', None)
+    return list(collections) if collections else [settings.QDRANT_COLLECTION_DOCUMENTS]
+
+
+def cold_collection_name(collection_name: str) -> str:
+    """コレクションに対応するコールド層のコレクション名を返します。
+
+    Args:
+        collection_name: コレクションの論理名
+
+    Returns:
+        str: コールド層のコレクションの論理名
+    """
+    return f"{collection_name}{getattr(settings, 'QDRANT_COLD_TIER_SUFFIX', '_cold')}"
+
+
+def _cold_tier_source(collection_name: str) -> Optional[str]:
+    """コールド層のコレクション名であれば、元のコレクション名を返します。"""
+    for source in get_cold_tier_collections():
+        if cold_collection_name(source) == collection_name:
+            return source
+    return None
+
+
+def get_collection_config(collection_name: str) -> CollectionConfig:
+    """設定ファイルからコレクションの構成設定を生成します。
+
+    全コレクション共通の ``QDRANT_*`` 設定値を既定値とし、
+    ``QDRANT_COLLECTION_OVERRIDES[collection_name]`` があれば上書きします。
+    量子化設定 ``QDRANT_QUANTIZATION_MODE`` はドキュメントコレクションにのみ既定で適用されます。
+    コールド層のコレクションは、元のコレクションの構成からベクトル・ペイロードをディスク上に保持し、
+    ``QDRANT_COLD_TIER_QUANTIZATION`` で量子化したベクトルのみをメモリ上に保持する構成にします。
+    ベクトルをそのまま移動できるよう、次元数・データ型は元のコレクションと同じです。
+
+    Args:
+        collection_name: コレクション名
+
+    Returns:
+        CollectionConfig: コレクションの構成設定
+
+    Raises:
+        ValueError: 上書き設定・量子化モード・データ型・切り詰め次元数が無効な場合
+    """
+    source = _cold_tier_source(collection_name)
+    if source is not None:
+        config = replace(
+            get_collection_config(source),
+            name=collection_name,
+            vectors_on_disk=True,
+            on_disk_payload=True,
+            quantization=getattr(settings, 'QDRANT_COLD_TIER_QUANTIZATION', QUANTIZATION_SCALAR),
+            quantization_always_ram=True,
+        )
+        return _validate(replace(config, **_get_overrides(collection_name)))
+
+    config = CollectionConfig(
+        name=collection_name,
+        vector_size=settings.QDRANT_VECTOR_SIZE,
+        hnsw_m=getattr(settings, 'QDRANT_HNSW_M', 16),
+        hnsw_ef_construct=getattr(settings, 'QDRANT_HNSW_EF_CONSTRUCT', 100),
+        hnsw_full_scan_threshold=getattr(settings, 'QDRANT_HNSW_FULL_SCAN_THRESHOLD', 10000),
+        vectors_on_disk=getattr(settings, 'QDRANT_VECTORS_ON_DISK', False),
+        on_disk_payload=getattr(settings, 'QDRANT_ON_DISK_PAYLOAD', False),
+        indexing_threshold=getattr(settings, 'QDRANT_INDEXING_THRESHOLD', 20000),
+        memmap_threshold=getattr(settings, 'QDRANT_MEMMAP_THRESHOLD', None),
+        hybrid=getattr(settings, 'QDRANT_HYBRID_SEARCH', False),
+        datatype=getattr(settings, 'QDRANT_VECTOR_DATATYPE', DATATYPE_FLOAT32),
+        truncate_dim=getattr(settings, 'QDRANT_VECTOR_TRUNCATE_DIM', None),
+    )
+    # 量子化はメモリ使用量の大半を占めるドキュメントコレクションにのみ既定で適用する
+    if collection_name == getattr(settings, 'QDRANT_COLLECTION_DOCUMENTS', None):
+        config = replace(
+            config,
+            quantization=getattr(settings, 'QDRANT_QUANTIZATION_MODE', QUANTIZATION_NONE),
+            quantization_always_ram=getattr(settings, 'QDRANT_QUANTIZATION_ALWAYS_RAM', True),
+        )
+
+    return _validate(replace(config, **_get_overrides(collection_name)))
+
+
+def _validate(config: CollectionConfig) -> CollectionConfig:
+    """構成設定の値を検証します。
+
+    Raises:
+        ValueError: 量子化モード・データ型・切り詰め次元数が無効な場合
+    """
+    if config.quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"コレクション {config.name} の量子化モードが無効です: {config.quantization!r}")
+    if config.datatype not in DATATYPES:
+        raise ValueError(f"コレクション {config.name} のベクトルのデータ型が無効です: {config.datatype!r}")
+    if config.truncate_dim is not None and not 0 < config.truncate_dim <= config.vector_size:
+        raise ValueError(
+            f"コレクション {config.name} の切り詰め次元数 ({config.truncate_dim}) は"
+            f"1以上 {config.vector_size} 以下である必要があります")
+    return config
@@ -0,0 +1,77 @@
+"""検索リクエストの時間予算（デッドライン）を管理するモジュール。
+
+``request_budget()`` で設定した期限はcontextvarsで保持され、同じリクエスト内の
+Qdrant呼び出しはその残り時間を超えないタイムアウトで実行されます。
+HTTPリクエストでは ``SearchRequestBudgetMiddleware`` が ``QDRANT_REQUEST_BUDGET`` の時間予算を設定します。
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from app.core.search.gateways import SearchTimeoutError
+
+# 現在のリクエストの期限（time.monotonic()の値）
+_deadline: ContextVar[Optional[float]] = ContextVar('search_deadline', default=None)
+
+
+@contextmanager
+def request_budget(seconds: float) -> Iterator[float]:
+    """ブロック内の検索に時間予算を設定します。
+
+    既に外側で期限が設定されている場合は、より早い方の期限が適用されます。
+
+    Args:
+        seconds: 時間予算（秒）
+
+    Yields:
+        float: 適用される期限（time.monotonic()の値）
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """現在のリクエストの残り時間を返します。
+
+    Returns:
+        Optional[float]: 残り時間（秒）。時間予算が設定されていない場合はNone
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """1回のQdrant呼び出しに適用するタイムアウトを返します。
+
+    ``QDRANT_SEARCH_TIMEOUT`` と現在のリクエストの残り時間のうち短い方を返します。
+
+    Args:
+        default: 時間予算が無い場合のタイムアウト。省略時は ``QDRANT_SEARCH_TIMEOUT``
+
+    Returns:
+        Optional[float]: タイムアウト（秒）。制限しない場合はNone
+
+    Raises:
+        SearchTimeoutError: 時間予算を使い切っている場合
+    """
+    if default is None:
+        default = getattr(settings, 'QDRANT_SEARCH_TIMEOUT', None)
+    remaining = remaining_budget()
+    if remaining is None:
+        return default
+    if remaining <= 0:
+        raise SearchTimeoutError("検索の時間予算を使い切りました")
+    return remaining if default is None else min(default, remaining)
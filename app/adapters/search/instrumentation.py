@@ -0,0 +1,632 @@
+"""Qdrantクライアントの呼び出しを計測するモジュール。
+
+``instrument_client()`` でラップしたクライアントは、すべてのメソッド呼び出しについて以下を記録します。
+
+- 操作・コレクション・接続先ノードごとのレイテンシ（ヒストグラム）
+- 返却されたポイント数と概算サイズ（バイト）
+- エラーの種類ごとの件数
+
+ヘッジリクエストなどの再試行とサーキットブレーカーの状態は ``record_retry()`` / ``record_circuit_state()``
+で記録します。計測値は ``QDRANT_METRICS_SINK`` で選択した送信先（Prometheusのテキスト形式 または
+statsd互換のUDP）に送られ、``track_qdrant_calls()`` の範囲内ではリクエスト単位の集計にも加算されます。
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from qdrant_client.http.models import GroupsResult, QueryResponse, Record, ScoredPoint, SparseVector
+
+logger = logging.getLogger(__name__)
+
+SINK_NONE = 'none'
+SINK_PROMETHEUS = 'prometheus'
+SINK_STATSD = 'statsd'
+
+METRIC_DURATION = 'qdrant_client_request_duration_seconds'
+METRIC_POINTS = 'qdrant_client_points_returned'
+METRIC_BYTES = 'qdrant_client_response_bytes'
+METRIC_ERRORS = 'qdrant_client_errors_total'
+METRIC_RETRIES = 'qdrant_search_retries_total'
+METRIC_CIRCUIT_STATE = 'qdrant_circuit_state'
+
+# サーキットブレーカーの状態を数値で表したもの（ゲージの値）
+CIRCUIT_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POINTS_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(8))
+
+HISTOGRAM_BUCKETS = {
+    METRIC_DURATION: DURATION_BUCKETS,
+    METRIC_POINTS: POINTS_BUCKETS,
+    METRIC_BYTES: BYTES_BUCKETS,
+}
+
+Tags = Optional[Dict[str, str]]
+
+
+# 返却されたペイロードの概算で、文字列以外の値1つあたりに見積もるサイズ（バイト）
+PAYLOAD_VALUE_SIZE = 16
+
+
+def _vectors_size(point: Any) -> int:
+    """ポイントの識別子とベクトルのサイズ（バイト）を求めます。"""
+    if isinstance(point.vector, dict):
+        vectors = point.vector.values()
+    else:
+        vectors = [] if point.vector is None else [point.vector]
+    size = 16
+    for vector in vectors:
+        if isinstance(vector, SparseVector):
+            size += 8 * len(vector.indices)
+        else:
+            size += 4 * len(vector)
+    return size
+
+
+def estimate_point_size(point: Any) -> int:
+    """ポイントの送受信サイズ（バイト）を見積もります。
+
+    ペイロードはJSONに変換したサイズを数えるため、登録時のバッチサイズの判定など正確さが必要な場合に使用します。
+
+    Args:
+        point: ポイント（PointStruct / Record / ScoredPoint）
+
+    Returns:
+        int: 見積もったサイズ（バイト）
+    """
+    return _vectors_size(point) + len(json.dumps(point.payload or {}, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def approximate_point_size(point: Any) -> int:
+    """返却されたポイントのサイズ（バイト）を、ペイロードをJSONに変換せずに概算します。
+
+    すべての呼び出しの計測で使用するため、ペイロードは最上位のキーと文字列の長さだけを数え、
+    文字列以外の値は1つあたり ``PAYLOAD_VALUE_SIZE`` バイトとみなします。
+
+    Args:
+        point: ポイント（Record / ScoredPoint）
+
+    Returns:
+        int: 概算サイズ（バイト）
+    """
+    size = _vectors_size(point)
+    for key, value in (point.payload or {}).items():
+        size += len(key) + (len(value) if isinstance(value, str) else PAYLOAD_VALUE_SIZE)
+    return size
+
+
+def _extract_points(result: Any) -> Optional[List[Any]]:
+    """呼び出し結果に含まれるポイントを返します。ポイントを返さない操作の場合はNoneを返します。"""
+    if isinstance(result, QueryResponse):
+        return result.points
+    if isinstance(result, GroupsResult):
+        return [hit for group in result.groups for hit in group.hits]
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        # scroll() は (ポイントのリスト, 次のオフセット) を返す
+        return _extract_points(result[0])
+    if isinstance(result, list):
+        if all(isinstance(item, QueryResponse) for item in result):
+            return [point for response in result for point in response.points]
+        if all(isinstance(item, (Record, ScoredPoint)) for item in result):
+            return result
+    return None
+
+
+def measure_result(result: Any) -> Optional[Tuple[int, int]]:
+    """呼び出し結果のポイント数と概算サイズを返します。
+
+    Args:
+        result: Qdrantクライアントのメソッドの戻り値
+
+    Returns:
+        Optional[Tuple[int, int]]: ポイント数と概算サイズ（バイト）。ポイントを返さない操作の場合はNone
+    """
+    points = _extract_points(result)
+    if points is None:
+        return None
+    return len(points), sum(approximate_point_size(point) for point in points)
+
+
+class MetricsSink(ABC):
+    """計測値の送信先の抽象基底クラス。"""
+
+    enabled = True
+
+    @abstractmethod
+    def increment(self, name: str, value: float = 1, tags: Tags = None) -> None:
+        """カウンターを加算します。
+
+        Args:
+            name: メトリクス名
+            value: 加算する値
+            tags: ラベル
+        """
+
+    @abstractmethod
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        """ヒストグラムに値を記録します。
+
+        Args:
+            name: メトリクス名
+            value: 記録する値（時間の場合は秒）
+            tags: ラベル
+        """
+
+    @abstractmethod
+    def gauge(self, name: str, value: float, tags: Tags = None) -> None:
+        """ゲージに現在値を設定します。
+
+        Args:
+            name: メトリクス名
+            value: 現在値
+            tags: ラベル
+        """
+
+
+class NullMetricsSink(MetricsSink):
+    """計測値を破棄する送信先（計測無効時）。"""
+
+    enabled = False
+
+    def increment(self, name: str, value: float = 1, tags: Tags = None) -> None:
+        """何もしません。"""
+
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        """何もしません。"""
+
+    def gauge(self, name: str, value: float, tags: Tags = None) -> None:
+        """何もしません。"""
+
+
+def _label_key(tags: Tags) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((tags or {}).items()))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(str(value))}"' for key, value in labels) + '}'
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class PrometheusMetricsSink(MetricsSink):
+    """計測値をプロセス内に集計し、Prometheusのテキスト形式で出力する送信先。
+
+    集計値はプロセスごとに保持されるため、複数ワーカーで動作する場合はワーカーごとの値になります。
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, Sequence[float]]] = None):
+        """初期化
+
+        Args:
+            buckets: メトリクス名ごとのヒストグラムの境界値。省略時は ``HISTOGRAM_BUCKETS``
+        """
+        self.buckets = buckets or HISTOGRAM_BUCKETS
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._gauges: Dict[str, Dict[tuple, float]] = {}
+        # ヒストグラムは [境界値ごとの件数..., 合計, 件数] を保持する
+        self._histograms: Dict[str, Dict[tuple, List[float]]] = {}
+
+    def increment(self, name: str, value: float = 1, tags: Tags = None) -> None:
+        """カウンターを加算します。
+
+        Args:
+            name: メトリクス名
+            value: 加算する値
+            tags: ラベル
+        """
+        key = _label_key(tags)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        """ヒストグラムに値を記録します。
+
+        Args:
+            name: メトリクス名
+            value: 記録する値
+            tags: ラベル
+        """
+        bounds = self.buckets.get(name, DURATION_BUCKETS)
+        key = _label_key(tags)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.setdefault(key, [0] * (len(bounds) + 2))
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def gauge(self, name: str, value: float, tags: Tags = None) -> None:
+        """ゲージに現在値を設定します。
+
+        Args:
+            name: メトリクス名
+            value: 現在値
+            tags: ラベル
+        """
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(tags)] = value
+
+    def render(self) -> str:
+        """集計値をPrometheusのテキスト形式で出力します。
+
+        Returns:
+            str: テキスト形式の計測値
+        """
+        lines: List[str] = []
+        with self._lock:
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted(metrics):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for labels, value in sorted(metrics[name].items()):
+                        lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                bounds = self.buckets.get(name, DURATION_BUCKETS)
+                for labels, state in sorted(self._histograms[name].items()):
+                    for bound, count in zip(bounds, state):
+                        le = labels + (('le', _format_number(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(le)} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {state[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(state[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {state[-1]}")
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdMetricsSink(MetricsSink):
+    """計測値をstatsd互換のUDPで送信する送信先。
+
+    ラベルはDogStatsD形式 (``|#key:value``) で付与します。時間（``_seconds``）はミリ秒のタイマー、
+    その他のヒストグラムは ``|h`` として送信します。送信の失敗は呼び出し元に伝えません。
+    """
+
+    def __init__(self, host: str, port: int, prefix: str = ''):
+        """初期化
+
+        Args:
+            host: statsdサーバーのホスト名
+            port: statsdサーバーのポート番号
+            prefix: メトリクス名の接頭辞
+        """
+        self.prefix = f"{prefix}." if prefix else ''
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        try:
+            # 送信のたびに名前解決しないよう、生成時に一度だけ解決する
+            self._address: Optional[Tuple[str, int]] = (socket.gethostbyname(host), port)
+        except OSError as e:
+            logger.warning(f"statsdサーバー {host} の名前解決に失敗したため、計測値を送信しません: {e}")
+            self._address = None
+
+    def increment(self, name: str, value: float = 1, tags: Tags = None) -> None:
+        """カウンターを加算します。
+
+        Args:
+            name: メトリクス名
+            value: 加算する値
+            tags: ラベル
+        """
+        self._send(name, _format_number(value), 'c', tags)
+
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        """ヒストグラムに値を記録します。
+
+        Args:
+            name: メトリクス名
+            value: 記録する値（時間の場合は秒）
+            tags: ラベル
+        """
+        if name.endswith('_seconds'):
+            self._send(name, f"{value * 1000:.3f}", 'ms', tags)
+        else:
+            self._send(name, _format_number(value), 'h', tags)
+
+    def gauge(self, name: str, value: float, tags: Tags = None) -> None:
+        """ゲージに現在値を設定します。
+
+        Args:
+            name: メトリクス名
+            value: 現在値
+            tags: ラベル
+        """
+        self._send(name, _format_number(value), 'g', tags)
+
+    def close(self) -> None:
+        """送信用のソケットを閉じます。"""
+        self._socket.close()
+
+    def _send(self, name: str, value: str, metric_type: str, tags: Tags) -> None:
+        if self._address is None:
+            return
+        line = f"{self.prefix}{name}:{value}|{metric_type}"
+        if tags:
+            line += '|#' + ','.join(f"{key}:{_sanitize_tag(str(tag))}" for key, tag in sorted(tags.items()))
+        try:
+            self._socket.sendto(line.encode('utf-8'), self._address)
+        except OSError as e:
+            logger.debug(f"statsdへの計測値の送信に失敗しました: {e}")
+
+
+def _sanitize_tag(value: str) -> str:
+    for char in ',|#\n':
+        value = value.replace(char, '_')
+    return value
+
+
+def create_metrics_sink() -> MetricsSink:
+    """設定に基づいて計測値の送信先を生成します。
+
+    Returns:
+        MetricsSink: 計測値の送信先
+
+    Raises:
+        ValueError: ``QDRANT_METRICS_SINK`` が不正な場合
+    """
+    kind = getattr(settings, 'QDRANT_METRICS_SINK', SINK_NONE)
+    if kind == SINK_NONE:
+        return NullMetricsSink()
+    if kind == SINK_PROMETHEUS:
+        return PrometheusMetricsSink()
+    if kind == SINK_STATSD:
+        return StatsdMetricsSink(
+            getattr(settings, 'QDRANT_STATSD_HOST', 'localhost'),
+            getattr(settings, 'QDRANT_STATSD_PORT', 8125),
+            getattr(settings, 'QDRANT_STATSD_PREFIX', ''),
+        )
+    raise ValueError(f"QDRANT_METRICS_SINK の値が不正です: {kind}")
+
+
+_sink: Optional[MetricsSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_metrics_sink() -> MetricsSink:
+    """プロセス内で共有する計測値の送信先を取得します。
+
+    Returns:
+        MetricsSink: 計測値の送信先
+    """
+    global _sink  # pylint: disable=global-statement
+    with _sink_lock:
+        if _sink is None:
+            _sink = create_metrics_sink()
+        return _sink
+
+
+def reset_metrics_sink() -> None:
+    """計測値の送信先をリセットします。設定の変更後やテストで使用します。"""
+    global _sink  # pylint: disable=global-statement
+    with _sink_lock:
+        _sink = None
+
+
+def _reset_after_fork() -> None:
+    """fork後の子プロセスでは親プロセスの集計値を引き継がない。"""
+    global _sink, _sink_lock  # pylint: disable=global-statement
+    _sink = None
+    _sink_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@dataclass
+class QdrantCallStats:
+    """リクエスト単位のQdrant呼び出しの集計。
+
+    Attributes:
+        calls: 呼び出し回数
+        seconds: 呼び出しの所要時間の合計（秒）
+        points: 返却されたポイント数の合計
+        bytes: 返却されたポイントの概算サイズの合計（バイト）
+        errors: 失敗した呼び出しの回数
+        retries: ヘッジリクエストなどの再試行の回数
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    points: int = 0
+    bytes: int = 0
+    errors: int = 0
+    retries: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record_call(self, seconds: float, points: int, size: int, failed: bool) -> None:
+        """呼び出しを集計に加算します。
+
+        Args:
+            seconds: 所要時間（秒）
+            points: 返却されたポイント数
+            size: 返却されたポイントの概算サイズ（バイト）
+            failed: 呼び出しが失敗したかどうか
+        """
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+            self.points += points
+            self.bytes += size
+            self.errors += int(failed)
+
+    def record_retry(self) -> None:
+        """再試行を集計に加算します。"""
+        with self._lock:
+            self.retries += 1
+
+
+_current_stats: ContextVar[Optional[QdrantCallStats]] = ContextVar('qdrant_call_stats', default=None)
+
+
+@contextmanager
+def track_qdrant_calls() -> Iterator[QdrantCallStats]:
+    """範囲内のQdrant呼び出しをリクエスト単位で集計します。
+
+    ``copy_context()`` で実行されるワーカースレッドの呼び出しも同じ集計に加算されます。
+
+    Yields:
+        QdrantCallStats: 集計
+    """
+    stats = QdrantCallStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def record_retry(reason: str) -> None:
+    """ヘッジリクエストなどの再試行を記録します。
+
+    Args:
+        reason: 再試行の理由（'hedge' / 'failover' など）
+    """
+    get_metrics_sink().increment(METRIC_RETRIES, tags={'reason': reason})
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record_retry()
+
+
+def record_circuit_state(name: str, state: str) -> None:
+    """サーキットブレーカーの状態を記録します。
+
+    Args:
+        name: サーキットブレーカーの名前
+        state: 状態（'closed' / 'open' / 'half_open'）
+    """
+    get_metrics_sink().gauge(METRIC_CIRCUIT_STATE, CIRCUIT_STATE_VALUES[state], {'circuit': name})
+
+
+class InstrumentedQdrantClient:
+    """Qdrantクライアント（同期・非同期）のメソッド呼び出しを計測するプロキシ。
+
+    公開メソッドの呼び出しはそのまま元のクライアントに委譲し、所要時間・返却されたポイント数・
+    エラーを計測値の送信先と現在のリクエストの集計に記録します。
+    """
+
+    def __init__(self, client: Any, node: str = 'primary', sink: Optional[MetricsSink] = None):
+        """初期化
+
+        Args:
+            client: 計測対象のQdrantクライアント
+            node: 接続先ノードの名前（ラベルに使用）
+            sink: 計測値の送信先。省略時は ``get_metrics_sink()``
+        """
+        self._client = client
+        self._node = node
+        self._sink = sink or get_metrics_sink()
+
+    @property
+    def wrapped(self) -> Any:
+        """計測対象のクライアントを返します。
+
+        Returns:
+            計測対象のQdrantクライアント
+        """
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        """元のクライアントの属性を返します。公開メソッドは計測用のラッパーで包みます。"""
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        wrapper = self._wrap(name, attr)
+        # 次回以降は __getattr__ を経由せずにラッパーを返す
+        self.__dict__[name] = wrapper
+        return wrapper
+
+    def _wrap(self, operation: str, method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_call(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await method(*args, **kwargs)
+                except Exception as e:
+                    self._record(operation, args, kwargs, started, error=e)
+                    raise
+                self._record(operation, args, kwargs, started, result=result)
+                return result
+            return async_call
+
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                self._record(operation, args, kwargs, started, error=e)
+                raise
+            self._record(operation, args, kwargs, started, result=result)
+            return result
+        return call
+
+    def _record(
+        self,
+        operation: str,
+        args: tuple,
+        kwargs: dict,
+        started: float,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """呼び出しの計測値を記録します。計測の失敗は呼び出し元に伝えません。"""
+        elapsed = time.perf_counter() - started
+        try:
+            collection = kwargs.get('collection_name') or (args[0] if args and isinstance(args[0], str) else '')
+            tags = {'operation': operation, 'collection': collection, 'node': self._node}
+            self._sink.observe(METRIC_DURATION, elapsed, {**tags, 'outcome': 'error' if error else 'ok'})
+            points, size = 0, 0
+            if error is not None:
+                self._sink.increment(METRIC_ERRORS, tags={**tags, 'error': type(error).__name__})
+            else:
+                measured = measure_result(result)
+                if measured is not None:
+                    points, size = measured
+                    self._sink.observe(METRIC_POINTS, points, tags)
+                    self._sink.observe(METRIC_BYTES, size, tags)
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.record_call(elapsed, points, size, error is not None)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug(f"Qdrant呼び出し {operation} の計測に失敗しました: {e}")
+
+
+def instrument_client(client: Any, node: str = 'primary') -> Any:
+    """計測が有効な場合、Qdrantクライアントを計測用のプロキシで包みます。
+
+    ``QDRANT_METRICS_SINK`` が 'none' の場合は元のクライアントをそのまま返します。
+
+    Args:
+        client: Qdrantクライアント（同期・非同期）
+        node: 接続先ノードの名前（ラベルに使用）
+
+    Returns:
+        計測用のプロキシ、または元のクライアント
+    """
+    sink = get_metrics_sink()
+    if not sink.enabled:
+        return client
+    return InstrumentedQdrantClient(client, node, sink)
@@ -0,0 +1,314 @@
+"""小規模なユーザーライブラリをプロセス内で総当たり検索するSearchGatewayの実装モジュール。
+
+数千チャンク程度のユーザーでは、Qdrantへのネットワーク往復とシリアライズのコストが検索そのものより大きくなります。
+このゲートウェイはユーザーごとのベクトルを ``LOCAL_VECTOR_INDEX_DIR`` 配下にfloat16行列として保存し、
+memmapした行列に対する内積で検索します。ポイント数が ``LOCAL_VECTOR_INDEX_MAX_POINTS`` を超えるユーザーや、
+ユーザーで絞り込まない検索はQdrantのゲートウェイにフォールバックします。
+
+ローカルインデックスは初回検索時にQdrantから構築されます。ポイントを登録・移動した場合は
+``invalidate_local_indexes()`` でインデックスを破棄します（``QdrantPointWriter`` とコールド層への移動は自動で破棄します）。
+破棄はインデックスのディレクトリの削除で行うため、同じディレクトリを共有する他のプロセスにも反映されます。
+それ以外の経路での変更に備え、構築から ``LOCAL_VECTOR_INDEX_TTL_SECONDS`` 秒が経過したインデックスは再構築します。
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from django.conf import settings
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+from app.adapters.search.collection_config import DENSE_VECTOR_NAME, get_collection_config
+from app.adapters.search.local_vector_index import LocalVectorIndex
+from app.adapters.search.payload_schema import PAYLOAD_DOCUMENT_ID, PAYLOAD_USER_ID
+from app.adapters.search.qdrant_manager import get_qdrant_client
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.core.search.gateways import SearchFilter, SearchGateway, SearchGroup, SearchHit
+
+logger = logging.getLogger(__name__)
+
+# Qdrantからポイントを読み込む際の1回あたりの件数
+SCROLL_BATCH_SIZE = 1000
+
+
+def local_index_path(collection_name: str, user_id: Union[int, str], index_dir: Optional[str] = None) -> str:
+    """ユーザーのローカルインデックスのディレクトリを返します。
+
+    Args:
+        collection_name: コレクション名
+        user_id: ユーザーID
+        index_dir: ローカルインデックスの保存先。省略時は ``LOCAL_VECTOR_INDEX_DIR``
+
+    Returns:
+        str: インデックスのディレクトリパス
+    """
+    return os.path.join(str(index_dir or settings.LOCAL_VECTOR_INDEX_DIR), collection_name, str(user_id))
+
+
+def invalidate_local_indexes(
+    collection_name: str,
+    user_ids: Iterable[Union[int, str]],
+    index_dir: Optional[str] = None,
+) -> None:
+    """ユーザーのローカルインデックスを削除します。次回の検索時に再構築されます。
+
+    インデックスを読み込み済みのゲートウェイは、検索のたびにメタ情報の有無と更新時刻を確認するため、
+    他のプロセスで削除した場合も次回の検索から再構築します。
+
+    Args:
+        collection_name: コレクション名
+        user_ids: ユーザーID
+        index_dir: ローカルインデックスの保存先。省略時は ``LOCAL_VECTOR_INDEX_DIR``
+    """
+    for user_id in {str(user_id) for user_id in user_ids}:
+        shutil.rmtree(local_index_path(collection_name, user_id, index_dir), ignore_errors=True)
+
+
+class LocalSearchGateway(SearchGateway):
+    """ユーザー単位のローカルインデックスで総当たり検索を行うSearchGatewayの実装クラス。
+
+    検索結果のスコアとペイロードはQdrantのCOSINE検索と互換であり、絞り込み条件も同じ意味で適用されます。
+    """
+
+    def __init__(
+        self,
+        fallback: Optional[SearchGateway] = None,
+        client: Optional[QdrantClient] = None,
+        index_dir: Optional[str] = None,
+        max_points: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        """初期化
+
+        Args:
+            fallback: ローカルインデックスを使用しない場合の検索先。省略時はQdrantSearchGateway
+            client: インデックス構築に使用するQdrantクライアント（テスト用に注入可能）
+            index_dir: ローカルインデックスの保存先。省略時は ``LOCAL_VECTOR_INDEX_DIR``
+            max_points: ローカルで検索するユーザーあたりの最大ポイント数。省略時は ``LOCAL_VECTOR_INDEX_MAX_POINTS``
+            ttl_seconds: インデックスを再構築するまでの時間（秒）。0の場合は再構築しない。
+                省略時は ``LOCAL_VECTOR_INDEX_TTL_SECONDS``
+        """
+        self._client = client
+        self.fallback = fallback or QdrantSearchGateway(client=client)
+        self.index_dir = str(index_dir or settings.LOCAL_VECTOR_INDEX_DIR)
+        self.max_points = max_points if max_points is not None else settings.LOCAL_VECTOR_INDEX_MAX_POINTS
+        # (コレクション名, ユーザーID) -> (meta.jsonの更新時刻, インデックス)
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else getattr(settings, 'LOCAL_VECTOR_INDEX_TTL_SECONDS', 3600))
+        self._cache: Dict[Tuple[str, str], Tuple[int, Optional[LocalVectorIndex]]] = {}
+        # _cache と _key_locks の操作のみを保護するロック（インデックスの構築中は保持しない）
+        self._lock = threading.Lock()
+        # (コレクション名, ユーザーID) ごとの構築用ロック
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    @property
+    def client(self) -> QdrantClient:
+        """インデックス構築に使用するQdrantクライアントを返します。
+
+        Returns:
+            QdrantClient: Qdrantクライアント
+        """
+        return self._client if self._client is not None else get_qdrant_client()
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """ローカルインデックスで検索し、対象外の場合はフォールバック先で検索する。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            スコアの降順に並んだ検索結果
+        """
+        index = None
+        if search_filter is not None and search_filter.user_id is not None:
+            index = self.get_index(collection_name, search_filter.user_id)
+        if index is None:
+            return self.fallback.search(collection_name, query_vector, search_filter, limit)
+        return index.search(get_collection_config(collection_name).prepare_vector(query_vector), search_filter, limit)
+
+    def hybrid_search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        query_text: str,
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """ハイブリッド検索はローカルでは行わず、フォールバック先に委譲する。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            query_text: 疎ベクトル検索に用いるクエリテキスト
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            融合後のスコアの降順に並んだ検索結果
+        """
+        return self.fallback.hybrid_search(collection_name, query_vector, query_text, search_filter, limit)
+
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        group_limit: int = 5,
+        group_size: int = 3,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> List[SearchGroup]:
+        """ローカルインデックスで文書ごとにグループ化して検索し、対象外の場合はフォールバック先で検索する。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            group_limit: 取得する最大文書数
+            group_size: 1文書あたりの最大件数
+            payload_fields: 結果に含めるペイロードのキー。Noneの場合はすべて
+
+        Returns:
+            最高スコアの降順に並んだ文書ごとの検索結果
+        """
+        index = None
+        if search_filter is not None and search_filter.user_id is not None:
+            index = self.get_index(collection_name, search_filter.user_id)
+        if index is None:
+            return self.fallback.search_groups(
+                collection_name, query_vector, search_filter, group_limit, group_size, payload_fields)
+        return index.search_groups(
+            get_collection_config(collection_name).prepare_vector(query_vector), PAYLOAD_DOCUMENT_ID, search_filter, group_limit, group_size, payload_fields)
+
+    def index_path(self, collection_name: str, user_id: Union[int, str]) -> str:
+        """ユーザーのローカルインデックスのディレクトリを返します。
+
+        Args:
+            collection_name: コレクション名
+            user_id: ユーザーID
+
+        Returns:
+            str: インデックスのディレクトリパス
+        """
+        return local_index_path(collection_name, user_id, self.index_dir)
+
+    def get_index(self, collection_name: str, user_id: Union[int, str]) -> Optional[LocalVectorIndex]:
+        """ユーザーのローカルインデックスを取得します。存在しない、または期限切れの場合はQdrantから構築します。
+
+        構築はユーザーごとのロックで行うため、あるユーザーの構築中も他のユーザーの検索は待機しません。
+
+        Args:
+            collection_name: コレクション名
+            user_id: ユーザーID
+
+        Returns:
+            Optional[LocalVectorIndex]: インデックス。ポイント数が上限を超える場合はNone
+        """
+        key = (collection_name, str(user_id))
+        meta_path = os.path.join(self.index_path(collection_name, user_id), LocalVectorIndex.META_FILE)
+        with self._lock:
+            cached = self._cache.get(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        mtime = self._get_fresh_mtime(meta_path)
+        if cached is not None and mtime is not None and cached[0] == mtime:
+            return cached[1]
+
+        with key_lock:
+            # ロック待ちの間に他のスレッドが構築・読み込みを済ませている可能性がある
+            mtime = self._get_fresh_mtime(meta_path)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None and mtime is not None and cached[0] == mtime:
+                return cached[1]
+
+            if mtime is None:
+                self.build_index(collection_name, user_id)
+                mtime = _get_mtime(meta_path)
+
+            path = self.index_path(collection_name, user_id)
+            meta = LocalVectorIndex.read_meta(path) or {}
+            index = LocalVectorIndex.load(path) if meta.get('point_count', 0) <= self.max_points else None
+            with self._lock:
+                self._cache[key] = (mtime, index)
+            return index
+
+    def _get_fresh_mtime(self, meta_path: str) -> Optional[int]:
+        """メタ情報の更新時刻を返します。存在しない、または構築から ``ttl_seconds`` 秒が経過した場合はNone。"""
+        mtime = _get_mtime(meta_path)
+        if mtime is not None and self.ttl_seconds and time.time_ns() - mtime > self.ttl_seconds * 1e9:
+            return None
+        return mtime
+
+    def build_index(self, collection_name: str, user_id: Union[int, str]) -> Optional[LocalVectorIndex]:
+        """Qdrantからユーザーのポイントを読み込み、ローカルインデックスを保存します。
+
+        ポイント数が上限を超える場合はベクトルを読み込まず、その旨をメタ情報のみとして保存します。
+
+        Args:
+            collection_name: コレクション名
+            user_id: ユーザーID
+
+        Returns:
+            Optional[LocalVectorIndex]: 構築したインデックス。ポイント数が上限を超える場合はNone
+        """
+        path = self.index_path(collection_name, user_id)
+        user_filter = Filter(must=[FieldCondition(key=PAYLOAD_USER_ID, match=MatchValue(value=str(user_id)))])
+        point_count = self.client.count(collection_name, count_filter=user_filter, exact=True).count
+        if point_count > self.max_points:
+            logger.debug(f"ユーザー {user_id} のポイント数 ({point_count}) が上限を超えるため、Qdrantで検索します: {collection_name}")
+            LocalVectorIndex.write_meta_only(path, {'point_count': point_count})
+            return None
+
+        vector_name = DENSE_VECTOR_NAME if get_collection_config(collection_name).hybrid else None
+        point_ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name,
+                scroll_filter=user_filter,
+                limit=SCROLL_BATCH_SIZE,
+                offset=offset,
+                with_payload=True,
+                with_vectors=[vector_name] if vector_name else True,
+            )
+            for point in points:
+                point_ids.append(point.id)
+                vectors.append(point.vector[vector_name] if vector_name else point.vector)
+                payloads.append(point.payload or {})
+            if offset is None:
+                break
+
+        index = LocalVectorIndex.from_points(point_ids, vectors, payloads)
+        index.save(path)
+        logger.info(f"ローカルインデックスを構築しました: {collection_name} user={user_id} ({len(index)}件)")
+        return index
+
+    def invalidate_index(self, collection_name: str, user_id: Union[int, str]) -> None:
+        """ユーザーのローカルインデックスを破棄します。次回の検索時に再構築されます。
+
+        Args:
+            collection_name: コレクション名
+            user_id: ユーザーID
+        """
+        invalidate_local_indexes(collection_name, [user_id], self.index_dir)
+        with self._lock:
+            self._cache.pop((collection_name, str(user_id)), None)
+
+
+def _get_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
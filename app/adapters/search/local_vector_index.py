@@ -0,0 +1,306 @@
+"""ユーザー単位のベクトルをローカルディスクに保持する総当たり検索インデックスのモジュール。
+
+ベクトルは正規化したfloat16の行列として ``vectors.npy`` に保存し、検索時はmemmapで読み込みます。
+正規化済みベクトルの内積はコサイン類似度と等しいため、スコアはQdrantのCOSINE距離と互換です。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.adapters.search.payload_schema import payload_matches
+from app.core.search.gateways import PointId, SearchFilter, SearchGroup, SearchHit
+
+# 1回の行列積で処理する行数
+BLOCK_ROWS = 8192
+
+
+class LocalVectorIndex:
+    """1ユーザー分のベクトルとペイロードを保持する総当たり検索インデックス。
+
+    インデックスは以下のファイルで構成されるディレクトリとして保存されます。
+
+    - ``vectors.npy``: 正規化済みベクトルのfloat16行列
+    - ``points.jsonl``: 各行に対応するポイントIDとペイロード
+    - ``meta.json``: ポイント数と次元数
+    """
+
+    VECTORS_FILE = 'vectors.npy'
+    POINTS_FILE = 'points.jsonl'
+    META_FILE = 'meta.json'
+
+    def __init__(self, point_ids: Sequence[PointId], vectors: np.ndarray, payloads: Sequence[Dict[str, Any]]):
+        """初期化
+
+        Args:
+            point_ids: ポイントIDのリスト
+            vectors: 正規化済みベクトルの行列 (ポイント数 x 次元数)
+            payloads: 各ポイントのペイロード
+
+        Raises:
+            ValueError: ポイントID・ベクトル・ペイロードの件数が一致しない場合
+        """
+        if not len(point_ids) == len(vectors) == len(payloads):
+            raise ValueError(
+                f"ポイントID ({len(point_ids)})・ベクトル ({len(vectors)})・ペイロード ({len(payloads)}) の件数が一致しません")
+        self.point_ids = list(point_ids)
+        self.vectors = vectors
+        self.payloads = list(payloads)
+
+    @classmethod
+    def from_points(
+        cls,
+        point_ids: Sequence[PointId],
+        vectors: Sequence[Sequence[float]],
+        payloads: Sequence[Dict[str, Any]],
+    ) -> 'LocalVectorIndex':
+        """ベクトルを正規化してfloat16に変換し、インデックスを生成します。
+
+        Args:
+            point_ids: ポイントIDのリスト
+            vectors: ベクトルのリスト
+            payloads: 各ポイントのペイロード
+
+        Returns:
+            LocalVectorIndex: 生成したインデックス
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(point_ids), -1 if len(point_ids) else 0)
+        return cls(point_ids, _normalize(matrix).astype(np.float16), payloads)
+
+    @classmethod
+    def load(cls, directory: str) -> 'LocalVectorIndex':
+        """保存済みのインデックスを読み込みます。ベクトル行列はmemmapで読み込みます。
+
+        Args:
+            directory: インデックスのディレクトリ
+
+        Returns:
+            LocalVectorIndex: 読み込んだインデックス
+        """
+        vectors = np.load(os.path.join(directory, cls.VECTORS_FILE), mmap_mode='r')
+        point_ids, payloads = [], []
+        with open(os.path.join(directory, cls.POINTS_FILE), encoding='utf-8') as f:
+            for line in f:
+                point = json.loads(line)
+                point_ids.append(point['id'])
+                payloads.append(point['payload'])
+        return cls(point_ids, vectors, payloads)
+
+    @classmethod
+    def read_meta(cls, directory: str) -> Optional[Dict[str, Any]]:
+        """インデックスのメタ情報を読み込みます。
+
+        Args:
+            directory: インデックスのディレクトリ
+
+        Returns:
+            Optional[Dict[str, Any]]: メタ情報。存在しない場合はNone
+        """
+        path = os.path.join(directory, cls.META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def write_meta_only(cls, directory: str, meta: Dict[str, Any]) -> None:
+        """ベクトルを含まないメタ情報のみのディレクトリを保存します。
+
+        Args:
+            directory: 保存先のディレクトリ
+            meta: メタ情報
+        """
+        _replace_directory(directory, lambda tmp: _write_json(os.path.join(tmp, cls.META_FILE), meta))
+
+    def save(self, directory: str) -> None:
+        """インデックスをディレクトリに保存します。
+
+        一時ディレクトリに書き込んだ後に置き換えるため、読み込み側が書きかけのファイルを読むことはありません。
+
+        Args:
+            directory: 保存先のディレクトリ
+        """
+        def write(tmp: str) -> None:
+            np.save(os.path.join(tmp, self.VECTORS_FILE), np.asarray(self.vectors, dtype=np.float16))
+            with open(os.path.join(tmp, self.POINTS_FILE), 'w', encoding='utf-8') as f:
+                for point_id, payload in zip(self.point_ids, self.payloads):
+                    f.write(json.dumps({'id': point_id, 'payload': payload}, ensure_ascii=False) + '\n')
+            _write_json(os.path.join(tmp, self.META_FILE), {
+                'point_count': len(self),
+                'dimension': int(self.vectors.shape[1]) if len(self) else 0,
+            })
+
+        _replace_directory(directory, write)
+
+    def __len__(self) -> int:
+        """インデックスに含まれるポイント数を返します。"""
+        return len(self.point_ids)
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """クエリベクトルとのコサイン類似度の上位を返します。
+
+        Args:
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            List[SearchHit]: スコアの降順に並んだ検索結果
+        """
+        return self.search_batch([query_vector], search_filter, limit)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[List[SearchHit]]:
+        """複数のクエリベクトルをまとめて検索します。
+
+        ベクトル行列を ``BLOCK_ROWS`` 行ずつ読み込んで全クエリとの内積を計算し、
+        ブロックごとの上位候補をマージして最終的な上位 ``limit`` 件を求めます。
+
+        Args:
+            query_vectors: クエリベクトルのリスト
+            search_filter: 検索対象の絞り込み条件
+            limit: 各クエリで取得する最大件数
+
+        Returns:
+            List[List[SearchHit]]: クエリごとの検索結果
+        """
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32))
+        if len(self) == 0 or limit <= 0:
+            return [[] for _ in range(len(queries))]
+
+        mask = self._mask(search_filter)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, len(self), BLOCK_ROWS):
+            block_mask = mask[start:start + BLOCK_ROWS]
+            if not block_mask.any():
+                continue
+            block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores = queries @ block.T
+            scores[:, ~block_mask] = -np.inf
+            rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            best_scores, best_rows = _top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_rows, rows], axis=1),
+                limit,
+            )
+
+        results = []
+        for query_scores, query_rows in zip(best_scores, best_rows):
+            order = np.argsort(-query_scores, kind='stable')
+            hits = []
+            for i in order:
+                if not np.isfinite(query_scores[i]):
+                    break
+                row = int(query_rows[i])
+                hits.append(SearchHit(point_id=self.point_ids[row], score=float(query_scores[i]),
+                                      payload=self.payloads[row]))
+            results.append(hits)
+        return results
+
+    def search_groups(
+        self,
+        query_vector: Sequence[float],
+        group_key: str,
+        search_filter: Optional[SearchFilter] = None,
+        group_limit: int = 5,
+        group_size: int = 3,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> List[SearchGroup]:
+        """ペイロードの ``group_key`` の値ごとにグループ化して、コサイン類似度の上位を返します。
+
+        Args:
+            query_vector: クエリベクトル
+            group_key: グループ化に用いるペイロードのキー
+            search_filter: 検索対象の絞り込み条件
+            group_limit: 取得する最大グループ数
+            group_size: 1グループあたりの最大件数
+            payload_fields: 結果に含めるペイロードのキー。Noneの場合はすべて
+
+        Returns:
+            List[SearchGroup]: 最高スコアの降順に並んだグループごとの検索結果
+        """
+        if len(self) == 0 or group_limit <= 0 or group_size <= 0:
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        mask = self._mask(search_filter)
+        scores = np.full(len(self), -np.inf, dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block_mask = mask[start:start + BLOCK_ROWS]
+            if block_mask.any():
+                block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = np.where(block_mask, block @ query, -np.inf)
+
+        groups: Dict[Any, List[SearchHit]] = {}
+        for row in np.argsort(-scores, kind='stable'):
+            if not np.isfinite(scores[row]):
+                break
+            key = self.payloads[row].get(group_key)
+            if key is None or isinstance(key, (list, dict)):
+                continue
+            if key not in groups and len(groups) >= group_limit:
+                continue
+            hits = groups.setdefault(key, [])
+            if len(hits) < group_size:
+                payload = self.payloads[row]
+                if payload_fields is not None:
+                    payload = {k: v for k, v in payload.items() if k in payload_fields}
+                hits.append(SearchHit(point_id=self.point_ids[int(row)], score=float(scores[row]), payload=payload))
+        return [SearchGroup(group_id=key, hits=hits) for key, hits in groups.items()]
+
+    def _mask(self, search_filter: Optional[SearchFilter]) -> np.ndarray:
+        """絞り込み条件に一致する行をTrueとする配列を返します。"""
+        return np.fromiter((payload_matches(p, search_filter) for p in self.payloads), dtype=bool, count=len(self))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int):
+    """各行のスコア上位k件（順不同）を取り出します。"""
+    if scores.shape[1] <= k:
+        return scores, rows
+    index = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, index, axis=1), np.take_along_axis(rows, index, axis=1)
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def _replace_directory(directory: str, write) -> None:
+    """一時ディレクトリに書き込んだ内容で ``directory`` を置き換えます。"""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        write(tmp)
+        if os.path.exists(directory):
+            old = tempfile.mkdtemp(dir=parent, prefix='.old-')
+            os.replace(directory, os.path.join(old, 'index'))
+            os.replace(tmp, directory)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, directory)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
@@ -0,0 +1,77 @@
+"""リクエストごとのQdrant呼び出しをリクエストログに付加し、検索の時間予算を設定するミドルウェア。"""
+
+import logging
+
+from django.conf import settings
+
+from app.adapters.search.deadline import request_budget
+from app.adapters.search.instrumentation import track_qdrant_calls
+
+logger = logging.getLogger(__name__)
+
+
+class QdrantRequestLogMiddleware:
+    """リクエスト中のQdrant呼び出しを集計し、ログと ``Server-Timing`` ヘッダーに出力するミドルウェア。
+
+    集計はQdrantクライアントの計測が有効な場合（``QDRANT_METRICS_SINK`` が 'none' 以外）のみ行われます。
+    Qdrantを呼び出さなかったリクエストでは何も出力しません。
+    """
+
+    def __init__(self, get_response):
+        """初期化
+
+        Args:
+            get_response: 次のミドルウェアまたはビュー
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """リクエストを処理し、Qdrant呼び出しの集計を出力します。
+
+        Args:
+            request: HTTPリクエスト
+
+        Returns:
+            HTTPレスポンス
+        """
+        with track_qdrant_calls() as stats:
+            response = self.get_response(request)
+        if stats.calls:
+            milliseconds = stats.seconds * 1000
+            logger.info(
+                f"{request.method} {request.path} {response.status_code} "
+                f"qdrant_calls={stats.calls} qdrant_ms={milliseconds:.1f} qdrant_points={stats.points} "
+                f"qdrant_bytes={stats.bytes} qdrant_errors={stats.errors} qdrant_retries={stats.retries}")
+            response['Server-Timing'] = f'qdrant;dur={milliseconds:.1f};desc="{stats.calls} calls"'
+        return response
+
+
+class SearchRequestBudgetMiddleware:
+    """リクエスト内の検索全体に ``QDRANT_REQUEST_BUDGET`` 秒の時間予算を設定するミドルウェア。
+
+    リクエスト内のQdrant呼び出しのタイムアウトとヘッジリクエストの待ち時間は、残りの時間予算を超えなくなります。
+    ``QDRANT_REQUEST_BUDGET`` が0の場合は時間予算を設定しません。
+    """
+
+    def __init__(self, get_response):
+        """初期化
+
+        Args:
+            get_response: 次のミドルウェアまたはビュー
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """時間予算を設定してリクエストを処理します。
+
+        Args:
+            request: HTTPリクエスト
+
+        Returns:
+            HTTPレスポンス
+        """
+        budget = getattr(settings, 'QDRANT_REQUEST_BUDGET', 0)
+        if not budget:
+            return self.get_response(request)
+        with request_budget(budget):
+            return self.get_response(request)
@@ -0,0 +1,90 @@
+"""Qdrantポイントのペイロード構造とペイロードインデックスを定義するモジュール。
+
+検索は常に1ユーザーのデータに限定され、文書・ページ・タグで絞り込まれるため、
+これらのフィールドにペイロードインデックスを作成してフィルタ付きHNSW検索を高速化します。
+"""
+
+from typing import Any, Dict, Optional, Union
+
+from qdrant_client.http.models import (
+    IntegerIndexParams,
+    IntegerIndexType,
+    KeywordIndexParams,
+    KeywordIndexType,
+    PayloadSchemaType,
+)
+
+from app.core.search.gateways import SearchFilter
+
+# ペイロードのフィールド名
+PAYLOAD_USER_ID = 'user_id'
+PAYLOAD_DOCUMENT_ID = 'document_id'
+PAYLOAD_PAGE_NUMBER = 'page_number'
+PAYLOAD_TAGS = 'tags'
+
+PayloadIndexParams = Union[KeywordIndexParams, IntegerIndexParams]
+
+
+def get_payload_indexes() -> Dict[str, PayloadIndexParams]:
+    """全コレクションに作成するペイロードインデックスの定義を返します。
+
+    ``user_id`` は ``is_tenant`` を指定し、Qdrantがテナント単位にデータを配置して
+    ユーザーで絞り込んだ検索を効率化できるようにします。
+    ``user_id`` は文字列として保存するため、キーワードインデックスを使用します。
+
+    Returns:
+        Dict[str, PayloadIndexParams]: フィールド名とインデックス設定の辞書
+    """
+    return {
+        PAYLOAD_USER_ID: KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True),
+        PAYLOAD_DOCUMENT_ID: KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+        PAYLOAD_PAGE_NUMBER: IntegerIndexParams(type=IntegerIndexType.INTEGER, lookup=True, range=True),
+        PAYLOAD_TAGS: KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+    }
+
+
+def get_index_data_type(params: PayloadIndexParams) -> PayloadSchemaType:
+    """インデックス設定に対応するペイロードのデータ型を返します。
+
+    Args:
+        params: インデックス設定
+
+    Returns:
+        PayloadSchemaType: ペイロードのデータ型
+    """
+    return PayloadSchemaType(params.type.value)
+
+
+def _payload_values(payload: Dict[str, Any], field_name: str) -> set:
+    value = payload.get(field_name)
+    if value is None:
+        return set()
+    if isinstance(value, (list, tuple)):
+        return set(value)
+    return {value}
+
+
+def payload_matches(payload: Dict[str, Any], search_filter: Optional[SearchFilter]) -> bool:
+    """ペイロードが絞り込み条件を満たすか判定します。
+
+    Qdrantのフィルタ (``build_filter()``) と同じ意味を持ちます。
+    配列のフィールドはいずれかの要素が一致すれば条件を満たし、``user_id`` は文字列として比較します。
+
+    Args:
+        payload: ポイントのペイロード
+        search_filter: 検索対象の絞り込み条件
+
+    Returns:
+        bool: 条件を満たす場合はTrue
+    """
+    if search_filter is None:
+        return True
+    if search_filter.user_id is not None and \
+            str(search_filter.user_id) not in _payload_values(payload, PAYLOAD_USER_ID):
+        return False
+    if search_filter.document_ids and \
+            not _payload_values(payload, PAYLOAD_DOCUMENT_ID) & set(search_filter.document_ids):
+        return False
+    if search_filter.tags and not _payload_values(payload, PAYLOAD_TAGS) & set(search_filter.tags):
+        return False
+    return True
@@ -0,0 +1,227 @@
+"""ポイントをバッチにまとめてQdrantに登録するモジュール。
+
+``QdrantPointWriter`` は追加されたポイントを件数とサイズの上限でバッチにまとめ、
+``wait=False`` のupsertとして少数の同時リクエストで送信します。
+
+- 送信中のリクエスト数が上限に達すると、``add()`` の呼び出し元は空きができるまで待機します
+- コレクションの最適化が追いつかず未インデックスのポイントが溜まっている間は、送信を待機します
+- ``flush()`` は送信中のリクエストの完了を待ち、最後に ``wait=True`` の書き込みで反映を確認します。
+  反映後、登録したポイントを持つユーザーのローカルインデックス (``LocalSearchGateway``) を破棄します
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import CollectionStatus, PointStruct
+
+from app.adapters.search.instrumentation import estimate_point_size
+from app.adapters.search.local_search_gateway import invalidate_local_indexes
+from app.adapters.search.payload_schema import PAYLOAD_USER_ID
+from app.adapters.search.qdrant_manager import get_qdrant_client
+from app.adapters.search.qdrant_search_gateway import build_point_vector
+from app.adapters.search.sparse_encoder import SparseTextEncoder
+from app.core.search.gateways import IndexPoint, PointWriterGateway
+
+logger = logging.getLogger(__name__)
+
+# 最適化の追いつきを待つ間のポーリング間隔の上限（秒）
+MAX_BACKPRESSURE_DELAY = 5.0
+
+
+class QdrantPointWriter(PointWriterGateway):
+    """Qdrantへのポイント登録をバッチ化・並列化するPointWriterGatewayの実装クラス。
+
+    複数のスレッドから ``add()`` を呼び出すことができます。
+    ``flush()`` の反映確認は、送信済みの書き込みを順に適用するQdrantの更新キューを前提としています。
+    """
+
+    def __init__(
+        self,
+        client: Optional[QdrantClient] = None,
+        batch_size: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        encoder: Optional[SparseTextEncoder] = None,
+    ):
+        """初期化
+
+        Args:
+            client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+            batch_size: 1回のupsertで送信する最大ポイント数。省略時は ``QDRANT_UPSERT_BATCH_SIZE``
+            max_batch_bytes: 1回のupsertで送信する最大サイズ（バイト）。省略時は ``QDRANT_UPSERT_MAX_BATCH_BYTES``
+            max_in_flight: 同時に送信中にできるリクエスト数。省略時は ``QDRANT_UPSERT_MAX_IN_FLIGHT``
+            encoder: 疎ベクトルのエンコーダー（ハイブリッド構成のコレクションのみ使用）
+        """
+        self.client = client or get_qdrant_client()
+        self.batch_size = batch_size or getattr(settings, 'QDRANT_UPSERT_BATCH_SIZE', 256)
+        self.max_batch_bytes = max_batch_bytes or getattr(settings, 'QDRANT_UPSERT_MAX_BATCH_BYTES', 8 * 1024 * 1024)
+        self.max_in_flight = max_in_flight or getattr(settings, 'QDRANT_UPSERT_MAX_IN_FLIGHT', 4)
+        self.encoder = encoder or SparseTextEncoder()
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[PointStruct]] = {}
+        self._buffer_bytes: Dict[str, int] = {}
+        # flush時の反映確認に用いる、コレクションごとに最後に送信したポイント
+        self._last_sent: Dict[str, PointStruct] = {}
+        # flush時にローカルインデックスを破棄する、コレクションごとのポイントを登録したユーザー
+        self._written_users: Dict[str, Set[str]] = {}
+        self._status_checked_at: Dict[str, float] = {}
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._futures: Set[Future] = set()
+        self._written = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def add(self, collection_name: str, points: Iterable[IndexPoint]) -> None:
+        """ポイントを登録キューに追加します。バッチの上限に達したら送信します。
+
+        Args:
+            collection_name: 登録先のコレクション名
+            points: 登録するポイント
+
+        Raises:
+            TimeoutError: コレクションの最適化が待機時間内に追いつかない場合
+        """
+        for point in points:
+            payload = dict(point.payload)
+            if payload.get(PAYLOAD_USER_ID) is not None:
+                # user_id はキーワードインデックスで文字列として絞り込むため、文字列で保存する
+                payload[PAYLOAD_USER_ID] = str(payload[PAYLOAD_USER_ID])
+                with self._lock:
+                    self._written_users.setdefault(collection_name, set()).add(payload[PAYLOAD_USER_ID])
+            struct = PointStruct(
+                id=point.point_id,
+                vector=build_point_vector(collection_name, point.vector, point.text, self.encoder),
+                payload=payload,
+            )
+            batch = self._append(collection_name, struct)
+            if batch:
+                self._send(collection_name, batch)
+
+    def flush(self) -> int:
+        """キューに残っているポイントを送信し、すべての登録が反映されるまで待機します。
+
+        Returns:
+            int: 前回のflush以降に登録したポイント数
+
+        Raises:
+            TimeoutError: コレクションの最適化が待機時間内に追いつかない場合
+        """
+        with self._lock:
+            buffers = self._buffers
+            self._buffers, self._buffer_bytes = {}, {}
+        for collection_name, points in buffers.items():
+            self._send(collection_name, points)
+
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+        self._raise_pending_error()
+
+        with self._lock:
+            last_sent, self._last_sent = self._last_sent, {}
+            written, self._written = self._written, 0
+            written_users, self._written_users = self._written_users, {}
+        for collection_name, point in last_sent.items():
+            # 最後に送信したポイントを再送し、それ以前の書き込みも含めて反映されるまで待機する（upsertは冪等）
+            self.client.upsert(collection_name, points=[point], wait=True)
+        for collection_name, user_ids in written_users.items():
+            invalidate_local_indexes(collection_name, user_ids)
+        if written:
+            logger.debug(f"{written}件のポイントを登録しました: {', '.join(last_sent)}")
+        return written
+
+    def close(self) -> None:
+        """送信用のスレッドプールを終了します。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _append(self, collection_name: str, point: PointStruct) -> Optional[List[PointStruct]]:
+        """ポイントをバッファに追加し、上限に達した場合は送信するバッチを返します。"""
+        size = estimate_point_size(point)
+        with self._lock:
+            buffer = self._buffers.setdefault(collection_name, [])
+            buffered = self._buffer_bytes.get(collection_name, 0)
+            if buffer and buffered + size > self.max_batch_bytes:
+                self._buffers[collection_name], self._buffer_bytes[collection_name] = [point], size
+                return buffer
+            buffer.append(point)
+            self._buffer_bytes[collection_name] = buffered + size
+            if len(buffer) >= self.batch_size:
+                del self._buffers[collection_name]
+                del self._buffer_bytes[collection_name]
+                return buffer
+        return None
+
+    def _send(self, collection_name: str, points: List[PointStruct]) -> None:
+        """バッチを非同期に送信します。送信中のリクエスト数が上限の場合は空きを待ちます。"""
+        self._raise_pending_error()
+        self._wait_for_optimizer(collection_name)
+        self._slots.acquire()  # pylint: disable=consider-using-with
+        try:
+            future = self._get_executor().submit(self._upsert, collection_name, points)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.add(future)
+            self._last_sent[collection_name] = points[-1]
+        future.add_done_callback(self._on_done)
+
+    def _upsert(self, collection_name: str, points: List[PointStruct]) -> int:
+        self.client.upsert(collection_name, points=points, wait=False)
+        return len(points)
+
+    def _on_done(self, _future: Future) -> None:
+        self._slots.release()
+
+    def _raise_pending_error(self) -> None:
+        """完了したリクエストを集計し、送信に失敗したものがあれば最初のエラーを送出します。"""
+        with self._lock:
+            done = {future for future in self._futures if future.done()}
+            self._futures -= done
+            errors = [future.exception() for future in done if future.exception() is not None]
+            self._written += sum(future.result() for future in done if future.exception() is None)
+        if errors:
+            if len(errors) > 1:
+                logger.error(f"ポイントの登録に {len(errors)}回 失敗しました")
+            raise errors[0]
+
+    def _wait_for_optimizer(self, collection_name: str) -> None:
+        """最適化中のコレクションで未インデックスのポイントが上限を超えている間、送信を待機します。
+
+        Raises:
+            TimeoutError: 待機時間内に未インデックスのポイントが上限を下回らない場合
+        """
+        now = time.monotonic()
+        interval = getattr(settings, 'QDRANT_UPSERT_STATUS_INTERVAL', 5.0)
+        if now - self._status_checked_at.get(collection_name, float('-inf')) < interval:
+            return
+        self._status_checked_at[collection_name] = now
+
+        max_unindexed = getattr(settings, 'QDRANT_UPSERT_MAX_UNINDEXED', 100000)
+        deadline = now + getattr(settings, 'QDRANT_UPSERT_BACKPRESSURE_TIMEOUT', 300.0)
+        delay = 0.1
+        while True:
+            info = self.client.get_collection(collection_name)
+            unindexed = (info.points_count or 0) - (info.indexed_vectors_count or 0)
+            if info.status != CollectionStatus.YELLOW or unindexed <= max_unindexed:
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"コレクション {collection_name} の最適化が追いつきません (未インデックス: {unindexed}件)")
+            logger.info(f"コレクション {collection_name} の最適化を待機します (未インデックス: {unindexed}件)")
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_BACKPRESSURE_DELAY)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='qdrant-upsert')
+            return self._executor
@@ -5,12 +5,53 @@
 """
 
 import logging
-from typing import Optional, Set
+import os
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Set
 
 from django.conf import settings
 from qdrant_client import QdrantClient
 from qdrant_client.http.exceptions import UnexpectedResponse
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionInfo,
+    CollectionParamsDiff,
+    Datatype,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    Modifier,
+    OptimizersConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SparseIndexParams,
+    SparseVectorParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from app.adapters.search.collection_aliases import (
+    get_collection_aliases,
+    list_collection_versions,
+    point_alias,
+    versioned_collection_name,
+)
+from app.adapters.search.collection_config import (
+    DATATYPE_FLOAT32,
+    DENSE_VECTOR_NAME,
+    QUANTIZATION_BINARY,
+    QUANTIZATION_NONE,
+    QUANTIZATION_SCALAR,
+    SPARSE_VECTOR_NAME,
+    CollectionConfig,
+    cold_collection_name,
+    get_cold_tier_collections,
+    get_collection_config,
+)
+from app.adapters.search.instrumentation import instrument_client
+from app.adapters.search.payload_schema import get_index_data_type, get_payload_indexes
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +60,19 @@ class QdrantClientManager:
     """Qdrantクライアントマネージャクラス。
 
     シングルトンパターンでQdrantクライアントインスタンスを管理します。
+    gRPCチャネルはfork後の子プロセスで安全に利用できないため、インスタンスを生成した
+    プロセスのPIDを記録し、別プロセスから利用された場合はクライアントを作り直します。
     """
 
     # クラス変数として単一のインスタンスを保持
     _instance: Optional[QdrantClient] = None
+    # インスタンスを生成したプロセスのPID
+    _pid: Optional[int] = None
+    # fork検知によりクライアントを作り直した回数
+    _rebuild_count: int = 0
+    # ヘッジリクエスト用のレプリカ接続クライアントと、それを生成したプロセスのPID
+    _replica_instance: Optional[QdrantClient] = None
+    _replica_pid: Optional[int] = None
 
     @classmethod
     def get_client(cls) -> QdrantClient:
@@ -30,6 +80,7 @@ class QdrantClientManager:
 
         環境変数またはDjango設定から接続情報を読み込み、Qdrantに接続するためのクライアントを返します。
         クライアントインスタンスはキャッシュされ、複数回の呼び出しでも同じインスタンスを返します。
+        親プロセスから引き継いだインスタンスは破棄し、現在のプロセスで接続し直します。
 
         Returns:
             QdrantClient: 設定済みのQdrantクライアントインスタンス
@@ -37,16 +88,20 @@ class QdrantClientManager:
         Raises:
             ConnectionError: Qdrantサーバーに接続できない場合
         """
+        if cls._instance is not None and cls._pid is not None and cls._pid != os.getpid():
+            cls._discard_inherited_client()
+
         if cls._instance is None:
             try:
                 # 将来的にAPIキーやHTTPS対応が必要な場合はここで設定
-                cls._instance = QdrantClient(
+                cls._instance = instrument_client(QdrantClient(
                     host=settings.QDRANT_HOST,
                     # port=settings.QDRANT_PORT,  # この行をコメントアウトまたは削除
                     grpc_port=settings.QDRANT_PORT,  # settings.QDRANT_PORT (6334) を grpc_port に指定
                     prefer_grpc=True,              # gRPC接続を優先するフラグを立てる
                     timeout=settings.QDRANT_TIMEOUT
-                )
+                ), node='primary')
+                cls._pid = os.getpid()
 
                 # 接続テスト
                 cls._instance.get_collections()
@@ -57,6 +112,71 @@ class QdrantClientManager:
 
         return cls._instance
 
+    @classmethod
+    def get_replica_client(cls) -> Optional[QdrantClient]:
+        """レプリカノードに接続するQdrantクライアントを取得します。
+
+        ``QDRANT_REPLICA_HOST`` が未設定の場合はNoneを返します。
+        レプリカへの接続失敗はサーキットブレーカーで扱うため、生成時の接続テストは行いません。
+
+        Returns:
+            Optional[QdrantClient]: レプリカ接続クライアント
+        """
+        host = getattr(settings, 'QDRANT_REPLICA_HOST', None)
+        if not host:
+            return None
+        if cls._replica_instance is not None and cls._replica_pid != os.getpid():
+            cls._replica_instance = None
+
+        if cls._replica_instance is None:
+            cls._replica_instance = instrument_client(QdrantClient(
+                host=host,
+                grpc_port=getattr(settings, 'QDRANT_REPLICA_PORT', settings.QDRANT_PORT),
+                prefer_grpc=True,
+                timeout=settings.QDRANT_TIMEOUT
+            ), node='replica')
+            cls._replica_pid = os.getpid()
+            logger.debug(f"Qdrantレプリカ接続クライアントを生成しました: {host}")
+        return cls._replica_instance
+
+    @classmethod
+    def _discard_inherited_client(cls) -> None:
+        """親プロセスから引き継いだクライアントを破棄します。
+
+        引き継いだgRPCチャネルを子プロセスでクローズすると親プロセス側の接続にも
+        影響し得るため、close()は呼ばずに参照のみを破棄します。
+        """
+        cls._replica_instance = None
+        cls._replica_pid = None
+        if cls._instance is None:
+            return
+        logger.debug(f"fork後のプロセス (pid={os.getpid()}) で Qdrant クライアントを再初期化します (生成元pid={cls._pid})")
+        cls._instance = None
+        cls._pid = None
+        cls._rebuild_count += 1
+
+    @classmethod
+    def after_fork_in_child(cls) -> None:
+        """fork直後の子プロセスで呼び出され、引き継いだクライアントを破棄します。
+
+        ``os.register_at_fork`` に登録され、gunicornの ``--preload`` や
+        Celeryのpreforkワーカーで子プロセスが生成された際に実行されます。
+        """
+        cls._discard_inherited_client()
+
+    @classmethod
+    def get_rebuild_count(cls) -> int:
+        """fork検知によりクライアントを作り直した回数を返します。
+
+        Returns:
+            int: 現在のプロセスでクライアントを再初期化した回数
+        """
+        return cls._rebuild_count
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=QdrantClientManager.after_fork_in_child)
+
 
 def get_qdrant_client() -> QdrantClient:
     """Qdrant クライアントのインスタンスを取得します。
@@ -79,11 +199,328 @@ def _get_existing_collections() -> Set[str]:
     return {c.name for c in client.get_collections().collections}
 
 
+def _build_vectors_config(config: CollectionConfig):
+    """コレクション作成時のベクトル設定を生成します。
+
+    ハイブリッド構成のコレクションでは、密ベクトルを ``dense`` という名前付きベクトルとして定義します。
+
+    Args:
+        config: コレクションの構成設定
+
+    Returns:
+        VectorParams | Dict[str, VectorParams]: ベクトル設定
+    """
+    params = VectorParams(
+        size=config.stored_vector_size,
+        distance=Distance.COSINE,
+        on_disk=config.vectors_on_disk,
+        datatype=_build_datatype(config),
+    )
+    if config.hybrid:
+        return {DENSE_VECTOR_NAME: params}
+    return params
+
+
+def _build_datatype(config: CollectionConfig) -> Optional[Datatype]:
+    """密ベクトルのデータ型を返します。float32の場合はサーバー既定値を用いるためNoneを返します。"""
+    return None if config.datatype == DATATYPE_FLOAT32 else Datatype(config.datatype)
+
+
+def _build_sparse_vectors_config(config: CollectionConfig) -> Optional[Dict[str, SparseVectorParams]]:
+    """コレクション作成時の疎ベクトル設定を生成します。
+
+    疎ベクトルの値はBM25の語頻度成分とし、IDFはQdrantサーバー側で算出させます。
+
+    Args:
+        config: コレクションの構成設定
+
+    Returns:
+        Optional[Dict[str, SparseVectorParams]]: 疎ベクトル設定。ハイブリッド構成でない場合はNone
+    """
+    if not config.hybrid:
+        return None
+    return {
+        SPARSE_VECTOR_NAME: SparseVectorParams(
+            index=SparseIndexParams(on_disk=config.vectors_on_disk),
+            modifier=Modifier.IDF,
+        )
+    }
+
+
+def _build_hnsw_config(config: CollectionConfig) -> HnswConfigDiff:
+    """HNSWインデックス設定を生成します。
+
+    Args:
+        config: コレクションの構成設定
+
+    Returns:
+        HnswConfigDiff: HNSWインデックス設定
+    """
+    return HnswConfigDiff(
+        m=config.hnsw_m,
+        ef_construct=config.hnsw_ef_construct,
+        full_scan_threshold=config.hnsw_full_scan_threshold,
+    )
+
+
+def _build_optimizers_config(config: CollectionConfig) -> OptimizersConfigDiff:
+    """オプティマイザ設定を生成します。
+
+    Args:
+        config: コレクションの構成設定
+
+    Returns:
+        OptimizersConfigDiff: オプティマイザ設定
+    """
+    return OptimizersConfigDiff(
+        indexing_threshold=config.indexing_threshold,
+        memmap_threshold=config.memmap_threshold,
+    )
+
+
+def _build_quantization_config(config: CollectionConfig):
+    """量子化設定を生成します。
+
+    Args:
+        config: コレクションの構成設定
+
+    Returns:
+        ScalarQuantization | BinaryQuantization | None: 量子化設定。量子化しない場合はNone
+    """
+    if config.quantization == QUANTIZATION_SCALAR:
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=config.quantization_always_ram,
+            )
+        )
+    if config.quantization == QUANTIZATION_BINARY:
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=config.quantization_always_ram)
+        )
+    return None
+
+
+def _current_quantization(quantization_config) -> tuple:
+    """既存コレクションの量子化設定を (モード, always_ram) の組に変換します。
+
+    Args:
+        quantization_config: コレクション情報に含まれる量子化設定
+
+    Returns:
+        tuple: 量子化モードとalways_ramの組
+    """
+    if isinstance(quantization_config, ScalarQuantization):
+        return QUANTIZATION_SCALAR, bool(quantization_config.scalar.always_ram)
+    if isinstance(quantization_config, BinaryQuantization):
+        return QUANTIZATION_BINARY, bool(quantization_config.binary.always_ram)
+    return QUANTIZATION_NONE, None
+
+
+def _create_collection(client: QdrantClient, config: CollectionConfig) -> None:
+    """構成設定に従ってコレクションを作成します。
+
+    Args:
+        client: Qdrantクライアント
+        config: コレクションの構成設定
+    """
+    client.create_collection(
+        collection_name=config.name,
+        vectors_config=_build_vectors_config(config),
+        sparse_vectors_config=_build_sparse_vectors_config(config),
+        hnsw_config=_build_hnsw_config(config),
+        optimizers_config=_build_optimizers_config(config),
+        on_disk_payload=config.on_disk_payload,
+        quantization_config=_build_quantization_config(config),
+    )
+
+
+def _diff_collection_config(info: CollectionInfo, config: CollectionConfig) -> Dict[str, Any]:
+    """既存コレクションの設定と構成設定の差分から、update_collectionの引数を生成します。
+
+    ベクトルの次元数など作成後に変更できない項目は差分に含めず、警告ログのみを出力します。
+
+    Args:
+        info: 既存コレクションの情報
+        config: 適用したい構成設定
+
+    Returns:
+        Dict[str, Any]: update_collectionに渡すキーワード引数。差分が無ければ空の辞書
+    """
+    current = info.config
+    changes: Dict[str, Any] = {}
+
+    hnsw = current.hnsw_config
+    if (hnsw.m, hnsw.ef_construct, hnsw.full_scan_threshold) != (
+            config.hnsw_m, config.hnsw_ef_construct, config.hnsw_full_scan_threshold):
+        changes['hnsw_config'] = _build_hnsw_config(config)
+
+    optimizer = current.optimizer_config
+    if optimizer.indexing_threshold != config.indexing_threshold or (
+            config.memmap_threshold is not None and optimizer.memmap_threshold != config.memmap_threshold):
+        changes['optimizers_config'] = _build_optimizers_config(config)
+
+    if bool(current.params.on_disk_payload) != config.on_disk_payload:
+        changes['collection_params'] = CollectionParamsDiff(on_disk_payload=config.on_disk_payload)
+
+    desired_quantization = (
+        config.quantization,
+        config.quantization_always_ram if config.quantization != QUANTIZATION_NONE else None,
+    )
+    if _current_quantization(current.quantization_config) != desired_quantization:
+        changes['quantization_config'] = _build_quantization_config(config) or Disabled.DISABLED
+
+    vectors_changes = _diff_vectors_config(info, config)
+    if vectors_changes:
+        changes['vectors_config'] = vectors_changes
+
+    return changes
+
+
+def _diff_vectors_config(info: CollectionInfo, config: CollectionConfig) -> Optional[Dict[str, VectorParamsDiff]]:
+    """既存コレクションの密ベクトル設定と構成設定の差分を生成します。
+
+    名前なしベクトルと名前付きベクトル（ハイブリッド構成）の切り替えや疎ベクトルの追加は
+    既存コレクションではできないため、警告ログのみを出力します。
+
+    Args:
+        info: 既存コレクションの情報
+        config: 適用したい構成設定
+
+    Returns:
+        Optional[Dict[str, VectorParamsDiff]]: update_collectionのvectors_config。差分が無ければNone
+    """
+    vectors = info.config.params.vectors
+    if config.hybrid:
+        vector_name = DENSE_VECTOR_NAME
+        current = vectors.get(DENSE_VECTOR_NAME) if isinstance(vectors, dict) else None
+        if SPARSE_VECTOR_NAME not in (info.config.params.sparse_vectors or {}):
+            current = None
+    else:
+        vector_name = ''
+        current = vectors if isinstance(vectors, VectorParams) else None
+
+    if current is None:
+        logger.warning(
+            f"コレクション {config.name} のベクトル構成がハイブリッド設定 (hybrid={config.hybrid}) と一致しません。"
+            "ベクトル構成は既存コレクションでは変更できないため、`manage.py qdrant_reindex` で再インデックスしてください。")
+        return None
+
+    if current.size != config.stored_vector_size:
+        logger.warning(
+            f"コレクション {config.name} のベクトル次元数 ({current.size}) が設定値 ({config.stored_vector_size}) と一致しません。"
+            "次元数は既存コレクションでは変更できないため、`manage.py qdrant_reindex` で再インデックスしてください。")
+    current_datatype = current.datatype.value if current.datatype is not None else DATATYPE_FLOAT32
+    if current_datatype != config.datatype:
+        logger.warning(
+            f"コレクション {config.name} のベクトルのデータ型 ({current_datatype}) が設定値 ({config.datatype}) と一致しません。"
+            "データ型は既存コレクションでは変更できないため、`manage.py qdrant_reindex` で再インデックスしてください。")
+    if bool(current.on_disk) != config.vectors_on_disk:
+        return {vector_name: VectorParamsDiff(on_disk=config.vectors_on_disk)}
+    return None
+
+
+def _reconcile_collection(client: QdrantClient, config: CollectionConfig, info: CollectionInfo) -> None:
+    """既存コレクションの設定を構成設定に合わせて更新します。
+
+    Args:
+        client: Qdrantクライアント
+        config: 適用したい構成設定
+        info: 既存コレクションの情報
+    """
+    changes = _diff_collection_config(info, config)
+    if not changes:
+        logger.debug(f"コレクション {config.name} の設定は最新です。")
+        return
+
+    logger.info(f"コレクション {config.name} の設定を更新: {sorted(changes)}")
+    client.update_collection(collection_name=config.name, **changes)
+
+
+def _ensure_payload_indexes(client: QdrantClient, collection_name: str, payload_schema: Dict[str, Any]) -> List[str]:
+    """不足しているペイロードインデックスをコレクションに追加します。
+
+    既存のインデックスの型が定義と異なる場合は、インデックスの再作成が必要なため警告ログのみを出力します。
+
+    Args:
+        client: Qdrantクライアント
+        collection_name: コレクション名
+        payload_schema: 既存コレクションのペイロードインデックス情報
+
+    Returns:
+        List[str]: 新たにインデックスを作成したフィールド名のリスト
+    """
+    created = []
+    for field_name, params in get_payload_indexes().items():
+        existing = payload_schema.get(field_name)
+        if existing is None:
+            logger.info(f"コレクション {collection_name} にペイロードインデックスを作成: {field_name} ({params.type.value})")
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=params,
+                wait=True,
+            )
+            created.append(field_name)
+        elif existing.data_type != get_index_data_type(params):
+            logger.warning(
+                f"コレクション {collection_name} のペイロードインデックス {field_name} の型 ({existing.data_type}) が"
+                f"定義 ({params.type.value}) と一致しません。インデックスを再作成してください。")
+    return created
+
+
+def ensure_collection(client: QdrantClient, config: CollectionConfig, existing_collections: Set[str]) -> None:
+    """1つのコレクションについて、作成または設定の反映とペイロードインデックスの追加を行います。
+
+    Args:
+        client: Qdrantクライアント
+        config: コレクションの構成設定
+        existing_collections: 既存のコレクション名のセット
+    """
+    collection_name = config.name
+    if collection_name not in existing_collections:
+        logger.info(f"Qdrantコレクションを作成: {collection_name}")
+        try:
+            _create_collection(client, config)
+            logger.info(f"コレクション作成成功: {collection_name}")
+        except UnexpectedResponse as e:
+            # APIエラーの詳細をログに記録
+            logger.error(f"Qdrant API エラー - コレクション {collection_name} の作成に失敗: {e}", exc_info=True)
+            raise
+        except Exception as e:
+            logger.error(f"コレクション {collection_name} の作成に失敗: {e}", exc_info=True)
+            # アプリケーション起動時に致命的なエラーとして扱う場合は例外を再送出
+            raise
+        payload_schema = {}
+    else:
+        logger.debug(f"コレクション {collection_name} は既に存在します。")
+        try:
+            info = client.get_collection(collection_name)
+            _reconcile_collection(client, config, info)
+        except Exception as e:
+            logger.error(f"コレクション {collection_name} の設定更新に失敗: {e}", exc_info=True)
+            raise
+        payload_schema = info.payload_schema or {}
+
+    try:
+        _ensure_payload_indexes(client, collection_name, payload_schema)
+    except Exception as e:
+        logger.error(f"コレクション {collection_name} のペイロードインデックス作成に失敗: {e}", exc_info=True)
+        raise
+
+
 def ensure_collections_exist() -> None:
     """必要なQdrantコレクションが存在することを確認し、なければ作成します。
 
     Django設定ファイルで指定されたコレクション名で、ベクトルコレクションを初期化します。
-    このメソッドは冪等であり、既存のコレクションは変更しません。
+    新規のコレクションはバージョン付きの物理コレクション（例: ``documents_v1``）として作成し、
+    設定ファイルのコレクション名をそのエイリアスとします。
+    コールド層が有効な場合は、対象コレクションのコールド層のコレクションも同様に初期化します。
+    HNSW・オプティマイザ・ディスク保存・量子化・ハイブリッド構成の設定は ``get_collection_config()`` の値を作成時に適用し、
+    既存のコレクションについては設定値との差分を ``update_collection`` で反映します。
+    また、``get_payload_indexes()`` で定義したペイロードインデックスのうち不足しているものを作成します。
+    このメソッドは冪等です。
 
     Raises:
         ValueError: 設定が不完全または無効な場合
@@ -101,39 +538,48 @@ def ensure_collections_exist() -> None:
 
     client = get_qdrant_client()
 
-    # ベクトルの次元数 - 設定ファイルから取得
-    vector_size = settings.QDRANT_VECTOR_SIZE
-
     # 確認・作成するコレクション名のリスト
     collections_to_ensure = [
         settings.QDRANT_COLLECTION_DOCUMENTS,
         settings.QDRANT_COLLECTION_QA,
     ]
+    # コールド層のコレクション（ディスク保存・量子化の構成は get_collection_config() が決定する）
+    collections_to_ensure += [cold_collection_name(name) for name in get_cold_tier_collections()]
 
-    # 既存のコレクション名を取得
+    # 既存のコレクション名とエイリアスを取得
     existing_collections = _get_existing_collections()
-    logger.debug(f"既存のQdrantコレクション: {existing_collections}")
+    aliases = get_collection_aliases(client)
+    logger.debug(f"既存のQdrantコレクション: {existing_collections}, エイリアス: {aliases}")
 
     # 各コレクションの存在確認と作成
     for collection_name in collections_to_ensure:
-        if collection_name not in existing_collections:
-            logger.info(f"Qdrantコレクションを作成: {collection_name}")
-            try:
-                client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=vector_size, distance=Distance.COSINE),
-                    # 必要に応じてインデックス設定などを追加
-                    # hnsw_config=models.HnswConfigDiff(m=16, ef_construct=100)
-                )
-                logger.info(f"コレクション作成成功: {collection_name}")
-            except UnexpectedResponse as e:
-                # APIエラーの詳細をログに記録
-                logger.error(f"Qdrant API エラー - コレクション {collection_name} の作成に失敗: {e}", exc_info=True)
-                raise
-            except Exception as e:
-                logger.error(f"コレクション {collection_name} の作成に失敗: {e}", exc_info=True)
-                # アプリケーション起動時に致命的なエラーとして扱う場合は例外を再送出
-                raise
-        else:
-            logger.debug(f"コレクション {collection_name} は既に存在します。")
+        physical_name = _resolve_physical_collection(collection_name, existing_collections, aliases)
+        config = replace(get_collection_config(collection_name), name=physical_name)
+        ensure_collection(client, config, existing_collections)
+        if physical_name != collection_name and collection_name not in aliases:
+            point_alias(client, collection_name, physical_name)
+
+
+def _resolve_physical_collection(logical_name: str, existing_collections: Set[str], aliases: Dict[str, str]) -> str:
+    """論理名に対応する物理コレクション名を決定します。
+
+    エイリアスがあればその参照先を、エイリアス導入前に論理名で作成されたコレクションがあればそのコレクションを、
+    どちらも無ければバージョン付きの物理コレクション名（既存の最新バージョン、無ければ ``_v1``）を返します。
+
+    Args:
+        logical_name: コレクションの論理名
+        existing_collections: 既存のコレクション名のセット
+        aliases: エイリアス名から物理コレクション名への辞書
+
+    Returns:
+        str: 物理コレクション名
+    """
+    if logical_name in aliases:
+        return aliases[logical_name]
+    if logical_name in existing_collections:
+        logger.warning(
+            f"コレクション {logical_name} はエイリアスを使用していません。"
+            f"`manage.py qdrant_reindex {logical_name}` でバージョン付きコレクションに移行できます。")
+        return logical_name
+    versions = list_collection_versions(existing_collections, logical_name)
+    return versioned_collection_name(logical_name, versions[-1] if versions else 1)
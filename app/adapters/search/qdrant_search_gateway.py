@@ -0,0 +1,373 @@
+"""Qdrantを用いたSearchGatewayの実装モジュール。
+
+コレクションの構成設定（量子化など）に応じた検索パラメータを組み立て、
+Qdrantに対してベクトル検索を行います。
+ハイブリッド構成のコレクションでは、密ベクトルと疎ベクトルの検索をサーバー側のRRFで融合し、
+1回のリクエストでハイブリッド検索を行います。
+"""
+
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    Fusion,
+    FusionQuery,
+    MatchAny,
+    MatchValue,
+    Prefetch,
+    QuantizationSearchParams,
+    QueryRequest,
+    SearchParams,
+)
+
+from app.adapters.search.collection_config import (
+    DENSE_VECTOR_NAME,
+    QUANTIZATION_NONE,
+    SPARSE_VECTOR_NAME,
+    get_collection_config,
+)
+from app.adapters.search.deadline import call_timeout
+from app.adapters.search.payload_schema import (
+    PAYLOAD_DOCUMENT_ID,
+    PAYLOAD_TAGS,
+    PAYLOAD_USER_ID,
+)
+from app.adapters.search.qdrant_manager import get_qdrant_client
+from app.adapters.search.sparse_encoder import SparseTextEncoder
+from app.core.search.gateways import (
+    BatchSearchResult,
+    SearchFilter,
+    SearchGateway,
+    SearchGroup,
+    SearchHit,
+    SearchRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_filter(search_filter: Optional[SearchFilter]) -> Optional[Filter]:
+    """SearchFilterをQdrantのフィルタ条件に変換します。
+
+    Args:
+        search_filter: 検索対象の絞り込み条件
+
+    Returns:
+        Optional[Filter]: Qdrantのフィルタ条件。条件が無い場合はNone
+    """
+    if search_filter is None:
+        return None
+
+    must = []
+    if search_filter.user_id is not None:
+        must.append(FieldCondition(key=PAYLOAD_USER_ID, match=MatchValue(value=str(search_filter.user_id))))
+    if search_filter.document_ids:
+        must.append(FieldCondition(key=PAYLOAD_DOCUMENT_ID, match=MatchAny(any=list(search_filter.document_ids))))
+    if search_filter.tags:
+        must.append(FieldCondition(key=PAYLOAD_TAGS, match=MatchAny(any=list(search_filter.tags))))
+    return Filter(must=must) if must else None
+
+
+def build_search_params(collection_name: str) -> Optional[SearchParams]:
+    """コレクションの構成設定に応じた検索パラメータを生成します。
+
+    量子化が有効なコレクションでは、量子化ベクトルで ``QDRANT_QUANTIZATION_OVERSAMPLING`` 倍の候補を取得し、
+    ``QDRANT_QUANTIZATION_RESCORE`` が有効であれば元のベクトルで再スコアリングします。
+
+    Args:
+        collection_name: 検索対象のコレクション名
+
+    Returns:
+        Optional[SearchParams]: 検索パラメータ。既定値のままでよい場合はNone
+    """
+    config = get_collection_config(collection_name)
+    hnsw_ef = getattr(settings, 'QDRANT_HNSW_EF_SEARCH', None)
+
+    quantization = None
+    if config.quantization != QUANTIZATION_NONE:
+        quantization = QuantizationSearchParams(
+            ignore=False,
+            rescore=getattr(settings, 'QDRANT_QUANTIZATION_RESCORE', True),
+            oversampling=getattr(settings, 'QDRANT_QUANTIZATION_OVERSAMPLING', None),
+        )
+
+    if hnsw_ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+
+def build_point_vector(
+    collection_name: str,
+    dense_vector: Sequence[float],
+    text: Optional[str] = None,
+    encoder: Optional[SparseTextEncoder] = None,
+) -> Any:
+    """コレクションの構成に合わせて、登録するポイントのベクトルを生成します。
+
+    Args:
+        collection_name: 登録先のコレクション名
+        dense_vector: 密ベクトル
+        text: 疎ベクトルの生成に用いるテキスト（ハイブリッド構成のコレクションのみ使用）
+        encoder: 疎ベクトルのエンコーダー。省略時は既定設定のエンコーダー
+
+    Returns:
+        List[float] | Dict[str, Any]: PointStructのvectorに指定する値
+    """
+    config = get_collection_config(collection_name)
+    dense = config.prepare_vector(dense_vector)
+    if not config.hybrid:
+        return dense
+    vector: Dict[str, Any] = {DENSE_VECTOR_NAME: dense}
+    if text:
+        vector[SPARSE_VECTOR_NAME] = (encoder or SparseTextEncoder()).encode_document(text)
+    return vector
+
+
+def _query_timeout() -> Optional[int]:
+    """Qdrantの呼び出しに指定するタイムアウト（秒、切り上げ）を返します。"""
+    timeout = call_timeout()
+    return math.ceil(timeout) if timeout is not None else None
+
+
+class QdrantSearchGateway(SearchGateway):
+    """Qdrantを用いたSearchGatewayの実装クラス。
+
+    クライアントを指定しない場合は ``get_qdrant_client()`` のシングルトンを使用します。
+    """
+
+    def __init__(self, client: Optional[QdrantClient] = None, encoder: Optional[SparseTextEncoder] = None):
+        """初期化
+
+        Args:
+            client: 使用するQdrantクライアント（テスト用に注入可能）
+            encoder: ハイブリッド検索でクエリの疎ベクトルを生成するエンコーダー
+        """
+        self._client = client
+        self._encoder = encoder or SparseTextEncoder()
+
+    @property
+    def client(self) -> QdrantClient:
+        """使用するQdrantクライアントを返します。
+
+        Returns:
+            QdrantClient: Qdrantクライアント
+        """
+        return self._client if self._client is not None else get_qdrant_client()
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """クエリベクトルに類似するポイントをQdrantで検索する。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            スコアの降順に並んだ検索結果
+
+        Raises:
+            SearchTimeoutError: リクエストの時間予算を使い切っている場合
+        """
+        return self._query(collection_name, self._dense_request(collection_name, query_vector, search_filter, limit))
+
+    def hybrid_search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        query_text: str,
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """密ベクトルと疎ベクトルの検索結果をRRFで融合して返す。
+
+        密ベクトル・疎ベクトルそれぞれの候補取得 (prefetch) と融合を1回のクエリでQdrantに実行させます。
+        ハイブリッド構成でないコレクションでは、密ベクトルのみの検索にフォールバックします。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            query_text: 疎ベクトル検索に用いるクエリテキスト
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            RRFスコアの降順に並んだ検索結果
+        """
+        request = self._hybrid_request(collection_name, query_vector, query_text, search_filter, limit)
+        return self._query(collection_name, request)
+
+    def search_batch(self, requests: Sequence[SearchRequest]) -> BatchSearchResult:
+        """複数のクエリをコレクションごとにQdrantのバッチクエリで送信し、コレクション間は並列に実行する。
+
+        Args:
+            requests: 検索するクエリ
+
+        Returns:
+            クエリごとの検索結果とコレクションごとの所要時間
+
+        Raises:
+            SearchTimeoutError: リクエストの時間予算を使い切っている場合
+        """
+        by_collection: Dict[str, List[int]] = {}
+        for i, request in enumerate(requests):
+            by_collection.setdefault(request.collection_name, []).append(i)
+
+        def run(collection_name: str) -> Tuple[List[List[SearchHit]], float]:
+            started = time.monotonic()
+            query_requests = [self._to_query_request(requests[i]) for i in by_collection[collection_name]]
+            responses = self.client.query_batch_points(collection_name, query_requests, timeout=_query_timeout())
+            return [_to_hits(response.points) for response in responses], time.monotonic() - started
+
+        if len(by_collection) <= 1:
+            outcomes = {name: run(name) for name in by_collection}
+        else:
+            with ThreadPoolExecutor(max_workers=len(by_collection), thread_name_prefix='qdrant-batch') as executor:
+                # 呼び出し元のデッドラインをワーカースレッドに引き継ぐ
+                futures = {name: executor.submit(copy_context().run, run, name) for name in by_collection}
+                outcomes = {name: future.result() for name, future in futures.items()}
+
+        results: List[List[SearchHit]] = [[] for _ in requests]
+        for collection_name, (hits_list, _) in outcomes.items():
+            for i, hits in zip(by_collection[collection_name], hits_list):
+                results[i] = hits
+        return BatchSearchResult(results=results, timings={name: elapsed for name, (_, elapsed) in outcomes.items()})
+
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        group_limit: int = 5,
+        group_size: int = 3,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> List[SearchGroup]:
+        """Qdrantのグループ化検索で、文書IDごとに上位のポイントを取得する。
+
+        グループ化はQdrant側で行われるため、上位を1文書が占める場合でも多めに取得して絞り込む必要はありません。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            group_limit: 取得する最大文書数
+            group_size: 1文書あたりの最大件数
+            payload_fields: 結果に含めるペイロードのキー。Noneの場合はすべて
+
+        Returns:
+            最高スコアの降順に並んだ文書ごとの検索結果
+
+        Raises:
+            SearchTimeoutError: リクエストの時間予算を使い切っている場合
+        """
+        config = get_collection_config(collection_name)
+        response = self.client.query_points_groups(
+            collection_name=collection_name,
+            group_by=PAYLOAD_DOCUMENT_ID,
+            query=config.prepare_vector(query_vector),
+            using=DENSE_VECTOR_NAME if config.hybrid else None,
+            query_filter=build_filter(search_filter),
+            search_params=build_search_params(collection_name),
+            limit=group_limit,
+            group_size=group_size,
+            with_payload=list(payload_fields) if payload_fields is not None else True,
+            timeout=_query_timeout(),
+        )
+        return [SearchGroup(group_id=group.id, hits=_to_hits(group.hits)) for group in response.groups]
+
+    def _to_query_request(self, request: SearchRequest) -> QueryRequest:
+        if request.query_text is not None:
+            return self._hybrid_request(request.collection_name, request.query_vector, request.query_text,
+                                        request.search_filter, request.limit)
+        return self._dense_request(request.collection_name, request.query_vector, request.search_filter, request.limit)
+
+    @staticmethod
+    def _dense_request(
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter],
+        limit: int,
+    ) -> QueryRequest:
+        """密ベクトル検索のクエリを組み立てます。"""
+        config = get_collection_config(collection_name)
+        return QueryRequest(
+            query=config.prepare_vector(query_vector),
+            using=DENSE_VECTOR_NAME if config.hybrid else None,
+            filter=build_filter(search_filter),
+            params=build_search_params(collection_name),
+            limit=limit,
+            with_payload=True,
+        )
+
+    def _hybrid_request(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        query_text: str,
+        search_filter: Optional[SearchFilter],
+        limit: int,
+    ) -> QueryRequest:
+        """密ベクトル・疎ベクトルの候補をRRFで融合するクエリを組み立てます。
+
+        ハイブリッド構成でないコレクションでは、密ベクトル検索のクエリを返します。
+        """
+        config = get_collection_config(collection_name)
+        if not config.hybrid:
+            logger.warning(f"コレクション {collection_name} はハイブリッド構成ではないため、密ベクトルのみで検索します")
+            return self._dense_request(collection_name, query_vector, search_filter, limit)
+
+        query_filter = build_filter(search_filter)
+        prefetch_limit = max(limit, getattr(settings, 'QDRANT_HYBRID_PREFETCH_LIMIT', 50))
+        prefetch = [
+            Prefetch(
+                query=config.prepare_vector(query_vector),
+                using=DENSE_VECTOR_NAME,
+                filter=query_filter,
+                params=build_search_params(collection_name),
+                limit=prefetch_limit,
+            ),
+        ]
+        sparse_vector = self._encoder.encode_query(query_text)
+        if sparse_vector.indices:
+            prefetch.append(Prefetch(
+                query=sparse_vector,
+                using=SPARSE_VECTOR_NAME,
+                filter=query_filter,
+                limit=prefetch_limit,
+            ))
+        return QueryRequest(prefetch=prefetch, query=FusionQuery(fusion=Fusion.RRF), limit=limit, with_payload=True)
+
+    def _query(self, collection_name: str, request: QueryRequest) -> List[SearchHit]:
+        response = self.client.query_points(
+            collection_name=collection_name,
+            query=request.query,
+            using=request.using,
+            prefetch=request.prefetch,
+            query_filter=request.filter,
+            search_params=request.params,
+            limit=request.limit,
+            with_payload=request.with_payload,
+            timeout=_query_timeout(),
+        )
+        return _to_hits(response.points)
+
+
+def _to_hits(points) -> List[SearchHit]:
+    return [
+        SearchHit(point_id=point.id, score=point.score, payload=point.payload or {})
+        for point in points
+    ]
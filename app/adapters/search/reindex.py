@@ -0,0 +1,363 @@
+"""Qdrantコレクションを新しいバージョンの物理コレクションへ再インデックスするモジュール。
+
+現在の設定（ベクトル次元数・HNSW・量子化・ハイブリッド構成など）で新しい物理コレクションを作成し、
+既存のコレクションまたはスナップショットからポイントを並列に登録した後、論理名のエイリアスをアトミックに切り替えます。
+切り替えまでの間、検索は既存の物理コレクションで継続されます。
+
+埋め込みモデルを変更する場合など、既存のベクトルをそのまま使えない場合は ``embedder`` で
+ペイロードから新しいベクトルを生成します。
+疎ベクトルを持たないコレクションをハイブリッド構成に移行する場合は、``text_field`` に指定した
+ペイロードのテキストから疎ベクトルを生成します。
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Filter, PointStruct
+
+from app.adapters.search.bulk_transfer import (
+    build_partitions,
+    build_point,
+    iter_shard_points,
+    read_manifest,
+    scroll_partition,
+    split_vector,
+)
+from app.adapters.search.collection_aliases import (
+    get_collection_aliases,
+    next_collection_version,
+    point_alias,
+    resolve_collection,
+    versioned_collection_name,
+)
+from app.adapters.search.collection_config import (
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+    CollectionConfig,
+    get_collection_config,
+)
+from app.adapters.search.payload_schema import PAYLOAD_USER_ID
+from app.adapters.search.qdrant_manager import ensure_collection, get_qdrant_client
+from app.adapters.search.sparse_encoder import SparseTextEncoder
+
+logger = logging.getLogger(__name__)
+
+# ペイロードのリストから新しい密ベクトルのリストを生成する関数
+Embedder = Callable[[List[dict]], List[List[float]]]
+
+
+@dataclass(frozen=True)
+class ReindexResult:
+    """再インデックスの結果。
+
+    Attributes:
+        collection_name: コレクションの論理名
+        source: 移行元の物理コレクション名。コレクションが存在しなかった場合はNone
+        target: 移行先の物理コレクション名
+        points_copied: コピーしたポイント数
+        source_dropped: 移行元のコレクションを削除したかどうか
+        elapsed_seconds: 所要時間（秒）
+    """
+    collection_name: str
+    source: Optional[str]
+    target: str
+    points_copied: int
+    source_dropped: bool
+    elapsed_seconds: float
+
+
+def _check_vector_size(client: QdrantClient, source: str, config: CollectionConfig) -> None:
+    """移行元のベクトルがそのまま（または切り詰めて）移行先で使えるか確認します。
+
+    Raises:
+        ValueError: 密ベクトルの次元数が異なる場合
+    """
+    vectors = client.get_collection(source).config.params.vectors
+    params = vectors.get(DENSE_VECTOR_NAME) if isinstance(vectors, dict) else vectors
+    current = params.size if params is not None else None
+    if not _is_compatible_size(current, config):
+        raise ValueError(
+            f"コレクション {source} のベクトル次元数 ({current}) が設定値 ({config.stored_vector_size}) と異なります。"
+            "新しいベクトルを生成する embedder を指定してください。")
+
+
+def _check_sparse_vectors(client: QdrantClient, source: str, config: CollectionConfig, text_field: Optional[str]) -> None:
+    """ハイブリッド構成の移行先に疎ベクトルを用意できるか確認します。
+
+    移行元が疎ベクトルを持たない場合にそのままコピーすると、移行先のポイントは疎ベクトルを持たず、
+    ハイブリッド検索が密ベクトルのみの検索になるため、疎ベクトルを生成するテキストの指定を必須とします。
+
+    Raises:
+        ValueError: 移行元が疎ベクトルを持たず、``text_field`` が指定されていない場合
+    """
+    if not config.hybrid or text_field is not None:
+        return
+    sparse_vectors = client.get_collection(source).config.params.sparse_vectors or {}
+    if SPARSE_VECTOR_NAME not in sparse_vectors:
+        raise ValueError(
+            f"コレクション {source} は疎ベクトルを持たないため、ハイブリッド構成に移行できません。"
+            "疎ベクトルを生成するペイロードのテキストのキーを text_field に指定してください。")
+
+
+def _is_compatible_size(size: Optional[int], config: CollectionConfig) -> bool:
+    """既存のベクトルが移行先でそのまま、または切り詰めて使える次元数か判定します。"""
+    return size is not None and size in (config.stored_vector_size, config.vector_size)
+
+
+def _upsert_batches(
+    client: QdrantClient,
+    target: str,
+    batches: Iterable[List[PointStruct]],
+) -> int:
+    """ポイントのバッチを ``wait=False`` で登録し、登録したポイント数を返します。"""
+    count = 0
+    for points in batches:
+        client.upsert(target, points=points, wait=False)
+        count += len(points)
+    return count
+
+
+def _run_parallel(tasks: List[Callable[[], int]], workers: int, thread_name_prefix: str) -> int:
+    """タスクを並列に実行し、戻り値（登録したポイント数）の合計を返します。"""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as executor:
+        futures = [executor.submit(task) for task in tasks]
+        return sum(future.result() for future in futures)
+
+
+def wait_for_points(client: QdrantClient, collection_name: str, expected: int, timeout: float = 600.0) -> None:
+    """``wait=False`` で登録したポイントがすべて反映されるまで待機します。
+
+    Args:
+        client: Qdrantクライアント
+        collection_name: コレクション名
+        expected: 期待するポイント数
+        timeout: 最大待機時間（秒）
+
+    Raises:
+        TimeoutError: 待機時間内にポイント数が期待値に達しない場合
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        count = client.count(collection_name, exact=True).count
+        if count >= expected:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"コレクション {collection_name} のポイント数が {expected} に達しません (現在: {count})")
+        time.sleep(0.5)
+
+
+def copy_points(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    config: CollectionConfig,
+    batch_size: int = 256,
+    workers: int = 4,
+    embedder: Optional[Embedder] = None,
+    partition_key: str = PAYLOAD_USER_ID,
+    text_field: Optional[str] = None,
+    encoder: Optional[SparseTextEncoder] = None,
+) -> int:
+    """移行元のポイントを移行先へコピーします。
+
+    移行元を ``partition_key`` の値でパーティションに分割し、パーティションごとに独立したscrollカーソルで
+    読み出したバッチを ``wait=False`` で移行先にupsertします。
+
+    Args:
+        client: Qdrantクライアント
+        source: 移行元の物理コレクション名
+        target: 移行先の物理コレクション名
+        config: 移行先のコレクション構成
+        batch_size: 1回のscroll・upsertで扱うポイント数
+        workers: 並列に読み出すカーソル数
+        embedder: ペイロードから新しい密ベクトルを生成する関数。省略時は既存の密ベクトルを使用
+        partition_key: パーティション分割に用いるペイロードのキー
+        text_field: 疎ベクトルを持たないポイントの疎ベクトルを生成するペイロードのテキストのキー
+            （ハイブリッド構成の移行先のみ使用）
+        encoder: 疎ベクトルのエンコーダー。省略時は既定設定のエンコーダー
+
+    Returns:
+        int: コピーしたポイント数
+    """
+    with_vectors = embedder is None or config.hybrid
+    if config.hybrid and text_field is not None:
+        encoder = encoder or SparseTextEncoder()
+
+    def sparse_vector(record, sparse):
+        if sparse is not None or encoder is None:
+            return sparse
+        text = (record.payload or {}).get(text_field)
+        return encoder.encode_document(text) if text else None
+
+    def convert(records) -> List[PointStruct]:
+        vectors = [split_vector(record.vector) if with_vectors else (None, None) for record in records]
+        if embedder is not None:
+            dense_vectors = embedder([record.payload or {} for record in records])
+        else:
+            dense_vectors = [dense for dense, _ in vectors]
+        return [
+            build_point(config, record.id, dense, sparse_vector(record, sparse), record.payload)
+            for record, dense, (_, sparse) in zip(records, dense_vectors, vectors)
+        ]
+
+    def copy_partition(partition_filter: Optional[Filter]) -> int:
+        batches = scroll_partition(client, source, partition_filter, batch_size, with_vectors)
+        return _upsert_batches(client, target, (convert(records) for records in batches))
+
+    partitions = build_partitions(client, source, workers, partition_key)
+    return _run_parallel([lambda f=f: copy_partition(f) for f in partitions], workers, 'qdrant-reindex')
+
+
+def _prepare_target(client: QdrantClient, collection_name: str) -> Tuple[Optional[str], CollectionConfig, Set[str]]:
+    """移行元と、次のバージョンの移行先コレクションの構成を決定します。
+
+    Returns:
+        Tuple[Optional[str], CollectionConfig, Set[str]]: 移行元の物理コレクション名、移行先の構成、既存のコレクション名
+    """
+    source = resolve_collection(client, collection_name)
+    existing = {c.name for c in client.get_collections().collections}
+    target = versioned_collection_name(collection_name, next_collection_version(existing, collection_name))
+    return source, replace(get_collection_config(collection_name), name=target), existing
+
+
+def _switch_alias(client: QdrantClient, collection_name: str, source: Optional[str], target: str, drop_source: bool) -> bool:
+    """論理名のエイリアスを移行先に切り替え、移行元を削除したかどうかを返します。"""
+    if source is None:
+        point_alias(client, collection_name, target)
+        return False
+    if collection_name not in get_collection_aliases(client):
+        # 論理名と同名のコレクションがあるとエイリアスを作成できないため、先に削除する
+        client.delete_collection(source)
+        point_alias(client, collection_name, target)
+        return True
+    point_alias(client, collection_name, target, replace=True)
+    if drop_source:
+        client.delete_collection(source)
+    return drop_source
+
+
+def reindex_collection(
+    collection_name: str,
+    client: Optional[QdrantClient] = None,
+    batch_size: int = 256,
+    workers: int = 4,
+    embedder: Optional[Embedder] = None,
+    drop_source: bool = False,
+    timeout: float = 600.0,
+    text_field: Optional[str] = None,
+) -> ReindexResult:
+    """コレクションを現在の設定で新しい物理コレクションに再インデックスし、エイリアスを切り替えます。
+
+    エイリアス導入前に論理名で作成されたコレクションを移行する場合は、エイリアスを作成するために
+    移行元のコレクションを削除します。その間（削除からエイリアス作成まで）のみ、コレクションを参照できません。
+
+    コピー中に移行元へ書き込まれたポイントは移行先に反映されないため、書き込みを止めた状態で実行してください。
+
+    Args:
+        collection_name: コレクションの論理名
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        batch_size: 1回のscroll・upsertで扱うポイント数
+        workers: 並列に読み出すカーソル数
+        embedder: ペイロードから新しい密ベクトルを生成する関数
+        drop_source: エイリアス切り替え後に移行元の物理コレクションを削除するかどうか
+        timeout: 登録したポイントが反映されるまでの最大待機時間（秒）
+        text_field: 疎ベクトルを生成するペイロードのテキストのキー。
+            疎ベクトルを持たないコレクションをハイブリッド構成に移行する場合は必須
+
+    Returns:
+        ReindexResult: 再インデックスの結果
+
+    Raises:
+        ValueError: コレクションが存在しない場合、embedder なしでベクトルを移行できない場合、
+            または text_field なしで疎ベクトルを持たないコレクションをハイブリッド構成に移行する場合
+    """
+    client = client or get_qdrant_client()
+    started = time.monotonic()
+
+    source, config, existing = _prepare_target(client, collection_name)
+    if source is None:
+        raise ValueError(f"コレクション {collection_name} が存在しません")
+    if embedder is None:
+        _check_vector_size(client, source, config)
+    _check_sparse_vectors(client, source, config, text_field)
+
+    logger.info(f"コレクション {collection_name} を再インデックスします: {source} -> {config.name}")
+    ensure_collection(client, config, existing)
+    copied = copy_points(
+        client, source, config.name, config, batch_size, workers, embedder, text_field=text_field)
+    wait_for_points(client, config.name, copied, timeout)
+    dropped = _switch_alias(client, collection_name, source, config.name, drop_source)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"コレクション {collection_name} の再インデックスが完了しました: {copied}件, {elapsed:.1f}秒")
+    return ReindexResult(
+        collection_name=collection_name,
+        source=source,
+        target=config.name,
+        points_copied=copied,
+        source_dropped=dropped,
+        elapsed_seconds=elapsed,
+    )
+
+
+def restore_collection(
+    directory: str,
+    collection_name: str,
+    client: Optional[QdrantClient] = None,
+    batch_size: int = 512,
+    workers: int = 4,
+    drop_source: bool = False,
+    timeout: float = 600.0,
+) -> ReindexResult:
+    """スナップショットから新しい物理コレクションを構築し、エイリアスを切り替えます。
+
+    シャードごとに並列に読み込み、``wait=False`` でupsertした後、全ポイントの反映を待ってから切り替えます。
+
+    Args:
+        directory: スナップショットのディレクトリ
+        collection_name: 登録先のコレクションの論理名
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        batch_size: 1回のupsertで登録するポイント数
+        workers: 並列に読み込むシャード数
+        drop_source: エイリアス切り替え後に既存の物理コレクションを削除するかどうか
+        timeout: 登録したポイントが反映されるまでの最大待機時間（秒）
+
+    Returns:
+        ReindexResult: 復元の結果
+
+    Raises:
+        ValueError: スナップショットが無効な場合、またはベクトル次元数が設定値と異なる場合
+    """
+    started = time.monotonic()
+    manifest = read_manifest(directory)
+    client = client or get_qdrant_client()
+    source, config, existing = _prepare_target(client, collection_name)
+    if not _is_compatible_size(manifest['vector_size'], config):
+        raise ValueError(
+            f"スナップショットのベクトル次元数 ({manifest['vector_size']}) が設定値 ({config.stored_vector_size}) と異なります")
+
+    logger.info(f"スナップショット {directory} からコレクション {collection_name} を復元します: {config.name}")
+    ensure_collection(client, config, existing)
+    tasks = [
+        lambda name=shard['name']: _upsert_batches(
+            client, config.name, iter_shard_points(directory, name, config, batch_size))
+        for shard in manifest['shards']
+    ]
+    restored = _run_parallel(tasks, workers, 'qdrant-restore')
+    wait_for_points(client, config.name, restored, timeout)
+    dropped = _switch_alias(client, collection_name, source, config.name, drop_source)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"コレクション {collection_name} を復元しました: {restored}件, {elapsed:.1f}秒")
+    return ReindexResult(
+        collection_name=collection_name,
+        source=source,
+        target=config.name,
+        points_copied=restored,
+        source_dropped=dropped,
+        elapsed_seconds=elapsed,
+    )
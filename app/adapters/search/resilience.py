@@ -0,0 +1,558 @@
+"""検索ゲートウェイの耐障害性（サーキットブレーカー・デッドライン・ヘッジリクエスト）を提供するモジュール。
+
+``ResilientSearchGateway`` は任意のSearchGatewayをラップし、以下を行います。
+
+- リクエストの時間予算 (``request_budget()``) を超えないよう待機時間を制限する
+- 連続して失敗したノードへの呼び出しをサーキットブレーカーで一定時間遮断する。
+  通信エラー・タイムアウト・サーバーエラーのみを失敗として数え、呼び出し元に起因するエラーはそのまま送出する
+- レプリカが設定されている場合、プライマリの応答がレイテンシのp95を超えたらレプリカにも問い合わせ、
+  先に成功した結果を返す（ヘッジリクエスト）
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+import grpc
+import httpx
+from django.conf import settings
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from app.adapters.search.collection_config import get_cold_tier_collections
+from app.adapters.search.deadline import call_timeout
+from app.adapters.search.instrumentation import record_circuit_state, record_retry
+from app.adapters.search.qdrant_manager import QdrantClientManager
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.adapters.search.tiered_search_gateway import TieredSearchGateway
+from app.core.search.gateways import (
+    BatchSearchResult,
+    SearchFilter,
+    SearchGateway,
+    SearchGroup,
+    SearchHit,
+    SearchRequest,
+    SearchTimeoutError,
+    SearchUnavailableError,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# ノードの障害としてサーキットブレーカーに記録するgRPCのステータスコード
+NODE_FAILURE_GRPC_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+})
+
+
+class CircuitOpenError(SearchUnavailableError):
+    """サーキットが開いているため呼び出しを行わなかった場合のエラー"""
+
+
+class CircuitBreaker:
+    """連続した失敗を検知して呼び出しを一時的に遮断するサーキットブレーカー。
+
+    - closed: 通常状態。連続失敗回数が ``failure_threshold`` に達するとopenに移行する
+    - open: 呼び出しを即座に失敗させる。``reset_timeout`` 秒経過するとhalf_openに移行する
+    - half_open: 1回だけ試行を許可し、成功すればclosed、失敗すればopenに戻る
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初期化
+
+        Args:
+            name: ログに出力する名前
+            failure_threshold: サーキットを開く連続失敗回数
+            reset_timeout: サーキットを開いてから試行を再開するまでの時間（秒）
+            clock: 現在時刻を返す関数（テスト用に注入可能）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+
+    @property
+    def state(self) -> str:
+        """現在の状態を返します。
+
+        Returns:
+            str: 'closed' / 'open' / 'half_open'
+        """
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """呼び出しを許可するか判定します。half_open状態では同時に1回のみ許可します。
+
+        Returns:
+            bool: 呼び出してよい場合はTrue
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state != self.HALF_OPEN or self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+        record_circuit_state(self.name, self.HALF_OPEN)
+        return True
+
+    def record_success(self) -> None:
+        """呼び出しの成功を記録し、サーキットを閉じます。"""
+        with self._lock:
+            was_open = self._opened_at is not None
+            if was_open:
+                logger.info(f"サーキット {self.name} を閉じました")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+        if was_open:
+            record_circuit_state(self.name, self.CLOSED)
+
+    def record_failure(self) -> None:
+        """呼び出しの失敗を記録し、しきい値に達した場合はサーキットを開きます。"""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            opened = self._opened_at is not None or self._failures >= self.failure_threshold
+            if opened:
+                if self._opened_at is None:
+                    logger.warning(f"サーキット {self.name} を開きました（連続失敗 {self._failures}回）")
+                self._opened_at = self._clock()
+        if opened:
+            record_circuit_state(self.name, self.OPEN)
+
+    def release(self) -> None:
+        """呼び出しの結果を記録せず、half_open状態の試行の枠を解放します。
+
+        ノードの状態と無関係なエラーで試行が終わった場合に、次の呼び出しで再び試行できるようにします。
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """サーキットブレーカーを通して関数を呼び出します。
+
+        Args:
+            func: 呼び出す関数
+            *args: 位置引数
+            **kwargs: キーワード引数
+
+        Returns:
+            関数の戻り値
+
+        Raises:
+            CircuitOpenError: サーキットが開いている場合
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"サーキット {self.name} が開いているため呼び出しを中止しました")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class LatencyTracker:
+    """直近の呼び出しのレイテンシを保持し、パーセンタイルを算出します。"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """初期化
+
+        Args:
+            window: 保持する計測値の数
+            min_samples: パーセンタイルを算出するのに必要な最小計測数
+        """
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        """レイテンシを記録します。
+
+        Args:
+            seconds: レイテンシ（秒）
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """記録したレイテンシのパーセンタイルを返します。
+
+        Args:
+            p: パーセンタイル (0-100)
+
+        Returns:
+            Optional[float]: パーセンタイル値（秒）。計測数が不足している場合はNone
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(math.ceil(p / 100 * len(samples)) - 1, 0))
+        return samples[index]
+
+
+def is_node_failure(error: BaseException) -> bool:
+    """例外が問い合わせ先のノードの障害（通信エラー・タイムアウト・サーバーエラー）によるものか判定します。
+
+    時間予算を使い切ったことによる ``SearchTimeoutError`` や、不正なフィルタ・ベクトル次元数などの
+    呼び出し元に起因するエラーはノードの障害とみなしません。
+
+    Args:
+        error: 検索ゲートウェイが送出した例外
+
+    Returns:
+        bool: ノードの障害の場合はTrue
+    """
+    if isinstance(error, SearchUnavailableError):
+        return False
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code >= 500
+    if isinstance(error, grpc.RpcError):
+        code = getattr(error, 'code', None)
+        return callable(code) and code() in NODE_FAILURE_GRPC_CODES
+    return isinstance(error, (ResponseHandlingException, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """プロセス内で共有する名前付きのサーキットブレーカーを取得します。
+
+    Args:
+        name: サーキットブレーカーの名前（接続先ノードごと）
+
+    Returns:
+        CircuitBreaker: サーキットブレーカー
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=getattr(settings, 'QDRANT_CIRCUIT_FAILURE_THRESHOLD', 5),
+                reset_timeout=getattr(settings, 'QDRANT_CIRCUIT_RESET_TIMEOUT', 30.0),
+            )
+        return _breakers[name]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """ヘッジリクエストを実行するスレッドプールを取得します。"""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'QDRANT_HEDGE_MAX_WORKERS', 64), thread_name_prefix='search-hedge')
+        return _executor
+
+
+def _reset_after_fork() -> None:
+    """fork後の子プロセスでは親プロセスのスレッドプールとサーキットの状態を引き継がない。"""
+    global _executor, _breakers_lock, _executor_lock  # pylint: disable=global-statement
+    _executor = None
+    _executor_lock = threading.Lock()
+    _breakers_lock = threading.Lock()
+    _breakers.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class ResilientSearchGateway(SearchGateway):
+    """サーキットブレーカー・デッドライン・ヘッジリクエストを備えたSearchGatewayのラッパー。"""
+
+    def __init__(
+        self,
+        primary: SearchGateway,
+        replica: Optional[SearchGateway] = None,
+        primary_breaker: Optional[CircuitBreaker] = None,
+        replica_breaker: Optional[CircuitBreaker] = None,
+        latency: Optional[LatencyTracker] = None,
+    ):
+        """初期化
+
+        Args:
+            primary: 通常の問い合わせ先
+            replica: ヘッジリクエストの問い合わせ先。Noneの場合はヘッジしない
+            primary_breaker: プライマリのサーキットブレーカー
+            replica_breaker: レプリカのサーキットブレーカー
+            latency: プライマリのレイテンシ計測
+        """
+        self.primary = primary
+        self.replica = replica
+        self.primary_breaker = primary_breaker or get_circuit_breaker('qdrant-primary')
+        self.replica_breaker = replica_breaker or get_circuit_breaker('qdrant-replica')
+        self.latency = latency or LatencyTracker()
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """耐障害性を備えたベクトル検索を行う。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            スコアの降順に並んだ検索結果
+
+        Raises:
+            SearchTimeoutError: 期限内に結果が得られなかった場合
+            SearchUnavailableError: すべての問い合わせ先が失敗した、またはサーキットが開いている場合
+        """
+        return self._execute(lambda gateway: gateway.search(collection_name, query_vector, search_filter, limit))
+
+    def hybrid_search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        query_text: str,
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """耐障害性を備えたハイブリッド検索を行う。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            query_text: キーワード検索に用いるクエリテキスト
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            融合後のスコアの降順に並んだ検索結果
+
+        Raises:
+            SearchTimeoutError: 期限内に結果が得られなかった場合
+            SearchUnavailableError: すべての問い合わせ先が失敗した、またはサーキットが開いている場合
+        """
+        return self._execute(
+            lambda gateway: gateway.hybrid_search(collection_name, query_vector, query_text, search_filter, limit))
+
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        group_limit: int = 5,
+        group_size: int = 3,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> List[SearchGroup]:
+        """耐障害性を備えたグループ化検索を行う。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            group_limit: 取得する最大文書数
+            group_size: 1文書あたりの最大件数
+            payload_fields: 結果に含めるペイロードのキー。Noneの場合はすべて
+
+        Returns:
+            最高スコアの降順に並んだ文書ごとの検索結果
+
+        Raises:
+            SearchTimeoutError: 期限内に結果が得られなかった場合
+            SearchUnavailableError: すべての問い合わせ先が失敗した、またはサーキットが開いている場合
+        """
+        return self._execute(lambda gateway: gateway.search_groups(
+            collection_name, query_vector, search_filter, group_limit, group_size, payload_fields))
+
+    def search_batch(self, requests: Sequence[SearchRequest]) -> BatchSearchResult:
+        """耐障害性を備えたバッチ検索を行う。
+
+        Args:
+            requests: 検索するクエリ
+
+        Returns:
+            クエリごとの検索結果とコレクションごとの所要時間
+
+        Raises:
+            SearchTimeoutError: 期限内に結果が得られなかった場合
+            SearchUnavailableError: すべての問い合わせ先が失敗した、またはサーキットが開いている場合
+        """
+        return self._execute(lambda gateway: gateway.search_batch(requests))
+
+    def hedge_delay(self) -> float:
+        """プライマリの応答を待ってからレプリカに問い合わせるまでの時間を返します。
+
+        Returns:
+            float: 待ち時間（秒）
+        """
+        delay = self.latency.percentile(getattr(settings, 'QDRANT_HEDGE_PERCENTILE', 95))
+        if delay is None:
+            delay = getattr(settings, 'QDRANT_HEDGE_DEFAULT_DELAY', 0.2)
+        return max(delay, getattr(settings, 'QDRANT_HEDGE_MIN_DELAY', 0.02))
+
+    def _attempt(
+        self,
+        gateway: SearchGateway,
+        breaker: CircuitBreaker,
+        operation: Callable[[SearchGateway], T],
+        started_event: Optional[threading.Event] = None,
+    ) -> T:
+        """``allow_request()`` で許可済みの呼び出しを実行し、結果をサーキットブレーカーに記録します。
+
+        ノードの障害以外の例外は、サーキットブレーカーに記録せずにそのまま送出します。
+        """
+        if started_event is not None:
+            started_event.set()
+        started = time.monotonic()
+        try:
+            result = operation(gateway)
+        except Exception as e:
+            if is_node_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            raise
+        breaker.record_success()
+        if gateway is self.primary:
+            self.latency.record(time.monotonic() - started)
+        return result
+
+    def _call_inline(self, gateway: SearchGateway, breaker: CircuitBreaker, operation: Callable[[SearchGateway], T]) -> T:
+        """``allow_request()`` で許可済みの呼び出しを呼び出し元のスレッドで実行し、ノードの障害を変換します。"""
+        try:
+            return self._attempt(gateway, breaker, operation)
+        except Exception as e:
+            if not is_node_failure(e):
+                raise
+            raise SearchUnavailableError(f"Qdrantでの検索に失敗しました: {e}") from e
+
+    def _submit(
+        self,
+        gateway: SearchGateway,
+        breaker: CircuitBreaker,
+        operation,
+        started_event: Optional[threading.Event] = None,
+    ) -> Future:
+        # 呼び出し元のデッドラインをワーカースレッドに引き継ぐ
+        return _get_executor().submit(copy_context().run, self._attempt, gateway, breaker, operation, started_event)
+
+    def _execute(self, operation: Callable[[SearchGateway], T]) -> T:
+        timeout = call_timeout()
+        if not self.primary_breaker.allow_request():
+            if self.replica is None or not self.replica_breaker.allow_request():
+                raise CircuitOpenError("Qdrantのサーキットが開いているため検索できません")
+            record_retry('failover')
+            return self._wait_first([self._submit(self.replica, self.replica_breaker, operation)], timeout)
+
+        if self.replica is None:
+            # ヘッジしない場合はスレッドを介さずに呼び出す（期限はゲートウェイ側のタイムアウトで守られる）
+            return self._call_inline(self.primary, self.primary_breaker, operation)
+
+        started = time.monotonic()
+        primary_started = threading.Event()
+        primary = self._submit(self.primary, self.primary_breaker, operation, primary_started)
+        futures = [primary]
+        # ヘッジの待ち時間内にプライマリが開始されない場合はスレッドプールが埋まっているため、
+        # ヘッジをプライマリの後ろに並べず、プライマリを取り消して呼び出し元のスレッドでレプリカに問い合わせる
+        start_wait = self.hedge_delay() if timeout is None else min(self.hedge_delay(), timeout)
+        if not primary_started.wait(start_wait) and primary.cancel():
+            self.primary_breaker.release()
+            if not self.replica_breaker.allow_request():
+                raise SearchUnavailableError("検索用のスレッドプールが埋まっており、レプリカのサーキットが開いているため検索できません")
+            logger.warning("検索用のスレッドプールが埋まっているため、レプリカに直接問い合わせます")
+            record_retry('hedge')
+            return self._call_inline(self.replica, self.replica_breaker, operation)
+        # スレッドプールでの待ち時間をヘッジの待ち時間に含めないよう、プライマリの呼び出し開始から計測する
+        primary_started.wait(timeout)
+        remaining = None if timeout is None else max(timeout - (time.monotonic() - started), 0)
+        delay = self.hedge_delay() if remaining is None else min(self.hedge_delay(), remaining)
+        wait(futures, timeout=delay)
+        if primary.done() and primary.exception() is not None and not is_node_failure(primary.exception()):
+            # 呼び出し元に起因するエラーはレプリカでも同じ結果になるため、ヘッジせずにそのまま送出する
+            raise primary.exception()
+        primary_succeeded = primary.done() and primary.exception() is None
+        if not primary_succeeded and self.replica_breaker.allow_request():
+            logger.debug(f"プライマリが {delay:.3f}秒 以内に成功しなかったため、レプリカにヘッジリクエストを送信します")
+            record_retry('hedge')
+            futures.append(self._submit(self.replica, self.replica_breaker, operation))
+        remaining = None if timeout is None else max(timeout - (time.monotonic() - started), 0)
+        return self._wait_first(futures, remaining)
+
+    @staticmethod
+    def _wait_first(futures: List[Future], timeout: Optional[float]) -> T:
+        """最初に成功した結果を返します。すべて失敗した場合は最後のエラーを送出します。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                raise SearchTimeoutError(f"検索が {timeout:.2f}秒 以内に完了しませんでした")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        if isinstance(error, SearchUnavailableError) or not is_node_failure(error):
+            raise error
+        raise SearchUnavailableError(f"Qdrantでの検索に失敗しました: {error}") from error
+
+
+def build_search_gateway(primary: Optional[SearchGateway] = None) -> ResilientSearchGateway:
+    """Qdrantの検索ゲートウェイを耐障害性のラッパーで包んで生成します。
+
+    ``QDRANT_REPLICA_HOST`` が設定されている場合は、レプリカへのヘッジリクエストを有効にします。
+    コールド層が有効な場合は、各ノードの検索ゲートウェイをTieredSearchGatewayで包みます。
+
+    Args:
+        primary: プライマリの検索ゲートウェイ。省略時はQdrantSearchGateway
+
+    Returns:
+        ResilientSearchGateway: 検索ゲートウェイ
+    """
+    primary = primary or QdrantSearchGateway()
+    replica_client = QdrantClientManager.get_replica_client()
+    replica = QdrantSearchGateway(client=replica_client) if replica_client is not None else None
+    if get_cold_tier_collections():
+        primary = TieredSearchGateway(primary)
+        if replica is not None:
+            replica = TieredSearchGateway(replica, client=replica_client)
+    return ResilientSearchGateway(primary, replica)
@@ -0,0 +1,174 @@
+"""Qdrantコレクションのスキーマ検証済みマーカーを管理するモジュール。
+
+``ensure_collections_exist()`` によるコレクションの作成・検証はデプロイごとに一度
+``manage.py qdrant_bootstrap`` で実行し、その結果を「スキーマ検証済み」マーカーとして記録します。
+各プロセスの起動時 (``SearchConfig.ready()``) はQdrantへ問い合わせる代わりにこのマーカーを確認します。
+
+マーカーの保存先は ``QDRANT_SCHEMA_MARKER_REDIS_URL`` が設定されていればRedisキー、
+未設定であれば ``QDRANT_SCHEMA_MARKER_PATH`` のファイルです。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from app.adapters.search import qdrant_manager
+from app.adapters.search.collection_config import (
+    cold_collection_name,
+    get_cold_tier_collections,
+    get_collection_config,
+)
+from app.adapters.search.payload_schema import get_payload_indexes
+
+logger = logging.getLogger(__name__)
+
+# Redisキーのデフォルト値
+DEFAULT_MARKER_KEY = 'deep-read:qdrant:schema-marker'
+
+
+def get_schema_definition() -> Dict[str, Any]:
+    """スキーマ検証の対象となる設定値を辞書で返します。
+
+    接続先やコレクション定義が変わった場合はフィンガープリントも変わり、
+    マーカーは無効として扱われます。
+
+    Returns:
+        Dict[str, Any]: フィンガープリント計算に用いる設定値
+    """
+    collection_names = [
+        getattr(settings, 'QDRANT_COLLECTION_DOCUMENTS', None),
+        getattr(settings, 'QDRANT_COLLECTION_QA', None),
+    ] + [cold_collection_name(name) for name in get_cold_tier_collections()]
+    return {
+        'host': getattr(settings, 'QDRANT_HOST', None),
+        'port': getattr(settings, 'QDRANT_PORT', None),
+        'vector_size': getattr(settings, 'QDRANT_VECTOR_SIZE', None),
+        'collections': [
+            get_collection_config(name).to_dict() if name else None
+            for name in collection_names
+        ],
+        'payload_indexes': {
+            field_name: params.model_dump(mode='json')
+            for field_name, params in get_payload_indexes().items()
+        },
+    }
+
+
+def compute_schema_fingerprint() -> str:
+    """現在の設定からスキーマのフィンガープリントを計算します。
+
+    Returns:
+        str: 設定値のSHA-256ハッシュ（16進文字列）
+    """
+    serialized = json.dumps(get_schema_definition(), sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def _get_redis_client():
+    """マーカー保存用のRedisクライアントを返します。
+
+    Returns:
+        Redisクライアント。Redis URLが未設定の場合はNone
+    """
+    redis_url = getattr(settings, 'QDRANT_SCHEMA_MARKER_REDIS_URL', None)
+    if not redis_url:
+        return None
+    import redis  # pylint: disable=import-outside-toplevel
+    return redis.Redis.from_url(redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+
+def _get_marker_key() -> str:
+    return getattr(settings, 'QDRANT_SCHEMA_MARKER_KEY', DEFAULT_MARKER_KEY)
+
+
+def read_schema_marker() -> Optional[Dict[str, Any]]:
+    """保存されているスキーマ検証済みマーカーを読み込みます。
+
+    Returns:
+        Optional[Dict[str, Any]]: マーカーの内容。存在しないか読み込めない場合はNone
+    """
+    try:
+        redis_client = _get_redis_client()
+        if redis_client is not None:
+            raw = redis_client.get(_get_marker_key())
+        else:
+            path = getattr(settings, 'QDRANT_SCHEMA_MARKER_PATH', None)
+            if not path or not os.path.exists(path):
+                return None
+            with open(path, 'rb') as f:
+                raw = f.read()
+        if not raw:
+            return None
+        return json.loads(raw)
+    except Exception as e:
+        logger.warning(f"Qdrantスキーマ検証済みマーカーの読み込みに失敗しました: {e}")
+        return None
+
+
+def write_schema_marker() -> Dict[str, Any]:
+    """現在の設定に対するスキーマ検証済みマーカーを書き込みます。
+
+    ファイルに保存する場合は一時ファイルへの書き込み後にリネームし、
+    読み込み側が書きかけのファイルを読まないようにします。
+
+    Returns:
+        Dict[str, Any]: 書き込んだマーカーの内容
+    """
+    marker = {
+        'fingerprint': compute_schema_fingerprint(),
+        'vector_size': getattr(settings, 'QDRANT_VECTOR_SIZE', None),
+        'verified_at': datetime.now(timezone.utc).isoformat(),
+    }
+    raw = json.dumps(marker, sort_keys=True).encode('utf-8')
+
+    redis_client = _get_redis_client()
+    if redis_client is not None:
+        redis_client.set(_get_marker_key(), raw)
+    else:
+        path = str(settings.QDRANT_SCHEMA_MARKER_PATH)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.qdrant_schema_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    logger.info(f"Qdrantスキーマ検証済みマーカーを記録しました: {marker['fingerprint'][:12]}")
+    return marker
+
+
+def is_schema_verified() -> bool:
+    """現在の設定に一致するスキーマ検証済みマーカーが存在するか確認します。
+
+    Returns:
+        bool: マーカーが存在し、フィンガープリントが一致する場合はTrue
+    """
+    marker = read_schema_marker()
+    if not marker:
+        return False
+    return marker.get('fingerprint') == compute_schema_fingerprint()
+
+
+def bootstrap_schema() -> Dict[str, Any]:
+    """コレクションを作成・検証し、スキーマ検証済みマーカーを記録します。
+
+    Returns:
+        Dict[str, Any]: 書き込んだマーカーの内容
+
+    Raises:
+        ValueError: 設定が不完全または無効な場合
+        ConnectionError: Qdrantサーバーに接続できない場合
+    """
+    qdrant_manager.ensure_collections_exist()
+    return write_schema_marker()
@@ -0,0 +1,123 @@
+"""ハイブリッド検索用の疎ベクトルを生成するモジュール。
+
+日本語テキストを形態素解析器に依存せず文字bigramでトークン化し、
+BM25の語頻度(TF)成分を値に持つ疎ベクトルへ変換します。
+IDF成分はコレクションの疎ベクトル設定 (``Modifier.IDF``) によりQdrantサーバー側で適用されます。
+"""
+
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from qdrant_client.http.models import SparseVector
+
+# 英数字の連続は単語として、それ以外の文字（かな・漢字など）の連続はbigramに分割する
+_ALNUM_RUN = re.compile(r'[0-9a-z]+')
+_WORD_RUN = re.compile(r'\w+')
+
+
+class SparseTextEncoder:
+    """テキストをBM25形式の疎ベクトルに変換するエンコーダー。
+
+    トークンはCRC32でハッシュ化して疎ベクトルのインデックスとするため、語彙辞書を保持しません。
+    登録時と検索時で同じエンコーダー設定を使用する必要があります。
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 256.0):
+        """初期化
+
+        Args:
+            k1: BM25の語頻度飽和パラメータ
+            b: BM25の文書長正規化パラメータ
+            avg_doc_length: 文書長正規化に用いる平均トークン数
+        """
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """テキストをトークンのリストに分割します。
+
+        Args:
+            text: 対象のテキスト
+
+        Returns:
+            List[str]: トークンのリスト
+        """
+        normalized = unicodedata.normalize('NFKC', text or '').lower()
+        tokens: List[str] = []
+        for run in _WORD_RUN.findall(normalized):
+            position = 0
+            for match in _ALNUM_RUN.finditer(run):
+                tokens.extend(_char_bigrams(run[position:match.start()]))
+                tokens.append(match.group())
+                position = match.end()
+            tokens.extend(_char_bigrams(run[position:]))
+        return tokens
+
+    @staticmethod
+    def token_index(token: str) -> int:
+        """トークンに対応する疎ベクトルのインデックスを返します。
+
+        Args:
+            token: トークン
+
+        Returns:
+            int: 32bit符号なし整数のインデックス
+        """
+        return zlib.crc32(token.encode('utf-8'))
+
+    def encode_document(self, text: str) -> SparseVector:
+        """登録する文書テキストを疎ベクトルに変換します。
+
+        各トークンの値はBM25の語頻度成分 ``tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))`` です。
+
+        Args:
+            text: 文書テキスト
+
+        Returns:
+            SparseVector: 疎ベクトル
+        """
+        tokens = self.tokenize(text)
+        length_norm = 1 - self.b + self.b * len(tokens) / self.avg_doc_length
+        weights: Dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            index = self.token_index(token)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return _to_sparse_vector(weights)
+
+    def encode_query(self, text: str) -> SparseVector:
+        """検索クエリのテキストを疎ベクトルに変換します。
+
+        クエリ側はトークンの有無のみを値1.0で表現します。
+
+        Args:
+            text: 検索クエリ
+
+        Returns:
+            SparseVector: 疎ベクトル
+        """
+        weights = {self.token_index(token): 1.0 for token in set(self.tokenize(text))}
+        return _to_sparse_vector(weights)
+
+
+def _char_bigrams(run: str) -> List[str]:
+    """文字列を文字bigramに分割します。1文字の場合はその文字をそのまま返します。
+
+    Args:
+        run: 対象の文字列
+
+    Returns:
+        List[str]: bigramのリスト
+    """
+    if len(run) <= 1:
+        return [run] if run else []
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _to_sparse_vector(weights: Dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[weights[i] for i in indices])
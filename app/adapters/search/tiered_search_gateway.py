@@ -0,0 +1,290 @@
+"""ホット層とコールド層のコレクションを透過的に検索するSearchGatewayのラッパーモジュール。
+
+``TieredSearchGateway`` はコールド層を持つコレクションの検索で、検索対象のユーザーのポイントが
+コールド層にある場合のみコールド層も並行して検索し、結果をスコア順に統合します。
+コールド層にポイントがあるかどうかはユーザーごとに件数を確認し、``QDRANT_COLD_TIER_CACHE_TTL`` 秒間
+キャッシュするため、コールド層を持たない大半のユーザーの検索はホット層のみで完結します。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from django.conf import settings
+from qdrant_client import QdrantClient
+
+from app.adapters.search.collection_config import cold_collection_name, get_cold_tier_collections
+from app.adapters.search.qdrant_manager import get_qdrant_client
+from app.adapters.search.qdrant_search_gateway import build_filter
+from app.core.search.gateways import (
+    BatchSearchResult,
+    SearchFilter,
+    SearchGateway,
+    SearchGroup,
+    SearchHit,
+    SearchRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def merge_hits(hot: Sequence[SearchHit], cold: Sequence[SearchHit], limit: int) -> List[SearchHit]:
+    """ホット層とコールド層の検索結果を統合します。
+
+    移動中に両方の層に存在するポイントは、スコアの高い方を残します。
+
+    Args:
+        hot: ホット層の検索結果
+        cold: コールド層の検索結果
+        limit: 取得する最大件数
+
+    Returns:
+        List[SearchHit]: スコアの降順に並んだ検索結果
+    """
+    best: Dict[object, SearchHit] = {}
+    for hit in list(hot) + list(cold):
+        if hit.point_id not in best or hit.score > best[hit.point_id].score:
+            best[hit.point_id] = hit
+    return sorted(best.values(), key=lambda hit: hit.score, reverse=True)[:limit]
+
+
+def merge_groups(
+    hot: Sequence[SearchGroup],
+    cold: Sequence[SearchGroup],
+    group_limit: int,
+    group_size: int,
+) -> List[SearchGroup]:
+    """ホット層とコールド層のグループ化検索の結果を統合します。
+
+    Args:
+        hot: ホット層の検索結果
+        cold: コールド層の検索結果
+        group_limit: 取得する最大文書数
+        group_size: 1文書あたりの最大件数
+
+    Returns:
+        List[SearchGroup]: 最高スコアの降順に並んだ文書ごとの検索結果
+    """
+    hits: Dict[object, List[SearchHit]] = {}
+    for group in list(hot) + list(cold):
+        hits.setdefault(group.group_id, []).extend(group.hits)
+    groups = [
+        SearchGroup(group_id=group_id, hits=merge_hits(group_hits, (), group_size))
+        for group_id, group_hits in hits.items()
+    ]
+    return sorted(groups, key=lambda group: group.score, reverse=True)[:group_limit]
+
+
+class TieredSearchGateway(SearchGateway):
+    """ホット層とコールド層を透過的に検索するSearchGatewayのラッパー。"""
+
+    def __init__(
+        self,
+        gateway: SearchGateway,
+        client: Optional[QdrantClient] = None,
+        cache_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初期化
+
+        Args:
+            gateway: 各層の検索に用いるゲートウェイ
+            client: コールド層の件数確認に用いるQdrantクライアント。省略時は ``get_qdrant_client()``
+            cache_ttl: 件数確認の結果をキャッシュする時間（秒）。省略時は ``QDRANT_COLD_TIER_CACHE_TTL``
+            clock: 現在時刻を返す関数（テスト用に注入可能）
+        """
+        self.gateway = gateway
+        self._client = client
+        self.cache_ttl = cache_ttl if cache_ttl is not None else getattr(settings, 'QDRANT_COLD_TIER_CACHE_TTL', 60.0)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cold_users: Dict[Tuple[str, str], Tuple[float, bool]] = {}
+
+    @property
+    def client(self) -> QdrantClient:
+        """コールド層の件数確認に用いるQdrantクライアントを返します。
+
+        Returns:
+            QdrantClient: Qdrantクライアント
+        """
+        if self._client is None:
+            self._client = get_qdrant_client()
+        return self._client
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """ホット層と、必要に応じてコールド層でベクトル検索を行う。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            スコアの降順に並んだ検索結果
+        """
+        return self._search_tiers(
+            collection_name, search_filter,
+            lambda name: self.gateway.search(name, query_vector, search_filter, limit),
+            lambda hot, cold: merge_hits(hot, cold, limit))
+
+    def hybrid_search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        query_text: str,
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """ホット層と、必要に応じてコールド層でハイブリッド検索を行う。
+
+        RRFのスコアは層ごとの順位に基づくため、統合後の順位は各層の順位を交互に並べたものに近くなります。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            query_text: キーワード検索に用いるクエリテキスト
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            融合後のスコアの降順に並んだ検索結果
+        """
+        return self._search_tiers(
+            collection_name, search_filter,
+            lambda name: self.gateway.hybrid_search(name, query_vector, query_text, search_filter, limit),
+            lambda hot, cold: merge_hits(hot, cold, limit))
+
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        group_limit: int = 5,
+        group_size: int = 3,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> List[SearchGroup]:
+        """ホット層と、必要に応じてコールド層でグループ化検索を行う。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            group_limit: 取得する最大文書数
+            group_size: 1文書あたりの最大件数
+            payload_fields: 結果に含めるペイロードのキー。Noneの場合はすべて
+
+        Returns:
+            最高スコアの降順に並んだ文書ごとの検索結果
+        """
+        return self._search_tiers(
+            collection_name, search_filter,
+            lambda name: self.gateway.search_groups(
+                name, query_vector, search_filter, group_limit, group_size, payload_fields),
+            lambda hot, cold: merge_groups(hot, cold, group_limit, group_size))
+
+    def search_batch(self, requests: Sequence[SearchRequest]) -> BatchSearchResult:
+        """ホット層でバッチ検索を行い、コールド層が必要なクエリのみコールド層でもバッチ検索を行う。
+
+        Args:
+            requests: 検索するクエリ
+
+        Returns:
+            クエリごとの検索結果とコレクションごとの所要時間
+        """
+        cold_indexes = [
+            i for i, request in enumerate(requests) if self.needs_cold_tier(request.collection_name, request.search_filter)
+        ]
+        if not cold_indexes:
+            return self.gateway.search_batch(requests)
+
+        cold_requests = [
+            SearchRequest(
+                collection_name=cold_collection_name(requests[i].collection_name),
+                query_vector=requests[i].query_vector,
+                search_filter=requests[i].search_filter,
+                limit=requests[i].limit,
+                query_text=requests[i].query_text,
+            )
+            for i in cold_indexes
+        ]
+        hot, cold = self._run_parallel(
+            lambda: self.gateway.search_batch(requests), lambda: self.gateway.search_batch(cold_requests))
+
+        results = list(hot.results)
+        for i, cold_hits in zip(cold_indexes, cold.results):
+            results[i] = merge_hits(results[i], cold_hits, requests[i].limit)
+        return BatchSearchResult(results=results, timings={**hot.timings, **cold.timings})
+
+    def needs_cold_tier(self, collection_name: str, search_filter: Optional[SearchFilter]) -> bool:
+        """コールド層も検索する必要があるか判定します。
+
+        ユーザーを限定しない検索では常にコールド層も検索します。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            search_filter: 検索対象の絞り込み条件
+
+        Returns:
+            bool: コールド層も検索する必要がある場合はTrue
+        """
+        if collection_name not in get_cold_tier_collections():
+            return False
+        if search_filter is None or search_filter.user_id is None:
+            return True
+
+        key = (collection_name, str(search_filter.user_id))
+        now = self._clock()
+        with self._lock:
+            cached = self._cold_users.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        has_cold = self._has_cold_points(collection_name, search_filter.user_id)
+        with self._lock:
+            self._cold_users[key] = (now + self.cache_ttl, has_cold)
+        return has_cold
+
+    def _has_cold_points(self, collection_name: str, user_id) -> bool:
+        """ユーザーのポイントがコールド層にあるか確認します。確認に失敗した場合はFalseを返します。"""
+        cold = cold_collection_name(collection_name)
+        try:
+            count = self.client.count(cold, count_filter=build_filter(SearchFilter(user_id=user_id)), exact=True)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"コールド層 {cold} の件数確認に失敗したため、ホット層のみを検索します: {e}")
+            return False
+        return count.count > 0
+
+    def _search_tiers(
+        self,
+        collection_name: str,
+        search_filter: Optional[SearchFilter],
+        search: Callable[[str], T],
+        merge: Callable[[T, T], T],
+    ) -> T:
+        """ホット層を検索し、必要な場合はコールド層も並行して検索して結果を統合します。"""
+        if not self.needs_cold_tier(collection_name, search_filter):
+            return search(collection_name)
+        hot, cold = self._run_parallel(
+            lambda: search(collection_name), lambda: search(cold_collection_name(collection_name)))
+        return merge(hot, cold)
+
+    @staticmethod
+    def _run_parallel(hot: Callable[[], T], cold: Callable[[], T]) -> Tuple[T, T]:
+        """ホット層の検索を呼び出し元のスレッドで、コールド層の検索をワーカースレッドで実行します。"""
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='qdrant-cold-tier') as executor:
+            # 呼び出し元のデッドラインとリクエスト単位の計測をワーカースレッドに引き継ぐ
+            cold_future = executor.submit(copy_context().run, cold)
+            hot_result = hot()
+            return hot_result, cold_future.result()
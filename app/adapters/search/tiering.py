@@ -0,0 +1,246 @@
+"""ポイントをホット層とコールド層のコレクション間で移動するモジュール。
+
+非アクティブなユーザーや古い文書のポイントを、ベクトル・ペイロードをディスク上に保持する
+コールド層のコレクション（例: ``documents_cold``）へ移動し、ホット層のメモリ使用量を抑えます。
+移動は移動先への登録 (``wait=True``) の後に移動元から削除するため、途中で中断しても
+ポイントが失われることはありません（両方の層に存在する間は検索時に重複を除去します）。
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Set, Union
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import FieldCondition, Filter, MatchAny, PointIdsList, PointStruct
+
+from app.adapters.search.collection_config import cold_collection_name, get_cold_tier_collections
+from app.adapters.search.local_search_gateway import invalidate_local_indexes
+from app.adapters.search.payload_schema import PAYLOAD_DOCUMENT_ID, PAYLOAD_USER_ID
+from app.adapters.search.qdrant_manager import get_qdrant_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TieringResult:
+    """層の間のポイント移動の結果。
+
+    Attributes:
+        collection_name: コレクションの論理名
+        source: 移動元のコレクション名
+        target: 移動先のコレクション名
+        points_moved: 移動したポイント数
+        elapsed_seconds: 所要時間（秒）
+    """
+    collection_name: str
+    source: str
+    target: str
+    points_moved: int
+    elapsed_seconds: float
+
+
+def build_tier_filter(
+    user_ids: Iterable[Union[int, str]] = (),
+    document_ids: Iterable[str] = (),
+) -> Filter:
+    """指定したユーザーまたは文書のポイントに一致するフィルタを生成します。
+
+    Args:
+        user_ids: 対象のユーザーID
+        document_ids: 対象の文書ID
+
+    Returns:
+        Filter: いずれかの条件に一致するポイントのフィルタ
+
+    Raises:
+        ValueError: ユーザーIDと文書IDのどちらも指定されていない場合
+    """
+    should = []
+    users = [str(user_id) for user_id in user_ids]
+    documents = list(document_ids)
+    if users:
+        should.append(FieldCondition(key=PAYLOAD_USER_ID, match=MatchAny(any=users)))
+    if documents:
+        should.append(FieldCondition(key=PAYLOAD_DOCUMENT_ID, match=MatchAny(any=documents)))
+    if not should:
+        raise ValueError("移動対象のユーザーIDまたは文書IDを指定してください")
+    return Filter(should=should)
+
+
+def move_points(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    point_filter: Filter,
+    batch_size: int = 256,
+) -> int:
+    """フィルタに一致するポイントを移動元から移動先へ移動します。
+
+    移動元から読み出したバッチを移動先に登録し、反映を待ってから移動元から削除します。
+    削除済みのポイントは次の読み出しに含まれないため、先頭から繰り返し読み出します。
+    移動したポイントを持つユーザーのローカルインデックスは、移動元・移動先ともに破棄します。
+
+    Args:
+        client: Qdrantクライアント
+        source: 移動元のコレクション名
+        target: 移動先のコレクション名
+        point_filter: 移動するポイントのフィルタ
+        batch_size: 1回に移動するポイント数
+
+    Returns:
+        int: 移動したポイント数
+    """
+    moved = 0
+    while True:
+        records, _ = client.scroll(
+            source, scroll_filter=point_filter, limit=batch_size, with_payload=True, with_vectors=True)
+        if not records:
+            return moved
+        points = [PointStruct(id=record.id, vector=record.vector, payload=record.payload) for record in records]
+        client.upsert(target, points=points, wait=True)
+        client.delete(source, points_selector=PointIdsList(points=[record.id for record in records]), wait=True)
+        moved += len(records)
+        user_ids = {
+            str(record.payload[PAYLOAD_USER_ID]) for record in records
+            if record.payload and record.payload.get(PAYLOAD_USER_ID) is not None
+        }
+        invalidate_local_indexes(source, user_ids)
+        invalidate_local_indexes(target, user_ids)
+
+
+def _tiered_collection(collection_name: str) -> str:
+    """コールド層を持つコレクションであることを確認し、コールド層のコレクション名を返します。
+
+    Raises:
+        ValueError: コールド層が無効、またはコレクションがコールド層を持たない場合
+    """
+    if collection_name not in get_cold_tier_collections():
+        raise ValueError(f"コレクション {collection_name} のコールド層は有効になっていません")
+    return cold_collection_name(collection_name)
+
+
+def _move(
+    collection_name: str,
+    to_cold: bool,
+    user_ids: Sequence[Union[int, str]],
+    document_ids: Sequence[str],
+    client: Optional[QdrantClient],
+    batch_size: int,
+) -> TieringResult:
+    cold = _tiered_collection(collection_name)
+    point_filter = build_tier_filter(user_ids, document_ids)
+    client = client or get_qdrant_client()
+    source, target = (collection_name, cold) if to_cold else (cold, collection_name)
+
+    started = time.monotonic()
+    moved = move_points(client, source, target, point_filter, batch_size)
+    elapsed = time.monotonic() - started
+    if moved:
+        logger.info(f"{moved}件のポイントを {source} から {target} に移動しました ({elapsed:.1f}秒)")
+    return TieringResult(collection_name, source, target, moved, elapsed)
+
+
+def move_to_cold_tier(
+    collection_name: str,
+    user_ids: Sequence[Union[int, str]] = (),
+    document_ids: Sequence[str] = (),
+    client: Optional[QdrantClient] = None,
+    batch_size: int = 256,
+) -> TieringResult:
+    """指定したユーザー・文書のポイントをコールド層に移動します。
+
+    Args:
+        collection_name: コレクションの論理名
+        user_ids: 移動するユーザーID（非アクティブなユーザー）
+        document_ids: 移動する文書ID（古い文書）
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        batch_size: 1回に移動するポイント数
+
+    Returns:
+        TieringResult: 移動の結果
+
+    Raises:
+        ValueError: コールド層が無効な場合、または移動対象が指定されていない場合
+    """
+    return _move(collection_name, True, user_ids, document_ids, client, batch_size)
+
+
+def move_to_hot_tier(
+    collection_name: str,
+    user_ids: Sequence[Union[int, str]] = (),
+    document_ids: Sequence[str] = (),
+    client: Optional[QdrantClient] = None,
+    batch_size: int = 256,
+) -> TieringResult:
+    """指定したユーザー・文書のポイントをコールド層からホット層に戻します。
+
+    Args:
+        collection_name: コレクションの論理名
+        user_ids: 戻すユーザーID（再びアクティブになったユーザー）
+        document_ids: 戻す文書ID
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        batch_size: 1回に移動するポイント数
+
+    Returns:
+        TieringResult: 移動の結果
+
+    Raises:
+        ValueError: コールド層が無効な場合、または移動対象が指定されていない場合
+    """
+    return _move(collection_name, False, user_ids, document_ids, client, batch_size)
+
+
+def list_cold_users(
+    collection_name: str,
+    client: Optional[QdrantClient] = None,
+    limit: int = 10000,
+    batch_size: int = 1000,
+) -> Set[str]:
+    """コールド層にポイントを持つユーザーIDを返します。
+
+    ファセットで ``limit`` 件までのユーザーIDを取得し、結果が上限に達した場合（切り捨てられている可能性がある場合）は
+    コールド層の全ポイントを読み出してすべてのユーザーIDを集めます。
+
+    Args:
+        collection_name: コレクションの論理名
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        limit: ファセットで取得するユーザー数の上限
+        batch_size: 全ポイントを読み出す場合の1回のscrollで読み出すポイント数
+
+    Returns:
+        Set[str]: ユーザーID（文字列）
+
+    Raises:
+        ValueError: コールド層が無効な場合
+    """
+    cold = _tiered_collection(collection_name)
+    client = client or get_qdrant_client()
+    response = client.facet(cold, key=PAYLOAD_USER_ID, limit=limit, exact=True)
+    if len(response.hits) < limit:
+        return {str(hit.value) for hit in response.hits}
+
+    logger.warning(f"コールド層 {cold} のユーザー数がファセットの上限 ({limit}件) に達したため、全ポイントから集計します")
+    user_ids: Set[str] = set()
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            cold, limit=batch_size, offset=offset, with_payload=[PAYLOAD_USER_ID], with_vectors=False)
+        user_ids.update(
+            str(record.payload[PAYLOAD_USER_ID]) for record in records
+            if (record.payload or {}).get(PAYLOAD_USER_ID) is not None)
+        if offset is None:
+            return user_ids
+
+
+def chunked(values: Sequence, size: int) -> List[Sequence]:
+    """シーケンスを指定した件数ごとに分割します。
+
+    Args:
+        values: 分割するシーケンス
+        size: 1つあたりの件数
+
+    Returns:
+        List[Sequence]: 分割したシーケンスのリスト
+    """
+    return [values[i:i + size] for i in range(0, len(values), size)]
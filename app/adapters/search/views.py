@@ -0,0 +1,30 @@
+"""Qdrant呼び出しの計測値を公開するビュー。"""
+
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from app.adapters.search.instrumentation import PrometheusMetricsSink, get_metrics_sink
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics_view(request):  # pylint: disable=unused-argument
+    """計測値をPrometheusのテキスト形式で返します。
+
+    ``QDRANT_METRICS_SINK`` が 'prometheus' 以外の場合は404を返します。
+    内部ネットワークからのスクレイプのみを想定しているため、公開する場合はリバースプロキシで制限してください。
+
+    Args:
+        request: HTTPリクエスト
+
+    Returns:
+        HttpResponse: テキスト形式の計測値
+
+    Raises:
+        Http404: Prometheus形式の計測が無効な場合
+    """
+    sink = get_metrics_sink()
+    if not isinstance(sink, PrometheusMetricsSink):
+        raise Http404("Prometheus形式の計測は無効です")
+    return HttpResponse(sink.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,170 @@
+"""起動後にQdrantコレクションを温めるウォームアップ処理のモジュール。
+
+Qdrantの再起動やワーカーのデプロイ直後は、メモリマップされたセグメント（HNSWグラフ・ベクトル・
+ペイロード）がページキャッシュに載っておらず、最初の検索が極端に遅くなります。
+``warm_up_collections()`` はコレクションごとに保存済みのポイントをランダムに抽出し、そのベクトルと
+ユーザーIDで通常の検索と同じ経路のクエリを発行して、実際の検索で参照されるページを読み込ませます。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Sample, SampleQuery
+
+from app.adapters.search.bulk_transfer import split_vector
+from app.adapters.search.collection_config import DENSE_VECTOR_NAME, get_collection_config
+from app.adapters.search.payload_schema import PAYLOAD_USER_ID
+from app.adapters.search.qdrant_manager import get_qdrant_client
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.core.search.gateways import SearchFilter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WarmupResult:
+    """コレクションのウォームアップの結果。
+
+    Attributes:
+        collection_name: コレクション名
+        queries: 発行した検索クエリ数
+        failures: 失敗した検索クエリ数
+        elapsed_seconds: 所要時間（秒）
+    """
+    collection_name: str
+    queries: int
+    failures: int
+    elapsed_seconds: float
+
+
+def get_warmup_collections() -> List[str]:
+    """ウォームアップ対象のコレクション名を返します。
+
+    Returns:
+        List[str]: ``QDRANT_WARMUP_COLLECTIONS``。未設定の場合は文書用とQ&Aペア用のコレクション
+    """
+    collections = getattr(settings, 'QDRANT_WARMUP_COLLECTIONS', None)
+    if collections:
+        return list(collections)
+    return [settings.QDRANT_COLLECTION_DOCUMENTS, settings.QDRANT_COLLECTION_QA]
+
+
+def sample_queries(client: QdrantClient, collection_name: str, count: int) -> List[tuple]:
+    """保存済みのポイントをランダムに抽出し、検索に用いるベクトルと絞り込み条件を返します。
+
+    Args:
+        client: Qdrantクライアント
+        collection_name: コレクション名
+        count: 抽出するポイント数
+
+    Returns:
+        List[tuple]: (クエリベクトル, SearchFilter) のリスト
+    """
+    config = get_collection_config(collection_name)
+    response = client.query_points(
+        collection_name,
+        query=SampleQuery(sample=Sample.RANDOM),
+        limit=count,
+        with_payload=[PAYLOAD_USER_ID],
+        with_vectors=[DENSE_VECTOR_NAME] if config.hybrid else True,
+    )
+    queries = []
+    for point in response.points:
+        dense, _ = split_vector(point.vector)
+        if dense is None:
+            continue
+        user_id = (point.payload or {}).get(PAYLOAD_USER_ID)
+        queries.append((dense, SearchFilter(user_id=user_id) if user_id is not None else None))
+    return queries
+
+
+def warm_up_collection(
+    collection_name: str,
+    client: Optional[QdrantClient] = None,
+    queries: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> WarmupResult:
+    """コレクションに代表的な検索クエリを発行してウォームアップします。
+
+    Args:
+        collection_name: コレクション名
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        queries: 発行する検索クエリ数。省略時は ``QDRANT_WARMUP_QUERIES``
+        limit: 1回の検索で取得する件数。省略時は ``QDRANT_WARMUP_LIMIT``
+
+    Returns:
+        WarmupResult: ウォームアップの結果
+    """
+    client = client or get_qdrant_client()
+    queries = queries or getattr(settings, 'QDRANT_WARMUP_QUERIES', 32)
+    limit = limit or getattr(settings, 'QDRANT_WARMUP_LIMIT', 10)
+    gateway = QdrantSearchGateway(client=client)
+
+    started = time.monotonic()
+    samples = sample_queries(client, collection_name, queries)
+    failures = 0
+    for vector, search_filter in samples:
+        try:
+            gateway.search(collection_name, vector, search_filter, limit)
+        except Exception as e:  # pylint: disable=broad-except
+            failures += 1
+            logger.debug(f"コレクション {collection_name} のウォームアップ検索に失敗しました: {e}")
+    elapsed = time.monotonic() - started
+    failure_note = f" (失敗 {failures}件)" if failures else ""
+    logger.info(f"コレクション {collection_name} をウォームアップしました: {len(samples)}件のクエリ, {elapsed:.2f}秒{failure_note}")
+    return WarmupResult(collection_name, len(samples), failures, elapsed)
+
+
+def warm_up_collections(
+    collections: Optional[Sequence[str]] = None,
+    client: Optional[QdrantClient] = None,
+    queries: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[WarmupResult]:
+    """複数のコレクションを順にウォームアップします。
+
+    存在しないコレクションなどで失敗した場合は、ログに記録して次のコレクションに進みます。
+
+    Args:
+        collections: コレクション名。省略時は ``get_warmup_collections()``
+        client: Qdrantクライアント。省略時は ``get_qdrant_client()``
+        queries: コレクションごとに発行する検索クエリ数
+        limit: 1回の検索で取得する件数
+
+    Returns:
+        List[WarmupResult]: ウォームアップできたコレクションの結果
+    """
+    client = client or get_qdrant_client()
+    results = []
+    for collection_name in collections or get_warmup_collections():
+        try:
+            results.append(warm_up_collection(collection_name, client, queries, limit))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"コレクション {collection_name} のウォームアップに失敗しました: {e}")
+    return results
+
+
+def _run_warmup() -> None:
+    """ウォームアップを実行します。接続できない場合も例外をスレッドの外に出さずにログに記録します。"""
+    try:
+        warm_up_collections()
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning(f"Qdrantのウォームアップに失敗しました: {e}")
+
+
+def start_warmup_thread() -> threading.Thread:
+    """バックグラウンドのスレッドでウォームアップを開始します。
+
+    プロセスの終了を妨げないよう、デーモンスレッドとして実行します。
+
+    Returns:
+        threading.Thread: 開始したスレッド
+    """
+    thread = threading.Thread(target=_run_warmup, name='qdrant-warmup', daemon=True)
+    thread.start()
+    return thread
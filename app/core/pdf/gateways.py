@@ -0,0 +1,85 @@
+"""PDF関連のゲートウェイを定義するモジュール。
+
+PDFのページを画像化するためのインターフェースと、画像化したページの値オブジェクトを提供します。
+PopplerなどのライセンスやOSパッケージに依存する画像化の実装はAdapter層に置きます。
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+
+class PdfRasterizeError(Exception):
+    """PDFの読み込み・画像化に失敗した場合のエラー"""
+
+
+class PdfToolNotInstalledError(PdfRasterizeError):
+    """画像化に用いるツール（Popplerなど）がインストールされていない場合のエラー
+
+    PDFの内容ではなくサーバーの構成の問題であるため、呼び出し元はPDFの不備として扱わないでください。
+    """
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    """画像化した1ページ。
+
+    Attributes:
+        page_number: ページ番号（1始まり）
+        path: 画像ファイルのパス
+        width: 画像の幅（ピクセル）
+        height: 画像の高さ（ピクセル）
+        dpi: 画像化した解像度。不明な場合はNone
+        grayscale: グレースケールで画像化したかどうか
+    """
+    page_number: int
+    path: str
+    width: int
+    height: int
+    dpi: Optional[int] = None
+    grayscale: bool = False
+
+
+class PdfRasterizerGateway(ABC):
+    """PDFのページを画像化するためのインターフェース。
+
+    大きな文書でもメモリ使用量がページ数に比例しないよう、実装はページを逐次画像化してストレージに書き出し、
+    書き出したページの情報のみを返します。
+    """
+
+    @abstractmethod
+    def get_page_count(self, pdf_path: str) -> int:
+        """PDFのページ数を返す。
+
+        Args:
+            pdf_path: PDFファイルのパス
+
+        Returns:
+            ページ数
+
+        Raises:
+            PdfToolNotInstalledError: 画像化に用いるツールがインストールされていない場合
+            PdfRasterizeError: PDFを読み込めない場合
+        """
+
+    @abstractmethod
+    def render_pages(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+    ) -> Iterator[RenderedPage]:
+        """PDFのページを画像化して出力先に書き出し、書き出したページを順に返す。
+
+        Args:
+            pdf_path: PDFファイルのパス
+            output_dir: 画像の出力先ディレクトリ
+            first_page: 画像化する最初のページ（1始まり）。省略時は先頭ページ
+            last_page: 画像化する最後のページ。省略時は最終ページ
+
+        Returns:
+            ページ番号の昇順に、書き出したページを逐次返すイテレータ
+
+        Raises:
+            PdfRasterizeError: PDFの読み込み・画像化に失敗した場合
+        """
@@ -0,0 +1,282 @@
+"""検索関連のゲートウェイを定義するモジュール。
+
+ベクトル検索・ポイント登録のためのインターフェースと、検索条件・検索結果・登録ポイントの値オブジェクトを提供します。
+"""
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+PointId = Union[int, str]
+
+
+class SearchUnavailableError(Exception):
+    """検索基盤が利用できない場合のエラー"""
+
+
+class SearchTimeoutError(SearchUnavailableError):
+    """検索が期限内に完了しなかった場合のエラー"""
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """検索対象を絞り込む条件。
+
+    すべての検索は原則として1ユーザーのデータに限定されます。
+
+    Attributes:
+        user_id: 検索対象のユーザーID
+        document_ids: 検索対象の文書ID。空の場合は全文書が対象
+        tags: いずれかを含む文書に限定するタグ。空の場合は制限なし
+    """
+    user_id: Optional[Union[int, str]] = None
+    document_ids: Sequence[str] = field(default_factory=tuple)
+    tags: Sequence[str] = field(default_factory=tuple)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """検索結果の1件。
+
+    Attributes:
+        point_id: ポイントID
+        score: 類似度スコア（大きいほど類似）
+        payload: ポイントに付随するペイロード
+    """
+    point_id: PointId
+    score: float
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class SearchGroup:
+    """文書単位にグループ化した検索結果。
+
+    Attributes:
+        group_id: グループのキー（文書ID）
+        hits: グループ内の検索結果（スコアの降順）
+    """
+    group_id: Union[int, str]
+    hits: Sequence[SearchHit] = field(default_factory=tuple)
+
+    @property
+    def score(self) -> float:
+        """グループ内の最高スコアを返します。
+
+        Returns:
+            float: 最高スコア。検索結果が無い場合は0.0
+        """
+        return self.hits[0].score if self.hits else 0.0
+
+
+@dataclass(frozen=True)
+class SearchRequest:
+    """バッチ検索の1件のクエリ。
+
+    Attributes:
+        collection_name: 検索対象のコレクション名
+        query_vector: クエリベクトル
+        search_filter: 検索対象の絞り込み条件
+        limit: 取得する最大件数
+        query_text: キーワード検索に用いるクエリテキスト。指定した場合はハイブリッド検索を行う
+    """
+    collection_name: str
+    query_vector: Sequence[float]
+    search_filter: Optional[SearchFilter] = None
+    limit: int = 10
+    query_text: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class BatchSearchResult:
+    """バッチ検索の結果。
+
+    Attributes:
+        results: リクエストと同じ順序で並んだクエリごとの検索結果
+        timings: コレクション名ごとの所要時間（秒）
+    """
+    results: Sequence[List[SearchHit]]
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def merged(self, requests: Sequence[SearchRequest], collection_name: str) -> List[SearchHit]:
+        """指定したコレクションに対するクエリの結果を、ポイントIDで重複を除いてスコアの降順にまとめます。
+
+        同じポイントが複数のクエリでヒットした場合は最高スコアを採用します。
+
+        Args:
+            requests: バッチ検索に渡したクエリ
+            collection_name: まとめる対象のコレクション名
+
+        Returns:
+            List[SearchHit]: スコアの降順に並んだ検索結果
+        """
+        best: Dict[PointId, SearchHit] = {}
+        for request, hits in zip(requests, self.results):
+            if request.collection_name != collection_name:
+                continue
+            for hit in hits:
+                if hit.point_id not in best or hit.score > best[hit.point_id].score:
+                    best[hit.point_id] = hit
+        return sorted(best.values(), key=lambda hit: hit.score, reverse=True)
+
+
+@dataclass(frozen=True)
+class IndexPoint:
+    """ベクトル検索基盤に登録する1件のポイント。
+
+    Attributes:
+        point_id: ポイントID
+        vector: 密ベクトル
+        payload: ポイントに付随するペイロード
+        text: キーワード検索用の疎ベクトルを生成するテキスト（ハイブリッド構成の場合のみ使用）
+    """
+    point_id: PointId
+    vector: Sequence[float]
+    payload: Dict[str, Any] = field(default_factory=dict)
+    text: Optional[str] = None
+
+
+class SearchGateway(ABC):
+    """ベクトル検索のためのインターフェース。
+
+    UseCase層はこのインターフェースに依存し、Qdrantなどの具体的な実装はAdapter層に置きます。
+    """
+
+    @abstractmethod
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """クエリベクトルに類似するポイントを検索する。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            スコアの降順に並んだ検索結果
+        """
+
+    def hybrid_search(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        query_text: str,
+        search_filter: Optional[SearchFilter] = None,
+        limit: int = 10,
+    ) -> List[SearchHit]:
+        """密ベクトルによる意味検索とキーワード検索を組み合わせて検索する。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            query_text: キーワード検索に用いるクエリテキスト
+            search_filter: 検索対象の絞り込み条件
+            limit: 取得する最大件数
+
+        Returns:
+            融合後のスコアの降順に並んだ検索結果
+
+        Raises:
+            NotImplementedError: 実装がハイブリッド検索に対応していない場合
+        """
+        raise NotImplementedError(f"{type(self).__name__} はハイブリッド検索に対応していません")
+
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        search_filter: Optional[SearchFilter] = None,
+        group_limit: int = 5,
+        group_size: int = 3,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> List[SearchGroup]:
+        """クエリベクトルに類似するポイントを文書ごとにグループ化して検索する。
+
+        1つの文書の結果が上位を占有しないよう、文書ごとに最大 ``group_size`` 件、
+        最大 ``group_limit`` 文書分の結果を返す。
+
+        Args:
+            collection_name: 検索対象のコレクション名
+            query_vector: クエリベクトル
+            search_filter: 検索対象の絞り込み条件
+            group_limit: 取得する最大文書数
+            group_size: 1文書あたりの最大件数
+            payload_fields: 結果に含めるペイロードのキー。Noneの場合はすべて
+
+        Returns:
+            最高スコアの降順に並んだ文書ごとの検索結果
+
+        Raises:
+            NotImplementedError: 実装がグループ化検索に対応していない場合
+        """
+        raise NotImplementedError(f"{type(self).__name__} はグループ化検索に対応していません")
+
+    def search_batch(self, requests: Sequence[SearchRequest]) -> BatchSearchResult:
+        """複数のクエリ（複数コレクション・複数のクエリ表現）をまとめて検索する。
+
+        既定の実装は各クエリを順に実行する。実装はコレクションごとのバッチAPIや並列実行で上書きできる。
+
+        Args:
+            requests: 検索するクエリ
+
+        Returns:
+            クエリごとの検索結果とコレクションごとの所要時間
+        """
+        results: List[List[SearchHit]] = []
+        timings: Dict[str, float] = {}
+        for request in requests:
+            started = time.monotonic()
+            if request.query_text is not None:
+                hits = self.hybrid_search(request.collection_name, request.query_vector, request.query_text,
+                                          request.search_filter, request.limit)
+            else:
+                hits = self.search(request.collection_name, request.query_vector, request.search_filter, request.limit)
+            results.append(hits)
+            timings[request.collection_name] = timings.get(request.collection_name, 0.0) + time.monotonic() - started
+        return BatchSearchResult(results=results, timings=timings)
+
+
+class PointWriterGateway(ABC):
+    """ポイントをまとめて登録するためのインターフェース。
+
+    ``add()`` したポイントは実装側でバッチにまとめて送信されます。
+    文書の登録完了時には ``flush()`` を呼び出し、すべてのポイントが検索可能になるまで待機します。
+    """
+
+    @abstractmethod
+    def add(self, collection_name: str, points: Iterable[IndexPoint]) -> None:
+        """ポイントを登録キューに追加する。
+
+        Args:
+            collection_name: 登録先のコレクション名
+            points: 登録するポイント
+        """
+
+    @abstractmethod
+    def flush(self) -> int:
+        """キューに残っているポイントを送信し、すべての登録が反映されるまで待機する。
+
+        Returns:
+            前回のflush以降に登録したポイント数
+        """
+
+    def close(self) -> None:
+        """実装が保持するリソースを解放する。"""
+
+    def __enter__(self) -> 'PointWriterGateway':
+        """コンテキストマネージャーとして自身を返す。"""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """正常終了時はflushし、リソースを解放する。"""
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
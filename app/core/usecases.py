@@ -6,7 +6,7 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Generic, TypeVar
+from typing import Generic, Iterable, TypeVar
 
 InputType = TypeVar('InputType')
 OutputType = TypeVar('OutputType')
@@ -188,6 +188,45 @@ class LoginUserUseCase(ABC):
         """
 
 
+# --- アップロード検証関連 ---
+@dataclass(frozen=True)
+class ValidateUploadInputData:
+    """アップロード検証入力データ"""
+    user_id: int
+    filename: str
+    chunks: Iterable[bytes]
+
+
+@dataclass(frozen=True)
+class ValidateUploadOutputData:
+    """アップロード検証出力データ"""
+    path: str
+    size_bytes: int
+    page_count: int
+
+
+class ValidateUploadUseCase(ABC):
+    """アップロード検証ユースケース
+
+    アップロードされたPDFをユーザー設定の上限で検証し、処理を開始する前に上限を超える文書を拒否します。
+    """
+
+    @abstractmethod
+    def execute(self, input_data: ValidateUploadInputData) -> ValidateUploadOutputData:
+        """アップロード検証処理を実行します。
+
+        Args:
+            input_data: アップロード検証に必要な入力データ
+
+        Returns:
+            ValidateUploadOutputData: 保存したPDFの情報
+
+        Raises:
+            UploadValidationError: アップロードされたファイルが上限を超える、またはPDFとして読み込めない場合
+            PdfToolNotInstalledError: ページ数の取得に用いるツールがインストールされていない場合（サーバーの構成の問題）
+        """
+
+
 # --- カスタム例外 ---
 class RegistrationError(Exception):
     """ユーザー登録処理中のエラーの基底クラス"""
@@ -211,3 +250,19 @@ class InvalidEmailFormatError(RegistrationError):
 
 class AuthenticationError(Exception):
     """認証失敗時のエラー"""
+
+
+class UploadValidationError(Exception):
+    """アップロード検証のエラーの基底クラス"""
+
+
+class FileTooLargeError(UploadValidationError):
+    """ファイルサイズがユーザー設定の上限を超える場合のエラー"""
+
+
+class TooManyPagesError(UploadValidationError):
+    """ページ数がユーザー設定の上限を超える場合のエラー"""
+
+
+class InvalidPdfError(UploadValidationError):
+    """PDFとして読み込めない場合のエラー"""
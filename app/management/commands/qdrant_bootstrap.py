@@ -0,0 +1,80 @@
+"""Qdrantコレクションの作成・検証をデプロイ時に一度だけ実行する管理コマンド。
+
+各Webワーカー・Celeryワーカーの起動時にQdrantへ問い合わせる代わりに、
+このコマンドでコレクションを作成・検証し、スキーマ検証済みマーカーを記録します。
+``--warmup`` を指定すると、続けて代表的な検索を発行してコレクションをウォームアップします。
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from app.adapters.search.schema_marker import (
+    bootstrap_schema,
+    compute_schema_fingerprint,
+    is_schema_verified,
+)
+from app.adapters.search.warmup import warm_up_collections
+
+
+class Command(BaseCommand):
+    """Qdrantコレクションを作成・検証し、スキーマ検証済みマーカーを記録するコマンド"""
+    help = 'Qdrantコレクションを作成・検証し、スキーマ検証済みマーカーを記録します。'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数を追加します。
+
+        Args:
+            parser: 引数パーサー
+        """
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='検証済みマーカーが存在してもコレクションの検証を実行します。'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='検証済みマーカーの有無のみを確認し、未検証の場合はエラー終了します。'
+        )
+        parser.add_argument(
+            '--warmup',
+            action='store_true',
+            help='検証後に代表的な検索を発行してコレクションをウォームアップします。'
+        )
+
+    def handle(self, *args, **options):
+        """コマンドを実行します。
+
+        Args:
+            *args: 位置引数
+            **options: コマンドラインオプション
+
+        Raises:
+            CommandError: 検証に失敗した場合、または --check で未検証の場合
+        """
+        fingerprint = compute_schema_fingerprint()
+
+        if options['check']:
+            if not is_schema_verified():
+                raise CommandError(f"Qdrantスキーマは未検証です (fingerprint={fingerprint[:12]})")
+            self.stdout.write(self.style.SUCCESS(f"Qdrantスキーマは検証済みです (fingerprint={fingerprint[:12]})"))
+            return
+
+        if not options['force'] and is_schema_verified():
+            self.stdout.write(f"Qdrantスキーマは検証済みのためスキップしました (fingerprint={fingerprint[:12]})")
+        else:
+            try:
+                marker = bootstrap_schema()
+            except Exception as e:
+                raise CommandError(f"Qdrantコレクションの作成・検証に失敗しました: {e}") from e
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Qdrantコレクションを検証し、マーカーを記録しました (fingerprint={marker['fingerprint'][:12]})"))
+
+        if options['warmup']:
+            self._warm_up()
+
+    def _warm_up(self):
+        """コレクションをウォームアップし、所要時間を出力します。"""
+        for result in warm_up_collections():
+            self.stdout.write(
+                f"{result.collection_name}: {result.queries}件のクエリでウォームアップしました "
+                f"({result.elapsed_seconds:.2f}秒, 失敗 {result.failures}件)")
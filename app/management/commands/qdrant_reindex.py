@@ -0,0 +1,98 @@
+"""Qdrantコレクションを現在の設定で再インデックスする管理コマンド。
+
+新しいバージョンの物理コレクション（例: ``documents_v3``）を作成して既存のポイントをコピーし、
+論理名のエイリアスをアトミックに切り替えます。ベクトル次元数や埋め込みモデル、
+ハイブリッド構成を変更した場合も、検索を止めずに移行できます。
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from app.adapters.search.reindex import reindex_collection
+from app.adapters.search.schema_marker import write_schema_marker
+
+
+class Command(BaseCommand):
+    """Qdrantコレクションを再インデックスし、エイリアスを切り替えるコマンド"""
+    help = 'Qdrantコレクションを新しい物理コレクションへ再インデックスし、エイリアスを切り替えます。'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数を追加します。
+
+        Args:
+            parser: 引数パーサー
+        """
+        parser.add_argument(
+            'collections',
+            nargs='*',
+            help='再インデックスするコレクションの論理名。省略時は全コレクション'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=256,
+            help='1回のscroll・upsertで扱うポイント数（既定: 256）'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='並列にupsertするスレッド数（既定: 4）'
+        )
+        parser.add_argument(
+            '--embedder',
+            help='ペイロードのリストから新しいベクトルのリストを生成する関数のドットパス。'
+                 'ベクトル次元数や埋め込みモデルを変更する場合に指定します。'
+        )
+        parser.add_argument(
+            '--text-field',
+            help='疎ベクトルを生成するペイロードのテキストのキー。'
+                 '疎ベクトルを持たないコレクションをハイブリッド構成に移行する場合に指定します。'
+        )
+        parser.add_argument(
+            '--drop-old',
+            action='store_true',
+            help='エイリアス切り替え後に移行元の物理コレクションを削除します。'
+        )
+
+    def handle(self, *args, **options):
+        """コマンドを実行します。
+
+        Args:
+            *args: 位置引数
+            **options: コマンドラインオプション
+
+        Raises:
+            CommandError: 再インデックスに失敗した場合
+        """
+        collections = options['collections'] or [
+            settings.QDRANT_COLLECTION_DOCUMENTS,
+            settings.QDRANT_COLLECTION_QA,
+        ]
+        try:
+            embedder = import_string(options['embedder']) if options['embedder'] else None
+        except ImportError as e:
+            raise CommandError(f"embedder を読み込めません: {e}") from e
+
+        for collection_name in collections:
+            self.stdout.write(f"コレクション {collection_name} を再インデックスしています...")
+            try:
+                result = reindex_collection(
+                    collection_name,
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    embedder=embedder,
+                    drop_source=options['drop_old'],
+                    text_field=options['text_field'],
+                )
+            except Exception as e:
+                raise CommandError(f"コレクション {collection_name} の再インデックスに失敗しました: {e}") from e
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{result.collection_name}: {result.source} -> {result.target} "
+                f"({result.points_copied}件, {result.elapsed_seconds:.1f}秒)"))
+            if not result.source_dropped:
+                self.stdout.write(f"移行元の {result.source} は残しています。不要になったら削除してください。")
+
+        # 現在の設定でスキーマを作成・検証したため、検証済みマーカーを更新する
+        write_schema_marker()
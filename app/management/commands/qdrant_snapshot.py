@@ -0,0 +1,109 @@
+"""Qdrantコレクションのスナップショットを書き出し・復元する管理コマンド。
+
+書き出しはペイロードの値で分割したパーティションごとに並列のscrollカーソルで読み出し、
+密ベクトルをNumPy配列、ペイロードをJSON Linesとしてシャード単位で保存します。
+復元は新しいバージョンの物理コレクションにシャードを並列に ``wait=False`` で登録し、
+全ポイントの反映後にエイリアスを切り替えます。
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from app.adapters.search.bulk_transfer import export_collection
+from app.adapters.search.payload_schema import PAYLOAD_USER_ID
+from app.adapters.search.qdrant_manager import get_qdrant_client
+from app.adapters.search.reindex import restore_collection
+
+
+class Command(BaseCommand):
+    """Qdrantコレクションのスナップショットを書き出し・復元するコマンド"""
+    help = 'Qdrantコレクションのスナップショットを書き出し (export)・復元 (import) します。'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数を追加します。
+
+        Args:
+            parser: 引数パーサー
+        """
+        parser.add_argument('action', choices=['export', 'import'], help='実行する操作')
+        parser.add_argument('collection', help='コレクションの論理名')
+        parser.add_argument('directory', help='スナップショットのディレクトリ')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='並列に読み出すカーソル数、または並列に復元するシャード数（既定: 4）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='1回のscroll・upsertで扱うポイント数（既定: 1000）'
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            default=100000,
+            help='書き出し時の1シャードあたりの最大ポイント数（既定: 100000）'
+        )
+        parser.add_argument(
+            '--float16',
+            action='store_true',
+            help='書き出し時に密ベクトルをfloat16で保存し、サイズを半分にします。'
+        )
+        parser.add_argument(
+            '--partition-key',
+            default=PAYLOAD_USER_ID,
+            help=f'書き出し時のパーティション分割に用いるペイロードのキー（既定: {PAYLOAD_USER_ID}）'
+        )
+        parser.add_argument(
+            '--drop-old',
+            action='store_true',
+            help='復元後に既存の物理コレクションを削除します。'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=600.0,
+            help='復元したポイントが反映されるまでの最大待機時間（秒、既定: 600）'
+        )
+
+    def handle(self, *args, **options):
+        """コマンドを実行します。
+
+        Args:
+            *args: 位置引数
+            **options: コマンドラインオプション
+
+        Raises:
+            CommandError: 書き出し・復元に失敗した場合
+        """
+        collection_name = options['collection']
+        directory = options['directory']
+        try:
+            if options['action'] == 'export':
+                manifest = export_collection(
+                    get_qdrant_client(),
+                    collection_name,
+                    directory,
+                    workers=options['workers'],
+                    batch_size=options['batch_size'],
+                    shard_size=options['shard_size'],
+                    dtype='float16' if options['float16'] else 'float32',
+                    partition_key=options['partition_key'],
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"{collection_name} を書き出しました: {manifest['point_count']}件, "
+                    f"{len(manifest['shards'])}シャード -> {directory}"))
+            else:
+                result = restore_collection(
+                    directory,
+                    collection_name,
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    drop_source=options['drop_old'],
+                    timeout=options['timeout'],
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"{collection_name} を復元しました: {result.target} ({result.points_copied}件, "
+                    f"{result.elapsed_seconds:.1f}秒)"))
+        except Exception as e:
+            raise CommandError(f"コレクション {collection_name} の {options['action']} に失敗しました: {e}") from e
@@ -3,6 +3,7 @@
 共通設定ファイル - 環境に依存しない設定を記述します
 """
 
+import json
 import os
 from pathlib import Path
 
@@ -44,6 +45,8 @@ AUTH_USER_MODEL = 'app.CustomUser'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'csp.middleware.CSPMiddleware',  # CSPミドルウェアを追加
+    'app.adapters.search.middleware.QdrantRequestLogMiddleware',  # Qdrant呼び出しをリクエストログに出力
+    'app.adapters.search.middleware.SearchRequestBudgetMiddleware',  # リクエスト内の検索に時間予算を設定
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -257,6 +260,48 @@ QDRANT_PORT = int(os.environ.get('QDRANT_PORT', 6334))  # デフォルトを6334
 # Qdrantへの接続タイムアウト設定（秒）
 QDRANT_TIMEOUT = float(os.environ.get('QDRANT_TIMEOUT', '10.0'))
 
+# 非同期クライアントプールのサイズ（1プロセスあたりのgRPCチャネル数の上限）
+QDRANT_ASYNC_POOL_SIZE = int(os.environ.get('QDRANT_ASYNC_POOL_SIZE', 4))
+
+# 検索の耐障害性設定
+# 1回の検索呼び出しのタイムアウト（秒）。リクエストの時間予算が残り少ない場合はそちらが優先される
+QDRANT_SEARCH_TIMEOUT = float(os.environ.get('QDRANT_SEARCH_TIMEOUT', '3.0'))
+# 連続してこの回数失敗したらサーキットを開き、QDRANT_CIRCUIT_RESET_TIMEOUT 秒間は即座に失敗させる
+QDRANT_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('QDRANT_CIRCUIT_FAILURE_THRESHOLD', 5))
+QDRANT_CIRCUIT_RESET_TIMEOUT = float(os.environ.get('QDRANT_CIRCUIT_RESET_TIMEOUT', '30.0'))
+# ヘッジリクエスト先のレプリカノード。未設定の場合はヘッジしない
+QDRANT_REPLICA_HOST = os.environ.get('QDRANT_REPLICA_HOST') or None
+QDRANT_REPLICA_PORT = int(os.environ.get('QDRANT_REPLICA_PORT', QDRANT_PORT))
+# プライマリの応答がレイテンシのこのパーセンタイルを超えたらレプリカにも問い合わせる
+QDRANT_HEDGE_PERCENTILE = float(os.environ.get('QDRANT_HEDGE_PERCENTILE', '95'))
+# レイテンシの計測値が少ない間に用いるヘッジ待ち時間と、待ち時間の下限（秒）
+QDRANT_HEDGE_DEFAULT_DELAY = float(os.environ.get('QDRANT_HEDGE_DEFAULT_DELAY', '0.2'))
+QDRANT_HEDGE_MIN_DELAY = float(os.environ.get('QDRANT_HEDGE_MIN_DELAY', '0.02'))
+# レプリカ設定時に検索を実行するスレッドプールのサイズ（1プロセスあたり）。
+# 同時に実行できる検索数の上限になるため、サーバーの1プロセスあたりのスレッド数以上を指定する
+QDRANT_HEDGE_MAX_WORKERS = int(os.environ.get('QDRANT_HEDGE_MAX_WORKERS', 64))
+# 1回のHTTPリクエスト内の検索全体の時間予算（秒）。0の場合は時間予算を設けない
+QDRANT_REQUEST_BUDGET = float(os.environ.get('QDRANT_REQUEST_BUDGET', '10.0'))
+
+# ポイント登録（インジェスト）の設定
+# 1回のupsertで送信する最大ポイント数と最大サイズ（バイト、ベクトル・ペイロードの概算）
+QDRANT_UPSERT_BATCH_SIZE = int(os.environ.get('QDRANT_UPSERT_BATCH_SIZE', 256))
+QDRANT_UPSERT_MAX_BATCH_BYTES = int(os.environ.get('QDRANT_UPSERT_MAX_BATCH_BYTES', 8 * 1024 * 1024))
+# 同時に送信中にできるupsertリクエスト数。上限に達するとadd()の呼び出し元を待機させる
+QDRANT_UPSERT_MAX_IN_FLIGHT = int(os.environ.get('QDRANT_UPSERT_MAX_IN_FLIGHT', 4))
+# 最適化中のコレクションで未インデックスのポイントがこの件数を超えたら、送信を待機する
+QDRANT_UPSERT_MAX_UNINDEXED = int(os.environ.get('QDRANT_UPSERT_MAX_UNINDEXED', 100000))
+# コレクションの状態を確認する間隔（秒）と、最適化の追いつきを待つ最大時間（秒）
+QDRANT_UPSERT_STATUS_INTERVAL = float(os.environ.get('QDRANT_UPSERT_STATUS_INTERVAL', '5.0'))
+QDRANT_UPSERT_BACKPRESSURE_TIMEOUT = float(os.environ.get('QDRANT_UPSERT_BACKPRESSURE_TIMEOUT', '300.0'))
+
+# Qdrant呼び出しの計測値（レイテンシ・返却件数・エラー・再試行・サーキット状態）の送信先
+# 'none': 計測しない / 'prometheus': /metrics/qdrant でテキスト形式を公開 / 'statsd': UDPで送信
+QDRANT_METRICS_SINK = os.environ.get('QDRANT_METRICS_SINK', 'none').lower()
+QDRANT_STATSD_HOST = os.environ.get('QDRANT_STATSD_HOST', 'localhost')
+QDRANT_STATSD_PORT = int(os.environ.get('QDRANT_STATSD_PORT', 8125))
+QDRANT_STATSD_PREFIX = os.environ.get('QDRANT_STATSD_PREFIX', 'deep_read')
+
 # コレクション名
 QDRANT_COLLECTION_DOCUMENTS = "documents"  # ドキュメント用コレクション名
 QDRANT_COLLECTION_QA = "qa_pairs"         # Q&Aペア用コレクション名
@@ -264,6 +309,121 @@ QDRANT_COLLECTION_QA = "qa_pairs"         # Q&Aペア用コレクション名
 # ベクトルの次元数 - 環境変数から取得またはデフォルト値を使用
 # 一般的なTransformerベースのモデル（例：BERT）のサイズをデフォルトとして設定
 QDRANT_VECTOR_SIZE = int(os.environ.get('QDRANT_VECTOR_SIZE', 768))
+# 密ベクトルの保存形式 ('float32', 'float16', 'uint8')。float16はメモリ使用量を半分にする
+# uint8は埋め込みモデル側で0〜255の整数に量子化したベクトルを登録・検索する場合にのみ使用する
+QDRANT_VECTOR_DATATYPE = os.environ.get('QDRANT_VECTOR_DATATYPE', 'float32').lower()
+# Matryoshka表現の埋め込みを先頭から何次元まで保存するか（例: 768次元のうち256次元）。未設定の場合は切り詰めない
+QDRANT_VECTOR_TRUNCATE_DIM = (
+    int(os.environ['QDRANT_VECTOR_TRUNCATE_DIM']) if os.environ.get('QDRANT_VECTOR_TRUNCATE_DIM') else None)
+
+# コレクションのインデックス・ストレージ設定（全コレクション共通の既定値）
+# HNSWグラフの各ノードの最大エッジ数（大きいほど精度が上がるがメモリを消費する）
+QDRANT_HNSW_M = int(os.environ.get('QDRANT_HNSW_M', 16))
+# HNSWインデックス構築時の探索幅
+QDRANT_HNSW_EF_CONSTRUCT = int(os.environ.get('QDRANT_HNSW_EF_CONSTRUCT', 100))
+# このサイズ(KB)未満のセグメントはHNSWを使わず全件走査する
+QDRANT_HNSW_FULL_SCAN_THRESHOLD = int(os.environ.get('QDRANT_HNSW_FULL_SCAN_THRESHOLD', 10000))
+# ベクトル・ペイロードをメモリではなくディスク(memmap)上に保持するかどうか
+QDRANT_VECTORS_ON_DISK = os.environ.get('QDRANT_VECTORS_ON_DISK', 'False').lower() == 'true'
+QDRANT_ON_DISK_PAYLOAD = os.environ.get('QDRANT_ON_DISK_PAYLOAD', 'False').lower() == 'true'
+# HNSWインデックスを構築するセグメントサイズのしきい値(KB)
+QDRANT_INDEXING_THRESHOLD = int(os.environ.get('QDRANT_INDEXING_THRESHOLD', 20000))
+# セグメントをmemmapに切り替えるしきい値(KB)。未設定の場合はQdrantサーバーの既定値
+QDRANT_MEMMAP_THRESHOLD = int(os.environ['QDRANT_MEMMAP_THRESHOLD']) if os.environ.get('QDRANT_MEMMAP_THRESHOLD') else None
+# ドキュメントコレクションの量子化モード: 'none' / 'scalar' (int8, 約1/4) / 'binary' (約1/32)
+QDRANT_QUANTIZATION_MODE = os.environ.get('QDRANT_QUANTIZATION_MODE', 'none').lower()
+# 量子化済みベクトルを常にメモリ上に保持する（元ベクトルはディスクに置いてもよい）
+QDRANT_QUANTIZATION_ALWAYS_RAM = os.environ.get('QDRANT_QUANTIZATION_ALWAYS_RAM', 'True').lower() == 'true'
+# 検索時に量子化ベクトルで候補を多めに取得し、元ベクトルで再スコアリングする
+QDRANT_QUANTIZATION_RESCORE = os.environ.get('QDRANT_QUANTIZATION_RESCORE', 'True').lower() == 'true'
+QDRANT_QUANTIZATION_OVERSAMPLING = float(os.environ.get('QDRANT_QUANTIZATION_OVERSAMPLING', '2.0'))
+# 検索時のHNSW探索幅。未設定の場合はQdrantサーバーの既定値
+QDRANT_HNSW_EF_SEARCH = int(os.environ['QDRANT_HNSW_EF_SEARCH']) if os.environ.get('QDRANT_HNSW_EF_SEARCH') else None
+# ハイブリッド検索（名前付きの密ベクトル + BM25形式の疎ベクトル）を有効にするかどうか
+# 既存のコレクションには反映されないため、有効化する場合は `manage.py qdrant_reindex` で再インデックスする
+QDRANT_HYBRID_SEARCH = os.environ.get('QDRANT_HYBRID_SEARCH', 'False').lower() == 'true'
+# ハイブリッド検索で、密ベクトル・疎ベクトルそれぞれから融合前に取得する候補数
+QDRANT_HYBRID_PREFETCH_LIMIT = int(os.environ.get('QDRANT_HYBRID_PREFETCH_LIMIT', 50))
+
+# 非アクティブなユーザー・古い文書のポイントを移動するコールド層（ディスク保存・量子化したコレクション）
+QDRANT_COLD_TIER_ENABLED = os.environ.get('QDRANT_COLD_TIER_ENABLED', 'False').lower() == 'true'
+# コールド層を持つコレクション（カンマ区切り、未設定の場合は文書用のコレクション）と、コールド層のコレクション名の接尾辞
+QDRANT_COLD_TIER_COLLECTIONS = [c for c in os.environ.get('QDRANT_COLD_TIER_COLLECTIONS', '').split(',') if c]
+QDRANT_COLD_TIER_SUFFIX = os.environ.get('QDRANT_COLD_TIER_SUFFIX', '_cold')
+# コールド層のベクトルの量子化モード ('scalar' / 'binary')。量子化済みベクトルのみをメモリ上に保持する
+QDRANT_COLD_TIER_QUANTIZATION = os.environ.get('QDRANT_COLD_TIER_QUANTIZATION', 'scalar').lower()
+# 最終ログインからこの日数が経過したユーザーのポイントをコールド層に移動する
+QDRANT_COLD_TIER_INACTIVE_DAYS = int(os.environ.get('QDRANT_COLD_TIER_INACTIVE_DAYS', 90))
+# ユーザーのポイントがコールド層にあるかどうかの確認結果をキャッシュする時間（秒）
+QDRANT_COLD_TIER_CACHE_TTL = float(os.environ.get('QDRANT_COLD_TIER_CACHE_TTL', '60.0'))
+# ローカル総当たり検索 (LocalSearchGateway) のインデックス保存先
+LOCAL_VECTOR_INDEX_DIR = os.environ.get('LOCAL_VECTOR_INDEX_DIR', str(BASE_DIR / '.vector_index'))
+# ローカルで検索するユーザーあたりの最大ポイント数。これを超えるユーザーはQdrantで検索する
+LOCAL_VECTOR_INDEX_MAX_POINTS = int(os.environ.get('LOCAL_VECTOR_INDEX_MAX_POINTS', 20000))
+# ローカルインデックスを構築してから再構築するまでの時間（秒）。0の場合は破棄されるまで再構築しない
+# ポイントの登録・移動時には破棄されるため、それ以外の経路（他のホストからの書き込みなど）での変更に備えた上限
+LOCAL_VECTOR_INDEX_TTL_SECONDS = float(os.environ.get('LOCAL_VECTOR_INDEX_TTL_SECONDS', 3600))
+# コレクションごとの上書き設定
+# 例: {"documents": {"hnsw_m": 32, "vectors_on_disk": True}}
+QDRANT_COLLECTION_OVERRIDES = json.loads(os.environ.get('QDRANT_COLLECTION_OVERRIDES', '{}'))
+
+# 起動時 (AppConfig.ready) にスキーマが未検証の場合、コレクションの作成・検証を行うかどうか
+# 本番環境では False とし、デプロイ時に `manage.py qdrant_bootstrap` を一度だけ実行する
+QDRANT_BOOTSTRAP_ON_STARTUP = os.environ.get('QDRANT_BOOTSTRAP_ON_STARTUP', 'True').lower() == 'true'
+
+# 起動時 (AppConfig.ready) にバックグラウンドで検索を発行し、コレクションのページキャッシュを温めるかどうか
+# デプロイ時に `manage.py qdrant_bootstrap --warmup` で実行することもできる
+QDRANT_WARMUP_ON_STARTUP = os.environ.get('QDRANT_WARMUP_ON_STARTUP', 'False').lower() == 'true'
+# ウォームアップ対象のコレクション（カンマ区切り、未設定の場合は文書用とQ&Aペア用）
+QDRANT_WARMUP_COLLECTIONS = [c for c in os.environ.get('QDRANT_WARMUP_COLLECTIONS', '').split(',') if c]
+# コレクションごとに発行する検索クエリ数（保存済みのポイントからランダムに抽出）と、1回の検索の取得件数
+QDRANT_WARMUP_QUERIES = int(os.environ.get('QDRANT_WARMUP_QUERIES', 32))
+QDRANT_WARMUP_LIMIT = int(os.environ.get('QDRANT_WARMUP_LIMIT', 10))
+
+# スキーマ検証済みマーカーの保存先
+# QDRANT_SCHEMA_MARKER_REDIS_URL が設定されていればRedisキー、未設定ならファイルに保存する
+QDRANT_SCHEMA_MARKER_REDIS_URL = os.environ.get('QDRANT_SCHEMA_MARKER_REDIS_URL') or None
+QDRANT_SCHEMA_MARKER_KEY = os.environ.get('QDRANT_SCHEMA_MARKER_KEY', 'deep-read:qdrant:schema-marker')
+QDRANT_SCHEMA_MARKER_PATH = os.environ.get(
+    'QDRANT_SCHEMA_MARKER_PATH', str(BASE_DIR / '.qdrant_schema_marker.json'))
+
+# ==============================================================================
+# PDF Rasterization Settings
+# ==============================================================================
+
+# Popplerの実行ファイル (pdftoppm, pdfinfo) のディレクトリ。未設定の場合はPATHから検索する
+POPPLER_PATH = os.environ.get('POPPLER_PATH') or None
+# ページ画像の解像度と形式 (jpg または png)
+PDF_RASTER_DPI = int(os.environ.get('PDF_RASTER_DPI', 200))
+PDF_RASTER_FORMAT = os.environ.get('PDF_RASTER_FORMAT', 'jpg')
+# 1回に画像化するページ数。メモリ上に展開される画像はこのページ数分に制限される
+PDF_RASTER_WINDOW_SIZE = int(os.environ.get('PDF_RASTER_WINDOW_SIZE', 10))
+# 1つの範囲を画像化するpdftoppmのタイムアウト（秒）。超えた場合は画像化に失敗したものとして扱う
+PDF_RASTER_TIMEOUT = int(os.environ.get('PDF_RASTER_TIMEOUT', 300))
+# 同時に画像化する範囲の数（範囲ごとに別のpdftoppmプロセスで実行される）。0の場合はCPUコア数
+PDF_RASTER_WORKERS = int(os.environ.get('PDF_RASTER_WORKERS', 0))
+# 1文書で同時に画像化する範囲の数の上限。複数の文書を同時に処理するワーカーでCPUを専有しないよう制限する
+PDF_RASTER_MAX_WORKERS_PER_DOCUMENT = int(os.environ.get('PDF_RASTER_MAX_WORKERS_PER_DOCUMENT', 8))
+# pdftoppmに画像ファイルを直接書き出させ、PIL画像へのデコード・再エンコードを省略するかどうか
+PDF_RASTER_PATHS_ONLY = os.environ.get('PDF_RASTER_PATHS_ONLY', 'True').lower() == 'true'
+# 画像化の前にページの内容（テキストレイヤーの文字数・画像の面積と色）を調べ、ページごとに解像度と色を決めるかどうか
+PDF_RASTER_ADAPTIVE = os.environ.get('PDF_RASTER_ADAPTIVE', 'False').lower() == 'true'
+# ページの内容を調べるコマンド (pdfinfo, pdftotext, pdfimages) ごとのタイムアウト（秒）。
+# 超えた場合はページの内容を調べずに既定の解像度のカラーで画像化する
+PDF_ANALYSIS_TIMEOUT = int(os.environ.get('PDF_ANALYSIS_TIMEOUT', 60))
+# ページごとの解像度と色を決める方針の上書き設定（項目は app.adapters.pdf.raster_policy.RasterPolicy を参照）
+# 例: {"text_dpi": 150, "text_grayscale": true, "min_text_chars": 200, "max_text_image_coverage": 0.05}
+PDF_RASTER_POLICY = json.loads(os.environ.get('PDF_RASTER_POLICY', '{}'))
+# 画像化したページを (PDFのSHA-256, ページ番号, 解像度, 形式, 色) をキーにキャッシュするかどうかと、その保存先
+# 再アップロードや処理の再実行では、キャッシュ済みのページを画像化せずに再利用する
+PDF_PAGE_CACHE_ENABLED = os.environ.get('PDF_PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+PDF_PAGE_CACHE_DIR = os.environ.get('PDF_PAGE_CACHE_DIR', str(BASE_DIR / '.page_cache'))
+# キャッシュの合計サイズの上限 (MB)。超えた場合は参照日時の古いページから削除する
+PDF_PAGE_CACHE_MAX_MB = int(os.environ.get('PDF_PAGE_CACHE_MAX_MB', 2048))
+# ページ数を取得するpdfinfoのタイムアウト（秒）。超えた場合はPDFを読み込めないものとして扱う
+PDF_PDFINFO_TIMEOUT = int(os.environ.get('PDF_PDFINFO_TIMEOUT', 10))
+# アップロードされたPDFの保存先。ユーザー設定のファイルサイズ・ページ数の上限による検証に合格したPDFのみを残す
+PDF_UPLOAD_DIR = os.environ.get('PDF_UPLOAD_DIR', str(BASE_DIR / '.uploads'))
 
 # ==============================================================================
 # Email Settings
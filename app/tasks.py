@@ -4,7 +4,13 @@
 """
 import time
 import logging
+from datetime import timedelta
+
 from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -40,3 +46,50 @@ def add(self, x, y):
         logger.error(f'Task {self.request.id} failed: {exc}')
         # リトライ間隔を指数関数的に増やす
         raise self.retry(exc=exc, countdown=5**self.request.retries)
+
+
+# 1回の移動で条件に指定するユーザー数の上限
+TIERING_USER_CHUNK_SIZE = 500
+
+
+@shared_task
+def rebalance_cold_tier():
+    """非アクティブなユーザーのポイントをコールド層に移動し、再びアクティブになったユーザーのポイントをホット層に戻す
+
+    最終ログイン（ログインしたことが無い場合は登録日時）から ``QDRANT_COLD_TIER_INACTIVE_DAYS`` 日以上
+    経過したユーザーを非アクティブとみなします。Celery beatなどで定期的に実行してください。
+
+    Returns:
+        dict: コレクションごとの移動したポイント数 ({'documents': {'to_cold': 10, 'to_hot': 2}})
+    """
+    from app.adapters.search.collection_config import get_cold_tier_collections
+    from app.adapters.search.tiering import chunked, list_cold_users, move_to_cold_tier, move_to_hot_tier
+
+    collections = get_cold_tier_collections()
+    if not collections:
+        logger.info('コールド層が無効のため、ポイントの移動をスキップします')
+        return {}
+
+    cutoff = timezone.now() - timedelta(days=settings.QDRANT_COLD_TIER_INACTIVE_DAYS)
+    inactive = Q(last_login__lt=cutoff) | Q(last_login__isnull=True, date_joined__lt=cutoff)
+    users = get_user_model().objects
+    inactive_ids = [str(user_id) for user_id in users.filter(inactive).values_list('id', flat=True)]
+
+    moved = {}
+    for collection_name in collections:
+        to_cold = sum(
+            move_to_cold_tier(collection_name, user_ids=chunk).points_moved
+            for chunk in chunked(inactive_ids, TIERING_USER_CHUNK_SIZE)
+        )
+        # コールド層にポイントを持つユーザーのうち、最近ログインしたユーザーをホット層に戻す
+        cold_users = list_cold_users(collection_name)
+        active_ids = [
+            str(user_id) for user_id in users.exclude(inactive).filter(pk__in=cold_users).values_list('id', flat=True)
+        ]
+        to_hot = sum(
+            move_to_hot_tier(collection_name, user_ids=chunk).points_moved
+            for chunk in chunked(active_ids, TIERING_USER_CHUNK_SIZE)
+        )
+        logger.info(f'{collection_name}: {to_cold}件をコールド層に、{to_hot}件をホット層に移動しました')
+        moved[collection_name] = {'to_cold': to_cold, 'to_hot': to_hot}
+    return moved
@@ -0,0 +1 @@
+"""PDF処理アダプター層テストパッケージです。"""
@@ -0,0 +1,179 @@
+"""ページ画像のキャッシュを参照するPDF画像化のテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+import os
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from app.adapters.pdf.cached_rasterizer import CachedPdfRasterizer, missing_ranges
+from app.adapters.pdf.factory import PdfRasterizerFactory
+from app.adapters.pdf.page_cache import PageImageCache
+from app.adapters.pdf.pdf2image_rasterizer import Pdf2ImageRasterizer
+from app.adapters.pdf.raster_policy import PagePlan
+from app.core.pdf.gateways import RenderedPage
+
+MODULE = 'app.adapters.pdf.pdf2image_rasterizer'
+
+
+def fake_pdftoppm(pdf_path, first_page, last_page, output_folder, output_file, **kwargs):  # pylint: disable=unused-argument
+    """pdftoppmと同じく「接頭辞-ページ番号」の名前で画像を書き出し、そのパスを返すconvert_from_pathの代替"""
+    paths = []
+    for page_number in range(first_page, last_page + 1):
+        path = os.path.join(output_folder, f'{output_file}-{page_number:03d}.jpg')
+        Image.new('L', (40, 50), page_number).save(path)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    """テスト用のPDFファイル（内容のハッシュのみを使用）"""
+    path = tmp_path / 'book.pdf'
+    path.write_bytes(b'%PDF-1.4 book')
+    return str(path)
+
+
+@pytest.fixture
+def convert():
+    """convert_from_pathを代替するモック"""
+    with patch(f'{MODULE}.convert_from_path', side_effect=fake_pdftoppm) as mock, \
+            patch(f'{MODULE}.pdfinfo_from_path', return_value={'Pages': 5}):
+        yield mock
+
+
+@pytest.fixture
+def rasterizer(tmp_path):
+    """キャッシュを参照する画像化の実装"""
+    cache = PageImageCache(str(tmp_path / 'cache'), max_bytes=10 * 1024 * 1024)
+    return CachedPdfRasterizer(Pdf2ImageRasterizer(window_size=2, workers=1, paths_only=True), cache)
+
+
+def rendered_ranges(convert):
+    """convert_from_pathで画像化した範囲"""
+    return [(c.kwargs['first_page'], c.kwargs['last_page']) for c in convert.call_args_list]
+
+
+class TestCachedPdfRasterizer:
+    """CachedPdfRasterizerのテスト"""
+
+    def test_rerender_uses_cache(self, rasterizer, convert, pdf_path, tmp_path):
+        """同じPDFを再度画像化する場合はpdftoppmを呼ばずにキャッシュのページを出力することをテスト"""
+        first = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'first')))
+        assert convert.call_count == 3
+
+        second = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'second')))
+
+        assert convert.call_count == 3
+        assert [page.page_number for page in second] == [1, 2, 3, 4, 5]
+        assert second[0].path == str(tmp_path / 'second' / 'page-0001.jpg')
+        assert (second[0].width, second[0].height) == (40, 50)
+        for before, after in zip(first, second):
+            assert open(before.path, 'rb').read() == open(after.path, 'rb').read()
+
+    def test_renders_only_missing_pages(self, rasterizer, convert, pdf_path, tmp_path):
+        """キャッシュされていないページのみを連続する範囲ごとに画像化し、ページ番号の順に返すことをテスト"""
+        list(rasterizer.render_pages(pdf_path, str(tmp_path / 'first'), first_page=2, last_page=3))
+        convert.reset_mock()
+
+        pages = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'second')))
+
+        assert [page.page_number for page in pages] == [1, 2, 3, 4, 5]
+        assert rendered_ranges(convert) == [(1, 1), (4, 5)]
+
+    def test_different_pdf_is_not_cached(self, rasterizer, convert, pdf_path, tmp_path):
+        """内容が異なるPDFはキャッシュを参照しないことをテスト"""
+        list(rasterizer.render_pages(pdf_path, str(tmp_path / 'first')))
+        other = tmp_path / 'other.pdf'
+        other.write_bytes(b'%PDF-1.4 other')
+        convert.reset_mock()
+
+        list(rasterizer.render_pages(str(other), str(tmp_path / 'second')))
+
+        assert convert.call_count == 3
+
+    def test_evicted_after_lookup(self, rasterizer, convert, pdf_path, tmp_path):
+        """参照後にキャッシュから削除されたページは画像化し直すことをテスト"""
+        with patch.object(rasterizer.cache, 'get', return_value=str(tmp_path / 'evicted.jpg')):
+            pages = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'out'), first_page=1, last_page=2))
+
+        assert [page.page_number for page in pages] == [1, 2]
+        assert rendered_ranges(convert) == [(1, 1), (2, 2)]
+
+    def test_cache_key_follows_page_plan(self, rasterizer, convert, pdf_path, tmp_path):
+        """ページごとの方針の解像度と色をキーにし、方針が変わったページのみ画像化し直すことをテスト"""
+        def plans(first_page, last_page, gray_pages):
+            return [
+                PagePlan(n, 150 if n in gray_pages else 200, n in gray_pages)
+                for n in range(first_page, last_page + 1)
+            ]
+
+        with patch.object(rasterizer.rasterizer, 'plan_pages', side_effect=lambda _, first, last: plans(first, last, {1, 2})):
+            pages = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'first')))
+        assert (pages[0].dpi, pages[0].grayscale) == (150, True)
+        cached_files = sorted(name for _, _, files in os.walk(rasterizer.cache.directory) for name in files)
+        assert cached_files[:2] == ['page-0001-150dpi-gray.jpg', 'page-0002-150dpi-gray.jpg']
+        convert.reset_mock()
+
+        with patch.object(rasterizer.rasterizer, 'plan_pages', side_effect=lambda _, first, last: plans(first, last, {1})):
+            pages = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'second')))
+        assert rendered_ranges(convert) == [(2, 2)]
+        assert convert.call_args.kwargs['dpi'] == 200
+        assert (pages[1].dpi, pages[1].grayscale) == (200, False)
+
+    def test_cache_key_follows_page_number(self, rasterizer, pdf_path, tmp_path):
+        """返されなかったページがある場合も、各ページを自身のページ番号でキャッシュに登録することをテスト"""
+        output_dir = tmp_path / 'out'
+        output_dir.mkdir()
+        path = str(output_dir / 'page-0002.jpg')
+        Image.new('L', (40, 50)).save(path)
+        short = [RenderedPage(page_number=2, path=path, width=40, height=50, dpi=200)]
+
+        with patch.object(rasterizer.rasterizer, 'render_planned', return_value=iter(short)):
+            pages = list(rasterizer.render_pages(pdf_path, str(output_dir), first_page=1, last_page=3))
+
+        assert [page.page_number for page in pages] == [2]
+        cached_files = sorted(name for _, _, files in os.walk(rasterizer.cache.directory) for name in files)
+        assert cached_files == ['page-0002-200dpi-color.jpg']
+
+    @pytest.mark.usefixtures('convert')
+    def test_rendered_pages_do_not_share_cache_files(self, rasterizer, pdf_path, tmp_path):
+        """出力したページを書き換えても、キャッシュされたページが変わらないことをテスト"""
+        first = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'first'), first_page=1, last_page=1))[0]
+        Image.new('L', (40, 50), 255).save(first.path)
+
+        second = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'second'), first_page=1, last_page=1))[0]
+        Image.new('L', (40, 50), 0).save(second.path)
+
+        cached = list(rasterizer.render_pages(pdf_path, str(tmp_path / 'third'), first_page=1, last_page=1))[0]
+        with Image.open(cached.path) as image:
+            assert image.getpixel((0, 0)) not in (0, 255)
+
+    def test_missing_ranges(self):
+        """ページ番号を連続する範囲にまとめることをテスト"""
+        assert missing_ranges([1, 2, 3, 5, 7, 8]) == [(1, 3), (5, 5), (7, 8)]
+        assert not missing_ranges([])
+
+
+class TestPdfRasterizerFactory:
+    """PdfRasterizerFactoryのテスト"""
+
+    def test_cache_enabled(self, settings, tmp_path):
+        """キャッシュが有効な場合はキャッシュを参照する実装を返すことをテスト"""
+        settings.PDF_PAGE_CACHE_ENABLED = True
+        settings.PDF_PAGE_CACHE_DIR = str(tmp_path)
+        settings.PDF_PAGE_CACHE_MAX_MB = 1
+        rasterizer = PdfRasterizerFactory.create_rasterizer()
+        assert isinstance(rasterizer, CachedPdfRasterizer)
+        assert rasterizer.cache.max_bytes == 1024 * 1024
+
+    def test_cache_disabled(self, settings):
+        """キャッシュが無効な場合はpdf2imageの実装を返し、シングルトンを共有することをテスト"""
+        settings.PDF_PAGE_CACHE_ENABLED = False
+        PdfRasterizerFactory.reset_rasterizer()
+        try:
+            assert isinstance(PdfRasterizerFactory.get_rasterizer(), Pdf2ImageRasterizer)
+            assert PdfRasterizerFactory.get_rasterizer() is PdfRasterizerFactory.get_rasterizer()
+        finally:
+            PdfRasterizerFactory.reset_rasterizer()
@@ -0,0 +1,85 @@
+"""画像化の前にPDFのページの内容を調べる処理のテストモジュール"""
+
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from app.adapters.pdf.page_analysis import analyze_pages, parse_image_list, parse_page_sizes, parse_text_chars
+from app.core.pdf.gateways import PdfRasterizeError
+
+MODULE = 'app.adapters.pdf.page_analysis'
+
+PDFINFO_OUTPUT = """Title:          book
+Pages:          3
+Page    1 size: 612 x 792 pts (letter)
+Page    1 rot:  0
+Page    2 size: 612 x 792 pts (letter)
+Page    2 rot:  0
+Page    3 size: 595.276 x 841.89 pts (A4)
+Page    3 rot:  0
+"""
+
+PDFIMAGES_OUTPUT = """page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio
+--------------------------------------------------------------------------------------------
+   2     0 image    2550  3300  gray    1   8  jpeg   no        10  0   300   300  402K 4.7%
+   3     1 image     300   300  rgb     3   8  jpeg   no        12  0   150   150  20K 7.4%
+   3     2 smask     300   300  gray    1   8  image  no        12  0   150   150  2K 1.0%
+"""
+
+
+def fake_run(args, **kwargs):  # pylint: disable=unused-argument
+    """Popplerのコマンドごとに固定の出力を返すsubprocess.runの代替"""
+    outputs = {
+        'pdfinfo': PDFINFO_OUTPUT,
+        'pdftotext': 'Lorem ipsum ' * 50 + '\f\f図1\f',
+        'pdfimages': PDFIMAGES_OUTPUT,
+    }
+    return subprocess.CompletedProcess(args, 0, stdout=outputs[args[0]].encode('utf-8'), stderr=b'')
+
+
+class TestPageAnalysis:
+    """ページの内容を調べる処理のテスト"""
+
+    def test_analyze_pages(self):
+        """ページの大きさ・文字数・画像の面積と色を求めることをテスト"""
+        with patch(f'{MODULE}.subprocess.run', side_effect=fake_run) as run:
+            metrics = analyze_pages('book.pdf', 1, 3)
+
+        assert metrics[1].text_chars == 500
+        assert (metrics[1].image_count, metrics[1].image_coverage) == (0, 0.0)
+        assert metrics[2].text_chars == 0
+        assert metrics[2].image_count == 1
+        assert metrics[2].image_coverage == pytest.approx(1.0)
+        assert metrics[2].has_color_images is False
+        assert metrics[3].image_count == 1
+        assert metrics[3].image_coverage == pytest.approx(4 / (595.276 / 72 * 841.89 / 72))
+        assert metrics[3].has_color_images is True
+        assert run.call_args_list[0].args[0] == ['pdfinfo', '-f', '1', '-l', '3', 'book.pdf']
+
+    def test_command_failure(self):
+        """コマンドが失敗した場合は PdfRasterizeError になることをテスト"""
+        failed = subprocess.CompletedProcess(['pdfinfo'], 1, stdout=b'', stderr=b'Syntax Error')
+        with patch(f'{MODULE}.subprocess.run', return_value=failed):
+            with pytest.raises(PdfRasterizeError, match='Syntax Error'):
+                analyze_pages('broken.pdf', 1, 1)
+
+    def test_command_not_installed(self):
+        """コマンドが見つからない場合は PdfRasterizeError になることをテスト"""
+        with patch(f'{MODULE}.subprocess.run', side_effect=FileNotFoundError('pdfinfo')):
+            with pytest.raises(PdfRasterizeError):
+                analyze_pages('book.pdf', 1, 1)
+
+    def test_parse_page_sizes(self):
+        """pdfinfoの出力からページの大きさを取り出すことをテスト"""
+        assert parse_page_sizes(PDFINFO_OUTPUT) == {1: (612.0, 792.0), 2: (612.0, 792.0), 3: (595.276, 841.89)}
+
+    def test_parse_text_chars(self):
+        """pdftotextの出力から空白以外の文字数をページごとに数えることをテスト"""
+        assert parse_text_chars('ab c\n\f\f 日本語 \f', 5) == {5: 3, 6: 0, 7: 3}
+
+    def test_parse_image_list_skips_masks(self):
+        """pdfimagesの出力のうちマスクとヘッダーを数えないことをテスト"""
+        images = parse_image_list(PDFIMAGES_OUTPUT)
+        assert sorted(images) == [2, 3]
+        assert len(images[3]) == 1
@@ -0,0 +1,76 @@
+"""ページ画像のキャッシュのテストモジュール"""
+
+import os
+
+from app.adapters.pdf.page_cache import PageCacheKey, PageImageCache, file_sha256
+
+
+def make_key(page_number, dpi=200):
+    """テスト用のキャッシュのキー"""
+    return PageCacheKey(pdf_sha256='ab' * 32, page_number=page_number, dpi=dpi, fmt='jpg', color_mode='color')
+
+
+def write(path, size):
+    """指定したサイズのファイルを作成する"""
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return str(path)
+
+
+class TestPageImageCache:
+    """PageImageCacheのテスト"""
+
+    def test_put_and_get(self, tmp_path):
+        """登録したページをキーで参照でき、解像度などが異なるキーでは参照できないことをテスト"""
+        cache = PageImageCache(str(tmp_path / 'cache'), max_bytes=10_000)
+        source = write(tmp_path / 'page.jpg', 100)
+
+        path = cache.put(make_key(1), source)
+
+        assert cache.get(make_key(1)) == path
+        assert open(path, 'rb').read() == b'x' * 100
+        assert cache.get(make_key(1, dpi=300)) is None
+        assert cache.get(make_key(2)) is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """上限を超えた場合は参照日時の古いページから削除することをテスト"""
+        cache = PageImageCache(str(tmp_path / 'cache'), max_bytes=250)
+        for page_number in (1, 2):
+            path = cache.put(make_key(page_number), write(tmp_path / f'{page_number}.jpg', 100))
+            os.utime(path, (page_number, page_number))
+        # ページ1を参照して最近使用したことにする
+        assert cache.get(make_key(1)) is not None
+
+        cache.put(make_key(3), write(tmp_path / '3.jpg', 100))
+
+        assert cache.get(make_key(2)) is None
+        assert cache.get(make_key(1)) is not None
+        assert cache.get(make_key(3)) is not None
+
+    def test_replacing_entry_does_not_grow_size(self, tmp_path):
+        """同じキーの画像を登録し直しても合計サイズが増えず、削除が起きないことをテスト"""
+        cache = PageImageCache(str(tmp_path / 'cache'), max_bytes=250)
+        cache.put(make_key(1), write(tmp_path / '1.jpg', 100))
+        for _ in range(3):
+            cache.put(make_key(2), write(tmp_path / '2.jpg', 100))
+
+        assert cache._size == 200  # pylint: disable=protected-access
+        assert cache.get(make_key(1)) is not None
+
+    def test_eviction_skips_files_being_registered(self, tmp_path):
+        """他のプロセスが登録中の一時ファイルは、古くても削除しないことをテスト"""
+        cache = PageImageCache(str(tmp_path / 'cache'), max_bytes=150)
+        path = cache.put(make_key(1), write(tmp_path / '1.jpg', 100))
+        temp_path = write(f'{cache.path_for(make_key(2))}.0123abcd.tmp', 100)
+        os.utime(temp_path, (0, 0))
+
+        cache.put(make_key(3), write(tmp_path / '3.jpg', 100))
+
+        assert os.path.exists(temp_path)
+        assert not os.path.exists(path)
+        assert cache.get(make_key(3)) is not None
+
+    def test_file_sha256(self, tmp_path):
+        """ファイルの内容のSHA-256を返すことをテスト"""
+        path = write(tmp_path / 'a.pdf', 3)
+        assert file_sha256(path, chunk_size=2) == 'cd2eb0837c9b4c962c22d2ff8b5441b7b45805887f051d39bf133b583baf6860'
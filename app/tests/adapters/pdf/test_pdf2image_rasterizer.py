@@ -0,0 +1,337 @@
+"""pdf2imageを用いたPDFページの画像化のテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+import os
+import subprocess
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError, PDFPopplerTimeoutError
+
+from app.adapters.pdf.page_analysis import PageMetrics
+from app.adapters.pdf.pdf2image_rasterizer import Pdf2ImageRasterizer, page_filename, plan_windows
+from app.adapters.pdf.raster_policy import PagePlan, RasterPolicy
+from app.core.pdf.gateways import PdfRasterizeError, PdfToolNotInstalledError
+
+MODULE = 'app.adapters.pdf.pdf2image_rasterizer'
+
+
+def fake_convert(pdf_path, first_page, last_page, **kwargs):  # pylint: disable=unused-argument
+    """指定された範囲のページ数分の画像を返すconvert_from_pathの代替"""
+    return [Image.new('RGB', (20, 30), 'white') for _ in range(first_page, last_page + 1)]
+
+
+def is_closed(image):
+    """PIL画像が解放済みかどうかを返す"""
+    try:
+        image.load()
+    except ValueError:
+        return True
+    return False
+
+
+@pytest.fixture
+def convert():
+    """convert_from_pathを代替するモック"""
+    with patch(f'{MODULE}.convert_from_path', side_effect=fake_convert) as mock:
+        yield mock
+
+
+@pytest.fixture
+def pdfinfo():
+    """7ページのPDFの情報を返すpdfinfo_from_pathのモック"""
+    with patch(f'{MODULE}.pdfinfo_from_path', return_value={'Pages': 7}) as mock:
+        yield mock
+
+
+def fake_pdftoppm(pdf_path, first_page, last_page, output_folder, output_file, **kwargs):  # pylint: disable=unused-argument
+    """pdftoppmと同じく「接頭辞-ページ番号」の名前で画像を書き出し、そのパスを返すconvert_from_pathの代替"""
+    paths = []
+    for page_number in range(first_page, last_page + 1):
+        path = os.path.join(output_folder, f'{output_file}-{page_number:03d}.jpg')
+        Image.new('L', (40, 50)).save(path)
+        paths.append(path)
+    return paths
+
+
+class TestPdf2ImageRasterizer:
+    """Pdf2ImageRasterizerのテスト（PIL画像を経由するモード）"""
+
+    @pytest.fixture(autouse=True)
+    def pil_mode(self, settings):
+        """PIL画像を経由して書き出す設定"""
+        settings.PDF_RASTER_PATHS_ONLY = False
+
+    def test_render_pages_in_windows(self, convert, pdfinfo, tmp_path):
+        """ページを指定した範囲ずつ変換し、ページ番号のファイル名で書き出すことをテスト"""
+        rasterizer = Pdf2ImageRasterizer(dpi=150, fmt='jpg', window_size=3)
+
+        pages = list(rasterizer.render_pages('book.pdf', str(tmp_path / 'out')))
+
+        assert [page.page_number for page in pages] == [1, 2, 3, 4, 5, 6, 7]
+        assert sorted((c.kwargs['first_page'], c.kwargs['last_page']) for c in convert.call_args_list) == [
+            (1, 3), (4, 6), (7, 7)]
+        assert convert.call_args.kwargs['dpi'] == 150
+        assert convert.call_args.kwargs['fmt'] == 'jpeg'
+        assert pages[0].path == str(tmp_path / 'out' / 'page-0001.jpg')
+        assert (pages[0].width, pages[0].height) == (20, 30)
+        assert sorted(os.listdir(tmp_path / 'out')) == [page_filename(n, 'jpg') for n in range(1, 8)]
+        pdfinfo.assert_called_once()
+
+    def test_render_pages_is_lazy(self, convert, pdfinfo, tmp_path):  # pylint: disable=unused-argument
+        """逐次実行では次の範囲は前の範囲のページを返し終えるまで変換せず、書き出した画像を解放することをテスト"""
+        images = []
+
+        def tracking_convert(*args, **kwargs):
+            converted = fake_convert(*args, **kwargs)
+            images.extend(converted)
+            return converted
+
+        convert.side_effect = tracking_convert
+        pages = Pdf2ImageRasterizer(window_size=2, workers=1).render_pages('book.pdf', str(tmp_path))
+
+        next(pages)
+        assert convert.call_count == 1
+        assert is_closed(images[0]) and is_closed(images[1])
+        next(pages)
+        next(pages)
+        assert convert.call_count == 2
+        pages.close()
+        assert convert.call_count == 2
+
+    def test_render_pages_in_parallel(self, convert, pdfinfo, tmp_path):  # pylint: disable=unused-argument
+        """複数の範囲を同時に変換し、同時実行数を上限以下に保ってページ番号の順に返すことをテスト"""
+        lock = threading.Lock()
+        active = [0]
+        peak = [0]
+
+        def slow_convert(*args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return fake_convert(*args, **kwargs)
+
+        convert.side_effect = slow_convert
+        rasterizer = Pdf2ImageRasterizer(window_size=1, workers=16, max_workers_per_document=3)
+
+        pages = list(rasterizer.render_pages('book.pdf', str(tmp_path)))
+
+        assert [page.page_number for page in pages] == [1, 2, 3, 4, 5, 6, 7]
+        assert convert.call_count == 7
+        assert 1 < peak[0] <= 3
+
+    def test_stop_cancels_pending_windows(self, convert, pdfinfo, tmp_path):  # pylint: disable=unused-argument
+        """途中で反復をやめた場合は未着手の範囲を変換しないことをテスト"""
+        pages = Pdf2ImageRasterizer(window_size=1, workers=2).render_pages('book.pdf', str(tmp_path))
+        next(pages)
+        pages.close()
+        assert convert.call_count <= 3
+
+    def test_worker_count(self, settings):
+        """同時に変換する範囲の数をCPUコア数・1文書あたりの上限・範囲の数で制限することをテスト"""
+        settings.PDF_RASTER_WORKERS = 0
+        settings.PDF_RASTER_MAX_WORKERS_PER_DOCUMENT = 4
+        with patch(f'{MODULE}.os.cpu_count', return_value=16):
+            rasterizer = Pdf2ImageRasterizer()
+            assert rasterizer.worker_count(40) == 4
+            assert rasterizer.worker_count(2) == 2
+        with patch(f'{MODULE}.os.cpu_count', return_value=2):
+            assert rasterizer.worker_count(40) == 2
+        assert Pdf2ImageRasterizer(workers=3, max_workers_per_document=8).worker_count(40) == 3
+
+    def test_render_page_range(self, convert, pdfinfo, tmp_path):
+        """ページ範囲を指定した場合はその範囲のみを変換し、ページ数を問い合わせないことをテスト"""
+        pages = list(Pdf2ImageRasterizer(fmt='png', window_size=10).render_pages(
+            'book.pdf', str(tmp_path), first_page=3, last_page=4))
+
+        assert [os.path.basename(page.path) for page in pages] == ['page-0003.png', 'page-0004.png']
+        assert convert.call_count == 1
+        pdfinfo.assert_not_called()
+
+    def test_poppler_error(self, tmp_path):
+        """Popplerのエラーを PdfRasterizeError に変換することをテスト"""
+        with patch(f'{MODULE}.pdfinfo_from_path', side_effect=PDFPageCountError('broken')):
+            with pytest.raises(PdfRasterizeError):
+                list(Pdf2ImageRasterizer().render_pages('broken.pdf', str(tmp_path)))
+
+    def test_missing_pages_raise(self, convert, tmp_path):
+        """変換されたページが範囲より少ない場合は PdfRasterizeError になり、画像を解放することをテスト"""
+        images = fake_convert('book.pdf', 1, 2)
+        convert.side_effect = None
+        convert.return_value = images
+
+        with pytest.raises(PdfRasterizeError, match='ページ数 \\(2\\)'):
+            list(Pdf2ImageRasterizer(workers=1).render_pages('book.pdf', str(tmp_path), first_page=1, last_page=3))
+        assert all(is_closed(image) for image in images)
+        assert not os.listdir(tmp_path)
+
+    def test_render_timeout(self, convert, settings, tmp_path):
+        """pdftoppmをPDF_RASTER_TIMEOUTのタイムアウトで実行し、タイムアウトは PdfRasterizeError になることをテスト"""
+        settings.PDF_RASTER_TIMEOUT = 30
+        convert.side_effect = PDFPopplerTimeoutError('Run poppler timeout.')
+
+        with pytest.raises(PdfRasterizeError):
+            list(Pdf2ImageRasterizer(workers=1).render_pages('book.pdf', str(tmp_path), first_page=1, last_page=2))
+        assert convert.call_args.kwargs['timeout'] == 30
+
+    def test_get_page_count_timeout(self, pdfinfo, settings):
+        """pdfinfoをPDF_PDFINFO_TIMEOUTのタイムアウトで実行することをテスト"""
+        settings.PDF_PDFINFO_TIMEOUT = 7
+
+        assert Pdf2ImageRasterizer().get_page_count('book.pdf') == 7
+        assert pdfinfo.call_args.kwargs['timeout'] == 7
+
+    def test_poppler_not_installed(self):
+        """Popplerがインストールされていない場合は PdfToolNotInstalledError になることをテスト"""
+        with patch(f'{MODULE}.pdfinfo_from_path', side_effect=PDFInfoNotInstalledError('pdfinfo not found')):
+            with pytest.raises(PdfToolNotInstalledError):
+                Pdf2ImageRasterizer().get_page_count('book.pdf')
+
+    def test_settings_defaults(self, settings):
+        """引数を省略した場合は設定値を用いることをテスト"""
+        settings.PDF_RASTER_DPI = 300
+        settings.PDF_RASTER_FORMAT = 'PNG'
+        settings.PDF_RASTER_WINDOW_SIZE = 4
+        rasterizer = Pdf2ImageRasterizer()
+        assert (rasterizer.dpi, rasterizer.fmt, rasterizer.window_size) == (300, 'png', 4)
+
+    def test_invalid_format(self):
+        """無効な画像形式はエラーになることをテスト"""
+        with pytest.raises(ValueError):
+            Pdf2ImageRasterizer(fmt='gif')
+
+
+class TestPathsOnly:
+    """pdftoppmに画像を直接書き出させるモードのテスト"""
+
+    def test_render_pages_direct_to_disk(self, pdfinfo, tmp_path):  # pylint: disable=unused-argument
+        """PIL画像を経由せずに書き出したファイルをページ番号の名前に変更し、パスとサイズのみを返すことをテスト"""
+        output_dir = tmp_path / 'doc-1'
+        with patch(f'{MODULE}.convert_from_path', side_effect=fake_pdftoppm) as convert:
+            pages = list(Pdf2ImageRasterizer(window_size=3, workers=2, paths_only=True).render_pages(
+                'book.pdf', str(output_dir)))
+
+        assert [page.page_number for page in pages] == [1, 2, 3, 4, 5, 6, 7]
+        assert sorted(os.listdir(output_dir)) == [page_filename(n, 'jpg') for n in range(1, 8)]
+        assert pages[6].path == str(output_dir / 'page-0007.jpg')
+        assert (pages[6].width, pages[6].height) == (40, 50)
+        kwargs = convert.call_args.kwargs
+        assert kwargs['paths_only'] is True
+        assert kwargs['output_folder'] == str(output_dir)
+
+    def test_page_numbers_from_file_names(self, tmp_path):
+        """ページ番号をファイルの並び順ではなくpdftoppmのファイル名から取得することをテスト"""
+        def unpadded_pdftoppm(pdf_path, first_page, last_page, output_folder, output_file, **kwargs):  # pylint: disable=unused-argument
+            paths = []
+            for page_number in range(first_page, last_page + 1):
+                path = os.path.join(output_folder, f'{output_file}-{page_number}.jpg')
+                Image.new('L', (page_number, 50)).save(path)
+                paths.append(path)
+            return sorted(paths)
+
+        with patch(f'{MODULE}.convert_from_path', side_effect=unpadded_pdftoppm):
+            pages = list(Pdf2ImageRasterizer(workers=1, paths_only=True).render_pages(
+                'book.pdf', str(tmp_path), first_page=9, last_page=10))
+
+        assert [(page.page_number, page.width) for page in pages] == [(9, 9), (10, 10)]
+
+    def test_missing_pages_raise(self, tmp_path):
+        """pdftoppmが書き出したページが範囲より少ない場合は PdfRasterizeError になり、画像を残さないことをテスト"""
+        def crashed_pdftoppm(pdf_path, first_page, last_page, **kwargs):
+            return fake_pdftoppm(pdf_path, first_page, last_page - 1, **kwargs)
+
+        with patch(f'{MODULE}.convert_from_path', side_effect=crashed_pdftoppm):
+            with pytest.raises(PdfRasterizeError, match='ページ数 \\(2\\)'):
+                list(Pdf2ImageRasterizer(workers=1, paths_only=True).render_pages(
+                    'book.pdf', str(tmp_path), first_page=1, last_page=3))
+        assert not os.listdir(tmp_path)
+
+    def test_paths_only_is_default(self, settings):
+        """既定でpdftoppmに直接書き出させるモードになることをテスト"""
+        settings.PDF_RASTER_PATHS_ONLY = True
+        assert Pdf2ImageRasterizer().paths_only is True
+
+    def test_rendered_files_removed_on_failure(self, tmp_path):
+        """名前の変更に失敗した場合は一時的なファイル名の画像を残さないことをテスト"""
+        with patch(f'{MODULE}.convert_from_path', side_effect=fake_pdftoppm), \
+                patch(f'{MODULE}.os.replace', side_effect=OSError('disk full')):
+            with pytest.raises(OSError):
+                list(Pdf2ImageRasterizer(workers=1, paths_only=True).render_pages(
+                    'book.pdf', str(tmp_path), first_page=1, last_page=2))
+        assert not os.listdir(tmp_path)
+
+
+class TestAdaptiveRaster:
+    """ページごとに解像度と色を決めて画像化するモードのテスト"""
+
+    @staticmethod
+    def analyzed(text_pages):
+        """指定したページは文字のみ、それ以外はカラー画像のページとするanalyze_pagesの代替"""
+        def analyze(pdf_path, first_page, last_page, **kwargs):  # pylint: disable=unused-argument
+            return {
+                n: PageMetrics(
+                    page_number=n, width_pt=612, height_pt=792,
+                    text_chars=1000 if n in text_pages else 0,
+                    image_count=0 if n in text_pages else 1,
+                    image_coverage=0.0 if n in text_pages else 0.8,
+                    has_color_images=n not in text_pages,
+                )
+                for n in range(first_page, last_page + 1)
+            }
+        return analyze
+
+    def test_render_pages_with_page_plans(self, pdfinfo, tmp_path):  # pylint: disable=unused-argument
+        """方針が同じ連続したページごとに、その解像度と色で変換することをテスト"""
+        rasterizer = Pdf2ImageRasterizer(dpi=200, window_size=10, workers=1, paths_only=True, adaptive=True)
+        with patch(f'{MODULE}.analyze_pages', side_effect=self.analyzed({1, 2, 3, 6, 7})), \
+                patch(f'{MODULE}.convert_from_path', side_effect=fake_pdftoppm) as convert:
+            pages = list(rasterizer.render_pages('book.pdf', str(tmp_path)))
+
+        assert [(c.kwargs['first_page'], c.kwargs['last_page'], c.kwargs['dpi'], c.kwargs['grayscale'])
+                for c in convert.call_args_list] == [(1, 3, 150, True), (4, 5, 200, False), (6, 7, 150, True)]
+        assert [page.page_number for page in pages] == [1, 2, 3, 4, 5, 6, 7]
+        assert (pages[0].dpi, pages[0].grayscale) == (150, True)
+        assert (pages[3].dpi, pages[3].grayscale) == (200, False)
+
+    def test_analysis_failure_uses_default_plan(self, tmp_path):
+        """ページの内容を調べられない場合は既定の解像度のカラーで画像化することをテスト"""
+        rasterizer = Pdf2ImageRasterizer(dpi=200, adaptive=True)
+        with patch(f'{MODULE}.analyze_pages', side_effect=PdfRasterizeError('pdfimages not found')):
+            plans = rasterizer.plan_pages(str(tmp_path / 'book.pdf'), 1, 2)
+        assert plans == [PagePlan(page_number=1, dpi=200), PagePlan(page_number=2, dpi=200)]
+
+    def test_analysis_timeout_uses_default_plan(self, settings, tmp_path):
+        """ページの内容を調べるコマンドがタイムアウトした場合は既定の方針で画像化することをテスト"""
+        settings.PDF_ANALYSIS_TIMEOUT = 5
+        rasterizer = Pdf2ImageRasterizer(dpi=200, adaptive=True)
+        with patch('app.adapters.pdf.page_analysis.subprocess.run',
+                   side_effect=subprocess.TimeoutExpired('pdftotext', 5)) as run:
+            plans = rasterizer.plan_pages(str(tmp_path / 'book.pdf'), 1, 2)
+        assert plans == [PagePlan(page_number=1, dpi=200), PagePlan(page_number=2, dpi=200)]
+        assert run.call_args.kwargs['timeout'] == 5
+
+    def test_not_adaptive_skips_analysis(self):
+        """適応的な画像化が無効な場合はページの内容を調べないことをテスト"""
+        with patch(f'{MODULE}.analyze_pages') as analyze:
+            plans = Pdf2ImageRasterizer(dpi=300, adaptive=False).plan_pages('book.pdf', 1, 3)
+        analyze.assert_not_called()
+        assert {(plan.dpi, plan.grayscale) for plan in plans} == {(300, False)}
+
+    def test_custom_policy(self):
+        """指定した方針でページごとの解像度と色を決めることをテスト"""
+        rasterizer = Pdf2ImageRasterizer(adaptive=True, policy=RasterPolicy(text_dpi=100, text_grayscale=False))
+        with patch(f'{MODULE}.analyze_pages', side_effect=self.analyzed({1})):
+            plan = rasterizer.plan_pages('book.pdf', 1, 1)[0]
+        assert (plan.dpi, plan.grayscale) == (100, False)
+
+    def test_plan_windows(self):
+        """方針の変わり目・ページの不連続・最大ページ数で範囲を分けることをテスト"""
+        plans = [PagePlan(n, 150, True) for n in (1, 2, 3, 4)] + [PagePlan(5, 200), PagePlan(7, 200)]
+        assert plan_windows(plans, window_size=3) == [
+            (1, 3, 150, True), (4, 4, 150, True), (5, 5, 200, False), (7, 7, 200, False)]
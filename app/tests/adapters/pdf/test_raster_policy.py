@@ -0,0 +1,66 @@
+"""ページごとの画像化の方針のテストモジュール"""
+
+import pytest
+
+from app.adapters.pdf.page_analysis import PageMetrics
+from app.adapters.pdf.raster_policy import (
+    REASON_IMAGE,
+    REASON_TEXT,
+    REASON_VECTOR,
+    RasterPolicy,
+    get_raster_policy,
+)
+
+
+def metrics(**kwargs):
+    """Letterサイズのページの指標"""
+    return PageMetrics(page_number=1, width_pt=612, height_pt=792, **kwargs)
+
+
+class TestRasterPolicy:
+    """RasterPolicyのテスト"""
+
+    def test_text_page(self):
+        """文字のみのページは低い解像度のグレースケールにすることをテスト"""
+        plan = RasterPolicy().decide(metrics(text_chars=1500), default_dpi=200)
+        assert (plan.dpi, plan.grayscale, plan.reason) == (150, True, REASON_TEXT)
+        assert plan.color_mode == 'gray'
+
+    def test_text_page_with_small_color_image(self):
+        """小さなカラー画像を含む文字のページは低い解像度のカラーにすることをテスト"""
+        plan = RasterPolicy().decide(
+            metrics(text_chars=1500, image_count=1, image_coverage=0.02, has_color_images=True), default_dpi=200)
+        assert (plan.dpi, plan.grayscale, plan.reason) == (150, False, REASON_TEXT)
+
+    def test_scanned_gray_page(self):
+        """グレースケールのスキャン画像のページは既定の解像度のグレースケールにすることをテスト"""
+        plan = RasterPolicy().decide(metrics(image_count=1, image_coverage=1.0), default_dpi=200)
+        assert (plan.dpi, plan.grayscale, plan.reason) == (200, True, REASON_IMAGE)
+
+    def test_color_image_page(self):
+        """カラー画像を含むページはカラーにすることをテスト"""
+        plan = RasterPolicy(image_dpi=300).decide(
+            metrics(text_chars=800, image_count=2, image_coverage=0.4, has_color_images=True), default_dpi=200)
+        assert (plan.dpi, plan.grayscale, plan.reason) == (300, False, REASON_IMAGE)
+
+    def test_vector_page(self):
+        """テキストも画像も少ないページは色を判定できないためカラーにすることをテスト"""
+        plan = RasterPolicy().decide(metrics(text_chars=30), default_dpi=200)
+        assert (plan.dpi, plan.grayscale, plan.reason) == (200, False, REASON_VECTOR)
+
+    def test_get_raster_policy_overrides(self, settings):
+        """PDF_RASTER_POLICY で方針を上書きできることをテスト"""
+        settings.PDF_RASTER_POLICY = {'text_dpi': 120, 'text_grayscale': False}
+        policy = get_raster_policy()
+        assert (policy.text_dpi, policy.text_grayscale, policy.min_text_chars) == (120, False, 200)
+
+    @pytest.mark.parametrize('overrides', [
+        {'unknown': 1},
+        {'text_dpi': 0},
+        {'max_text_image_coverage': 1.5},
+    ])
+    def test_get_raster_policy_invalid(self, settings, overrides):
+        """未知の項目や無効な値はエラーになることをテスト"""
+        settings.PDF_RASTER_POLICY = overrides
+        with pytest.raises(ValueError):
+            get_raster_policy()
@@ -3,10 +3,15 @@
 検索アプリケーションの初期化や設定に関するテストを含みます。
 """
 
+import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import patch
 
+from django.test import override_settings
+
 from app.adapters.search.apps import SearchConfig
+from app.adapters.search.schema_marker import is_schema_verified, write_schema_marker
 
 
 class TestSearchConfig(TestCase):
@@ -15,10 +20,59 @@ class TestSearchConfig(TestCase):
     検索アプリケーションの設定と初期化をテストします。
     """
 
+    def setUp(self):
+        """テストごとに一時的なマーカーファイルのパスを用意します。"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.marker_path = os.path.join(self.tmp_dir.name, 'marker.json')
+        self.settings_override = override_settings(
+            QDRANT_SCHEMA_MARKER_PATH=self.marker_path,
+            QDRANT_SCHEMA_MARKER_REDIS_URL=None,
+            QDRANT_BOOTSTRAP_ON_STARTUP=True,
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        """設定と一時ディレクトリを元に戻します。"""
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
     def test_ready(self):
         """アプリケーションのready()メソッドが正しく機能することを確認します。"""
         config = SearchConfig.create('app.adapters.search')
         with patch('app.adapters.search.qdrant_manager.ensure_collections_exist') as mock_ready:
             config.ready()
-            # SearchConfigのready()メソッドでensure_collections_existが呼ばれることを確認
+            # スキーマ未検証の場合はensure_collections_existが呼ばれることを確認
             mock_ready.assert_called_once()
+        # 検証後はマーカーが記録される
+        self.assertTrue(is_schema_verified())
+
+    def test_ready_skips_when_schema_verified(self):
+        """スキーマ検証済みマーカーがある場合はQdrantへ問い合わせないことを確認します。"""
+        write_schema_marker()
+        config = SearchConfig.create('app.adapters.search')
+        with patch('app.adapters.search.qdrant_manager.ensure_collections_exist') as mock_ready:
+            config.ready()
+            mock_ready.assert_not_called()
+
+    def test_ready_skips_when_bootstrap_on_startup_disabled(self):
+        """起動時の初期化が無効な場合は未検証でもQdrantへ問い合わせないことを確認します。"""
+        config = SearchConfig.create('app.adapters.search')
+        with override_settings(QDRANT_BOOTSTRAP_ON_STARTUP=False):
+            with patch('app.adapters.search.qdrant_manager.ensure_collections_exist') as mock_ready:
+                with self.assertLogs('app.adapters.search.apps', level='WARNING') as cm:
+                    config.ready()
+                mock_ready.assert_not_called()
+        self.assertTrue(any('qdrant_bootstrap' in msg for msg in cm.output))
+        self.assertFalse(is_schema_verified())
+
+    def test_ready_starts_warmup_when_enabled(self):
+        """起動時のウォームアップが有効な場合はバックグラウンドで開始することを確認します。"""
+        write_schema_marker()
+        config = SearchConfig.create('app.adapters.search')
+        with patch('app.adapters.search.warmup.start_warmup_thread') as mock_start:
+            with override_settings(QDRANT_WARMUP_ON_STARTUP=False):
+                config.ready()
+            mock_start.assert_not_called()
+            with override_settings(QDRANT_WARMUP_ON_STARTUP=True):
+                config.ready()
+            mock_start.assert_called_once()
@@ -0,0 +1,129 @@
+"""非同期Qdrantマネージャーのテストモジュール
+
+非同期クライアントプールの遅延接続、上限、ラウンドロビン動作をテストします。
+"""
+# pylint: disable=protected-access
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.adapters.search.async_qdrant_manager import (
+    AsyncQdrantClientManager,
+    get_async_qdrant_client,
+)
+
+
+def _make_async_client():
+    """AsyncQdrantClientのモックを生成します"""
+    client = MagicMock()
+    client.get_collections = AsyncMock(return_value=MagicMock())
+    client.close = AsyncMock()
+    return client
+
+
+@pytest.fixture(autouse=True)
+def reset_async_manager():
+    """テストごとにプールを初期化する"""
+    AsyncQdrantClientManager._pool = []
+    AsyncQdrantClientManager._next_index = 0
+    AsyncQdrantClientManager._loop = None
+    AsyncQdrantClientManager._lock = None
+    yield
+    AsyncQdrantClientManager._pool = []
+    AsyncQdrantClientManager._loop = None
+    AsyncQdrantClientManager._lock = None
+
+
+class TestAsyncQdrantClientManager:
+    """AsyncQdrantClientManagerのユニットテスト"""
+
+    @patch('app.adapters.search.async_qdrant_manager.AsyncQdrantClient')
+    def test_pool_grows_up_to_limit_and_round_robins(self, mock_client_cls, settings):
+        """プールが上限まで拡張され、その後ラウンドロビンで払い出されることをテスト"""
+        settings.QDRANT_ASYNC_POOL_SIZE = 2
+        clients = [_make_async_client(), _make_async_client()]
+        mock_client_cls.side_effect = clients
+
+        async def run():
+            return [await get_async_qdrant_client() for _ in range(5)]
+
+        result = asyncio.run(run())
+
+        assert mock_client_cls.call_count == 2
+        assert result == [clients[0], clients[1], clients[0], clients[1], clients[0]]
+        # 接続テストは各クライアントで1回ずつ
+        clients[0].get_collections.assert_awaited_once()
+        clients[1].get_collections.assert_awaited_once()
+        mock_client_cls.assert_called_with(
+            host=settings.QDRANT_HOST,
+            grpc_port=settings.QDRANT_PORT,
+            prefer_grpc=True,
+            timeout=settings.QDRANT_TIMEOUT
+        )
+
+    @patch('app.adapters.search.async_qdrant_manager.AsyncQdrantClient')
+    def test_connection_error_is_not_pooled(self, mock_client_cls, settings):
+        """接続テストに失敗したクライアントはプールに追加されないことをテスト"""
+        settings.QDRANT_ASYNC_POOL_SIZE = 2
+        failing = _make_async_client()
+        failing.get_collections.side_effect = Exception("接続エラー")
+        mock_client_cls.return_value = failing
+
+        async def run():
+            with pytest.raises(ConnectionError, match="Qdrantサーバーに接続できません"):
+                await get_async_qdrant_client()
+
+        asyncio.run(run())
+
+        assert AsyncQdrantClientManager.pool_size() == 0
+        failing.close.assert_awaited_once()
+
+    @patch('app.adapters.search.async_qdrant_manager.AsyncQdrantClient')
+    def test_pool_is_rebuilt_for_new_event_loop(self, mock_client_cls, settings):
+        """イベントループが変わった場合にプールが作り直されることをテスト"""
+        settings.QDRANT_ASYNC_POOL_SIZE = 1
+        first, second = _make_async_client(), _make_async_client()
+        mock_client_cls.side_effect = [first, second]
+
+        assert asyncio.run(get_async_qdrant_client()) is first
+        assert asyncio.run(get_async_qdrant_client()) is second
+        # 破棄したプールのチャネルはクローズする
+        first.close.assert_awaited_once()
+        second.close.assert_not_awaited()
+
+    @patch('app.adapters.search.async_qdrant_manager.AsyncQdrantClient')
+    def test_close_all(self, mock_client_cls, settings):
+        """close_allでプール内の全クライアントが閉じられることをテスト"""
+        settings.QDRANT_ASYNC_POOL_SIZE = 2
+        clients = [_make_async_client(), _make_async_client()]
+        mock_client_cls.side_effect = clients
+
+        async def run():
+            await get_async_qdrant_client()
+            await get_async_qdrant_client()
+            await AsyncQdrantClientManager.close_all()
+
+        asyncio.run(run())
+
+        assert AsyncQdrantClientManager.pool_size() == 0
+        for client in clients:
+            client.close.assert_awaited_once()
+
+    @patch('app.adapters.search.async_qdrant_manager.AsyncQdrantClient')
+    def test_after_fork_in_child_drops_pool(self, mock_client_cls, settings):
+        """fork後フックでプールが破棄されることをテスト"""
+        settings.QDRANT_ASYNC_POOL_SIZE = 1
+        client = _make_async_client()
+        mock_client_cls.return_value = client
+
+        asyncio.run(get_async_qdrant_client())
+        assert AsyncQdrantClientManager.pool_size() == 1
+
+        AsyncQdrantClientManager.after_fork_in_child()
+
+        assert AsyncQdrantClientManager.pool_size() == 0
+        assert AsyncQdrantClientManager._loop is None
+        # 親プロセスのチャネルはクローズしない
+        client.close.assert_not_awaited()
@@ -0,0 +1,217 @@
+"""スナップショットの書き出し・復元のテストモジュール
+
+ローカルモードのQdrantクライアント（インメモリ）を使用してテストします。
+"""
+# pylint: disable=redefined-outer-name
+
+import json
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    Modifier,
+    PointStruct,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from app.adapters.search.bulk_transfer import (
+    MANIFEST_FILE,
+    build_partitions,
+    export_collection,
+    read_manifest,
+)
+from app.adapters.search.collection_aliases import resolve_collection
+from app.adapters.search.reindex import restore_collection
+
+DOCUMENTS = 'documents'
+
+
+@pytest.fixture
+def local_client(settings):
+    """テスト用のポイントを登録したインメモリQdrantクライアント"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = DOCUMENTS
+    settings.QDRANT_VECTOR_SIZE = 3
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = False
+    client = QdrantClient(':memory:')
+    client.create_collection(DOCUMENTS, vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    client.upsert(DOCUMENTS, points=[
+        PointStruct(id=i, vector=[1.0, float(i), 0.5],
+                    payload={'user_id': str(i % 4), 'page_number': i} if i < 18 else {'page_number': i})
+        for i in range(20)
+    ])
+    with patch('app.adapters.search.qdrant_manager.get_qdrant_client', return_value=client), \
+            patch('app.adapters.search.reindex.get_qdrant_client', return_value=client), \
+            patch('app.management.commands.qdrant_snapshot.get_qdrant_client', return_value=client):
+        yield client
+    client.close()
+
+
+def _all_points(client, collection_name):
+    points, _ = client.scroll(collection_name, limit=100, with_vectors=True)
+    return {point.id: point for point in points}
+
+
+class TestBuildPartitions:
+    """パーティション分割のテスト"""
+
+    def test_partitions_are_disjoint_and_complete(self, local_client):
+        """パーティションが重複なく全ポイントを網羅することをテスト"""
+        partitions = build_partitions(local_client, DOCUMENTS, partitions=2)
+
+        # 2つの値のパーティション + 残余パーティション
+        assert len(partitions) == 3
+        seen = []
+        for partition_filter in partitions:
+            points, _ = local_client.scroll(DOCUMENTS, scroll_filter=partition_filter, limit=100)
+            seen.extend(point.id for point in points)
+        assert sorted(seen) == list(range(20))
+
+    def test_facet_limit_bounds_partition_filters(self, local_client):
+        """ファセットの取得件数の上限を超える値は残余パーティションに含まれることをテスト"""
+        with patch('app.adapters.search.bulk_transfer.FACET_LIMIT', 2):
+            partitions = build_partitions(local_client, DOCUMENTS, partitions=4)
+
+        assert len(partitions) == 3
+        assert len(partitions[-1].must_not[0].match.any) == 2
+        seen = []
+        for partition_filter in partitions:
+            points, _ = local_client.scroll(DOCUMENTS, scroll_filter=partition_filter, limit=100)
+            seen.extend(point.id for point in points)
+        assert sorted(seen) == list(range(20))
+
+    def test_facet_failure_falls_back_to_single_cursor(self, local_client):
+        """ファセットを取得できない場合は単一のカーソルになることをテスト"""
+        with patch.object(local_client, 'facet', side_effect=Exception('index required')):
+            assert build_partitions(local_client, DOCUMENTS, partitions=4) == [None]
+
+
+class TestSnapshotRoundTrip:
+    """スナップショットの書き出しと復元のテスト"""
+
+    def test_export_and_restore(self, local_client, tmp_path):
+        """書き出したスナップショットから同じポイントが復元されることをテスト"""
+        directory = str(tmp_path / 'snapshot')
+
+        manifest = export_collection(local_client, DOCUMENTS, directory, workers=3, batch_size=4, shard_size=3)
+
+        assert manifest['point_count'] == 20
+        assert manifest['vector_size'] == 3
+        assert sum(shard['points'] for shard in manifest['shards']) == 20
+        assert max(shard['points'] for shard in manifest['shards']) <= 3
+        assert read_manifest(directory) == manifest
+        for shard in manifest['shards']:
+            vectors = np.load(tmp_path / 'snapshot' / f"{shard['name']}.npy", mmap_mode='r')
+            assert vectors.shape == (shard['points'], 3)
+
+        original = _all_points(local_client, DOCUMENTS)
+        # ローカルモードのクライアントは並列のupsertに対してスレッドセーフではないため、1並列で復元する
+        result = restore_collection(directory, DOCUMENTS, batch_size=5, workers=1)
+
+        # エイリアス導入前のコレクションは置き換えられる
+        assert (result.source, result.target, result.points_copied) == (DOCUMENTS, 'documents_v1', 20)
+        assert resolve_collection(local_client, DOCUMENTS) == 'documents_v1'
+        restored = _all_points(local_client, DOCUMENTS)
+        assert restored.keys() == original.keys()
+        for point_id, point in original.items():
+            assert restored[point_id].payload == point.payload
+            assert restored[point_id].vector == pytest.approx(point.vector, abs=1e-6)
+
+    def test_export_float16(self, local_client, tmp_path):
+        """float16で書き出した場合はベクトルがfloat16で保存されることをテスト"""
+        directory = tmp_path / 'snapshot'
+
+        manifest = export_collection(local_client, DOCUMENTS, str(directory), dtype='float16')
+
+        shard = manifest['shards'][0]['name']
+        assert np.load(directory / f'{shard}.npy').dtype == np.float16
+
+    def test_hybrid_sparse_vectors_are_preserved(self, local_client, settings, tmp_path):
+        """ハイブリッド構成のコレクションでは疎ベクトルも復元されることをテスト"""
+        settings.QDRANT_HYBRID_SEARCH = True
+        local_client.create_collection(
+            'hybrid_src',
+            vectors_config={'dense': VectorParams(size=3, distance=Distance.COSINE)},
+            sparse_vectors_config={'sparse': SparseVectorParams(modifier=Modifier.IDF)},
+        )
+        local_client.upsert('hybrid_src', points=[
+            PointStruct(id=1, vector={'dense': [1.0, 0.0, 0.0], 'sparse': SparseVector(indices=[3, 7], values=[0.5, 1.5])},
+                        payload={'user_id': '1'}),
+        ])
+        directory = str(tmp_path / 'snapshot')
+
+        export_collection(local_client, 'hybrid_src', directory)
+        restore_collection(directory, 'hybrid_dst')
+
+        point = local_client.retrieve('hybrid_dst', [1], with_vectors=True)[0]
+        assert point.vector['sparse'].indices == [3, 7]
+        assert point.vector['sparse'].values == [0.5, 1.5]
+
+    def test_export_rejects_points_without_dense_vector(self, local_client, tmp_path):
+        """密ベクトルが無いポイントは、ポイントIDを示すValueErrorとなりマニフェストを作成しないことをテスト"""
+        local_client.create_collection(
+            'hybrid_src',
+            vectors_config={'dense': VectorParams(size=3, distance=Distance.COSINE)},
+            sparse_vectors_config={'sparse': SparseVectorParams(modifier=Modifier.IDF)},
+        )
+        local_client.upsert('hybrid_src', points=[
+            PointStruct(id=1, vector={'sparse': SparseVector(indices=[3], values=[0.5])}, payload={'user_id': '1'}),
+        ])
+        directory = tmp_path / 'snapshot'
+
+        with pytest.raises(ValueError, match='ポイント 1 に密ベクトルが無い'):
+            export_collection(local_client, 'hybrid_src', str(directory))
+        assert not (directory / MANIFEST_FILE).exists()
+
+    def test_export_requires_empty_directory(self, local_client, tmp_path):
+        """書き出し先が空でない場合はValueErrorとなることをテスト"""
+        (tmp_path / 'other.txt').write_text('x')
+
+        with pytest.raises(ValueError, match='空ではありません'):
+            export_collection(local_client, DOCUMENTS, str(tmp_path))
+
+    def test_restore_requires_manifest(self, tmp_path):
+        """マニフェストが無いスナップショットは復元できないことをテスト"""
+        with pytest.raises(ValueError, match='マニフェスト'):
+            restore_collection(str(tmp_path), DOCUMENTS)
+
+    def test_restore_rejects_vector_size_mismatch(self, local_client, settings, tmp_path):
+        """ベクトル次元数が設定値と異なる場合は復元できないことをテスト"""
+        directory = tmp_path / 'snapshot'
+        export_collection(local_client, DOCUMENTS, str(directory))
+        manifest = json.loads((directory / MANIFEST_FILE).read_text())
+        settings.QDRANT_VECTOR_SIZE = 8
+
+        with pytest.raises(ValueError, match='次元数'):
+            restore_collection(str(directory), DOCUMENTS)
+        assert manifest['vector_size'] == 3
+
+
+class TestQdrantSnapshotCommand:
+    """qdrant_snapshot 管理コマンドのテスト"""
+
+    def test_export_and_import(self, local_client, tmp_path):
+        """コマンドで書き出し・復元できることをテスト"""
+        directory = str(tmp_path / 'snapshot')
+        out = StringIO()
+
+        call_command('qdrant_snapshot', 'export', DOCUMENTS, directory, '--workers', '2', stdout=out)
+        call_command('qdrant_snapshot', 'import', DOCUMENTS, directory, '--workers', '1', stdout=out)
+
+        assert '20件' in out.getvalue()
+        assert local_client.count(DOCUMENTS).count == 20
+        assert resolve_collection(local_client, DOCUMENTS) == 'documents_v1'
+
+    @pytest.mark.usefixtures('local_client')
+    def test_failure_raises_command_error(self, tmp_path):
+        """失敗した場合はCommandErrorとなることをテスト"""
+        with pytest.raises(CommandError, match='import'):
+            call_command('qdrant_snapshot', 'import', DOCUMENTS, str(tmp_path), stdout=StringIO())
@@ -0,0 +1,156 @@
+"""コレクション構成設定のテストモジュール"""
+
+import pytest
+
+from app.adapters.search.collection_config import (
+    CollectionConfig,
+    cold_collection_name,
+    get_cold_tier_collections,
+    get_collection_config,
+)
+
+
+class TestGetCollectionConfig:
+    """get_collection_config関数のテスト"""
+
+    def test_defaults_from_settings(self, settings):
+        """共通設定値がコレクションの構成設定に反映されることをテスト"""
+        settings.QDRANT_HNSW_M = 32
+        settings.QDRANT_HNSW_EF_CONSTRUCT = 200
+        settings.QDRANT_VECTORS_ON_DISK = True
+        settings.QDRANT_MEMMAP_THRESHOLD = 50000
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+
+        config = get_collection_config('documents')
+
+        assert config == CollectionConfig(
+            name='documents',
+            vector_size=settings.QDRANT_VECTOR_SIZE,
+            hnsw_m=32,
+            hnsw_ef_construct=200,
+            hnsw_full_scan_threshold=settings.QDRANT_HNSW_FULL_SCAN_THRESHOLD,
+            vectors_on_disk=True,
+            on_disk_payload=settings.QDRANT_ON_DISK_PAYLOAD,
+            indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD,
+            memmap_threshold=50000,
+        )
+
+    def test_per_collection_overrides(self, settings):
+        """コレクションごとの上書き設定が他のコレクションに影響しないことをテスト"""
+        settings.QDRANT_HNSW_M = 16
+        settings.QDRANT_COLLECTION_OVERRIDES = {'documents': {'hnsw_m': 48, 'on_disk_payload': True}}
+
+        documents = get_collection_config('documents')
+        qa_pairs = get_collection_config('qa_pairs')
+
+        assert documents.hnsw_m == 48
+        assert documents.on_disk_payload is True
+        assert qa_pairs.hnsw_m == 16
+
+    def test_unknown_override_key(self, settings):
+        """未知の上書き設定項目はValueErrorになることをテスト"""
+        settings.QDRANT_COLLECTION_OVERRIDES = {'documents': {'hnsw_mm': 48}}
+
+        with pytest.raises(ValueError, match="未知の設定項目"):
+            get_collection_config('documents')
+
+    def test_quantization_applies_to_documents_only(self, settings):
+        """量子化モードがドキュメントコレクションにのみ既定で適用されることをテスト"""
+        settings.QDRANT_QUANTIZATION_MODE = 'scalar'
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+
+        assert get_collection_config(settings.QDRANT_COLLECTION_DOCUMENTS).quantization == 'scalar'
+        assert get_collection_config(settings.QDRANT_COLLECTION_QA).quantization == 'none'
+
+    def test_invalid_quantization_mode(self, settings):
+        """無効な量子化モードはValueErrorになることをテスト"""
+        settings.QDRANT_QUANTIZATION_MODE = 'pq'
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+
+        with pytest.raises(ValueError, match="量子化モードが無効"):
+            get_collection_config(settings.QDRANT_COLLECTION_DOCUMENTS)
+
+    def test_datatype_and_truncation_from_settings(self, settings):
+        """データ型と切り詰め次元数が構成設定に反映されることをテスト"""
+        settings.QDRANT_VECTOR_SIZE = 768
+        settings.QDRANT_VECTOR_DATATYPE = 'float16'
+        settings.QDRANT_VECTOR_TRUNCATE_DIM = 256
+        settings.QDRANT_COLLECTION_OVERRIDES = {'qa_pairs': {'truncate_dim': None}}
+
+        documents = get_collection_config('documents')
+        qa_pairs = get_collection_config('qa_pairs')
+
+        assert documents.datatype == 'float16'
+        assert documents.stored_vector_size == 256
+        assert qa_pairs.stored_vector_size == 768
+
+    @pytest.mark.parametrize('overrides, message', [
+        ({'datatype': 'int4'}, "データ型が無効"),
+        ({'truncate_dim': 1024}, "切り詰め次元数"),
+        ({'truncate_dim': 0}, "切り詰め次元数"),
+    ])
+    def test_invalid_vector_storage(self, settings, overrides, message):
+        """無効なデータ型・切り詰め次元数はValueErrorになることをテスト"""
+        settings.QDRANT_VECTOR_SIZE = 768
+        settings.QDRANT_COLLECTION_OVERRIDES = {'documents': overrides}
+
+        with pytest.raises(ValueError, match=message):
+            get_collection_config('documents')
+
+    def test_cold_tier_config(self, settings):
+        """コールド層のコレクションは元の構成をディスク保存・量子化に切り替えた構成になることをテスト"""
+        settings.QDRANT_COLLECTION_DOCUMENTS = 'documents'
+        settings.QDRANT_COLD_TIER_ENABLED = True
+        settings.QDRANT_COLD_TIER_COLLECTIONS = []
+        settings.QDRANT_COLD_TIER_SUFFIX = '_cold'
+        settings.QDRANT_COLD_TIER_QUANTIZATION = 'scalar'
+        settings.QDRANT_VECTOR_DATATYPE = 'float16'
+        settings.QDRANT_VECTORS_ON_DISK = False
+        settings.QDRANT_COLLECTION_OVERRIDES = {'documents_cold': {'hnsw_m': 8}}
+
+        assert get_cold_tier_collections() == ['documents']
+        assert cold_collection_name('documents') == 'documents_cold'
+        hot = get_collection_config('documents')
+        cold = get_collection_config('documents_cold')
+
+        assert cold.name == 'documents_cold'
+        assert (cold.vectors_on_disk, cold.on_disk_payload) == (True, True)
+        assert (cold.quantization, cold.quantization_always_ram) == ('scalar', True)
+        assert (cold.datatype, cold.stored_vector_size) == (hot.datatype, hot.stored_vector_size)
+        assert cold.hnsw_m == 8
+        assert hot.vectors_on_disk is False
+
+    def test_cold_tier_disabled(self, settings):
+        """コールド層が無効な場合は接尾辞付きの名前も通常のコレクションとして扱うことをテスト"""
+        settings.QDRANT_COLD_TIER_ENABLED = False
+        settings.QDRANT_VECTORS_ON_DISK = False
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+
+        assert get_cold_tier_collections() == []
+        assert get_collection_config('documents_cold').vectors_on_disk is False
+
+
+class TestPrepareVector:
+    """CollectionConfig.prepare_vectorのテスト"""
+
+    def test_without_truncation(self):
+        """切り詰めない場合はベクトルをそのまま返すことをテスト"""
+        config = CollectionConfig(name='documents', vector_size=3)
+
+        assert config.prepare_vector((3.0, 4.0, 0.0)) == [3.0, 4.0, 0.0]
+
+    def test_truncation_renormalizes(self):
+        """切り詰めた場合は先頭の次元を残して再正規化することをテスト"""
+        config = CollectionConfig(name='documents', vector_size=4, truncate_dim=2)
+
+        assert config.prepare_vector([3.0, 4.0, 5.0, 6.0]) == pytest.approx([0.6, 0.8])
+        # 切り詰め済みのベクトルは再正規化しない
+        assert config.prepare_vector([3.0, 4.0]) == [3.0, 4.0]
+
+    def test_uint8_requires_quantized_values(self):
+        """uint8のコレクションでは0〜255の整数のみを受け付けることをテスト"""
+        config = CollectionConfig(name='documents', vector_size=4, datatype='uint8', truncate_dim=2)
+
+        assert config.prepare_vector([12, 255, 3, 4]) == [12, 255]
+        with pytest.raises(ValueError, match='uint8'):
+            config.prepare_vector([0.5, 0.1, 0.0, 0.0])
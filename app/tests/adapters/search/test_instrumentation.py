@@ -0,0 +1,287 @@
+"""Qdrant呼び出しの計測（計測値の送信先・クライアントのプロキシ・リクエストログ）のテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import socket
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, Record, VectorParams
+
+from app.adapters.search import instrumentation
+from app.adapters.search.instrumentation import (
+    METRIC_BYTES,
+    METRIC_CIRCUIT_STATE,
+    METRIC_DURATION,
+    METRIC_ERRORS,
+    METRIC_POINTS,
+    METRIC_RETRIES,
+    InstrumentedQdrantClient,
+    NullMetricsSink,
+    PrometheusMetricsSink,
+    StatsdMetricsSink,
+    instrument_client,
+    measure_result,
+    record_retry,
+    track_qdrant_calls,
+)
+from app.adapters.search.middleware import QdrantRequestLogMiddleware
+from app.adapters.search.resilience import CircuitBreaker
+from app.adapters.search.views import metrics_view
+
+COLLECTION = 'documents'
+
+
+class RecordingSink(PrometheusMetricsSink):
+    """記録した値を検証できるテスト用の送信先"""
+
+    def __init__(self):
+        """初期化"""
+        super().__init__()
+        self.events = []
+
+    def increment(self, name, value=1, tags=None):
+        """記録して集計する"""
+        self.events.append(('increment', name, value, tags))
+        super().increment(name, value, tags)
+
+    def observe(self, name, value, tags=None):
+        """記録して集計する"""
+        self.events.append(('observe', name, value, tags))
+        super().observe(name, value, tags)
+
+    def gauge(self, name, value, tags=None):
+        """記録して集計する"""
+        self.events.append(('gauge', name, value, tags))
+        super().gauge(name, value, tags)
+
+    def named(self, name):
+        """指定したメトリクスの記録を返す"""
+        return [event for event in self.events if event[1] == name]
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    """プロセス共有の送信先をテスト用の送信先に差し替える"""
+    recording = RecordingSink()
+    monkeypatch.setattr(instrumentation, '_sink', recording)
+    return recording
+
+
+@pytest.fixture
+def client():
+    """2件のポイントを持つローカルモードのクライアント"""
+    local = QdrantClient(':memory:')
+    local.create_collection(COLLECTION, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    local.upsert(COLLECTION, points=[
+        PointStruct(id=1, vector=[1.0, 0.0], payload={'text': 'a'}),
+        PointStruct(id=2, vector=[0.0, 1.0], payload={'text': 'b'}),
+    ])
+    yield local
+    local.close()
+
+
+class TestPrometheusMetricsSink:
+    """PrometheusMetricsSinkのテスト"""
+
+    def test_render(self):
+        """カウンター・ゲージ・ヒストグラムをテキスト形式で出力すること"""
+        sink = PrometheusMetricsSink(buckets={METRIC_DURATION: (0.1, 1.0)})
+        sink.increment(METRIC_ERRORS, tags={'operation': 'query_points'})
+        sink.increment(METRIC_ERRORS, tags={'operation': 'query_points'})
+        sink.gauge(METRIC_CIRCUIT_STATE, 2, {'circuit': 'qdrant-primary'})
+        sink.observe(METRIC_DURATION, 0.05, {'operation': 'query_points'})
+        sink.observe(METRIC_DURATION, 0.5, {'operation': 'query_points'})
+
+        lines = sink.render().splitlines()
+
+        assert f'{METRIC_ERRORS}{{operation="query_points"}} 2' in lines
+        assert f'{METRIC_CIRCUIT_STATE}{{circuit="qdrant-primary"}} 2' in lines
+        assert f'# TYPE {METRIC_DURATION} histogram' in lines
+        assert f'{METRIC_DURATION}_bucket{{operation="query_points",le="0.1"}} 1' in lines
+        assert f'{METRIC_DURATION}_bucket{{operation="query_points",le="1"}} 2' in lines
+        assert f'{METRIC_DURATION}_bucket{{operation="query_points",le="+Inf"}} 2' in lines
+        assert f'{METRIC_DURATION}_sum{{operation="query_points"}} 0.55' in lines
+        assert f'{METRIC_DURATION}_count{{operation="query_points"}} 2' in lines
+
+    def test_label_values_are_escaped(self):
+        """ラベルの値の引用符と改行をエスケープすること"""
+        sink = PrometheusMetricsSink()
+        sink.increment(METRIC_ERRORS, tags={'error': 'a"b\nc'})
+        assert f'{METRIC_ERRORS}{{error="a\\"b\\nc"}} 1' in sink.render().splitlines()
+
+
+class TestStatsdMetricsSink:
+    """StatsdMetricsSinkのテスト"""
+
+    def test_sends_udp_packets(self):
+        """カウンター・タイマー・ヒストグラム・ゲージをラベル付きで送信すること"""
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(1.0)
+        sink = StatsdMetricsSink('127.0.0.1', receiver.getsockname()[1], prefix='deep_read')
+        try:
+            sink.increment(METRIC_ERRORS, tags={'operation': 'query_points'})
+            sink.observe(METRIC_DURATION, 0.25)
+            sink.observe(METRIC_POINTS, 10, {'collection': 'a,b'})
+            sink.gauge(METRIC_CIRCUIT_STATE, 1)
+            packets = [receiver.recv(1024).decode('utf-8') for _ in range(4)]
+        finally:
+            sink.close()
+            receiver.close()
+
+        assert packets == [
+            f'deep_read.{METRIC_ERRORS}:1|c|#operation:query_points',
+            f'deep_read.{METRIC_DURATION}:250.000|ms',
+            f'deep_read.{METRIC_POINTS}:10|h|#collection:a_b',
+            f'deep_read.{METRIC_CIRCUIT_STATE}:1|g',
+        ]
+
+
+class TestInstrumentedQdrantClient:
+    """InstrumentedQdrantClientのテスト"""
+
+    def test_records_latency_and_points(self, client, sink):
+        """呼び出しのレイテンシと返却されたポイント数・サイズを記録すること"""
+        instrumented = InstrumentedQdrantClient(client, node='primary', sink=sink)
+
+        with track_qdrant_calls() as stats:
+            response = instrumented.query_points(COLLECTION, query=[1.0, 0.0], limit=2, with_payload=True)
+
+        tags = {'operation': 'query_points', 'collection': COLLECTION, 'node': 'primary'}
+        assert sink.named(METRIC_DURATION)[0][3] == {**tags, 'outcome': 'ok'}
+        assert sink.named(METRIC_POINTS) == [('observe', METRIC_POINTS, 2, tags)]
+        assert sink.named(METRIC_BYTES)[0][2] == measure_result(response)[1] > 0
+        assert (stats.calls, stats.points, stats.errors) == (1, 2, 0)
+        assert stats.bytes == measure_result(response)[1]
+
+    def test_operations_without_points(self, client, sink):
+        """ポイントを返さない操作では件数・サイズを記録しないこと"""
+        instrumented = InstrumentedQdrantClient(client, sink=sink)
+        assert instrumented.count(COLLECTION).count == 2
+        assert len(sink.named(METRIC_DURATION)) == 1
+        assert not sink.named(METRIC_POINTS)
+
+    def test_scroll_and_batch_results_are_measured(self, client):
+        """scrollとバッチ検索の結果からポイント数を求めること"""
+        records, _ = client.scroll(COLLECTION, limit=10)
+        assert measure_result((records, None))[0] == 2
+        responses = client.query_batch_points(COLLECTION, requests=[])
+        assert measure_result(responses) == (0, 0)
+
+    def test_result_size_does_not_serialize_payloads(self):
+        """返却されたポイントのサイズはペイロードをJSONに変換せずに概算すること"""
+        records = [Record(id=i, vector=[0.0] * 8, payload={'text': 'x' * 100, 'page': i}) for i in range(3)]
+        with patch.object(instrumentation.json, 'dumps', side_effect=AssertionError('json.dumps called')):
+            count, size = measure_result((records, None))
+        assert count == 3
+        assert size == 3 * (16 + 4 * 8 + len('text') + 100 + len('page') + instrumentation.PAYLOAD_VALUE_SIZE)
+
+    def test_records_errors(self, sink):
+        """失敗した呼び出しをエラーの種類ごとに記録し、例外をそのまま送出すること"""
+        raw = MagicMock()
+        raw.query_points.side_effect = TimeoutError('deadline')
+        instrumented = InstrumentedQdrantClient(raw, sink=sink)
+
+        with track_qdrant_calls() as stats:
+            with pytest.raises(TimeoutError):
+                instrumented.query_points(collection_name=COLLECTION, query=[1.0])
+
+        assert sink.named(METRIC_ERRORS)[0][3]['error'] == 'TimeoutError'
+        assert sink.named(METRIC_DURATION)[0][3]['outcome'] == 'error'
+        assert (stats.calls, stats.errors) == (1, 1)
+
+    def test_async_client(self, sink):
+        """非同期クライアントの呼び出しも計測すること"""
+        async def run():
+            raw = AsyncQdrantClient(':memory:')
+            instrumented = InstrumentedQdrantClient(raw, sink=sink)
+            await instrumented.create_collection(COLLECTION, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+            await instrumented.upsert(COLLECTION, points=[PointStruct(id=1, vector=[1.0, 0.0])])
+            response = await instrumented.query_points(COLLECTION, query=[1.0, 0.0])
+            await raw.close()
+            return response
+
+        with track_qdrant_calls() as stats:
+            response = asyncio.run(run())
+
+        assert len(response.points) == 1
+        assert stats.calls == 3
+        assert sink.named(METRIC_POINTS)[0][2] == 1
+
+    def test_instrument_client_is_disabled_by_default(self, monkeypatch):
+        """計測が無効な場合はクライアントをそのまま返すこと"""
+        monkeypatch.setattr(instrumentation, '_sink', NullMetricsSink())
+        raw = MagicMock()
+        assert instrument_client(raw) is raw
+
+    def test_instrument_client_wraps_when_enabled(self, sink):
+        """計測が有効な場合はプロキシで包むこと"""
+        raw = MagicMock()
+        wrapped = instrument_client(raw, node='replica')
+        assert isinstance(wrapped, InstrumentedQdrantClient)
+        assert wrapped.wrapped is raw
+        wrapped.get_collections()
+        assert sink.named(METRIC_DURATION)[0][3]['node'] == 'replica'
+
+
+class TestResilienceMetrics:
+    """再試行とサーキット状態の記録のテスト"""
+
+    def test_record_retry(self, sink):
+        """再試行を理由ごとに記録し、リクエストの集計にも加算すること"""
+        with track_qdrant_calls() as stats:
+            record_retry('hedge')
+        assert sink.named(METRIC_RETRIES) == [('increment', METRIC_RETRIES, 1, {'reason': 'hedge'})]
+        assert stats.retries == 1
+
+    def test_circuit_state_transitions(self, sink):
+        """サーキットの状態遷移をゲージとして記録すること"""
+        now = [0.0]
+        breaker = CircuitBreaker('qdrant-primary', failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10.0
+        breaker.allow_request()
+        breaker.record_success()
+
+        assert [event[2] for event in sink.named(METRIC_CIRCUIT_STATE)] == [2, 1, 0]
+
+
+class TestRequestLogging:
+    """QdrantRequestLogMiddleware と metrics_view のテスト"""
+
+    def test_middleware_attaches_stats(self, client, sink, caplog):
+        """リクエスト中のQdrant呼び出しをログとServer-Timingヘッダーに出力すること"""
+        instrumented = InstrumentedQdrantClient(client, sink=sink)
+
+        def view(_request):
+            instrumented.query_points(COLLECTION, query=[1.0, 0.0], limit=1)
+            return HttpResponse('ok')
+
+        with caplog.at_level('INFO', logger='app.adapters.search.middleware'):
+            response = QdrantRequestLogMiddleware(view)(RequestFactory().get('/search'))
+
+        assert response['Server-Timing'].startswith('qdrant;dur=')
+        assert 'qdrant_calls=1' in caplog.text
+        assert 'qdrant_points=1' in caplog.text
+
+    def test_middleware_without_calls(self):
+        """Qdrantを呼び出さなかったリクエストではヘッダーを付与しないこと"""
+        response = QdrantRequestLogMiddleware(lambda _request: HttpResponse('ok'))(RequestFactory().get('/'))
+        assert not response.has_header('Server-Timing')
+
+    def test_metrics_view(self, sink):
+        """Prometheus形式の計測値を返すこと"""
+        sink.increment(METRIC_RETRIES, tags={'reason': 'hedge'})
+        response = metrics_view(RequestFactory().get('/metrics/qdrant'))
+        assert response.status_code == 200
+        assert f'{METRIC_RETRIES}{{reason="hedge"}} 1' in response.content.decode('utf-8')
+
+    def test_metrics_view_disabled(self, monkeypatch):
+        """Prometheus形式の計測が無効な場合は404を返すこと"""
+        monkeypatch.setattr(instrumentation, '_sink', NullMetricsSink())
+        with pytest.raises(Http404):
+            metrics_view(RequestFactory().get('/metrics/qdrant'))
@@ -0,0 +1,189 @@
+"""LocalSearchGatewayのテストモジュール
+
+ローカルモードのQdrantクライアント（インメモリ）から構築したインデックスと、
+Qdrantでの検索結果が一致することをテストします。
+"""
+# pylint: disable=redefined-outer-name
+
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from app.adapters.search.local_search_gateway import LocalSearchGateway, invalidate_local_indexes
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.core.search.gateways import SearchFilter
+
+COLLECTION = 'documents'
+
+
+@pytest.fixture
+def local_client(settings):
+    """テスト用のポイントを登録したインメモリQdrantクライアント"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = False
+    client = QdrantClient(':memory:')
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert(COLLECTION, points=[
+        PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0],
+                    payload={'user_id': '1', 'document_id': 'doc-a', 'tags': ['math']}),
+        PointStruct(id=2, vector=[0.9, 0.1, 0.0, 0.0],
+                    payload={'user_id': '1', 'document_id': 'doc-b', 'tags': ['physics']}),
+        PointStruct(id=3, vector=[0.1, 0.9, 0.2, 0.0],
+                    payload={'user_id': '1', 'document_id': 'doc-b', 'tags': ['math', 'physics']}),
+        PointStruct(id=4, vector=[1.0, 0.0, 0.0, 0.0],
+                    payload={'user_id': '2', 'document_id': 'doc-c', 'tags': ['math']}),
+    ])
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def gateway(local_client, tmp_path):
+    """インデックス保存先を一時ディレクトリにしたゲートウェイ"""
+    return LocalSearchGateway(client=local_client, index_dir=str(tmp_path), max_points=2)
+
+
+class TestLocalSearchGateway:
+    """ローカル総当たり検索ゲートウェイのテスト"""
+
+    @pytest.mark.parametrize('search_filter', [
+        SearchFilter(user_id=2),
+        SearchFilter(user_id='2', tags=['math']),
+        SearchFilter(user_id=2, document_ids=['doc-x']),
+    ])
+    def test_results_match_qdrant(self, local_client, tmp_path, search_filter):
+        """ローカル検索の結果がQdrantでの検索結果と一致することをテスト"""
+        gateway = LocalSearchGateway(client=local_client, index_dir=str(tmp_path), max_points=10)
+        qdrant = QdrantSearchGateway(client=local_client)
+        query = [0.7, 0.3, 0.1, 0.0]
+
+        local_hits = gateway.search(COLLECTION, query, search_filter)
+        qdrant_hits = qdrant.search(COLLECTION, query, search_filter)
+
+        assert [hit.point_id for hit in local_hits] == [hit.point_id for hit in qdrant_hits]
+        assert [hit.payload for hit in local_hits] == [hit.payload for hit in qdrant_hits]
+        for local_hit, qdrant_hit in zip(local_hits, qdrant_hits):
+            assert local_hit.score == pytest.approx(qdrant_hit.score, abs=1e-3)
+
+    @pytest.mark.parametrize('group_size', [1, 2])
+    def test_grouped_results_match_qdrant(self, local_client, tmp_path, group_size):
+        """文書ごとにグループ化したローカル検索の結果がQdrantでの結果と一致することをテスト"""
+        gateway = LocalSearchGateway(client=local_client, index_dir=str(tmp_path), max_points=10)
+        qdrant = QdrantSearchGateway(client=local_client)
+        query = [0.2, 0.9, 0.1, 0.0]
+        search_filter = SearchFilter(user_id=1)
+
+        local_groups = gateway.search_groups(COLLECTION, query, search_filter, group_limit=2, group_size=group_size)
+        qdrant_groups = qdrant.search_groups(COLLECTION, query, search_filter, group_limit=2, group_size=group_size)
+
+        assert [group.group_id for group in local_groups] == [group.group_id for group in qdrant_groups]
+        assert [[hit.point_id for hit in group.hits] for group in local_groups] == \
+            [[hit.point_id for hit in group.hits] for group in qdrant_groups]
+
+    @pytest.mark.usefixtures('local_client')
+    def test_index_is_built_once(self, gateway, tmp_path):
+        """インデックスは初回検索時に構築され、以降はQdrantに問い合わせないことをテスト"""
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+        assert (tmp_path / COLLECTION / '2' / 'vectors.npy').exists()
+
+        gateway._client = MagicMock(spec=QdrantClient)  # pylint: disable=protected-access
+        gateway.fallback = MagicMock()
+        hits = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+
+        assert [hit.point_id for hit in hits] == [4]
+        gateway._client.count.assert_not_called()  # pylint: disable=protected-access
+        gateway.fallback.search.assert_not_called()
+
+    def test_large_user_falls_back_to_qdrant(self, gateway, tmp_path):
+        """ポイント数が上限を超えるユーザーはフォールバック先で検索されることをテスト"""
+        fallback = MagicMock()
+        fallback.search.return_value = []
+        gateway.fallback = fallback
+
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+
+        assert fallback.search.call_count == 2
+        assert not (tmp_path / COLLECTION / '1' / 'vectors.npy').exists()
+
+    def test_search_without_user_falls_back(self, gateway):
+        """ユーザーで絞り込まない検索はフォールバック先で検索されることをテスト"""
+        gateway.fallback = MagicMock()
+
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0])
+
+        gateway.fallback.search.assert_called_once_with(COLLECTION, [1.0, 0.0, 0.0, 0.0], None, 10)
+
+    @pytest.mark.usefixtures('tmp_path')
+    def test_invalidate_index(self, gateway, local_client):
+        """インデックスを破棄すると次回検索時に最新のポイントで再構築されることをテスト"""
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+        local_client.upsert(COLLECTION, points=[
+            PointStruct(id=5, vector=[0.0, 1.0, 0.0, 0.0], payload={'user_id': '2', 'document_id': 'doc-d'}),
+        ])
+
+        gateway.invalidate_index(COLLECTION, 2)
+        hits = gateway.search(COLLECTION, [0.0, 1.0, 0.0, 0.0], SearchFilter(user_id=2))
+
+        assert [hit.point_id for hit in hits] == [5, 4]
+
+    def test_invalidated_by_other_process(self, gateway, local_client, tmp_path):
+        """他のプロセスがディレクトリを削除した場合も、読み込み済みのインデックスを再構築することをテスト"""
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+        local_client.upsert(COLLECTION, points=[
+            PointStruct(id=5, vector=[0.0, 1.0, 0.0, 0.0], payload={'user_id': '2', 'document_id': 'doc-d'}),
+        ])
+
+        invalidate_local_indexes(COLLECTION, [2], index_dir=str(tmp_path))
+        hits = gateway.search(COLLECTION, [0.0, 1.0, 0.0, 0.0], SearchFilter(user_id=2))
+
+        assert [hit.point_id for hit in hits] == [5, 4]
+
+    def test_expired_index_is_rebuilt(self, local_client, tmp_path):
+        """構築からTTLが経過したインデックスは、上限超過の記録も含めて再構築することをテスト"""
+        gateway = LocalSearchGateway(client=local_client, index_dir=str(tmp_path), max_points=2, ttl_seconds=60)
+        gateway.fallback = MagicMock()
+        gateway.fallback.search.return_value = []
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+        meta_path = tmp_path / COLLECTION / '1' / 'meta.json'
+        expired = time.time() - 120
+        os.utime(meta_path, (expired, expired))
+
+        gateway.max_points = 10
+        hits = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+
+        assert [hit.point_id for hit in hits] == [1, 2, 3]
+        gateway.fallback.search.assert_called_once()
+
+    def test_build_does_not_block_other_users(self, gateway, tmp_path):
+        """あるユーザーのインデックスの構築中も、他のユーザーの検索は待機しないことをテスト"""
+        gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+        started, release = threading.Event(), threading.Event()
+        build_index = gateway.build_index
+
+        def slow_build(collection_name, user_id):
+            started.set()
+            release.wait(5)
+            return build_index(collection_name, user_id)
+
+        with patch.object(gateway, 'build_index', side_effect=slow_build):
+            gateway.fallback = MagicMock()
+            thread = threading.Thread(
+                target=gateway.search, args=(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1)))
+            thread.start()
+            assert started.wait(5)
+            searched_at = time.monotonic()
+            hits = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+            elapsed = time.monotonic() - searched_at
+            release.set()
+            thread.join(5)
+
+        assert elapsed < 1.0
+        assert [hit.point_id for hit in hits] == [4]
+        assert (tmp_path / COLLECTION / '1' / 'meta.json').exists()
@@ -0,0 +1,108 @@
+"""LocalVectorIndexのテストモジュール"""
+
+import numpy as np
+import pytest
+
+from app.adapters.search import local_vector_index
+from app.adapters.search.local_vector_index import LocalVectorIndex
+from app.core.search.gateways import SearchFilter
+
+
+@pytest.fixture
+def index():
+    """テスト用のインデックス"""
+    return LocalVectorIndex.from_points(
+        [1, 2, 3, 'a'],
+        [[1.0, 0.0], [0.8, 0.6], [0.0, 2.0], [-1.0, 0.0]],
+        [
+            {'user_id': '1', 'document_id': 'doc-a', 'tags': ['math']},
+            {'user_id': '1', 'document_id': 'doc-b', 'tags': ['physics', 'math']},
+            {'user_id': '1', 'document_id': 'doc-b'},
+            {'user_id': '1', 'document_id': 'doc-c'},
+        ],
+    )
+
+
+class TestLocalVectorIndex:
+    """総当たり検索インデックスのテスト"""
+
+    def test_vectors_are_normalized_float16(self, index):
+        """ベクトルが正規化されたfloat16行列として保持されることをテスト"""
+        assert index.vectors.dtype == np.float16
+        assert np.allclose(np.linalg.norm(index.vectors.astype(np.float32), axis=1), 1.0, atol=1e-3)
+
+    def test_search_returns_cosine_scores(self, index):
+        """コサイン類似度の降順で結果が返されることをテスト"""
+        hits = index.search([2.0, 0.0], limit=3)
+
+        assert [hit.point_id for hit in hits] == [1, 2, 3]
+        assert [round(hit.score, 2) for hit in hits] == [1.0, 0.8, 0.0]
+        assert hits[0].payload['document_id'] == 'doc-a'
+
+    def test_search_applies_filter(self, index):
+        """絞り込み条件に一致しないポイントが除外されることをテスト"""
+        by_tag = index.search([1.0, 0.0], SearchFilter(user_id=1, tags=['math']))
+        by_document = index.search([1.0, 0.0], SearchFilter(user_id=1, document_ids=['doc-b', 'doc-c']))
+        other_user = index.search([1.0, 0.0], SearchFilter(user_id=2))
+
+        assert [hit.point_id for hit in by_tag] == [1, 2]
+        assert [hit.point_id for hit in by_document] == [2, 3, 'a']
+        assert other_user == []
+
+    def test_search_groups(self, index):
+        """文書ごとに件数を制限してグループ化した結果が返されることをテスト"""
+        groups = index.search_groups([0.8, 0.6], 'document_id', group_limit=2, group_size=1,
+                                     payload_fields=['document_id'])
+
+        assert [group.group_id for group in groups] == ['doc-b', 'doc-a']
+        assert [[hit.point_id for hit in group.hits] for group in groups] == [[2], [1]]
+        assert groups[0].hits[0].payload == {'document_id': 'doc-b'}
+        assert groups[0].score > groups[1].score
+
+    def test_search_groups_applies_filter(self, index):
+        """絞り込み条件に一致するポイントのみがグループ化されることをテスト"""
+        groups = index.search_groups([0.0, 1.0], 'document_id', SearchFilter(user_id=1, tags=['math']), group_size=3)
+
+        assert [(group.group_id, [hit.point_id for hit in group.hits]) for group in groups] == \
+            [('doc-b', [2]), ('doc-a', [1])]
+
+    def test_search_batch_across_blocks(self, monkeypatch):
+        """ブロック分割した場合も全件走査と同じ上位が得られることをテスト"""
+        monkeypatch.setattr(local_vector_index, 'BLOCK_ROWS', 7)
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8))
+        queries = rng.normal(size=(3, 8))
+        index = LocalVectorIndex.from_points(list(range(50)), vectors, [{}] * 50)
+
+        results = index.search_batch(queries, limit=5)
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        for query, hits in zip(queries, results):
+            expected = np.argsort(-(normalized @ query))[:5]
+            assert [hit.point_id for hit in hits] == list(expected)
+
+    def test_save_and_load_with_memmap(self, index, tmp_path):
+        """保存したインデックスをmemmapで読み込めることをテスト"""
+        directory = str(tmp_path / 'documents' / '1')
+        index.save(directory)
+        # 上書き保存も可能
+        index.save(directory)
+
+        loaded = LocalVectorIndex.load(directory)
+
+        assert isinstance(loaded.vectors, np.memmap)
+        assert loaded.point_ids == index.point_ids
+        assert LocalVectorIndex.read_meta(directory) == {'point_count': 4, 'dimension': 2}
+        assert [hit.point_id for hit in loaded.search([1.0, 0.0], limit=2)] == [1, 2]
+
+    def test_empty_index(self, tmp_path):
+        """ポイントが無いインデックスでは空の結果が返されることをテスト"""
+        empty = LocalVectorIndex.from_points([], [], [])
+        empty.save(str(tmp_path / 'empty'))
+
+        assert LocalVectorIndex.load(str(tmp_path / 'empty')).search([1.0, 0.0]) == []
+
+    def test_mismatched_lengths(self):
+        """件数が一致しない場合はValueErrorが発生することをテスト"""
+        with pytest.raises(ValueError):
+            LocalVectorIndex([1, 2], np.zeros((1, 2), dtype=np.float16), [{}])
@@ -0,0 +1,200 @@
+"""QdrantPointWriterのテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CollectionStatus,
+    Distance,
+    Modifier,
+    PointStruct,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from app.adapters.search.point_writer import QdrantPointWriter, estimate_point_size
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.core.search.gateways import IndexPoint, SearchFilter
+
+COLLECTION = 'documents'
+
+
+@pytest.fixture(autouse=True)
+def writer_settings(settings, tmp_path):
+    """コレクション設定と、状態確認を毎回行う設定"""
+    settings.LOCAL_VECTOR_INDEX_DIR = str(tmp_path / 'vector_index')
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = False
+    settings.QDRANT_UPSERT_STATUS_INTERVAL = 0
+    settings.QDRANT_UPSERT_MAX_UNINDEXED = 100
+    settings.QDRANT_UPSERT_BACKPRESSURE_TIMEOUT = 1.0
+    return settings
+
+
+def _points(count, start=0):
+    return [
+        IndexPoint(point_id=i, vector=[1.0, float(i), 0.0, 0.0], payload={'user_id': '1', 'document_id': 'doc-a'})
+        for i in range(start, start + count)
+    ]
+
+
+def _upsert_sizes(client, wait):
+    return [len(c.kwargs['points']) for c in client.upsert.call_args_list if c.kwargs['wait'] is wait]
+
+
+class TestQdrantPointWriter:
+    """QdrantPointWriterのテスト"""
+
+    def test_batches_by_count(self):
+        """件数の上限でバッチにまとめて送信し、flushで残りを送信して反映を確認することをテスト"""
+        client = MagicMock()
+        writer = QdrantPointWriter(client=client, batch_size=2)
+
+        writer.add(COLLECTION, _points(5))
+
+        assert writer.flush() == 5
+        assert _upsert_sizes(client, wait=False) == [2, 2, 1]
+        # 最後に送信したポイントを wait=True で再送して反映を確認する
+        assert _upsert_sizes(client, wait=True) == [1]
+        assert client.upsert.call_args.kwargs['points'][0].id == 4
+        writer.close()
+
+    def test_batches_by_size(self):
+        """サイズの上限を超える場合はバッチを分割することをテスト"""
+        client = MagicMock()
+        points = _points(3)
+        writer = QdrantPointWriter(client=client, batch_size=100, max_batch_bytes=1)
+
+        writer.add(COLLECTION, points)
+        writer.flush()
+
+        assert _upsert_sizes(client, wait=False) == [1, 1, 1]
+        writer.close()
+
+    def test_estimate_point_size(self):
+        """ベクトルとペイロードから送信サイズを概算することをテスト"""
+        base = estimate_point_size(PointStruct(id=1, vector=[0.0] * 8, payload={}))
+        assert estimate_point_size(PointStruct(id=1, vector=[0.0] * 16, payload={})) == base + 32
+        assert estimate_point_size(PointStruct(id=1, vector=[0.0] * 8, payload={'text': 'x' * 100})) > base + 100
+
+    def test_flush_without_points(self):
+        """ポイントが無い場合は何も送信しないことをテスト"""
+        client = MagicMock()
+        with QdrantPointWriter(client=client) as writer:
+            assert writer.flush() == 0
+        client.upsert.assert_not_called()
+
+    def test_limits_in_flight_requests(self):
+        """同時に送信中のリクエスト数が上限を超えないことをテスト"""
+        client = MagicMock()
+        lock = threading.Lock()
+        state = {'current': 0, 'max': 0}
+
+        def slow_upsert(*args, **kwargs):
+            with lock:
+                state['current'] += 1
+                state['max'] = max(state['max'], state['current'])
+            time.sleep(0.02)
+            with lock:
+                state['current'] -= 1
+
+        client.upsert.side_effect = slow_upsert
+        with QdrantPointWriter(client=client, batch_size=1, max_in_flight=2) as writer:
+            writer.add(COLLECTION, _points(8))
+
+        assert state['max'] == 2
+        assert _upsert_sizes(client, wait=False) == [1] * 8
+
+    def test_upsert_error_is_raised(self):
+        """送信に失敗した場合はflushでエラーを送出することをテスト"""
+        client = MagicMock()
+        client.upsert.side_effect = RuntimeError('unavailable')
+        writer = QdrantPointWriter(client=client, batch_size=10)
+        writer.add(COLLECTION, _points(3))
+
+        with pytest.raises(RuntimeError, match='unavailable'):
+            writer.flush()
+        writer.close()
+
+    def test_waits_for_optimizer(self):
+        """最適化中で未インデックスのポイントが多い間は送信を待機することをテスト"""
+        client = MagicMock()
+        client.get_collection.side_effect = [
+            MagicMock(status=CollectionStatus.YELLOW, points_count=1000, indexed_vectors_count=0),
+            MagicMock(status=CollectionStatus.GREEN, points_count=1000, indexed_vectors_count=1000),
+        ]
+        with QdrantPointWriter(client=client, batch_size=2) as writer:
+            writer.add(COLLECTION, _points(2))
+
+        assert client.get_collection.call_count == 2
+        assert _upsert_sizes(client, wait=False) == [2]
+
+    def test_optimizer_backpressure_timeout(self, writer_settings):
+        """最適化が待機時間内に追いつかない場合はTimeoutErrorを送出することをテスト"""
+        writer_settings.QDRANT_UPSERT_BACKPRESSURE_TIMEOUT = 0.05
+        client = MagicMock()
+        client.get_collection.return_value = MagicMock(
+            status=CollectionStatus.YELLOW, points_count=1000, indexed_vectors_count=0)
+        writer = QdrantPointWriter(client=client, batch_size=2)
+
+        with pytest.raises(TimeoutError):
+            writer.add(COLLECTION, _points(2))
+        client.upsert.assert_not_called()
+        writer.close()
+
+    def test_hybrid_points_are_searchable_after_flush(self, writer_settings):
+        """ハイブリッド構成のコレクションに疎ベクトル付きで登録され、flush後に検索できることをテスト"""
+        writer_settings.QDRANT_HYBRID_SEARCH = True
+        client = QdrantClient(':memory:')
+        client.create_collection(
+            COLLECTION,
+            vectors_config={'dense': VectorParams(size=4, distance=Distance.COSINE)},
+            sparse_vectors_config={'sparse': SparseVectorParams(modifier=Modifier.IDF)},
+        )
+        points = [
+            IndexPoint(point_id=1, vector=[1.0, 0.0, 0.0, 0.0], payload={'user_id': '1'}, text='線形代数の固有値'),
+            IndexPoint(point_id=2, vector=[0.0, 1.0, 0.0, 0.0], payload={'user_id': '1'}, text='確率と統計'),
+        ]
+        # ローカルモードのクライアントはスレッドセーフではないため、送信は1件ずつ行う
+        with QdrantPointWriter(client=client, batch_size=1, max_in_flight=1) as writer:
+            writer.add(COLLECTION, points)
+
+        assert client.count(COLLECTION).count == 2
+        hits = QdrantSearchGateway(client=client).hybrid_search(
+            COLLECTION, [0.0, 1.0, 0.0, 0.0], '固有値', SearchFilter(user_id=1))
+        assert {hit.point_id for hit in hits} == {1, 2}
+        client.close()
+
+    def test_int_user_id_is_searchable(self):
+        """整数のuser_idは文字列として登録され、ユーザーで絞り込んだ検索で取得できることをテスト"""
+        client = QdrantClient(':memory:')
+        client.create_collection(COLLECTION, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+        point = IndexPoint(point_id=1, vector=[1.0, 0.0, 0.0, 0.0], payload={'user_id': 7})
+        with QdrantPointWriter(client=client, max_in_flight=1) as writer:
+            writer.add(COLLECTION, [point])
+
+        assert client.retrieve(COLLECTION, [1])[0].payload['user_id'] == '7'
+        hits = QdrantSearchGateway(client=client).search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=7))
+        assert [hit.point_id for hit in hits] == [1]
+        assert point.payload['user_id'] == 7
+        client.close()
+
+    def test_flush_invalidates_local_indexes(self, writer_settings):
+        """flushで登録を反映した後、ポイントを登録したユーザーのローカルインデックスを破棄することをテスト"""
+        index_dir = os.path.join(writer_settings.LOCAL_VECTOR_INDEX_DIR, COLLECTION)
+        for user_id in ('1', '2'):
+            os.makedirs(os.path.join(index_dir, user_id))
+        writer = QdrantPointWriter(client=MagicMock())
+
+        writer.add(COLLECTION, _points(2))
+        assert os.path.exists(os.path.join(index_dir, '1'))
+        writer.flush()
+
+        assert sorted(os.listdir(index_dir)) == ['2']
+        writer.close()
@@ -181,7 +181,9 @@ class TestQdrantDirectConnection:
                 timeout=qdrant_timeout
             )
             collections_list = client.get_collections()
+            # 新規コレクションはバージョン付きの物理コレクションとして作成され、論理名はエイリアスとなる
             collection_names = [c.name for c in collections_list.collections]
+            collection_names += [a.alias_name for a in client.get_aliases().aliases]
             logger.info(f"実際の接続成功。取得されたコレクション: {collection_names}")
             print(f"実際の接続成功。取得されたコレクション: {collection_names}")
 
@@ -227,7 +229,9 @@ class TestQdrantDirectConnection:
             # クライアントを取得してコレクションを確認
             client = get_qdrant_client()
             collections_list = client.get_collections()
+            # 新規コレクションはバージョン付きの物理コレクションとして作成され、論理名はエイリアスとなる
             collection_names = [c.name for c in collections_list.collections]
+            collection_names += [a.alias_name for a in client.get_aliases().aliases]
 
             # 期待されるコレクションが存在するか確認
             expected_collections = [settings.QDRANT_COLLECTION_DOCUMENTS, settings.QDRANT_COLLECTION_QA]
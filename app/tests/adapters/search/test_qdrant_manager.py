@@ -4,6 +4,7 @@ Qdrantへの接続やコレクション操作、ベクトル検索の基本機
 """
 # pylint: disable=redefined-outer-name
 
+import os
 import uuid
 from unittest.mock import MagicMock, patch
 
@@ -13,8 +14,12 @@ from qdrant_client import QdrantClient, models
 from qdrant_client.http.models import Distance, PointStruct, VectorParams
 from qdrant_client.models import FieldCondition, Filter, MatchValue
 
+from app.adapters.search.collection_config import CollectionConfig, get_collection_config
+from app.adapters.search.payload_schema import get_index_data_type, get_payload_indexes
 from app.adapters.search.qdrant_manager import (
     QdrantClientManager,
+    _diff_collection_config,
+    _ensure_payload_indexes,
     _get_existing_collections,
     ensure_collections_exist,
     get_qdrant_client,
@@ -106,7 +111,8 @@ class TestQdrantIntegration:
         """ensure_collections_exist実行後にコレクションが存在するか確認"""
         client = get_qdrant_client()
         collections = client.get_collections().collections
-        collection_names = {c.name for c in collections}
+        # コレクションは論理名のエイリアス、またはエイリアス導入前の論理名のコレクションとして存在する
+        collection_names = {c.name for c in collections} | {a.alias_name for a in client.get_aliases().aliases}
         assert settings.QDRANT_COLLECTION_DOCUMENTS in collection_names
         assert settings.QDRANT_COLLECTION_QA in collection_names
 
@@ -384,3 +390,421 @@ class TestQdrantManagerUnit:
 
         # 期待される結果と一致するか確認
         assert result == {"test_collection_1", "test_collection_2"}
+
+
+@pytest.mark.django_db  # settings を利用するため
+class TestQdrantClientManagerForkSafety:
+    """fork後のクライアント再初期化のテスト"""
+
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._rebuild_count', 0)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._pid', None)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._instance', None)
+    @patch('app.adapters.search.qdrant_manager.QdrantClient')
+    def test_get_client_rebuilds_when_pid_changes(self, mock_qdrant_client_class):
+        """生成元と異なるプロセスから取得した場合にクライアントが作り直されることをテスト"""
+        # pylint: disable=protected-access
+        inherited_client = MagicMock(spec=QdrantClient)
+        new_client = MagicMock(spec=QdrantClient)
+        mock_qdrant_client_class.return_value = new_client
+
+        # 親プロセスで生成されたクライアントを引き継いだ状態を再現
+        QdrantClientManager._instance = inherited_client
+        QdrantClientManager._pid = os.getpid() + 1
+
+        client = QdrantClientManager.get_client()
+
+        assert client is new_client
+        assert QdrantClientManager._pid == os.getpid()
+        assert QdrantClientManager.get_rebuild_count() == 1
+        # 引き継いだチャネルはクローズしない
+        inherited_client.close.assert_not_called()
+
+        # 同一プロセス内では再生成されない
+        assert QdrantClientManager.get_client() is new_client
+        assert mock_qdrant_client_class.call_count == 1
+
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._rebuild_count', 0)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._pid', None)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._instance', None)
+    def test_after_fork_in_child_discards_instance(self):
+        """fork後フックでインスタンスが破棄されカウンタが増えることをテスト"""
+        # pylint: disable=protected-access
+        QdrantClientManager._instance = MagicMock(spec=QdrantClient)
+        QdrantClientManager._pid = os.getpid()
+
+        QdrantClientManager.after_fork_in_child()
+
+        assert QdrantClientManager._instance is None
+        assert QdrantClientManager.get_rebuild_count() == 1
+
+        # インスタンスが無い場合はカウントしない
+        QdrantClientManager.after_fork_in_child()
+        assert QdrantClientManager.get_rebuild_count() == 1
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="forkが利用できない環境です")
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._rebuild_count', 0)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._pid', None)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._instance', None)
+    def test_real_fork_resets_instance_in_child(self):
+        """実際にforkした子プロセスでインスタンスが破棄されていることをテスト"""
+        # pylint: disable=protected-access
+        QdrantClientManager._instance = MagicMock(spec=QdrantClient)
+        QdrantClientManager._pid = os.getpid()
+
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - 子プロセス側
+            ok = QdrantClientManager._instance is None and QdrantClientManager.get_rebuild_count() == 1
+            os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        # 親プロセスのインスタンスはそのまま
+        assert QdrantClientManager._instance is not None
+
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._replica_pid', None)
+    @patch('app.adapters.search.qdrant_manager.QdrantClientManager._replica_instance', None)
+    @patch('app.adapters.search.qdrant_manager.QdrantClient')
+    def test_get_replica_client(self, mock_qdrant_client_class, settings):
+        """レプリカが設定されている場合のみレプリカ接続クライアントが生成されることをテスト"""
+        settings.QDRANT_REPLICA_HOST = None
+        assert QdrantClientManager.get_replica_client() is None
+        mock_qdrant_client_class.assert_not_called()
+
+        settings.QDRANT_REPLICA_HOST = 'qdrant-replica'
+        settings.QDRANT_REPLICA_PORT = 6334
+        client = QdrantClientManager.get_replica_client()
+        assert client is mock_qdrant_client_class.return_value
+        assert QdrantClientManager.get_replica_client() is client
+        mock_qdrant_client_class.assert_called_once()
+        assert mock_qdrant_client_class.call_args.kwargs['host'] == 'qdrant-replica'
+
+        # fork後はレプリカ接続クライアントも破棄される
+        QdrantClientManager.after_fork_in_child()
+        assert QdrantClientManager._replica_instance is None  # pylint: disable=protected-access
+
+
+def _make_collection_info(config, **overrides):
+    """構成設定に一致する既存コレクション情報のモックを生成します"""
+    values = {
+        'm': config.hnsw_m,
+        'ef_construct': config.hnsw_ef_construct,
+        'full_scan_threshold': config.hnsw_full_scan_threshold,
+        'indexing_threshold': config.indexing_threshold,
+        'memmap_threshold': config.memmap_threshold,
+        'on_disk_payload': config.on_disk_payload,
+        'vectors': VectorParams(size=config.vector_size, distance=Distance.COSINE, on_disk=config.vectors_on_disk),
+        'sparse_vectors': None,
+    }
+    if config.hybrid:
+        values['vectors'] = {'dense': values['vectors']}
+        values['sparse_vectors'] = {'sparse': models.SparseVectorParams(modifier=models.Modifier.IDF)}
+    values.update(overrides)
+    info = MagicMock()
+    info.config.hnsw_config.m = values['m']
+    info.config.hnsw_config.ef_construct = values['ef_construct']
+    info.config.hnsw_config.full_scan_threshold = values['full_scan_threshold']
+    info.config.optimizer_config.indexing_threshold = values['indexing_threshold']
+    info.config.optimizer_config.memmap_threshold = values['memmap_threshold']
+    info.config.params.on_disk_payload = values['on_disk_payload']
+    info.config.params.vectors = values['vectors']
+    info.config.params.sparse_vectors = values['sparse_vectors']
+    info.payload_schema = {
+        field_name: models.PayloadIndexInfo(data_type=get_index_data_type(params), params=params, points=0)
+        for field_name, params in get_payload_indexes().items()
+    }
+    return info
+
+
+@pytest.mark.django_db  # settings を利用するため
+class TestCollectionConfigApplication:
+    """コレクション構成設定の適用と差分反映のテスト"""
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_create_collection_applies_config(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """コレクション作成時にHNSW・オプティマイザ・ディスク設定が適用されることをテスト"""
+        settings.QDRANT_HNSW_M = 32
+        settings.QDRANT_HNSW_EF_CONSTRUCT = 256
+        settings.QDRANT_VECTORS_ON_DISK = True
+        settings.QDRANT_ON_DISK_PAYLOAD = True
+        settings.QDRANT_INDEXING_THRESHOLD = 10000
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        assert mock_client.create_collection.call_count == 2
+        kwargs = mock_client.create_collection.call_args_list[0].kwargs
+        assert kwargs['collection_name'] == f"{settings.QDRANT_COLLECTION_DOCUMENTS}_v1"
+        assert kwargs['vectors_config'].on_disk is True
+        assert kwargs['hnsw_config'].m == 32
+        assert kwargs['hnsw_config'].ef_construct == 256
+        assert kwargs['optimizers_config'].indexing_threshold == 10000
+        assert kwargs['on_disk_payload'] is True
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_create_collection_applies_datatype_and_truncation(
+            self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """コレクション作成時にデータ型と切り詰め後の次元数が適用されることをテスト"""
+        settings.QDRANT_VECTOR_SIZE = 768
+        settings.QDRANT_VECTOR_DATATYPE = 'float16'
+        settings.QDRANT_VECTOR_TRUNCATE_DIM = 256
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        vectors_config = mock_client.create_collection.call_args_list[0].kwargs['vectors_config']
+        assert vectors_config.size == 256
+        assert vectors_config.datatype == models.Datatype.FLOAT16
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_cold_tier_collection_is_created(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """コールド層が有効な場合はディスク保存・量子化したコールド層のコレクションも作成されることをテスト"""
+        settings.QDRANT_COLD_TIER_ENABLED = True
+        settings.QDRANT_COLD_TIER_COLLECTIONS = []
+        settings.QDRANT_COLD_TIER_SUFFIX = '_cold'
+        settings.QDRANT_COLD_TIER_QUANTIZATION = 'scalar'
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        assert mock_client.create_collection.call_count == 3
+        kwargs = mock_client.create_collection.call_args_list[2].kwargs
+        assert kwargs['collection_name'] == f"{settings.QDRANT_COLLECTION_DOCUMENTS}_cold_v1"
+        assert kwargs['vectors_config'].on_disk is True
+        assert kwargs['on_disk_payload'] is True
+        assert isinstance(kwargs['quantization_config'], models.ScalarQuantization)
+        mock_client.update_collection_aliases.assert_called()
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_existing_collection_is_reconciled(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """既存コレクションの設定差分がupdate_collectionで反映されることをテスト"""
+        settings.QDRANT_COLLECTION_OVERRIDES = {settings.QDRANT_COLLECTION_DOCUMENTS: {'hnsw_m': 8}}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = {
+            settings.QDRANT_COLLECTION_DOCUMENTS,
+            settings.QDRANT_COLLECTION_QA,
+        }
+        # 既存コレクションは既定値(m=16)で作成されている
+        base = CollectionConfig(name='any', vector_size=settings.QDRANT_VECTOR_SIZE,
+                                hnsw_m=settings.QDRANT_HNSW_M,
+                                hnsw_ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                                hnsw_full_scan_threshold=settings.QDRANT_HNSW_FULL_SCAN_THRESHOLD,
+                                vectors_on_disk=settings.QDRANT_VECTORS_ON_DISK,
+                                on_disk_payload=settings.QDRANT_ON_DISK_PAYLOAD,
+                                indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD,
+                                memmap_threshold=settings.QDRANT_MEMMAP_THRESHOLD)
+        mock_client.get_collection.return_value = _make_collection_info(base)
+
+        ensure_collections_exist()
+
+        mock_client.create_collection.assert_not_called()
+        # 設定が異なるdocumentsのみ更新される
+        mock_client.update_collection.assert_called_once()
+        kwargs = mock_client.update_collection.call_args.kwargs
+        assert kwargs['collection_name'] == settings.QDRANT_COLLECTION_DOCUMENTS
+        assert kwargs['hnsw_config'].m == 8
+        assert set(kwargs) == {'collection_name', 'hnsw_config'}
+
+    def test_diff_collection_config_detects_storage_changes(self):
+        """ディスク保存・オプティマイザ設定の差分が検出されることをテスト"""
+        config = CollectionConfig(name='documents', vector_size=768, vectors_on_disk=True,
+                                  on_disk_payload=True, memmap_threshold=20000)
+        info = _make_collection_info(config, on_disk_payload=False, memmap_threshold=None,
+                                     vectors=VectorParams(size=768, distance=Distance.COSINE))
+
+        changes = _diff_collection_config(info, config)
+
+        assert set(changes) == {'optimizers_config', 'collection_params', 'vectors_config'}
+        assert changes['collection_params'].on_disk_payload is True
+        assert changes['optimizers_config'].memmap_threshold == 20000
+        assert changes['vectors_config'][''].on_disk is True
+
+    def test_diff_collection_config_quantization(self):
+        """量子化設定の追加・解除が差分として検出されることをテスト"""
+        scalar = CollectionConfig(name='documents', vector_size=768, quantization='scalar')
+        info = _make_collection_info(scalar)
+        info.config.quantization_config = None
+
+        changes = _diff_collection_config(info, scalar)
+        assert isinstance(changes['quantization_config'], models.ScalarQuantization)
+        assert changes['quantization_config'].scalar.type == models.ScalarType.INT8
+
+        # 既にバイナリ量子化されているコレクションで量子化を無効にする
+        plain = CollectionConfig(name='documents', vector_size=768)
+        info.config.quantization_config = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True))
+        assert _diff_collection_config(info, plain) == {'quantization_config': models.Disabled.DISABLED}
+
+        # 設定が一致していれば差分なし
+        binary = CollectionConfig(name='documents', vector_size=768, quantization='binary')
+        assert _diff_collection_config(info, binary) == {}
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_create_documents_collection_with_quantization(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """量子化モードがドキュメントコレクションの作成時にのみ適用されることをテスト"""
+        settings.QDRANT_QUANTIZATION_MODE = 'binary'
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        calls = {c.kwargs['collection_name']: c.kwargs for c in mock_client.create_collection.call_args_list}
+        assert isinstance(calls[f"{settings.QDRANT_COLLECTION_DOCUMENTS}_v1"]['quantization_config'], models.BinaryQuantization)
+        assert calls[f"{settings.QDRANT_COLLECTION_QA}_v1"]['quantization_config'] is None
+
+    def test_diff_collection_config_no_changes(self):
+        """設定が一致する場合は差分が空になることをテスト"""
+        config = CollectionConfig(name='documents', vector_size=768)
+
+        assert _diff_collection_config(_make_collection_info(config), config) == {}
+
+
+@pytest.mark.django_db  # settings を利用するため
+class TestHybridCollections:
+    """名前付き密ベクトル + 疎ベクトルのハイブリッド構成のテスト"""
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_create_hybrid_collections(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """ハイブリッド検索が有効な場合、名前付きベクトルと疎ベクトルで作成されることをテスト"""
+        settings.QDRANT_HYBRID_SEARCH = True
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        for call in mock_client.create_collection.call_args_list:
+            kwargs = call.kwargs
+            assert set(kwargs['vectors_config']) == {'dense'}
+            assert kwargs['vectors_config']['dense'].size == settings.QDRANT_VECTOR_SIZE
+            assert kwargs['sparse_vectors_config']['sparse'].modifier == models.Modifier.IDF
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_create_plain_collections_by_default(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """既定では名前なしの密ベクトルのみで作成されることをテスト"""
+        settings.QDRANT_HYBRID_SEARCH = False
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        kwargs = mock_client.create_collection.call_args.kwargs
+        assert isinstance(kwargs['vectors_config'], VectorParams)
+        assert kwargs['sparse_vectors_config'] is None
+
+    def test_diff_hybrid_collection(self):
+        """ハイブリッド構成のコレクションでは名前付きベクトルの差分が生成されることをテスト"""
+        config = CollectionConfig(name='documents', vector_size=768, hybrid=True)
+        assert _diff_collection_config(_make_collection_info(config), config) == {}
+
+        on_disk = CollectionConfig(name='documents', vector_size=768, hybrid=True, vectors_on_disk=True)
+        changes = _diff_collection_config(_make_collection_info(config), on_disk)
+        assert changes['vectors_config']['dense'].on_disk is True
+
+    def test_diff_vector_layout_mismatch_is_reported(self, caplog):
+        """名前なしベクトルのコレクションをハイブリッド構成へ変更しようとした場合は警告のみとなることをテスト"""
+        plain = CollectionConfig(name='documents', vector_size=768)
+        hybrid = CollectionConfig(name='documents', vector_size=768, hybrid=True)
+
+        with caplog.at_level('WARNING'):
+            changes = _diff_collection_config(_make_collection_info(plain), hybrid)
+
+        assert 'vectors_config' not in changes
+        assert 'hybrid=True' in caplog.text
+
+    def test_diff_datatype_mismatch_is_reported(self, caplog):
+        """既存コレクションとデータ型・切り詰め次元数が異なる場合は再インデックスを促す警告となることをテスト"""
+        current = CollectionConfig(name='documents', vector_size=768)
+        desired = CollectionConfig(name='documents', vector_size=768, datatype='float16', truncate_dim=256)
+
+        with caplog.at_level('WARNING'):
+            changes = _diff_collection_config(_make_collection_info(current), desired)
+
+        assert 'vectors_config' not in changes
+        assert 'データ型 (float32)' in caplog.text
+        assert '次元数 (768)' in caplog.text
+
+
+@pytest.mark.django_db  # settings を利用するため
+class TestPayloadIndexes:
+    """ペイロードインデックスの作成・追加のテスト"""
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_indexes_created_with_new_collections(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """新規コレクションに全てのペイロードインデックスが作成されることをテスト"""
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = set()
+
+        ensure_collections_exist()
+
+        created = {(c.kwargs['collection_name'], c.kwargs['field_name']): c.kwargs['field_schema']
+                   for c in mock_client.create_payload_index.call_args_list}
+        for logical_name in (settings.QDRANT_COLLECTION_DOCUMENTS, settings.QDRANT_COLLECTION_QA):
+            collection_name = f"{logical_name}_v1"
+            assert {field for name, field in created if name == collection_name} == {
+                'user_id', 'document_id', 'page_number', 'tags'}
+            user_index = created[(collection_name, 'user_id')]
+            assert user_index.type == models.KeywordIndexType.KEYWORD
+            assert user_index.is_tenant is True
+            assert created[(collection_name, 'page_number')].type == models.IntegerIndexType.INTEGER
+
+    @patch('app.adapters.search.qdrant_manager._get_existing_collections')
+    @patch('app.adapters.search.qdrant_manager.get_qdrant_client')
+    def test_missing_indexes_added_to_existing_collection(self, mock_get_qdrant_client, mock_get_existing_collections, settings):
+        """既存コレクションに不足しているインデックスのみ追加されることをテスト"""
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        mock_client = MagicMock(spec=QdrantClient)
+        mock_get_qdrant_client.return_value = mock_client
+        mock_get_existing_collections.return_value = {
+            settings.QDRANT_COLLECTION_DOCUMENTS,
+            settings.QDRANT_COLLECTION_QA,
+        }
+        info = _make_collection_info(get_collection_config(settings.QDRANT_COLLECTION_QA))
+        del info.payload_schema['tags']
+        mock_client.get_collection.return_value = info
+
+        ensure_collections_exist()
+
+        fields = [c.kwargs['field_name'] for c in mock_client.create_payload_index.call_args_list]
+        # 2コレクションそれぞれでtagsのみが追加される
+        assert fields == ['tags', 'tags']
+
+    def test_mismatched_index_type_is_reported(self, caplog):
+        """既存インデックスの型が異なる場合は警告のみで再作成しないことをテスト"""
+        mock_client = MagicMock(spec=QdrantClient)
+        schema = {
+            field_name: models.PayloadIndexInfo(data_type=get_index_data_type(params), params=params, points=0)
+            for field_name, params in get_payload_indexes().items()
+        }
+        schema['page_number'] = models.PayloadIndexInfo(data_type=models.PayloadSchemaType.KEYWORD, points=0)
+
+        with caplog.at_level('WARNING'):
+            created = _ensure_payload_indexes(mock_client, 'documents', schema)
+
+        assert created == []
+        mock_client.create_payload_index.assert_not_called()
+        assert 'page_number' in caplog.text
@@ -0,0 +1,289 @@
+"""QdrantSearchGatewayのテストモジュール
+
+ローカルモードのQdrantクライアント（インメモリ）を使用して検索動作をテストします。
+"""
+# pylint: disable=redefined-outer-name
+
+from unittest.mock import patch
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    Modifier,
+    PointStruct,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from app.adapters.search.deadline import request_budget
+from app.adapters.search.qdrant_search_gateway import (
+    QdrantSearchGateway,
+    build_filter,
+    build_point_vector,
+    build_search_params,
+)
+from app.core.search.gateways import SearchFilter, SearchRequest, SearchTimeoutError
+
+COLLECTION = 'documents'
+
+
+@pytest.fixture
+def local_client(settings):
+    """テスト用のポイントを登録したインメモリQdrantクライアント"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    client = QdrantClient(':memory:')
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert(COLLECTION, points=[
+        PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0],
+                    payload={'user_id': '1', 'document_id': 'doc-a', 'tags': ['math']}),
+        PointStruct(id=2, vector=[0.9, 0.1, 0.0, 0.0],
+                    payload={'user_id': '1', 'document_id': 'doc-b', 'tags': ['physics']}),
+        PointStruct(id=3, vector=[1.0, 0.0, 0.0, 0.0],
+                    payload={'user_id': '2', 'document_id': 'doc-c', 'tags': ['math']}),
+    ])
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def hybrid_client(settings):
+    """ハイブリッド構成のコレクションにテスト用のポイントを登録したインメモリQdrantクライアント"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = True
+    client = QdrantClient(':memory:')
+    client.create_collection(
+        COLLECTION,
+        vectors_config={'dense': VectorParams(size=4, distance=Distance.COSINE)},
+        sparse_vectors_config={'sparse': SparseVectorParams(modifier=Modifier.IDF)},
+    )
+    texts = {
+        1: '機械学習の基礎と線形回帰',
+        2: '量子力学の入門',
+        3: 'ニューラルネットワークによる画像認識',
+    }
+    vectors = {1: [1.0, 0.0, 0.0, 0.0], 2: [0.0, 1.0, 0.0, 0.0], 3: [0.9, 0.1, 0.0, 0.0]}
+    client.upsert(COLLECTION, points=[
+        PointStruct(id=point_id, vector=build_point_vector(COLLECTION, vectors[point_id], text),
+                    payload={'user_id': '1', 'document_id': f'doc-{point_id}'})
+        for point_id, text in texts.items()
+    ])
+    yield client
+    client.close()
+
+
+class TestQdrantSearchGateway:
+    """QdrantSearchGatewayのテスト"""
+
+    def test_search_is_scoped_to_user(self, local_client):
+        """ユーザーIDでの絞り込みが適用されることをテスト"""
+        gateway = QdrantSearchGateway(client=local_client)
+
+        hits = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1), limit=10)
+
+        assert [hit.point_id for hit in hits] == [1, 2]
+        assert hits[0].score >= hits[1].score
+        assert hits[0].payload['document_id'] == 'doc-a'
+
+    def test_search_with_document_and_tag_filters(self, local_client):
+        """文書IDとタグでの絞り込みが適用されることをテスト"""
+        gateway = QdrantSearchGateway(client=local_client)
+
+        by_document = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0],
+                                     SearchFilter(user_id=1, document_ids=['doc-b']))
+        by_tag = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0],
+                                SearchFilter(user_id=1, tags=['math']))
+
+        assert [hit.point_id for hit in by_document] == [2]
+        assert [hit.point_id for hit in by_tag] == [1]
+
+    def test_search_with_quantization_params(self, local_client, settings):
+        """量子化が有効な場合も検索できることをテスト（ローカルモードでは量子化は無視される）"""
+        settings.QDRANT_QUANTIZATION_MODE = 'binary'
+        gateway = QdrantSearchGateway(client=local_client)
+
+        hits = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=2))
+
+        assert [hit.point_id for hit in hits] == [3]
+
+    def test_search_groups_by_document(self, local_client):
+        """文書IDごとにグループ化した結果が返され、指定したペイロードのみ含まれることをテスト"""
+        local_client.upsert(COLLECTION, points=[
+            PointStruct(id=4, vector=[0.95, 0.05, 0.0, 0.0],
+                        payload={'user_id': '1', 'document_id': 'doc-a', 'tags': ['math']}),
+        ])
+        gateway = QdrantSearchGateway(client=local_client)
+
+        groups = gateway.search_groups(
+            COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1), group_limit=1, group_size=2,
+            payload_fields=['document_id'])
+
+        assert len(groups) == 1
+        assert groups[0].group_id == 'doc-a'
+        assert [hit.point_id for hit in groups[0].hits] == [1, 4]
+        assert groups[0].hits[0].payload == {'document_id': 'doc-a'}
+
+    def test_search_timeout_follows_request_budget(self, local_client, settings):
+        """リクエストの時間予算が呼び出しのタイムアウトに反映されることをテスト"""
+        settings.QDRANT_SEARCH_TIMEOUT = 3.0
+        gateway = QdrantSearchGateway(client=local_client)
+        with patch.object(local_client, 'query_points', wraps=local_client.query_points) as query_points:
+            gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+            with request_budget(0.5):
+                gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+
+        assert [c.kwargs['timeout'] for c in query_points.call_args_list] == [3, 1]
+
+    def test_search_with_exhausted_budget(self, local_client):
+        """時間予算を使い切っている場合はQdrantを呼び出さずにSearchTimeoutErrorを送出することをテスト"""
+        gateway = QdrantSearchGateway(client=local_client)
+        with request_budget(0.0):
+            with pytest.raises(SearchTimeoutError):
+                gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1))
+
+
+class TestSearchBatch:
+    """バッチ検索のテスト"""
+
+    @pytest.fixture
+    def batch_client(self, local_client, settings):
+        """documentsとqa_pairsの2コレクションを持つクライアント"""
+        settings.QDRANT_COLLECTION_QA = 'qa_pairs'
+        local_client.create_collection('qa_pairs', vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+        local_client.upsert('qa_pairs', points=[
+            PointStruct(id=10, vector=[1.0, 0.0, 0.0, 0.0], payload={'user_id': '1'}),
+            PointStruct(id=11, vector=[0.0, 1.0, 0.0, 0.0], payload={'user_id': '1'}),
+        ])
+        return local_client
+
+    def test_batch_matches_individual_searches(self, batch_client):
+        """バッチ検索の結果が個別の検索結果と一致し、コレクションごとの所要時間が返されることをテスト"""
+        gateway = QdrantSearchGateway(client=batch_client)
+        requests = [
+            SearchRequest('qa_pairs', [0.0, 1.0, 0.0, 0.0], SearchFilter(user_id=1), limit=1),
+            SearchRequest(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1)),
+            SearchRequest(COLLECTION, [0.0, 1.0, 0.0, 0.0], SearchFilter(user_id=1)),
+        ]
+
+        result = gateway.search_batch(requests)
+
+        for request, hits in zip(requests, result.results):
+            expected = gateway.search(request.collection_name, request.query_vector, request.search_filter,
+                                      request.limit)
+            assert [hit.point_id for hit in hits] == [hit.point_id for hit in expected]
+        assert set(result.timings) == {'qa_pairs', COLLECTION}
+        assert all(elapsed >= 0 for elapsed in result.timings.values())
+
+    def test_one_request_per_collection(self, batch_client):
+        """コレクションごとに1回のバッチクエリで送信されることをテスト"""
+        gateway = QdrantSearchGateway(client=batch_client)
+        requests = [
+            SearchRequest(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1)),
+            SearchRequest('qa_pairs', [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1)),
+            SearchRequest(COLLECTION, [0.0, 1.0, 0.0, 0.0], SearchFilter(user_id=1)),
+        ]
+        with patch.object(batch_client, 'query_batch_points', wraps=batch_client.query_batch_points) as batch:
+            gateway.search_batch(requests)
+
+        assert sorted((c.args[0], len(c.args[1])) for c in batch.call_args_list) == [(COLLECTION, 2), ('qa_pairs', 1)]
+
+    def test_merged_results(self, batch_client):
+        """同じコレクションへの複数クエリの結果を重複なくまとめられることをテスト"""
+        gateway = QdrantSearchGateway(client=batch_client)
+        requests = [
+            SearchRequest(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1)),
+            SearchRequest(COLLECTION, [0.9, 0.1, 0.0, 0.0], SearchFilter(user_id=1)),
+        ]
+
+        merged = gateway.search_batch(requests).merged(requests, COLLECTION)
+
+        assert [hit.point_id for hit in merged] == [1, 2]
+        assert merged[1].score == pytest.approx(1.0, abs=1e-3)
+
+
+class TestHybridSearch:
+    """ハイブリッド検索のテスト"""
+
+    def test_keyword_match_is_boosted(self, hybrid_client):
+        """キーワードが一致する文書が密ベクトルの類似度が低くても上位に融合されることをテスト"""
+        gateway = QdrantSearchGateway(client=hybrid_client)
+
+        # 密ベクトルは文書1・3に近いが、キーワード「量子力学」は文書2にのみ一致する
+        hits = gateway.hybrid_search(COLLECTION, [1.0, 0.0, 0.0, 0.0], '量子力学', SearchFilter(user_id=1))
+
+        assert hits[0].point_id in (1, 2)
+        assert 2 in [hit.point_id for hit in hits[:2]]
+        dense_only = gateway.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], SearchFilter(user_id=1), limit=2)
+        assert 2 not in [hit.point_id for hit in dense_only]
+
+    def test_hybrid_search_respects_filter(self, hybrid_client):
+        """ハイブリッド検索でも絞り込み条件が適用されることをテスト"""
+        gateway = QdrantSearchGateway(client=hybrid_client)
+
+        assert gateway.hybrid_search(COLLECTION, [1.0, 0.0, 0.0, 0.0], '量子力学', SearchFilter(user_id=2)) == []
+
+    def test_falls_back_to_dense_search(self, local_client, settings):
+        """ハイブリッド構成でないコレクションでは密ベクトル検索にフォールバックすることをテスト"""
+        settings.QDRANT_HYBRID_SEARCH = False
+        gateway = QdrantSearchGateway(client=local_client)
+
+        hits = gateway.hybrid_search(COLLECTION, [1.0, 0.0, 0.0, 0.0], '数学', SearchFilter(user_id=1))
+
+        assert [hit.point_id for hit in hits] == [1, 2]
+
+    def test_hybrid_request_in_batch(self, hybrid_client):
+        """query_textを指定したバッチ検索のクエリがハイブリッド検索と同じ結果になることをテスト"""
+        gateway = QdrantSearchGateway(client=hybrid_client)
+        query = [0.0, 0.0, 1.0, 0.0]
+        request = SearchRequest(COLLECTION, query, SearchFilter(user_id=1), limit=3, query_text='線形回帰')
+
+        [hits] = gateway.search_batch([request]).results
+        expected = gateway.hybrid_search(COLLECTION, query, '線形回帰', SearchFilter(user_id=1), limit=3)
+
+        assert [hit.point_id for hit in hits] == [hit.point_id for hit in expected]
+
+    def test_build_point_vector(self, settings):
+        """コレクションの構成に応じたポイントのベクトルが生成されることをテスト"""
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+        settings.QDRANT_HYBRID_SEARCH = False
+        assert build_point_vector(COLLECTION, (0.5, 0.5)) == [0.5, 0.5]
+
+        settings.QDRANT_HYBRID_SEARCH = True
+        vector = build_point_vector(COLLECTION, (0.5, 0.5), '検索')
+        assert vector['dense'] == [0.5, 0.5]
+        assert len(vector['sparse'].indices) == 1
+
+
+class TestBuildHelpers:
+    """フィルタ・検索パラメータ生成のテスト"""
+
+    def test_build_filter_empty(self):
+        """条件が無い場合はNoneになることをテスト"""
+        assert build_filter(None) is None
+        assert build_filter(SearchFilter()) is None
+
+    def test_build_search_params_without_quantization(self, settings):
+        """量子化無し・ef未指定の場合は既定値（None）になることをテスト"""
+        settings.QDRANT_QUANTIZATION_MODE = 'none'
+        settings.QDRANT_HNSW_EF_SEARCH = None
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+
+        assert build_search_params(settings.QDRANT_COLLECTION_DOCUMENTS) is None
+
+    def test_build_search_params_with_quantization(self, settings):
+        """量子化が有効な場合に再スコアリング・オーバーサンプリングが指定されることをテスト"""
+        settings.QDRANT_QUANTIZATION_MODE = 'scalar'
+        settings.QDRANT_QUANTIZATION_RESCORE = True
+        settings.QDRANT_QUANTIZATION_OVERSAMPLING = 3.0
+        settings.QDRANT_HNSW_EF_SEARCH = 128
+        settings.QDRANT_COLLECTION_OVERRIDES = {}
+
+        params = build_search_params(settings.QDRANT_COLLECTION_DOCUMENTS)
+
+        assert params.hnsw_ef == 128
+        assert params.quantization.rescore is True
+        assert params.quantization.oversampling == 3.0
+        # Q&Aコレクションには量子化を適用しない
+        assert build_search_params(settings.QDRANT_COLLECTION_QA).quantization is None
@@ -0,0 +1,195 @@
+"""コレクションのエイリアス管理と再インデックスのテストモジュール
+
+ローカルモードのQdrantクライアント（インメモリ）を使用して、再インデックスとエイリアスの切り替えをテストします。
+"""
+# pylint: disable=redefined-outer-name
+
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Datatype, Distance, PointStruct, VectorParams
+
+from app.adapters.search.collection_aliases import (
+    get_collection_aliases,
+    list_collection_versions,
+    next_collection_version,
+    resolve_collection,
+)
+from app.adapters.search.qdrant_manager import ensure_collections_exist
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.adapters.search.reindex import reindex_collection
+
+DOCUMENTS = 'documents'
+QA = 'qa_pairs'
+
+
+@pytest.fixture
+def local_client(settings, tmp_path):
+    """インメモリQdrantクライアントを ``get_qdrant_client()`` として使用する"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = DOCUMENTS
+    settings.QDRANT_COLLECTION_QA = QA
+    settings.QDRANT_VECTOR_SIZE = 4
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = False
+    settings.QDRANT_SCHEMA_MARKER_REDIS_URL = None
+    settings.QDRANT_SCHEMA_MARKER_PATH = str(tmp_path / 'marker.json')
+    client = QdrantClient(':memory:')
+    with patch('app.adapters.search.qdrant_manager.get_qdrant_client', return_value=client), \
+            patch('app.adapters.search.reindex.get_qdrant_client', return_value=client):
+        yield client
+    client.close()
+
+
+def _upsert_points(client, collection_name, count=5):
+    client.upsert(collection_name, points=[
+        PointStruct(id=i, vector=[1.0, float(i), 0.0, 0.0], payload={'user_id': '1', 'text': f'chunk {i}'})
+        for i in range(count)
+    ])
+
+
+class TestCollectionVersions:
+    """物理コレクションのバージョン番号のテスト"""
+
+    def test_list_and_next_versions(self):
+        """バージョン付きのコレクション名のみが対象となることをテスト"""
+        names = {'documents', 'documents_v1', 'documents_v10', 'documents_v2', 'documents_vx', 'qa_pairs_v3'}
+
+        assert list_collection_versions(names, 'documents') == [1, 2, 10]
+        assert next_collection_version(names, 'documents') == 11
+        assert next_collection_version(names, 'other') == 1
+
+
+class TestEnsureCollectionsWithAliases:
+    """エイリアスを用いたコレクション作成のテスト"""
+
+    def test_new_collections_are_created_behind_aliases(self, local_client):
+        """新規コレクションがバージョン付きで作成され、論理名がエイリアスになることをテスト"""
+        ensure_collections_exist()
+        ensure_collections_exist()  # 冪等であること
+
+        assert get_collection_aliases(local_client) == {DOCUMENTS: 'documents_v1', QA: 'qa_pairs_v1'}
+        assert {c.name for c in local_client.get_collections().collections} == {'documents_v1', 'qa_pairs_v1'}
+
+    def test_legacy_collection_is_kept(self, local_client):
+        """エイリアス導入前のコレクションはそのまま使用されることをテスト"""
+        local_client.create_collection(DOCUMENTS, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+
+        ensure_collections_exist()
+
+        assert resolve_collection(local_client, DOCUMENTS) == DOCUMENTS
+        assert resolve_collection(local_client, QA) == 'qa_pairs_v1'
+
+
+class TestReindexCollection:
+    """再インデックスのテスト"""
+
+    def test_reindex_swaps_alias(self, local_client):
+        """新しい物理コレクションにポイントがコピーされ、エイリアスが切り替わることをテスト"""
+        ensure_collections_exist()
+        _upsert_points(local_client, DOCUMENTS)
+
+        result = reindex_collection(DOCUMENTS, batch_size=2, workers=2)
+
+        assert (result.source, result.target, result.points_copied) == ('documents_v1', 'documents_v2', 5)
+        assert result.source_dropped is False
+        assert resolve_collection(local_client, DOCUMENTS) == 'documents_v2'
+        assert local_client.count(DOCUMENTS).count == 5
+        # 移行元はロールバック用に残る
+        assert local_client.collection_exists('documents_v1')
+
+    def test_reindex_with_embedder_changes_vector_size(self, local_client, settings):
+        """embedderを指定するとベクトル次元数を変更できることをテスト"""
+        ensure_collections_exist()
+        _upsert_points(local_client, DOCUMENTS, count=3)
+        settings.QDRANT_VECTOR_SIZE = 2
+
+        with pytest.raises(ValueError, match='embedder'):
+            reindex_collection(DOCUMENTS)
+
+        def embedder(payloads):
+            return [[1.0, float(len(payload['text']))] for payload in payloads]
+
+        result = reindex_collection(DOCUMENTS, embedder=embedder, drop_source=True)
+
+        assert result.source_dropped is True
+        assert not local_client.collection_exists('documents_v1')
+        info = local_client.get_collection(DOCUMENTS)
+        assert info.config.params.vectors.size == 2
+        assert local_client.count(DOCUMENTS).count == 3
+
+    def test_reindex_legacy_collection(self, local_client):
+        """エイリアス導入前のコレクションがバージョン付きコレクションへ移行されることをテスト"""
+        local_client.create_collection(DOCUMENTS, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+        _upsert_points(local_client, DOCUMENTS)
+
+        result = reindex_collection(DOCUMENTS)
+
+        assert (result.source, result.target, result.source_dropped) == (DOCUMENTS, 'documents_v1', True)
+        assert get_collection_aliases(local_client) == {DOCUMENTS: 'documents_v1'}
+        assert local_client.count(DOCUMENTS).count == 5
+
+    def test_reindex_to_hybrid(self, local_client, settings):
+        """名前なしベクトルのコレクションを、ペイロードのテキストから疎ベクトルを生成してハイブリッド構成に移行できることをテスト"""
+        ensure_collections_exist()
+        _upsert_points(local_client, DOCUMENTS, count=2)
+        settings.QDRANT_HYBRID_SEARCH = True
+
+        with pytest.raises(ValueError, match='text_field'):
+            reindex_collection(DOCUMENTS)
+        reindex_collection(DOCUMENTS, text_field='text')
+
+        point = local_client.retrieve(DOCUMENTS, [1], with_vectors=True)[0]
+        assert point.vector['dense'][0] == pytest.approx(1.0 / 2 ** 0.5)
+        assert point.vector['sparse'].indices
+
+    def test_reindex_to_truncated_float16(self, local_client, settings):
+        """既存のベクトルを切り詰めてfloat16のコレクションに移行し、切り詰め前のクエリで検索できることをテスト"""
+        ensure_collections_exist()
+        _upsert_points(local_client, DOCUMENTS, count=3)
+        settings.QDRANT_VECTOR_DATATYPE = 'float16'
+        settings.QDRANT_VECTOR_TRUNCATE_DIM = 2
+
+        reindex_collection(DOCUMENTS)
+
+        params = local_client.get_collection(DOCUMENTS).config.params.vectors
+        assert (params.size, params.datatype) == (2, Datatype.FLOAT16)
+        hits = QdrantSearchGateway(client=local_client).search(DOCUMENTS, [1.0, 2.0, 9.0, 9.0], limit=1)
+        assert hits[0].point_id == 2
+
+    @pytest.mark.usefixtures('local_client')
+    def test_reindex_missing_collection(self):
+        """存在しないコレクションの場合はValueErrorが発生することをテスト"""
+        with pytest.raises(ValueError, match='存在しません'):
+            reindex_collection(DOCUMENTS)
+
+
+class TestQdrantReindexCommand:
+    """qdrant_reindex 管理コマンドのテスト"""
+
+    def test_command_reindexes_all_collections(self, local_client):
+        """引数なしで全コレクションを再インデックスし、マーカーを記録することをテスト"""
+        ensure_collections_exist()
+        out = StringIO()
+
+        with patch('app.management.commands.qdrant_reindex.write_schema_marker') as mock_write:
+            call_command('qdrant_reindex', stdout=out)
+
+        assert get_collection_aliases(local_client) == {DOCUMENTS: 'documents_v2', QA: 'qa_pairs_v2'}
+        assert 'documents_v1 -> documents_v2' in out.getvalue()
+        mock_write.assert_called_once()
+
+    def test_command_failure(self):
+        """再インデックスに失敗した場合はCommandErrorとなることをテスト"""
+        with patch('app.management.commands.qdrant_reindex.reindex_collection',
+                   MagicMock(side_effect=ValueError('失敗'))):
+            with pytest.raises(CommandError, match='失敗'):
+                call_command('qdrant_reindex', 'documents', stdout=StringIO())
+
+    def test_command_invalid_embedder(self):
+        """embedderを読み込めない場合はCommandErrorとなることをテスト"""
+        with pytest.raises(CommandError, match='embedder'):
+            call_command('qdrant_reindex', '--embedder', 'app.no_such_module.embed', stdout=StringIO())
@@ -0,0 +1,402 @@
+"""検索ゲートウェイの耐障害性（サーキットブレーカー・デッドライン・ヘッジリクエスト）のテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from qdrant_client.http.exceptions import ResponseHandlingException
+
+from app.adapters.search import resilience
+from app.adapters.search.deadline import call_timeout, remaining_budget, request_budget
+from app.adapters.search.middleware import SearchRequestBudgetMiddleware
+from app.adapters.search.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientSearchGateway,
+    is_node_failure,
+)
+from app.core.search.gateways import (
+    SearchGateway,
+    SearchHit,
+    SearchRequest,
+    SearchTimeoutError,
+    SearchUnavailableError,
+)
+
+
+class FakeClock:
+    """テスト用に進めることができる時計"""
+
+    def __init__(self):
+        """初期化"""
+        self.now = 0.0
+
+    def __call__(self):
+        """現在時刻を返す"""
+        return self.now
+
+
+class FakeGateway(SearchGateway):
+    """指定した時間待ってから結果を返す（または例外を送出する）テスト用ゲートウェイ"""
+
+    def __init__(self, name, delay=0.0, error=None):
+        """初期化"""
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.budgets = []
+
+    def search(self, collection_name, query_vector, search_filter=None, limit=10):
+        """待機後に自身の名前をペイロードに持つ結果を返す"""
+        self.calls += 1
+        self.budgets.append(remaining_budget())
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [SearchHit(point_id=1, score=1.0, payload={'source': self.name})]
+
+    def hybrid_search(self, collection_name, query_vector, query_text, search_filter=None, limit=10):
+        """このテストでは使用しない"""
+        raise AssertionError('hybrid_search is not expected to be called')
+
+    def search_groups(self, collection_name, query_vector, search_filter=None, group_limit=5, group_size=3,
+                      payload_fields=None):
+        """このテストでは使用しない"""
+        raise AssertionError('search_groups is not expected to be called')
+
+
+def _breaker(threshold=2, reset=10.0, clock=None):
+    return CircuitBreaker('test', failure_threshold=threshold, reset_timeout=reset, clock=clock or FakeClock())
+
+
+class TestRequestBudget:
+    """request_budget / call_timeout のテスト"""
+
+    def test_call_timeout_without_budget(self, settings):
+        """時間予算が無い場合はQDRANT_SEARCH_TIMEOUTを返すこと"""
+        settings.QDRANT_SEARCH_TIMEOUT = 3.0
+        assert call_timeout() == 3.0
+
+    def test_call_timeout_is_capped_by_budget(self, settings):
+        """残り時間がQDRANT_SEARCH_TIMEOUTより短い場合は残り時間を返すこと"""
+        settings.QDRANT_SEARCH_TIMEOUT = 3.0
+        with request_budget(0.5):
+            assert 0 < call_timeout() <= 0.5
+
+    def test_nested_budget_uses_earlier_deadline(self):
+        """ネストした時間予算ではより早い期限が適用されること"""
+        with request_budget(0.5) as outer:
+            with request_budget(10.0) as inner:
+                assert inner == outer
+            with request_budget(0.1) as inner:
+                assert inner < outer
+        assert remaining_budget() is None
+
+    def test_exhausted_budget_raises(self):
+        """時間予算を使い切った場合はSearchTimeoutErrorを送出すること"""
+        with request_budget(0.0):
+            with pytest.raises(SearchTimeoutError):
+                call_timeout()
+
+    def test_middleware_applies_request_budget(self, settings):
+        """ミドルウェアがQDRANT_REQUEST_BUDGETの時間予算をリクエストに設定すること"""
+        settings.QDRANT_REQUEST_BUDGET = 5.0
+        budgets = []
+
+        def view(_request):
+            budgets.append(remaining_budget())
+            return HttpResponse('ok')
+
+        SearchRequestBudgetMiddleware(view)(RequestFactory().get('/search'))
+        settings.QDRANT_REQUEST_BUDGET = 0
+        SearchRequestBudgetMiddleware(view)(RequestFactory().get('/search'))
+
+        assert 4.0 < budgets[0] <= 5.0
+        assert budgets[1] is None
+        assert remaining_budget() is None
+
+
+class TestCircuitBreaker:
+    """CircuitBreakerのテスト"""
+
+    def test_opens_after_consecutive_failures(self):
+        """連続失敗がしきい値に達するとサーキットが開くこと"""
+        breaker = _breaker(threshold=2)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is False
+
+    def test_success_resets_failure_count(self):
+        """成功すると連続失敗回数がリセットされること"""
+        breaker = _breaker(threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_allows_single_trial(self):
+        """reset_timeout経過後は1回だけ試行を許可すること"""
+        clock = FakeClock()
+        breaker = _breaker(threshold=1, reset=10.0, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+
+    def test_half_open_success_closes(self):
+        """half_openでの試行が成功するとサーキットが閉じること"""
+        clock = FakeClock()
+        breaker = _breaker(threshold=1, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_failure_reopens(self):
+        """half_openでの試行が失敗するとサーキットが再び開くこと"""
+        clock = FakeClock()
+        breaker = _breaker(threshold=1, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_call_fails_fast_when_open(self):
+        """サーキットが開いている場合は関数を呼び出さずにCircuitOpenErrorを送出すること"""
+        breaker = _breaker(threshold=1)
+        breaker.record_failure()
+        called = []
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: called.append(1))
+        assert not called
+
+
+class TestLatencyTracker:
+    """LatencyTrackerのテスト"""
+
+    def test_percentile_requires_min_samples(self):
+        """計測数が不足している場合はNoneを返すこと"""
+        tracker = LatencyTracker(min_samples=5)
+        for _ in range(4):
+            tracker.record(0.1)
+        assert tracker.percentile(95) is None
+
+    def test_percentile(self):
+        """記録した値のパーセンタイルを返すこと"""
+        tracker = LatencyTracker(min_samples=1)
+        for i in range(1, 101):
+            tracker.record(i / 100)
+        assert tracker.percentile(50) == pytest.approx(0.5, abs=0.01)
+        assert tracker.percentile(95) == pytest.approx(0.95, abs=0.01)
+
+
+class TestResilientSearchGateway:
+    """ResilientSearchGatewayのテスト"""
+
+    @pytest.fixture(autouse=True)
+    def hedge_settings(self, settings):
+        """ヘッジの待ち時間をテスト用に短くする"""
+        settings.QDRANT_SEARCH_TIMEOUT = 2.0
+        settings.QDRANT_HEDGE_DEFAULT_DELAY = 0.05
+        settings.QDRANT_HEDGE_MIN_DELAY = 0.01
+
+    def test_primary_only(self):
+        """レプリカが無い場合はプライマリの結果を返すこと"""
+        primary = FakeGateway('primary')
+        gateway = ResilientSearchGateway(primary, primary_breaker=_breaker())
+        hits = gateway.search('documents', [1.0])
+        assert hits[0].payload['source'] == 'primary'
+
+    def test_search_batch_uses_default_implementation(self):
+        """バッチ検索に対応していないゲートウェイでは各クエリを順に実行することをテスト"""
+        primary = FakeGateway('primary')
+        gateway = ResilientSearchGateway(primary, primary_breaker=_breaker())
+        requests = [SearchRequest('documents', [1.0]), SearchRequest('qa_pairs', [1.0])]
+
+        result = gateway.search_batch(requests)
+
+        assert [hits[0].payload['source'] for hits in result.results] == ['primary', 'primary']
+        assert set(result.timings) == {'documents', 'qa_pairs'}
+        assert primary.calls == 2
+
+    def test_primary_error_is_wrapped(self):
+        """プライマリの例外はSearchUnavailableErrorとして送出されること"""
+        breaker = _breaker(threshold=1)
+        gateway = ResilientSearchGateway(FakeGateway('primary', error=ConnectionError('down')), primary_breaker=breaker)
+        with pytest.raises(SearchUnavailableError):
+            gateway.search('documents', [1.0])
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            gateway.search('documents', [1.0])
+
+    def test_caller_error_is_not_recorded(self):
+        """呼び出し元に起因するエラーはサーキットブレーカーに記録せず、そのまま送出すること"""
+        breaker = _breaker(threshold=1)
+        gateway = ResilientSearchGateway(FakeGateway('primary', error=ValueError('wrong vector size')),
+                                         primary_breaker=breaker)
+        with pytest.raises(ValueError):
+            gateway.search('documents', [1.0])
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_expired_budget_is_not_recorded(self):
+        """時間予算切れのSearchTimeoutErrorはサーキットブレーカーに記録しないこと"""
+        primary_breaker, replica_breaker = _breaker(threshold=1), _breaker(threshold=1)
+        primary = FakeGateway('primary', error=SearchTimeoutError('budget'))
+        replica = FakeGateway('replica', error=SearchTimeoutError('budget'))
+        gateway = ResilientSearchGateway(primary, replica, primary_breaker, replica_breaker)
+        with pytest.raises(SearchTimeoutError):
+            gateway.search('documents', [1.0])
+        assert primary_breaker.state == CircuitBreaker.CLOSED
+        assert replica_breaker.state == CircuitBreaker.CLOSED
+
+    def test_caller_error_releases_half_open_trial(self):
+        """half_openの試行が呼び出し元のエラーで終わった場合は次の呼び出しで再試行できること"""
+        clock = FakeClock()
+        breaker = _breaker(threshold=1, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        primary = FakeGateway('primary', error=ValueError('bad filter'))
+        gateway = ResilientSearchGateway(primary, primary_breaker=breaker)
+        with pytest.raises(ValueError):
+            gateway.search('documents', [1.0])
+        primary.error = None
+        assert gateway.search('documents', [1.0])[0].payload['source'] == 'primary'
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_is_node_failure(self):
+        """通信エラー・タイムアウト・サーバーエラーのみをノードの障害と判定すること"""
+        assert is_node_failure(ConnectionError('refused'))
+        assert is_node_failure(ResponseHandlingException(TimeoutError('read timeout')))
+        assert not is_node_failure(SearchTimeoutError('budget'))
+        assert not is_node_failure(ValueError('bad filter'))
+
+    def test_hedge_delay_starts_when_primary_starts(self):
+        """スレッドプールでの待ち時間はヘッジの待ち時間に含めないこと"""
+        primary, replica = FakeGateway('primary', delay=0.15), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), _breaker())
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit(time.sleep, 0.1)
+        with patch.object(resilience, '_get_executor', return_value=executor), \
+                patch.object(gateway, 'hedge_delay', return_value=0.2), \
+                patch.object(resilience, 'record_retry') as mock_retry:
+            hits = gateway.search('documents', [1.0])
+        executor.shutdown()
+
+        assert hits[0].payload['source'] == 'primary'
+        mock_retry.assert_not_called()
+
+    def test_saturated_pool_queries_replica_directly(self):
+        """スレッドプールが埋まっている場合は、プライマリを取り消して呼び出し元のスレッドでレプリカに問い合わせること"""
+        primary, replica = FakeGateway('primary'), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), _breaker())
+        executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        executor.submit(release.wait, 5.0)
+        started = time.monotonic()
+        with patch.object(resilience, '_get_executor', return_value=executor), \
+                patch.object(resilience, 'record_retry') as mock_retry:
+            hits = gateway.search('documents', [1.0])
+        elapsed = time.monotonic() - started
+        release.set()
+        executor.shutdown()
+
+        assert hits[0].payload['source'] == 'replica'
+        assert elapsed < 1.0
+        assert primary.calls == 0
+        mock_retry.assert_called_once_with('hedge')
+
+    def test_saturated_pool_with_open_replica_fails_fast(self):
+        """スレッドプールが埋まっておりレプリカのサーキットが開いている場合はSearchUnavailableErrorを送出すること"""
+        replica_breaker = _breaker(threshold=1)
+        replica_breaker.record_failure()
+        gateway = ResilientSearchGateway(FakeGateway('primary'), FakeGateway('replica'), _breaker(), replica_breaker)
+        executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        executor.submit(release.wait, 5.0)
+        with patch.object(resilience, '_get_executor', return_value=executor):
+            with pytest.raises(SearchUnavailableError, match='スレッドプール'):
+                gateway.search('documents', [1.0])
+        release.set()
+        executor.shutdown()
+
+    def test_executor_size_from_settings(self, settings, monkeypatch):
+        """スレッドプールのサイズをQDRANT_HEDGE_MAX_WORKERSで指定できること"""
+        settings.QDRANT_HEDGE_MAX_WORKERS = 3
+        monkeypatch.setattr(resilience, '_executor', None)
+        executor = resilience._get_executor()  # pylint: disable=protected-access
+        assert executor._max_workers == 3  # pylint: disable=protected-access
+        executor.shutdown()
+
+    def test_fast_primary_does_not_hedge(self):
+        """プライマリがヘッジの待ち時間内に応答した場合はレプリカに問い合わせないこと"""
+        primary, replica = FakeGateway('primary'), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), _breaker())
+        hits = gateway.search('documents', [1.0])
+        assert hits[0].payload['source'] == 'primary'
+        assert replica.calls == 0
+
+    def test_slow_primary_is_hedged(self):
+        """プライマリが遅い場合はレプリカの結果を返すこと"""
+        primary, replica = FakeGateway('primary', delay=0.5), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), _breaker())
+        started = time.monotonic()
+        hits = gateway.search('documents', [1.0])
+        assert hits[0].payload['source'] == 'replica'
+        assert time.monotonic() - started < 0.4
+
+    def test_failed_primary_is_hedged(self):
+        """プライマリが失敗した場合はレプリカの結果を返すこと"""
+        primary = FakeGateway('primary', error=ConnectionError('down'))
+        gateway = ResilientSearchGateway(primary, FakeGateway('replica'), _breaker(), _breaker())
+        hits = gateway.search('documents', [1.0])
+        assert hits[0].payload['source'] == 'replica'
+
+    def test_open_primary_goes_to_replica(self):
+        """プライマリのサーキットが開いている場合はレプリカのみに問い合わせること"""
+        primary_breaker = _breaker(threshold=1)
+        primary_breaker.record_failure()
+        primary, replica = FakeGateway('primary'), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, primary_breaker, _breaker())
+        hits = gateway.search('documents', [1.0])
+        assert hits[0].payload['source'] == 'replica'
+        assert primary.calls == 0
+
+    def test_open_replica_is_not_hedged(self):
+        """レプリカのサーキットが開いている場合はヘッジしないこと"""
+        replica_breaker = _breaker(threshold=1)
+        replica_breaker.record_failure()
+        primary, replica = FakeGateway('primary', delay=0.1), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), replica_breaker)
+        hits = gateway.search('documents', [1.0])
+        assert hits[0].payload['source'] == 'primary'
+        assert replica.calls == 0
+
+    def test_budget_timeout(self):
+        """時間予算内に結果が得られない場合はSearchTimeoutErrorを送出すること"""
+        primary, replica = FakeGateway('primary', delay=0.5), FakeGateway('replica', delay=0.5)
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), _breaker())
+        started = time.monotonic()
+        with request_budget(0.1):
+            with pytest.raises(SearchTimeoutError):
+                gateway.search('documents', [1.0])
+        assert time.monotonic() - started < 0.4
+
+    def test_budget_is_propagated_to_worker_threads(self):
+        """ワーカースレッドで実行されるゲートウェイにも時間予算が引き継がれること"""
+        primary, replica = FakeGateway('primary'), FakeGateway('replica')
+        gateway = ResilientSearchGateway(primary, replica, _breaker(), _breaker())
+        with request_budget(1.0):
+            gateway.search('documents', [1.0])
+        assert primary.budgets[0] is not None
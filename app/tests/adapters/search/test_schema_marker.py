@@ -0,0 +1,130 @@
+"""スキーマ検証済みマーカーと qdrant_bootstrap コマンドのテストモジュール"""
+
+import json
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from app.adapters.search.schema_marker import (
+    compute_schema_fingerprint,
+    is_schema_verified,
+    read_schema_marker,
+    write_schema_marker,
+)
+from app.adapters.search.warmup import WarmupResult
+
+
+@pytest.fixture
+def marker_settings(settings, tmp_path):
+    """マーカーをテスト用の一時ファイルに保存する設定"""
+    settings.QDRANT_SCHEMA_MARKER_PATH = str(tmp_path / 'marker.json')
+    settings.QDRANT_SCHEMA_MARKER_REDIS_URL = None
+    return settings
+
+
+class TestSchemaMarker:
+    """スキーマ検証済みマーカーのテスト"""
+
+    @pytest.mark.usefixtures('marker_settings')
+    def test_not_verified_without_marker(self):
+        """マーカーが無い場合は未検証と判定されることをテスト"""
+        assert read_schema_marker() is None
+        assert not is_schema_verified()
+
+    def test_write_and_verify(self, marker_settings):
+        """マーカーを書き込むと検証済みと判定されることをテスト"""
+        marker = write_schema_marker()
+
+        assert marker['fingerprint'] == compute_schema_fingerprint()
+        assert marker['vector_size'] == marker_settings.QDRANT_VECTOR_SIZE
+        with open(marker_settings.QDRANT_SCHEMA_MARKER_PATH, encoding='utf-8') as f:
+            assert json.load(f)['fingerprint'] == marker['fingerprint']
+        assert is_schema_verified()
+
+    def test_marker_invalidated_by_config_change(self, marker_settings):
+        """ベクトル次元数が変わるとマーカーが無効になることをテスト"""
+        write_schema_marker()
+        marker_settings.QDRANT_VECTOR_SIZE = marker_settings.QDRANT_VECTOR_SIZE * 2
+
+        assert not is_schema_verified()
+
+    def test_corrupted_marker_is_treated_as_unverified(self, marker_settings):
+        """壊れたマーカーファイルは未検証として扱われることをテスト"""
+        with open(marker_settings.QDRANT_SCHEMA_MARKER_PATH, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+
+        assert not is_schema_verified()
+
+    @patch('app.adapters.search.schema_marker._get_redis_client')
+    def test_redis_backend(self, mock_get_redis_client, marker_settings):
+        """Redisが設定されている場合はRedisキーにマーカーを保存することをテスト"""
+        store = {}
+        redis_client = MagicMock()
+        redis_client.set.side_effect = store.__setitem__
+        redis_client.get.side_effect = store.get
+        mock_get_redis_client.return_value = redis_client
+        marker_settings.QDRANT_SCHEMA_MARKER_KEY = 'test:marker'
+
+        write_schema_marker()
+
+        assert 'test:marker' in store
+        assert is_schema_verified()
+
+
+class TestQdrantBootstrapCommand:
+    """qdrant_bootstrap 管理コマンドのテスト"""
+
+    @pytest.mark.usefixtures('marker_settings')
+    @patch('app.adapters.search.qdrant_manager.ensure_collections_exist')
+    def test_bootstrap_writes_marker(self, mock_ensure):
+        """コマンド実行でコレクションが検証されマーカーが記録されることをテスト"""
+        out = StringIO()
+        call_command('qdrant_bootstrap', stdout=out)
+
+        mock_ensure.assert_called_once()
+        assert is_schema_verified()
+
+    @pytest.mark.usefixtures('marker_settings')
+    @patch('app.adapters.search.qdrant_manager.ensure_collections_exist')
+    def test_bootstrap_skips_when_verified(self, mock_ensure):
+        """検証済みの場合は再検証しないこと、--forceで再検証することをテスト"""
+        write_schema_marker()
+
+        call_command('qdrant_bootstrap', stdout=StringIO())
+        mock_ensure.assert_not_called()
+
+        call_command('qdrant_bootstrap', '--force', stdout=StringIO())
+        mock_ensure.assert_called_once()
+
+    @pytest.mark.usefixtures('marker_settings')
+    def test_check_fails_when_not_verified(self):
+        """--check で未検証の場合にエラー終了することをテスト"""
+        with pytest.raises(CommandError, match="未検証"):
+            call_command('qdrant_bootstrap', '--check', stdout=StringIO())
+
+    @pytest.mark.usefixtures('marker_settings')
+    @patch('app.adapters.search.qdrant_manager.ensure_collections_exist')
+    def test_bootstrap_failure_raises_command_error(self, mock_ensure):
+        """コレクション検証に失敗した場合はマーカーを書かずにエラー終了することをテスト"""
+        mock_ensure.side_effect = ConnectionError("Qdrantサーバーに接続できません")
+
+        with pytest.raises(CommandError, match="作成・検証に失敗"):
+            call_command('qdrant_bootstrap', stdout=StringIO())
+        assert not is_schema_verified()
+
+    @pytest.mark.usefixtures('marker_settings')
+    @patch('app.management.commands.qdrant_bootstrap.warm_up_collections')
+    def test_bootstrap_with_warmup(self, mock_warm_up):
+        """--warmup で検証後にウォームアップを実行し、所要時間を出力することをテスト"""
+        write_schema_marker()
+        mock_warm_up.return_value = [WarmupResult('documents', queries=32, failures=0, elapsed_seconds=1.5)]
+        out = StringIO()
+
+        call_command('qdrant_bootstrap', '--warmup', stdout=out)
+
+        mock_warm_up.assert_called_once()
+        assert 'documents: 32件のクエリ' in out.getvalue()
+        assert '1.50秒' in out.getvalue()
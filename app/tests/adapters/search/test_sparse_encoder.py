@@ -0,0 +1,37 @@
+"""SparseTextEncoderのテストモジュール"""
+
+from app.adapters.search.sparse_encoder import SparseTextEncoder
+
+
+class TestSparseTextEncoder:
+    """疎ベクトルエンコーダーのテスト"""
+
+    def test_tokenize_japanese_and_ascii(self):
+        """日本語は文字bigram、英数字は単語単位でトークン化されることをテスト"""
+        tokens = SparseTextEncoder.tokenize('機械学習のPDF ｖ２')
+
+        assert tokens == ['機械', '械学', '学習', '習の', 'pdf', 'v2']
+
+    def test_tokenize_single_character_run(self):
+        """1文字のみの連続はそのままトークンになることをテスト"""
+        assert SparseTextEncoder.tokenize('本 と') == ['本', 'と']
+        assert SparseTextEncoder.tokenize('') == []
+
+    def test_encode_document_applies_tf_saturation(self):
+        """語頻度に応じて値が増加し、かつ飽和することをテスト"""
+        encoder = SparseTextEncoder(avg_doc_length=4.0)
+
+        once = encoder.encode_document('学習')
+        twice = encoder.encode_document('学習 学習')
+
+        assert once.indices == twice.indices
+        assert once.values[0] < twice.values[0] < once.values[0] * 2
+        assert twice.values[0] < encoder.k1 + 1
+
+    def test_encode_query_is_binary_and_sorted(self):
+        """クエリは重複を除いた値1.0の疎ベクトルになり、インデックスが昇順であることをテスト"""
+        vector = SparseTextEncoder().encode_query('学習 学習 機械')
+
+        assert vector.values == [1.0, 1.0]
+        assert vector.indices == sorted(vector.indices)
+        assert set(vector.indices) == {SparseTextEncoder.token_index('学習'), SparseTextEncoder.token_index('機械')}
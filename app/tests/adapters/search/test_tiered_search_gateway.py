@@ -0,0 +1,126 @@
+"""ホット層・コールド層を透過的に検索するゲートウェイのテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+from unittest.mock import patch
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from app.adapters.search.qdrant_search_gateway import QdrantSearchGateway
+from app.adapters.search.tiered_search_gateway import TieredSearchGateway, merge_groups, merge_hits
+from app.core.search.gateways import SearchFilter, SearchGroup, SearchHit, SearchRequest
+
+COLLECTION = 'documents'
+COLD = 'documents_cold'
+
+
+@pytest.fixture(autouse=True)
+def tier_settings(settings):
+    """文書用コレクションのコールド層を有効にする設定"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = False
+    settings.QDRANT_COLD_TIER_ENABLED = True
+    settings.QDRANT_COLD_TIER_COLLECTIONS = []
+    settings.QDRANT_COLD_TIER_SUFFIX = '_cold'
+    return settings
+
+
+@pytest.fixture
+def client():
+    """ユーザー1のポイントが両方の層に、ユーザー2のポイントがホット層のみにあるローカルモードのクライアント"""
+    local = QdrantClient(':memory:')
+    for name in (COLLECTION, COLD):
+        local.create_collection(name, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    local.upsert(COLLECTION, points=[
+        PointStruct(id=1, vector=[1.0, 0.5], payload={'user_id': '1', 'document_id': 'doc-1'}),
+        PointStruct(id=2, vector=[1.0, 0.0], payload={'user_id': '2', 'document_id': 'doc-2'}),
+    ])
+    local.upsert(COLD, points=[
+        PointStruct(id=3, vector=[1.0, 0.0], payload={'user_id': '1', 'document_id': 'doc-3'}),
+        PointStruct(id=4, vector=[0.0, 1.0], payload={'user_id': '1', 'document_id': 'doc-3'}),
+    ])
+    yield local
+    local.close()
+
+
+@pytest.fixture
+def gateway(client):
+    """ローカルモードのクライアントを用いるゲートウェイ"""
+    return TieredSearchGateway(QdrantSearchGateway(client=client), client=client)
+
+
+class TestTieredSearchGateway:
+    """ホット層・コールド層の透過的な検索のテスト"""
+
+    def test_search_merges_cold_tier(self, gateway):
+        """コールド層にポイントを持つユーザーの検索結果が両方の層から統合されることをテスト"""
+        hits = gateway.search(COLLECTION, [1.0, 0.0], SearchFilter(user_id=1), limit=2)
+        assert [hit.point_id for hit in hits] == [3, 1]
+
+    def test_search_groups_merges_cold_tier(self, gateway):
+        """グループ化検索でも両方の層の結果が統合されることをテスト"""
+        groups = gateway.search_groups(COLLECTION, [1.0, 0.0], SearchFilter(user_id=1), group_limit=5)
+        assert [group.group_id for group in groups] == ['doc-3', 'doc-1']
+
+    def test_skips_cold_tier_without_cold_points(self, gateway, client):
+        """コールド層にポイントが無いユーザーはコールド層を検索せず、件数確認をキャッシュすることをテスト"""
+        with patch.object(client, 'count', wraps=client.count) as count, \
+                patch.object(client, 'query_points', wraps=client.query_points) as query_points:
+            for _ in range(3):
+                hits = gateway.search(COLLECTION, [1.0, 0.0], SearchFilter(user_id=2))
+                assert [hit.point_id for hit in hits] == [2]
+
+        assert count.call_count == 1
+        assert {call.kwargs['collection_name'] for call in query_points.call_args_list} == {COLLECTION}
+
+    def test_cache_expires(self, client):
+        """キャッシュの有効期限が切れると件数を再確認することをテスト"""
+        now = [0.0]
+        gateway = TieredSearchGateway(QdrantSearchGateway(client=client), client=client, cache_ttl=10,
+                                      clock=lambda: now[0])
+        with patch.object(client, 'count', wraps=client.count) as count:
+            gateway.needs_cold_tier(COLLECTION, SearchFilter(user_id=2))
+            now[0] = 11.0
+            gateway.needs_cold_tier(COLLECTION, SearchFilter(user_id=2))
+        assert count.call_count == 2
+
+    def test_needs_cold_tier(self, gateway, tier_settings):
+        """ユーザーを限定しない検索は常にコールド層も対象にし、コールド層の無いコレクションは対象外にすることをテスト"""
+        assert gateway.needs_cold_tier(COLLECTION, None) is True
+        assert gateway.needs_cold_tier('qa_pairs', None) is False
+        tier_settings.QDRANT_COLD_TIER_ENABLED = False
+        assert gateway.needs_cold_tier(COLLECTION, None) is False
+
+    def test_count_failure_falls_back_to_hot_tier(self, gateway, client):
+        """件数確認に失敗した場合はホット層のみを検索することをテスト"""
+        with patch.object(client, 'count', side_effect=ConnectionError('unavailable')):
+            hits = gateway.search(COLLECTION, [1.0, 0.0], SearchFilter(user_id=1))
+        assert [hit.point_id for hit in hits] == [1]
+
+    def test_search_batch(self, gateway):
+        """バッチ検索ではコールド層が必要なクエリのみ両方の層の結果を統合することをテスト"""
+        result = gateway.search_batch([
+            SearchRequest(COLLECTION, [1.0, 0.0], SearchFilter(user_id=1), limit=3),
+            SearchRequest(COLLECTION, [1.0, 0.0], SearchFilter(user_id=2), limit=3),
+        ])
+        assert [[hit.point_id for hit in hits] for hits in result.results] == [[3, 1, 4], [2]]
+        assert set(result.timings) == {COLLECTION, COLD}
+
+
+class TestMerge:
+    """検索結果の統合のテスト"""
+
+    def test_merge_hits_deduplicates(self):
+        """両方の層に存在するポイントはスコアの高い方を残すことをテスト"""
+        hot = [SearchHit(1, 0.9), SearchHit(2, 0.5)]
+        cold = [SearchHit(2, 0.7), SearchHit(3, 0.6)]
+        assert merge_hits(hot, cold, 2) == [SearchHit(1, 0.9), SearchHit(2, 0.7)]
+
+    def test_merge_groups(self):
+        """同じ文書のグループを統合し、最高スコアの降順に並べることをテスト"""
+        hot = [SearchGroup('a', (SearchHit(1, 0.5),)), SearchGroup('b', (SearchHit(2, 0.4),))]
+        cold = [SearchGroup('a', (SearchHit(3, 0.8),)), SearchGroup('c', (SearchHit(4, 0.6),))]
+        groups = merge_groups(hot, cold, group_limit=2, group_size=1)
+        assert [(group.group_id, [hit.point_id for hit in group.hits]) for group in groups] == [('a', [3]), ('c', [4])]
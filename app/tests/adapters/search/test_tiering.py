@@ -0,0 +1,110 @@
+"""ホット層・コールド層間のポイント移動のテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+import os
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from app.adapters.search.tiering import (
+    build_tier_filter,
+    chunked,
+    list_cold_users,
+    move_to_cold_tier,
+    move_to_hot_tier,
+)
+
+COLLECTION = 'documents'
+COLD = 'documents_cold'
+
+
+@pytest.fixture(autouse=True)
+def tier_settings(settings, tmp_path):
+    """文書用コレクションのコールド層を有効にする設定"""
+    settings.LOCAL_VECTOR_INDEX_DIR = str(tmp_path)
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLD_TIER_ENABLED = True
+    settings.QDRANT_COLD_TIER_COLLECTIONS = []
+    settings.QDRANT_COLD_TIER_SUFFIX = '_cold'
+    return settings
+
+
+@pytest.fixture
+def client():
+    """ホット層に3ユーザー分のポイントを持つローカルモードのクライアント"""
+    local = QdrantClient(':memory:')
+    for name in (COLLECTION, COLD):
+        local.create_collection(name, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    local.upsert(COLLECTION, points=[
+        PointStruct(id=i, vector=[1.0, float(i)], payload={'user_id': str(i % 3), 'document_id': f'doc-{i}'})
+        for i in range(9)
+    ])
+    yield local
+    local.close()
+
+
+def _ids(client, collection_name):
+    records, _ = client.scroll(collection_name, limit=100)
+    return sorted(record.id for record in records)
+
+
+class TestTiering:
+    """層の間のポイント移動のテスト"""
+
+    def test_move_users_to_cold_and_back(self, client):
+        """ユーザーのポイントをベクトル・ペイロードごとコールド層に移し、ホット層に戻せることをテスト"""
+        result = move_to_cold_tier(COLLECTION, user_ids=[0, 1], client=client, batch_size=2)
+
+        assert (result.source, result.target, result.points_moved) == (COLLECTION, COLD, 6)
+        assert _ids(client, COLLECTION) == [2, 5, 8]
+        assert _ids(client, COLD) == [0, 1, 3, 4, 6, 7]
+        record = client.retrieve(COLD, [4], with_vectors=True)[0]
+        assert record.payload == {'user_id': '1', 'document_id': 'doc-4'}
+        assert record.vector == pytest.approx([0.24253562, 0.9701425])
+        assert list_cold_users(COLLECTION, client=client) == {'0', '1'}
+
+        result = move_to_hot_tier(COLLECTION, user_ids=['1'], client=client)
+
+        assert (result.source, result.target, result.points_moved) == (COLD, COLLECTION, 3)
+        assert _ids(client, COLD) == [0, 3, 6]
+        assert list_cold_users(COLLECTION, client=client) == {'0'}
+
+    def test_list_cold_users_beyond_facet_limit(self, client):
+        """ユーザー数がファセットの上限に達した場合は全ポイントから集計することをテスト"""
+        move_to_cold_tier(COLLECTION, user_ids=[0, 1, 2], client=client)
+
+        assert list_cold_users(COLLECTION, client=client, limit=2, batch_size=2) == {'0', '1', '2'}
+
+    def test_move_documents_to_cold(self, client):
+        """文書IDを指定して古い文書のポイントのみを移動できることをテスト"""
+        result = move_to_cold_tier(COLLECTION, document_ids=['doc-2', 'doc-7'], client=client)
+        assert result.points_moved == 2
+        assert _ids(client, COLD) == [2, 7]
+
+    def test_move_invalidates_local_indexes(self, client, tier_settings):
+        """移動したポイントを持つユーザーのローカルインデックスを移動元・移動先ともに破棄することをテスト"""
+        for name in (COLLECTION, COLD):
+            for user_id in ('0', '1', '2'):
+                os.makedirs(os.path.join(tier_settings.LOCAL_VECTOR_INDEX_DIR, name, user_id))
+
+        move_to_cold_tier(COLLECTION, document_ids=['doc-1', 'doc-3'], client=client)
+
+        for name in (COLLECTION, COLD):
+            assert sorted(os.listdir(os.path.join(tier_settings.LOCAL_VECTOR_INDEX_DIR, name))) == ['2']
+
+    def test_not_tiered_collection(self, client, tier_settings):
+        """コールド層が無効なコレクションは移動できないことをテスト"""
+        tier_settings.QDRANT_COLD_TIER_ENABLED = False
+        with pytest.raises(ValueError):
+            move_to_cold_tier(COLLECTION, user_ids=[0], client=client)
+
+    def test_build_tier_filter_requires_target(self):
+        """移動対象が指定されていない場合はエラーになることをテスト"""
+        with pytest.raises(ValueError):
+            build_tier_filter()
+        assert len(build_tier_filter([1], ['doc-1']).should) == 2
+
+    def test_chunked(self):
+        """指定した件数ごとに分割することをテスト"""
+        assert chunked([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
@@ -0,0 +1,74 @@
+"""コレクションのウォームアップのテストモジュール"""
+# pylint: disable=redefined-outer-name
+
+from unittest.mock import patch
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from app.adapters.search import warmup
+from app.adapters.search.warmup import sample_queries, start_warmup_thread, warm_up_collections
+
+COLLECTION = 'documents'
+
+
+@pytest.fixture(autouse=True)
+def warmup_settings(settings):
+    """ウォームアップ対象のコレクション設定"""
+    settings.QDRANT_COLLECTION_DOCUMENTS = COLLECTION
+    settings.QDRANT_COLLECTION_QA = 'qa_pairs'
+    settings.QDRANT_COLLECTION_OVERRIDES = {}
+    settings.QDRANT_HYBRID_SEARCH = False
+    settings.QDRANT_WARMUP_COLLECTIONS = []
+    return settings
+
+
+@pytest.fixture
+def client():
+    """ユーザーごとのポイントを持つローカルモードのクライアント"""
+    local = QdrantClient(':memory:')
+    local.create_collection(COLLECTION, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    local.upsert(COLLECTION, points=[
+        PointStruct(id=i, vector=[1.0, float(i)], payload={'user_id': str(i % 2), 'text': f'chunk {i}'})
+        for i in range(10)
+    ])
+    yield local
+    local.close()
+
+
+class TestWarmup:
+    """ウォームアップのテスト"""
+
+    def test_sample_queries(self, client):
+        """保存済みのポイントからクエリベクトルとユーザーの絞り込み条件を抽出することをテスト"""
+        queries = sample_queries(client, COLLECTION, 4)
+        assert len(queries) == 4
+        for vector, search_filter in queries:
+            assert len(vector) == 2
+            assert search_filter.user_id in ('0', '1')
+
+    def test_warm_up_collections(self, client):
+        """コレクションごとに検索を発行し、存在しないコレクションはスキップすることをテスト"""
+        with patch.object(client, 'query_points', wraps=client.query_points) as query_points:
+            results = warm_up_collections(client=client, queries=5, limit=3)
+
+        assert [result.collection_name for result in results] == [COLLECTION]
+        assert results[0].queries == 5
+        assert results[0].failures == 0
+        assert results[0].elapsed_seconds >= 0
+        # 抽出1回 + 検索5回 + 存在しないqa_pairsでの抽出1回
+        assert query_points.call_count == 7
+
+    def test_configured_collections(self, client, warmup_settings):
+        """QDRANT_WARMUP_COLLECTIONS が設定されている場合はそのコレクションのみを対象にすることをテスト"""
+        warmup_settings.QDRANT_WARMUP_COLLECTIONS = [COLLECTION]
+        results = warm_up_collections(client=client, queries=2)
+        assert [result.collection_name for result in results] == [COLLECTION]
+
+    def test_start_warmup_thread_logs_connection_error(self, caplog):
+        """接続できない場合もスレッド内で例外を送出せずにログに記録することをテスト"""
+        with patch.object(warmup, 'get_qdrant_client', side_effect=ConnectionError('unavailable')):
+            with caplog.at_level('WARNING', logger='app.adapters.search.warmup'):
+                start_warmup_thread().join(timeout=5)
+        assert 'ウォームアップに失敗しました' in caplog.text
@@ -2,12 +2,18 @@
 
 Celeryタスクが期待通りに動作することを確認するテスト
 """
+from datetime import timedelta
 from unittest.mock import patch
 
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
 # pylint: disable=no-value-for-parameter
 # Celeryタスクはbind=Trueの場合、self引数が自動的に渡されるため、
 # テスト時に明示的にselfを渡す必要がなく、pylintの警告を抑制します
-from app.tasks import add
+from app.adapters.search.tiering import TieringResult
+from app.tasks import add, rebalance_cold_tier
 
 
 class TestCeleryTasks:
@@ -47,3 +53,48 @@ class TestCeleryTasks:
 
             result3 = add(0.5, 0.5)
             assert result3 == 1.0
+
+
+@pytest.mark.django_db
+class TestRebalanceColdTier:
+    """rebalance_cold_tierタスクのテストケース"""
+
+    @pytest.fixture(autouse=True)
+    def tier_settings(self, settings):
+        """文書用コレクションのコールド層を有効にする設定"""
+        settings.QDRANT_COLLECTION_DOCUMENTS = 'documents'
+        settings.QDRANT_COLD_TIER_ENABLED = True
+        settings.QDRANT_COLD_TIER_COLLECTIONS = []
+        settings.QDRANT_COLD_TIER_INACTIVE_DAYS = 90
+        return settings
+
+    def test_moves_inactive_and_active_users(self):
+        """非アクティブなユーザーをコールド層に、最近ログインしたユーザーをホット層に移動することをテスト"""
+        users = get_user_model().objects
+        old = timezone.now() - timedelta(days=120)
+        inactive = users.create_user(email="inactive@example.com", password="password123")
+        users.filter(pk=inactive.pk).update(last_login=old)
+        never = users.create_user(email="never@example.com", password="password123")
+        users.filter(pk=never.pk).update(date_joined=old)
+        returning = users.create_user(email="returning@example.com", password="password123")
+        users.filter(pk=returning.pk).update(last_login=timezone.now())
+
+        def result(points):
+            return TieringResult('documents', 'documents', 'documents_cold', points, 0.0)
+
+        with patch('app.adapters.search.tiering.move_to_cold_tier', return_value=result(5)) as to_cold, \
+                patch('app.adapters.search.tiering.move_to_hot_tier', return_value=result(2)) as to_hot, \
+                patch('app.adapters.search.tiering.list_cold_users',
+                      return_value={str(inactive.pk), str(returning.pk)}):
+            moved = rebalance_cold_tier()
+
+        assert moved == {'documents': {'to_cold': 5, 'to_hot': 2}}
+        assert sorted(to_cold.call_args.kwargs['user_ids']) == sorted([str(inactive.pk), str(never.pk)])
+        assert to_hot.call_args.kwargs['user_ids'] == [str(returning.pk)]
+
+    def test_disabled(self, tier_settings):
+        """コールド層が無効な場合は何も移動しないことをテスト"""
+        tier_settings.QDRANT_COLD_TIER_ENABLED = False
+        with patch('app.adapters.search.tiering.move_to_cold_tier') as to_cold:
+            assert rebalance_cold_tier() == {}
+        to_cold.assert_not_called()
@@ -0,0 +1,98 @@
+"""アップロード検証UseCaseのテスト
+
+ValidateUploadInteractorの機能をテストします。
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from app.core.pdf.gateways import PdfRasterizeError, PdfRasterizerGateway, PdfToolNotInstalledError
+from app.core.repositories import UserSettingsRepository
+from app.core.usecases import (
+    FileTooLargeError,
+    InvalidPdfError,
+    TooManyPagesError,
+    UploadValidationError,
+    ValidateUploadInputData,
+)
+from app.models.user_settings import UserSettings
+from app.usecases.validate_upload import ValidateUploadInteractor
+
+MB = 1024 * 1024
+
+
+class TestValidateUploadUseCase(unittest.TestCase):
+    """アップロード検証UseCase（ValidateUploadInteractor）のテストケース"""
+
+    def setUp(self):
+        """テストの前準備"""
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        # ユーザー設定: 最大2MB・10ページ
+        self.user_settings_repository = Mock(spec=UserSettingsRepository)
+        self.user_settings_repository.get_or_create_for_user.return_value = UserSettings(
+            max_file_size_mb=2, max_pages=10)
+        self.rasterizer = Mock(spec=PdfRasterizerGateway)
+        self.rasterizer.get_page_count.return_value = 8
+        self.use_case = ValidateUploadInteractor(
+            self.user_settings_repository, self.rasterizer, upload_dir=self.upload_dir)
+
+    def input_data(self, chunks):
+        """入力データを作成する"""
+        return ValidateUploadInputData(user_id=1, filename='book.pdf', chunks=chunks)
+
+    def test_validate_upload_success(self):
+        """正常系：上限以内のPDFを保存し、パス・バイト数・ページ数を返すケース"""
+        output = self.use_case.execute(self.input_data([b'%PDF-1.4 ', b'x' * MB]))
+
+        self.assertEqual(output.size_bytes, MB + 9)
+        self.assertEqual(output.page_count, 8)
+        self.assertEqual(os.listdir(self.upload_dir), [os.path.basename(output.path)])
+        self.rasterizer.get_page_count.assert_called_once_with(output.path + '.part')
+        self.user_settings_repository.get_or_create_for_user.assert_called_once_with(1)
+
+    def test_file_too_large_aborts_reading(self):
+        """異常系：上限を超えた時点で読み込みを中止し、ページ数を確認しないケース"""
+        consumed = []
+
+        def chunks():
+            for i in range(10):
+                consumed.append(i)
+                yield b'x' * MB
+
+        with self.assertRaises(FileTooLargeError):
+            self.use_case.execute(self.input_data(chunks()))
+
+        self.assertEqual(len(consumed), 3)
+        self.rasterizer.get_page_count.assert_not_called()
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_too_many_pages(self):
+        """異常系：ページ数が上限を超えるPDFを拒否し、書き出したファイルを削除するケース"""
+        self.rasterizer.get_page_count.return_value = 2000
+
+        with self.assertRaises(TooManyPagesError):
+            self.use_case.execute(self.input_data([b'%PDF-1.4']))
+
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_invalid_pdf(self):
+        """異常系：PDFとして読み込めないファイルを拒否するケース"""
+        self.rasterizer.get_page_count.side_effect = PdfRasterizeError('Syntax Error')
+
+        with self.assertRaises(InvalidPdfError) as context:
+            self.use_case.execute(self.input_data([b'not a pdf']))
+
+        self.assertIsInstance(context.exception, UploadValidationError)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_tool_not_installed_is_not_invalid_pdf(self):
+        """異常系：Popplerがインストールされていない場合はPDFの不備とせずにそのまま送出するケース"""
+        self.rasterizer.get_page_count.side_effect = PdfToolNotInstalledError('pdfinfo not found')
+
+        with self.assertRaises(PdfToolNotInstalledError):
+            self.use_case.execute(self.input_data([b'%PDF-1.4']))
+
+        self.assertEqual(os.listdir(self.upload_dir), [])
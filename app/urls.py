@@ -14,9 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 
+from app.adapters.search.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 ]
+
+# Qdrant呼び出しの計測値をPrometheus形式で公開する（QDRANT_METRICS_SINK = 'prometheus' の場合のみ）
+if getattr(settings, 'QDRANT_METRICS_SINK', 'none') == 'prometheus':
+    urlpatterns.append(path('metrics/qdrant', metrics_view, name='qdrant-metrics'))
@@ -0,0 +1,116 @@
+"""アップロード検証 UseCase 実装。
+
+アップロードされたPDFをユーザー設定 (``UserSettings``) のファイルサイズ・ページ数の上限で検証します。
+ファイルはチャンクごとにディスクへ書き出しながらバイト数を数え、上限を超えた時点で読み込みを中止します。
+ページ数はpdfinfoで文書の情報のみを読み込んで確認するため、上限を超える文書をページの画像化の前に拒否できます。
+"""
+import logging
+import os
+import uuid
+from typing import Optional
+
+from django.conf import settings
+
+from app.core.pdf.gateways import PdfRasterizeError, PdfRasterizerGateway, PdfToolNotInstalledError
+from app.core.repositories import UserSettingsRepository
+from app.core.usecases import (
+    FileTooLargeError,
+    InvalidPdfError,
+    TooManyPagesError,
+    ValidateUploadInputData,
+    ValidateUploadOutputData,
+    ValidateUploadUseCase,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ValidateUploadInteractor(ValidateUploadUseCase):
+    """アップロード検証 UseCase の実装。
+
+    検証に合格したPDFのみを ``PDF_UPLOAD_DIR`` に残し、不合格の場合は書き出したファイルを削除します。
+    """
+
+    def __init__(
+        self,
+        user_settings_repository: UserSettingsRepository,
+        rasterizer: PdfRasterizerGateway,
+        upload_dir: Optional[str] = None,
+    ):
+        """コンストラクタ。
+
+        Args:
+            user_settings_repository: ユーザー設定リポジトリ
+            rasterizer: ページ数の取得に用いるPDF画像化ゲートウェイ
+            upload_dir: アップロードされたPDFの保存先ディレクトリ。省略時は ``PDF_UPLOAD_DIR``
+        """
+        self.user_settings_repository = user_settings_repository
+        self.rasterizer = rasterizer
+        self.upload_dir = upload_dir or settings.PDF_UPLOAD_DIR
+
+    def execute(self, input_data: ValidateUploadInputData) -> ValidateUploadOutputData:
+        """アップロード検証処理を実行します。
+
+        Args:
+            input_data: アップロード検証に必要な入力データ。``chunks`` にはアップロードされたファイルの
+                内容を先頭から順に渡します（例: ``UploadedFile.chunks()``）
+
+        Returns:
+            ValidateUploadOutputData: 保存したPDFのパス・バイト数・ページ数
+
+        Raises:
+            FileTooLargeError: ファイルサイズが ``max_file_size_mb`` を超える場合
+            InvalidPdfError: PDFとして読み込めない場合
+            TooManyPagesError: ページ数が ``max_pages`` を超える場合
+            PdfToolNotInstalledError: ページ数の取得に用いるツールがインストールされていない場合
+        """
+        user_settings = self.user_settings_repository.get_or_create_for_user(input_data.user_id)
+        max_bytes = user_settings.max_file_size_mb * 1024 * 1024
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}.pdf")
+        temp_path = f"{path}.part"
+        try:
+            size_bytes = self._write_chunks(input_data, temp_path, max_bytes)
+            page_count = self._get_page_count(input_data, temp_path)
+            if page_count > user_settings.max_pages:
+                logger.warning(
+                    f"アップロードを拒否しました: {input_data.filename} ({page_count}ページ, "
+                    f"上限 {user_settings.max_pages}ページ)")
+                raise TooManyPagesError(
+                    f"ページ数 ({page_count}) が上限 ({user_settings.max_pages}ページ) を超えています。")
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        logger.info(f"アップロードを受け付けました: {input_data.filename} ({size_bytes}バイト, {page_count}ページ)")
+        return ValidateUploadOutputData(path=path, size_bytes=size_bytes, page_count=page_count)
+
+    @staticmethod
+    def _write_chunks(input_data: ValidateUploadInputData, path: str, max_bytes: int) -> int:
+        """チャンクを書き出しながらバイト数を数え、上限を超えた時点で中止します。"""
+        size_bytes = 0
+        with open(path, 'wb') as f:
+            for chunk in input_data.chunks:
+                size_bytes += len(chunk)
+                if size_bytes > max_bytes:
+                    logger.warning(
+                        f"アップロードを拒否しました: {input_data.filename} (上限 {max_bytes}バイトを超過)")
+                    raise FileTooLargeError(
+                        f"ファイルサイズが上限 ({max_bytes // (1024 * 1024)}MB) を超えています。")
+                f.write(chunk)
+        return size_bytes
+
+    def _get_page_count(self, input_data: ValidateUploadInputData, path: str) -> int:
+        """書き出したPDFのページ数を取得します。
+
+        ツールがインストールされていない場合はサーバーの構成の問題であるため、PDFの不備とはせずにそのまま送出します。
+        """
+        try:
+            return self.rasterizer.get_page_count(path)
+        except PdfToolNotInstalledError:
+            raise
+        except PdfRasterizeError as e:
+            logger.warning(f"アップロードを拒否しました: {input_data.filename} (PDFとして読み込めません: {e})")
+            raise InvalidPdfError("PDFとして読み込めないファイルです。") from e
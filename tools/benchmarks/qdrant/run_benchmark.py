@@ -0,0 +1,302 @@
+r"""Qdrantコレクションのパラメータごとの性能を計測するベンチマークスクリプト。
+
+合成コーパスを登録して、登録スループット・ユーザーで絞り込んだ検索のレイテンシ・
+完全探索 (exact search) に対するrecall@kを、HNSW・量子化・データ型の組み合わせごとに計測します。
+コレクションの作成・ベクトルの変換・検索はアプリケーションと同じ ``get_collection_config()``・
+``ensure_collection()``・``QdrantSearchGateway`` を経由するため、計測結果をそのまま
+``QDRANT_COLLECTION_OVERRIDES`` などの設定値の選択に用いることができます。
+
+実行例::
+
+    # ローカルモード（メモリ上）でベンチマーク自体の動作を確認する
+    python tools/benchmarks/qdrant/run_benchmark.py --vectors 10000 --dim 384
+
+    # Qdrantサーバーでパラメータを比較する
+    python tools/benchmarks/qdrant/run_benchmark.py --url http://localhost:6333 \
+        --vectors 1000000 --dim 768 --hnsw-m 16,32 --quantization none,scalar,binary \
+        --datatype float32,float16 --output results.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import warnings
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings.development')
+
+# pylint: disable=wrong-import-position
+from django.conf import settings  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.http.models import (  # noqa: E402
+    CollectionStatus,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+)
+
+from app.adapters.search.collection_config import (  # noqa: E402
+    DATATYPE_FLOAT16,
+    DATATYPE_FLOAT32,
+    get_collection_config,
+)
+from app.adapters.search.qdrant_manager import ensure_collection  # noqa: E402
+from app.adapters.search.qdrant_search_gateway import (  # noqa: E402
+    QdrantSearchGateway,
+    build_filter,
+    build_point_vector,
+)
+from app.core.search.gateways import SearchFilter  # noqa: E402
+
+from synthetic_corpus import SyntheticCorpus  # noqa: E402
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """1回の計測に用いるコレクションのパラメータ。
+
+    Attributes:
+        hnsw_m: HNSWグラフの各ノードの最大エッジ数
+        hnsw_ef_construct: インデックス構築時の探索幅
+        hnsw_ef: 検索時の探索幅。Noneの場合はサーバー既定値
+        quantization: 量子化モード
+        datatype: 密ベクトルの保存形式
+        truncate_dim: 保存する次元数（Matryoshka表現の切り詰め）
+    """
+    hnsw_m: int
+    hnsw_ef_construct: int
+    hnsw_ef: Optional[int]
+    quantization: str
+    datatype: str
+    truncate_dim: Optional[int]
+
+    def overrides(self, dim: int) -> Dict[str, object]:
+        """``QDRANT_COLLECTION_OVERRIDES`` に指定する上書き設定を返します。"""
+        return {
+            'vector_size': dim,
+            'hnsw_m': self.hnsw_m,
+            'hnsw_ef_construct': self.hnsw_ef_construct,
+            'quantization': self.quantization,
+            'datatype': self.datatype,
+            'truncate_dim': self.truncate_dim,
+            'hybrid': False,
+        }
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """1回の計測結果。
+
+    Attributes:
+        case: 計測したパラメータ
+        vectors: 登録したポイント数
+        dim: ベクトルの次元数
+        ingest_points_per_second: 登録スループット（件/秒）
+        indexing_seconds: 登録後にインデックス構築が完了するまでの時間（秒）
+        latency_p50_ms: 検索レイテンシの中央値（ミリ秒）
+        latency_p95_ms: 検索レイテンシの95パーセンタイル（ミリ秒）
+        latency_p99_ms: 検索レイテンシの99パーセンタイル（ミリ秒）
+        queries_per_second: 逐次実行した場合の検索スループット（件/秒）
+        recall_at_k: 同じコレクションでの完全探索の上位k件に対する再現率の平均（HNSW・量子化による劣化）
+        full_recall_at_k: 量子化・切り詰め前のベクトルでの完全探索に対する再現率の平均
+            （データ型・切り詰めを含めた劣化）。コーパスが ``--full-recall-max`` より大きい場合はNone
+        k: 再現率の算出に用いた件数
+    """
+    case: BenchmarkCase
+    vectors: int
+    dim: int
+    ingest_points_per_second: float
+    indexing_seconds: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    queries_per_second: float
+    recall_at_k: float
+    full_recall_at_k: Optional[float]
+    k: int
+
+    def to_dict(self) -> Dict[str, object]:
+        """計測結果を1階層の辞書に変換します。"""
+        result = asdict(self)
+        return {**result.pop('case'), **result}
+
+
+# uint8形式はコサイン距離のコレクションでは合成コーパスを意味のある形で量子化できないため、計測対象外とします
+BENCHMARK_DATATYPES = (DATATYPE_FLOAT32, DATATYPE_FLOAT16)
+
+
+def ingest(client: QdrantClient, collection_name: str, corpus: SyntheticCorpus, batch_size: int) -> float:
+    """合成コーパスを登録し、登録スループット（件/秒）を返します。"""
+    started = time.perf_counter()
+    for ids, vectors in corpus.iter_batches(batch_size):
+        points = [
+            PointStruct(
+                id=point_id,
+                vector=build_point_vector(collection_name, vector.tolist()),
+                payload=corpus.payload(point_id),
+            )
+            for point_id, vector in zip(ids, vectors)
+        ]
+        client.upsert(collection_name, points=points, wait=True)
+    return corpus.size / (time.perf_counter() - started)
+
+
+def wait_for_indexing(client: QdrantClient, collection_name: str, timeout: float) -> float:
+    """コレクションのインデックス構築が完了するまで待ち、待機時間（秒）を返します。"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if client.get_collection(collection_name).status == CollectionStatus.GREEN:
+            break
+        time.sleep(0.5)
+    return time.perf_counter() - started
+
+
+def exact_search(client: QdrantClient, collection_name: str, query_vector: Sequence[float],
+                 search_filter: SearchFilter, k: int) -> List[object]:
+    """量子化・HNSWを使わない完全探索で上位k件のポイントIDを返します。"""
+    response = client.query_points(
+        collection_name,
+        query=get_collection_config(collection_name).prepare_vector(query_vector),
+        query_filter=build_filter(search_filter),
+        limit=k,
+        search_params=SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True)),
+    )
+    return [point.id for point in response.points]
+
+
+def run_case(client: QdrantClient, collection_name: str, case: BenchmarkCase, corpus: SyntheticCorpus,
+             args: argparse.Namespace) -> BenchmarkResult:
+    """1つのパラメータの組み合わせでコレクションを作成し、登録・検索を計測します。"""
+    settings.QDRANT_COLLECTION_OVERRIDES = {collection_name: case.overrides(corpus.dim)}
+    settings.QDRANT_HNSW_EF_SEARCH = case.hnsw_ef
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    ensure_collection(client, get_collection_config(collection_name), set())
+
+    try:
+        ingest_rate = ingest(client, collection_name, corpus, args.batch_size)
+        indexing_seconds = wait_for_indexing(client, collection_name, args.index_timeout)
+
+        gateway = QdrantSearchGateway(client=client)
+        queries = corpus.queries(args.queries)
+        full_expected = corpus.exact_neighbors(queries, args.k) if corpus.size <= args.full_recall_max else None
+        latencies, recalls, full_recalls = [], [], []
+        for i, (vector, user_id) in enumerate(queries):
+            query_vector = vector.tolist()
+            search_filter = SearchFilter(user_id=user_id)
+            started = time.perf_counter()
+            hits = gateway.search(collection_name, query_vector, search_filter, args.k)
+            latencies.append(time.perf_counter() - started)
+
+            found = {hit.point_id for hit in hits}
+            expected = exact_search(client, collection_name, query_vector, search_filter, args.k)
+            if expected:
+                recalls.append(len(found & set(expected)) / len(expected))
+            if full_expected and full_expected[i]:
+                full_recalls.append(len(found & set(full_expected[i])) / len(full_expected[i]))
+    finally:
+        if not args.keep:
+            client.delete_collection(collection_name)
+
+    latencies_ms = np.array(latencies) * 1000
+    return BenchmarkResult(
+        case=case,
+        vectors=corpus.size,
+        dim=corpus.dim,
+        ingest_points_per_second=round(ingest_rate, 1),
+        indexing_seconds=round(indexing_seconds, 2),
+        latency_p50_ms=round(float(np.percentile(latencies_ms, 50)), 3),
+        latency_p95_ms=round(float(np.percentile(latencies_ms, 95)), 3),
+        latency_p99_ms=round(float(np.percentile(latencies_ms, 99)), 3),
+        queries_per_second=round(len(latencies) / sum(latencies), 1),
+        recall_at_k=round(float(np.mean(recalls)) if recalls else 0.0, 4),
+        full_recall_at_k=round(float(np.mean(full_recalls)), 4) if full_recalls else None,
+        k=args.k,
+    )
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def _optional_int_list(value: str) -> List[Optional[int]]:
+    return [None if v in ('', 'none') else int(v) for v in value.split(',')]
+
+
+def _str_list(value: str) -> List[str]:
+    return [v for v in value.split(',') if v]
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """コマンドライン引数を解析します。"""
+    parser = argparse.ArgumentParser(description='Qdrantコレクションのパラメータごとの性能を計測します。')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='QdrantサーバーのURL。省略時はローカルモード')
+    target.add_argument('--path', help='ローカルモードでデータを保存するディレクトリ。省略時はメモリ上')
+    parser.add_argument('--vectors', type=_int_list, default=[10000], help='登録するポイント数（カンマ区切りで複数指定可）')
+    parser.add_argument('--dim', type=int, default=384, help='ベクトルの次元数')
+    parser.add_argument('--users', type=int, default=100, help='ポイントを割り当てるユーザー数')
+    parser.add_argument('--queries', type=int, default=200, help='計測する検索クエリ数')
+    parser.add_argument('--k', type=int, default=10, help='取得件数（recall@kのk）')
+    parser.add_argument('--batch-size', type=int, default=512, help='1回の登録リクエストのポイント数')
+    parser.add_argument('--hnsw-m', type=_int_list, default=[16], help='HNSWのm（カンマ区切り）')
+    parser.add_argument('--ef-construct', type=_int_list, default=[100], help='HNSWのef_construct（カンマ区切り）')
+    parser.add_argument('--hnsw-ef', type=_optional_int_list, default=[None], help='検索時のhnsw_ef（カンマ区切り、none=既定値）')
+    parser.add_argument('--quantization', type=_str_list, default=['none'], help='量子化モード（none,scalar,binary）')
+    parser.add_argument('--datatype', type=_str_list, default=['float32'], help='データ型（float32,float16）')
+    parser.add_argument('--truncate-dim', type=_optional_int_list, default=[None], help='切り詰め次元数（none=切り詰めない）')
+    parser.add_argument('--full-recall-max', type=int, default=200000,
+                        help='量子化・切り詰め前のベクトルでの再現率を計算する最大ポイント数')
+    parser.add_argument('--seed', type=int, default=42, help='合成コーパスの乱数シード')
+    parser.add_argument('--index-timeout', type=float, default=600.0, help='インデックス構築を待つ最大時間（秒）')
+    parser.add_argument('--collection-prefix', default='bench', help='計測用コレクション名の接頭辞')
+    parser.add_argument('--keep', action='store_true', help='計測後にコレクションを削除しない')
+    parser.add_argument('--output', help='計測結果をJSON Lines形式で追記するファイル')
+    args = parser.parse_args(argv)
+    unsupported = [datatype for datatype in args.datatype if datatype not in BENCHMARK_DATATYPES]
+    if unsupported:
+        parser.error(f"--datatype に計測できないデータ型が指定されています: {','.join(unsupported)}")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> List[BenchmarkResult]:
+    """ベンチマークを実行し、計測結果を表示します。"""
+    args = parse_args(argv)
+    if args.url:
+        client = QdrantClient(url=args.url, timeout=600)
+    else:
+        # ローカルモードは常に完全探索を行うため、HNSW・量子化の設定は計測結果に影響しません
+        warnings.filterwarnings('ignore', message='Local mode performs exact')
+        client = QdrantClient(path=args.path) if args.path else QdrantClient(':memory:')
+        print('注意: ローカルモードは完全探索のため、HNSW・量子化の比較にはQdrantサーバー (--url) を使用してください。')
+
+    cases = [
+        BenchmarkCase(*values)
+        for values in itertools.product(
+            args.hnsw_m, args.ef_construct, args.hnsw_ef, args.quantization, args.datatype, args.truncate_dim)
+    ]
+    results = []
+    for size in args.vectors:
+        corpus = SyntheticCorpus(size=size, dim=args.dim, users=args.users, seed=args.seed)
+        for index, case in enumerate(cases):
+            result = run_case(client, f'{args.collection_prefix}_{index}', case, corpus, args)
+            results.append(result)
+            row = result.to_dict()
+            print(' '.join(f'{key}={value}' for key, value in row.items()), flush=True)
+            if args.output:
+                with open(args.output, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    client.close()
+    return results
+
+
+if __name__ == '__main__':
+    main()
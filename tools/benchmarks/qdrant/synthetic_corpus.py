@@ -0,0 +1,136 @@
+"""ベンチマーク用の合成コーパスを生成するモジュール。
+
+埋め込みベクトルの分布を模倣するため、ランダムなクラスタ中心の周りにガウス雑音を加えて正規化した
+ベクトルを生成します。ベクトルはバッチごとにシードから再生成できるため、数百万件のコーパスでも
+全件をメモリに保持する必要はありません。
+"""
+
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+# ベクトルを同じシードで生成する単位（件）
+BLOCK_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class SyntheticCorpus:
+    """合成コーパスの定義。
+
+    Attributes:
+        size: ポイント数
+        dim: ベクトルの次元数
+        users: ポイントを割り当てるユーザー数
+        chunks_per_document: 1文書あたりのチャンク数
+        clusters: クラスタ数
+        noise: クラスタ中心からのばらつき
+        seed: 乱数のシード
+    """
+    size: int
+    dim: int
+    users: int = 100
+    chunks_per_document: int = 20
+    clusters: int = 256
+    noise: float = 0.35
+    seed: int = 42
+
+    def _centers(self) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        return _normalize(rng.standard_normal((self.clusters, self.dim), dtype=np.float32))
+
+    def _sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        centers = self._centers()[rng.integers(0, self.clusters, count)]
+        return _normalize(centers + self.noise * rng.standard_normal((count, self.dim), dtype=np.float32))
+
+    def payload(self, point_id: int) -> dict:
+        """ポイントのペイロードを返します。
+
+        Args:
+            point_id: ポイントID
+
+        Returns:
+            dict: ユーザーID・文書ID・ページ番号を含むペイロード
+        """
+        document = point_id // self.chunks_per_document
+        return {
+            'user_id': str(document % self.users),
+            'document_id': f'doc-{document}',
+            'page_number': point_id % self.chunks_per_document + 1,
+        }
+
+    def _block(self, index: int) -> np.ndarray:
+        """``BLOCK_SIZE`` 件単位のブロックのベクトルを、ブロック番号から決まるシードで生成します。"""
+        start = index * BLOCK_SIZE
+        rng = np.random.default_rng((self.seed, index))
+        return self._sample(rng, min(BLOCK_SIZE, self.size - start))
+
+    def iter_batches(self, batch_size: int) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """ポイントIDとベクトルをバッチごとに生成します。
+
+        ベクトルはブロック単位で生成するため、バッチサイズによらず同じポイントIDには同じベクトルが対応します。
+
+        Args:
+            batch_size: 1バッチのポイント数
+
+        Yields:
+            Tuple[List[int], np.ndarray]: ポイントIDのリストと (件数, 次元数) のベクトル
+        """
+        buffer = np.empty((0, self.dim), dtype=np.float32)
+        start = 0
+        for index in range(-(-self.size // BLOCK_SIZE)):
+            buffer = np.concatenate([buffer, self._block(index)])
+            while len(buffer) >= batch_size or (len(buffer) and start + len(buffer) == self.size):
+                batch, buffer = buffer[:batch_size], buffer[batch_size:]
+                yield list(range(start, start + len(batch))), batch
+                start += len(batch)
+
+    def queries(self, count: int) -> List[Tuple[np.ndarray, str]]:
+        """クエリベクトルと検索対象のユーザーIDを生成します。
+
+        Args:
+            count: クエリ数
+
+        Returns:
+            List[Tuple[np.ndarray, str]]: (クエリベクトル, ユーザーID) のリスト
+        """
+        rng = np.random.default_rng((self.seed, 0, 1))
+        vectors = self._sample(rng, count)
+        users = rng.integers(0, min(self.users, max(1, self.size // self.chunks_per_document)), count)
+        return [(vector, str(user)) for vector, user in zip(vectors, users)]
+
+    def exact_neighbors(self, queries: List[Tuple[np.ndarray, str]], k: int, batch_size: int = 8192) -> List[List[int]]:
+        """量子化・切り詰め前のベクトルに対する完全探索で、クエリごとの上位k件のポイントIDを求めます。
+
+        コーパスをバッチごとに再生成してスコアを計算するため、メモリ使用量はバッチサイズに比例します。
+
+        Args:
+            queries: ``queries()`` が返す (クエリベクトル, ユーザーID) のリスト
+            k: 取得件数
+            batch_size: 1回に計算するポイント数
+
+        Returns:
+            List[List[int]]: クエリごとのスコアの降順に並んだポイントID
+        """
+        vectors = np.stack([vector for vector, _ in queries])
+        users = np.array([int(user) for _, user in queries])
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for ids, batch in self.iter_batches(batch_size):
+            point_ids = np.array(ids)
+            point_users = point_ids // self.chunks_per_document % self.users
+            scores = vectors @ batch.T
+            scores[users[:, np.newaxis] != point_users[np.newaxis, :]] = -np.inf
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_ids = np.concatenate([best_ids, np.broadcast_to(point_ids, scores.shape)], axis=1)
+            top = np.argsort(-best_scores, axis=1, kind='stable')[:, :k]
+            best_scores = np.take_along_axis(best_scores, top, axis=1)
+            best_ids = np.take_along_axis(best_ids, top, axis=1)
+        return [
+            [int(point_id) for point_id, score in zip(row_ids, row_scores) if score > -np.inf]
+            for row_ids, row_scores in zip(best_ids, best_scores)
+        ]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
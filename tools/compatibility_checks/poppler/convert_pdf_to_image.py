@@ -2,14 +2,25 @@
 # -*- coding: utf-8 -*-
 """
 PDFファイルをJPGまたはPNG画像に変換するスクリプト
+
+アプリケーションと同じ PdfRasterizerGateway の実装 (Pdf2ImageRasterizer) を用い、
+一定のページ数ずつ画像化して書き出すため、大きな文書でもメモリ使用量は増えません。
 """
 
 import os
+import sys
 import argparse
-from pdf2image import convert_from_path
 from datetime import datetime
 
-def convert_pdf_to_images(pdf_path, output_dir=None, format='jpg', dpi=200):
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings.development')
+
+from app.adapters.pdf.pdf2image_rasterizer import Pdf2ImageRasterizer  # noqa: E402
+
+
+def convert_pdf_to_images(pdf_path, output_dir=None, format='jpg', dpi=200, window_size=10, workers=0,
+                          adaptive=False):
     """
     PDFファイルを指定した形式の画像に変換する
 
@@ -18,11 +29,19 @@ def convert_pdf_to_images(pdf_path, output_dir=None, format='jpg', dpi=200):
     pdf_path : str
         変換するPDFファイルのパス
     output_dir : str, optional
-        出力先ディレクトリ。指定がなければPDFと同じディレクトリ
+        出力先ディレクトリ。指定がなければPDFと同じディレクトリ。
+        画像はその下の「PDFのファイル名_変換日時」ディレクトリに page-0001.jpg の形式で保存する
     format : str, optional
         出力形式 ('jpg' または 'png')
     dpi : int, optional
         解像度 (DPI)
+    window_size : int, optional
+        1回に画像化するページ数
+    workers : int, optional
+        同時に画像化する範囲の数。0の場合はCPUコア数
+    adaptive : bool, optional
+        ページの内容を調べ、ページごとに解像度と色を決めるかどうか。
+        文字のみのページは PDF_RASTER_POLICY の解像度のグレースケールで画像化する
 
     Returns:
     --------
@@ -31,55 +50,55 @@ def convert_pdf_to_images(pdf_path, output_dir=None, format='jpg', dpi=200):
     """
     if output_dir is None:
         output_dir = os.path.dirname(os.path.abspath(pdf_path))
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
+
     # PDFのファイル名（拡張子なし）を取得
     pdf_filename = os.path.splitext(os.path.basename(pdf_path))[0]
-    
-    # 現在時刻をファイル名に含めて一意にする
+
+    # 現在時刻をディレクトリ名に含めて一意にする
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # PDFを画像に変換
+    page_dir = os.path.join(output_dir, f"{pdf_filename}_{timestamp}")
+
+    rasterizer = Pdf2ImageRasterizer(
+        dpi=dpi, fmt=format, window_size=window_size, workers=workers, adaptive=adaptive)
+    page_count = rasterizer.get_page_count(pdf_path)
+
+    # PDFを一定のページ数ずつ並列に画像に変換し、変換したページから順に保存する
     print(f"PDFファイル '{pdf_path}' を {format.upper()} 形式に変換中...")
-    images = convert_from_path(
-        pdf_path,
-        dpi=dpi,
-        fmt=format.lower()
-    )
-    
-    # 変換した画像を保存
     image_paths = []
-    for i, image in enumerate(images):
-        # ページ番号は1から始める
-        page_num = i + 1
-        image_filename = f"{pdf_filename}_page{page_num}_{timestamp}.{format.lower()}"
-        image_path = os.path.join(output_dir, image_filename)
-        
-        image.save(image_path)
-        image_paths.append(image_path)
-        print(f"ページ {page_num}/{len(images)} を保存しました: {image_path}")
-    
+    for page in rasterizer.render_pages(pdf_path, page_dir):
+        image_paths.append(page.path)
+        color = 'グレースケール' if page.grayscale else 'カラー'
+        print(f"ページ {page.page_number}/{page_count} を保存しました ({page.dpi} DPI, {color}): {page.path}")
+
     return image_paths
 
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='PDFファイルを画像に変換します')
     parser.add_argument('pdf_path', help='変換するPDFファイルのパス')
     parser.add_argument('--output-dir', '-o', help='出力先ディレクトリ')
     parser.add_argument('--format', '-f', choices=['jpg', 'png'], default='jpg',
-                      help='出力画像形式 (jpg または png)')
+                        help='出力画像形式 (jpg または png)')
     parser.add_argument('--dpi', '-d', type=int, default=200,
-                      help='出力画像の解像度 (DPI)')
-    
+                        help='出力画像の解像度 (DPI)')
+    parser.add_argument('--window-size', '-w', type=int, default=10,
+                        help='1回に画像化するページ数')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='同時に画像化する範囲の数 (0の場合はCPUコア数)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='ページごとに解像度と色を決める (文字のみのページは低解像度のグレースケール)')
+
     args = parser.parse_args()
-    
+
     output_images = convert_pdf_to_images(
         args.pdf_path,
         args.output_dir,
         args.format,
-        args.dpi
+        args.dpi,
+        args.window_size,
+        args.workers,
+        args.adaptive
     )
-    
+
     print(f"\n変換完了: {len(output_images)}ページの画像を生成しました")
-    print(f"出力形式: {args.format.upper()}, 解像度: {args.dpi} DPI")
\ No newline at end of file
+    print(f"出力形式: {args.format.upper()}, 解像度: {args.dpi} DPI")